@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains the monitor of the event loop latencies of the Qudi threads.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+import os
+import sys
+import threading
+import time
+from qtpy import QtCore, QtGui
+from collections import OrderedDict, deque
+from .util.mutex import Mutex
+
+_CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+_MAIN_DIR = os.path.dirname(_CORE_DIR)
+
+
+class EventLoopProbe(QtCore.QObject):
+    """ Object in a monitored thread that answers the pings of the monitor.
+
+      A ping is a queued call, it is executed after all events that were posted to the thread
+      before it. The time between sending and answering is the time a queued signal waits in
+      this thread.
+    """
+    sigPing = QtCore.Signal(float)
+
+    def __init__(self, monitor, name):
+        """
+          @param EventLoopMonitor monitor: monitor that receives the answers
+          @param str name: name of the thread
+        """
+        super().__init__()
+        self.monitor = monitor
+        self.name = name
+        self.sigPing.connect(self.pong, QtCore.Qt.QueuedConnection)
+
+    @QtCore.Slot(float)
+    def pong(self, sent):
+        """ Answer a ping. Runs in the monitored thread.
+
+          @param float sent: time.perf_counter() when the ping was sent
+        """
+        self.monitor.recordWait(self.name, threading.get_ident(), time.perf_counter() - sent)
+
+    @QtCore.Slot()
+    def release(self):
+        """ Move the probe to the thread of the monitor. Runs in the monitored thread when it
+            finishes, afterwards the probe can no longer be moved out of it and deleteLater
+            would never be processed there.
+        """
+        self.moveToThread(self.monitor.thread())
+
+
+class ThreadMetrics:
+    """ Event loop metrics of one monitored thread. """
+
+    def __init__(self, name, thread, probe, window=100):
+        """
+          @param str name: name of the thread
+          @param QThread thread: monitored thread
+          @param EventLoopProbe probe: probe living in the thread
+          @param int window: number of waits kept for the live metrics
+        """
+        self.name = name
+        self.thread = thread
+        self.probe = probe
+        self.ident = None
+        self.pingSent = None
+        self.waits = deque(maxlen=window)
+        self.blocking = None
+        self.blocks = 0
+        self.longestBlock = 0.0
+        self.longestBlockSlot = ''
+        self.blockTimes = OrderedDict()
+
+
+class EventLoopMonitor(QtCore.QAbstractTableModel):
+    """ This class measures how long queued events wait in the event loops of the Qudi threads
+        and finds the slots that block them.
+
+      Every thread created by the ThreadManager gets a probe object. A watchdog thread sends a
+      queued ping to every probe at a fixed interval, while the ping of a thread is not
+      answered no new ping is sent. The time until the answer is the wait of a queued signal in
+      this thread. If a ping is not answered within the block threshold, the watchdog looks at
+      the python stack of the thread: the outermost function of a hardware, logic or gui module
+      is the slot that blocks the event loop. A warning with this slot is logged and the blocked
+      time is accumulated per slot.
+
+      The watchdog is a plain python thread, so it also detects a blocked main thread. The class
+      is a table model with the live metrics of the threads that can be displayed in the manager
+      GUI.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lock = Mutex()
+        self.interval = 0.1
+        self.threshold = 0.5
+        self._threads = OrderedDict()
+        self._keys = list()
+        self._metrics = OrderedDict()
+        self._watchdog = None
+        self._stopEvent = threading.Event()
+        self.headers = ['Thread', 'Wait [ms]', 'Mean wait [ms]', 'Max wait [ms]', 'Blocks',
+                        'Longest block [ms]', 'Blocking slot']
+        self.addThread('main', QtCore.QThread.currentThread())
+        self._refreshTimer = QtCore.QTimer()
+        self._refreshTimer.setInterval(1000)
+        self._refreshTimer.timeout.connect(self._refresh)
+
+    def start(self, interval=0.1, threshold=0.5):
+        """ Start monitoring.
+
+          @param float interval: time between two pings of a thread in seconds, 0 to disable
+          @param float threshold: time in seconds a slot may run before it is reported
+        """
+        if interval <= 0 or self._watchdog is not None:
+            return
+        self.interval = interval
+        self.threshold = threshold
+        self._stopEvent.clear()
+        self._watchdog = threading.Thread(
+            target=self._watch, name='eventloop-watchdog', daemon=True)
+        self._watchdog.start()
+        self._refreshTimer.start()
+
+    def stop(self):
+        """ Stop monitoring. """
+        if self._watchdog is None:
+            return
+        self._stopEvent.set()
+        self._watchdog.join()
+        self._watchdog = None
+        self._refreshTimer.stop()
+
+    def isRunning(self):
+        """ @return bool: threads are monitored """
+        return self._watchdog is not None
+
+    def addThread(self, name, thread):
+        """ Monitor the event loop of a thread. The thread does not need to be started yet.
+
+          @param str name: unique name of the thread
+          @param QThread thread: the thread
+        """
+        probe = EventLoopProbe(self, name)
+        probe.moveToThread(thread)
+        thread.finished.connect(probe.release, QtCore.Qt.DirectConnection)
+        with self.lock:
+            self._threads[name] = ThreadMetrics(name, thread, probe)
+
+    def removeThread(self, name):
+        """ Stop monitoring a thread.
+
+          @param str name: name of the thread
+        """
+        with self.lock:
+            metrics = self._threads.pop(name, None)
+        if metrics is not None:
+            # the probe was moved to the thread of the monitor when its thread finished
+            metrics.probe.deleteLater()
+
+    def recordWait(self, name, ident, wait):
+        """ Record the answer to a ping. Thread safe.
+
+          @param str name: name of the thread
+          @param int ident: python identifier of the thread
+          @param float wait: time the ping waited in seconds
+        """
+        with self.lock:
+            metrics = self._threads.get(name)
+            if metrics is None:
+                return
+            metrics.ident = ident
+            metrics.pingSent = None
+            metrics.waits.append(wait)
+            slot = metrics.blocking
+            metrics.blocking = None
+            if slot is not None:
+                metrics.blocks += 1
+                metrics.blockTimes[slot] = metrics.blockTimes.get(slot, 0.0) + wait
+                if wait > metrics.longestBlock:
+                    metrics.longestBlock = wait
+                    metrics.longestBlockSlot = slot
+        if slot is not None:
+            logger.warning('Thread {0} was blocked for {1:.3f} s by {2}.'.format(
+                name, wait, slot))
+
+    def _watch(self):
+        """ Send the pings and check for blocked threads. Runs in the watchdog thread.
+        """
+        while not self._stopEvent.wait(self.interval):
+            now = time.perf_counter()
+            blocked = list()
+            with self.lock:
+                for metrics in self._threads.values():
+                    if not metrics.thread.isRunning():
+                        metrics.pingSent = None
+                        metrics.blocking = None
+                    elif metrics.pingSent is None:
+                        metrics.pingSent = now
+                        metrics.probe.sigPing.emit(now)
+                    elif (now - metrics.pingSent > self.threshold
+                            and metrics.blocking is None
+                            and metrics.ident is not None):
+                        blocked.append(metrics)
+            for metrics in blocked:
+                slot = self.runningSlot(metrics.ident)
+                with self.lock:
+                    if metrics.pingSent is None:
+                        continue
+                    metrics.blocking = slot
+                logger.warning('Thread {0} is blocked for more than {1:.3f} s by {2}.'.format(
+                    metrics.name, self.threshold, slot))
+
+    @staticmethod
+    def runningSlot(ident):
+        """ Find the slot that runs in a thread from its python stack.
+
+          @param int ident: python identifier of the thread
+
+          @return str: class and function of the outermost frame in a hardware, logic or gui
+                       module or the innermost frame if there is none
+        """
+        frame = sys._current_frames().get(ident)
+        if frame is None:
+            return 'unknown slot'
+        stack = list()
+        while frame is not None:
+            stack.append(frame)
+            frame = frame.f_back
+        innermost = stack[0]
+        for frame in reversed(stack):
+            filename = os.path.abspath(frame.f_code.co_filename)
+            if filename.startswith(_MAIN_DIR) and not filename.startswith(_CORE_DIR):
+                break
+        else:
+            frame = innermost
+        owner = frame.f_locals.get('self')
+        name = frame.f_code.co_name
+        if owner is not None:
+            name = '{0}.{1}'.format(type(owner).__name__, name)
+        return '{0} ({1}:{2})'.format(
+            name, os.path.basename(frame.f_code.co_filename), frame.f_lineno)
+
+    def getMetrics(self):
+        """ Get the metrics of all monitored threads.
+
+          @return OrderedDict: {thread name: dict with wait (last), mean_wait, max_wait (over the
+                               last waits, in s), blocks, longest_block (s), longest_block_slot,
+                               blocking (slot blocking now or None) and block_times (blocked
+                               time in s per slot)}
+        """
+        with self.lock:
+            result = OrderedDict()
+            for name, metrics in self._threads.items():
+                waits = list(metrics.waits)
+                result[name] = OrderedDict([
+                    ('wait', waits[-1] if waits else 0.0),
+                    ('mean_wait', sum(waits) / len(waits) if waits else 0.0),
+                    ('max_wait', max(waits) if waits else 0.0),
+                    ('blocks', metrics.blocks),
+                    ('longest_block', metrics.longestBlock),
+                    ('longest_block_slot', metrics.longestBlockSlot),
+                    ('blocking', metrics.blocking),
+                    ('block_times', OrderedDict(metrics.blockTimes))])
+            return result
+
+    @QtCore.Slot()
+    def _refresh(self):
+        """ Update the table with the current metrics. Runs in the thread of the model.
+        """
+        self.beginResetModel()
+        self._metrics = self.getMetrics()
+        self._keys = list(self._metrics)
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        """ Gives the number of monitored threads.
+
+          @return int: number of threads
+        """
+        return len(self._keys)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        """ Gives the number of columns.
+
+          @return int: number of columns
+        """
+        return len(self.headers)
+
+    def flags(self, index):
+        """ Determines what can be done with entry cells in the table view.
+
+          @param QModelIndex index: cell fo which the flags are requested
+
+          @return Qt.ItemFlags: actins allowed fotr this cell
+        """
+        return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+
+    def data(self, index, role):
+        """ Get data from model for a given cell. Data can have a role that affects display.
+
+          @param QModelIndex index: cell for which data is requested
+          @param ItemDataRole role: role for which data is requested
+
+          @return QVariant: data for given cell and role
+        """
+        if not index.isValid() or not 0 <= index.row() < len(self._keys):
+            return None
+        name = self._keys[index.row()]
+        metrics = self._metrics[name]
+        if role == QtCore.Qt.ForegroundRole:
+            if metrics['blocking'] is not None:
+                return QtGui.QColor('red')
+            return None
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        column = index.column()
+        if column == 0:
+            return name
+        elif column == 1:
+            return '{0:.1f}'.format(1e3 * metrics['wait'])
+        elif column == 2:
+            return '{0:.1f}'.format(1e3 * metrics['mean_wait'])
+        elif column == 3:
+            return '{0:.1f}'.format(1e3 * metrics['max_wait'])
+        elif column == 4:
+            return metrics['blocks']
+        elif column == 5:
+            return '{0:.1f}'.format(1e3 * metrics['longest_block'])
+        elif column == 6:
+            if metrics['blocking'] is not None:
+                return metrics['blocking']
+            return metrics['longest_block_slot']
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        """ Data for the table view headers.
+
+          @param int section: number of the column to get header data for
+          @param Qt.Orientation: orientation of header (horizontal or vertical)
+          @param ItemDataRole: role for which to get data
+
+          @return QVariant: header data for given column and role
+        """
+        if not(0 <= section < len(self.headers)):
+            return None
+        elif role != QtCore.Qt.DisplayRole:
+            return None
+        elif orientation != QtCore.Qt.Horizontal:
+            return None
+        else:
+            return self.headers[section]
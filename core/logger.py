@@ -30,6 +30,7 @@ import logging.handlers
 import sys
 import traceback
 import functools
+from collections import deque
 from qtpy import QtCore
 
 
@@ -78,7 +79,10 @@ class QtLogHandler(QtCore.QObject, logging.Handler):
     """Log handler for displaying log records in a QT gui.
 
       For each log record the Qt signal sigLoggedMessage is emitted
-      with a dictionary as parameter. The keys of this dictionary are:
+      with a dictionary as parameter. The records are also collected and
+      emitted together as a list with sigLoggedMessages once the thread of
+      the handler gets to it, so that a burst of records from another thread
+      costs a single queued signal. The keys of the dictionaries are:
         - name: logger name
         - message: the message
         - timestamp: the creation time of the log record
@@ -90,26 +94,52 @@ class QtLogHandler(QtCore.QObject, logging.Handler):
 
       @param object parent: parent of QObject, defaults to None
       @param int level: log level, defaults to NOTSET
+      @param int max_pending: maximum number of records waiting for
+                              sigLoggedMessages, older ones are dropped
     """
 
     sigLoggedMessage = QtCore.Signal(object)
     """signal emitted for each log record"""
+    sigLoggedMessages = QtCore.Signal(object)
+    """signal emitted with a list of the log records since the last one"""
+    _sigFlush = QtCore.Signal()
 
-    def __init__(self, parent=None, level=0):
+    def __init__(self, parent=None, level=0, max_pending=10000):
         QtCore.QObject.__init__(self, parent)
         logging.Handler.__init__(self, level)
         self.setFormatter(QtLogFormatter())
+        self._pending = deque(maxlen=max_pending)
+        self._sigFlush.connect(self._flush, QtCore.Qt.QueuedConnection)
 
     def emit(self, record):
         """Emit function of handler.
 
-          Formats the log record and emits :sigLoggedMessage:
+          Formats the log record, emits :sigLoggedMessage: and queues
+          the record for :sigLoggedMessages:
 
           @param object record: :logging.LogRecord:
         """
         record = self.format(record)
         if record:
             self.sigLoggedMessage.emit(record)
+            # the lock of the handler is held while emit is called
+            self._pending.append(record)
+            if len(self._pending) == 1:
+                self._sigFlush.emit()
+
+    @QtCore.Slot()
+    def _flush(self):
+        """Emit :sigLoggedMessages: with all queued records. Runs in the
+           thread of the handler.
+        """
+        self.acquire()
+        try:
+            records = list(self._pending)
+            self._pending.clear()
+        finally:
+            self.release()
+        if records:
+            self.sigLoggedMessages.emit(records)
 
 
 def initialize_logger():
@@ -36,10 +36,15 @@ from qtpy import QtCore
 from . import config
 
 from .util.mutex import Mutex   # Mutex provides access serialization between threads
-from .util.modules import toposort, isBase
+from .util.modules import toposort, toposort_levels, isBase
 from collections import OrderedDict
 from .logger import register_exception_handler
 from .threadmanager import ThreadManager
+from .eventloopmonitor import EventLoopMonitor
+from .startupprofiler import StartupProfiler
+from .methodprofiler import MethodProfiler
+from .statusstore import StatusStore
+from .workerprocess import WorkerProcess, freePort
 # try to import RemoteObjectManager. Might fail if rpyc is not installed.
 try:
     from .remote import RemoteObjectManager
@@ -103,6 +108,13 @@ class Manager(QtCore.QObject):
         self.baseDir = None
         self.alreadyQuit = False
         self.remote_server = False
+        self.startupTimeline = list()
+        # modification times of module source files at the time they were (re)loaded
+        self._moduleMTimes = dict()
+        self._statusStore = None
+        # worker processes by name and by the modules they run
+        self.workers = OrderedDict()
+        self._moduleWorkers = dict()
 
         try:
             # Initialize parent class QObject
@@ -112,9 +124,16 @@ class Manager(QtCore.QObject):
             register_exception_handler(self)
 
             # Thread management
-            self.tm = ThreadManager()
+            self.eventLoopMonitor = EventLoopMonitor()
+            self.tm = ThreadManager(monitor=self.eventLoopMonitor)
             logger.debug('Main thread is {0}'.format(QtCore.QThread.currentThreadId()))
 
+            # Durations of module import, reload, instantiation and activation
+            self.startupProfiler = StartupProfiler()
+
+            # Call statistics of the methods of profiled modules
+            self.methodProfiler = MethodProfiler()
+
             # Task runner
             self.tr = None
 
@@ -187,6 +206,13 @@ class Manager(QtCore.QObject):
                     except:
                         logger.exception('Remote server could not be started.')
 
+            self.setupWorkerProcesses()
+
+            # Watch the event loops of the main thread and all module threads
+            self.eventLoopMonitor.start(
+                self.tree['global'].get('eventloop_interval', 0.1),
+                self.tree['global'].get('slot_block_threshold', 0.5))
+
             logger.info('Qudi started.')
 
             # Load startup things from config here
@@ -550,6 +576,35 @@ class Manager(QtCore.QObject):
         # print('refcnt:', sys.getrefcount(mod))
         return mod
 
+    def reloadModuleIfChanged(self, moduleObject, force=False):
+        """Reload a python module if its source file was modified since it was last loaded.
+
+          @param object moduleObject: loaded python module
+          @param bool force: reload regardless of the modification time
+
+          @return bool: True if the module was reloaded
+
+          Reloading unchanged modules can be enforced for all modules with the global config
+          option 'force_module_reload: True'.
+        """
+        force = force or self.tree['global'].get('force_module_reload', False)
+        name = moduleObject.__name__
+        try:
+            mtime = os.path.getmtime(moduleObject.__file__)
+        except (AttributeError, TypeError, OSError):
+            mtime = None
+        if name not in self._moduleMTimes:
+            # first load, the module was just imported
+            self._moduleMTimes[name] = mtime
+            if not force:
+                return False
+        if force or mtime is None or mtime != self._moduleMTimes[name]:
+            logger.debug('Reloading python module {0}.'.format(name))
+            importlib.reload(moduleObject)
+            self._moduleMTimes[name] = mtime
+            return True
+        return False
+
     def configureModule(self, moduleObject, baseName, className, instanceName,
                         configuration=None):
         """Instantiate an object from the class that makes up a Qudi module
@@ -597,6 +652,10 @@ class Manager(QtCore.QObject):
         # Create object from class
         instance = modclass(manager=self, name=instanceName, config=configuration)
 
+        # profile the methods if switched on globally or for this module
+        if configuration.get('profile', self.tree['global'].get('method_profiling', False)):
+            self.methodProfiler.instrument(instance, instanceName)
+
         with self.lock:
             self.tree['loaded'][baseName][instanceName] = instance
 
@@ -619,7 +678,8 @@ class Manager(QtCore.QObject):
                              base, thismodule['module.Class'], mkey))
             return -1
         loaded_module = self.tree['loaded'][base][mkey]
-        if ('connect' not in thismodule):
+        if ('connect' not in thismodule) or mkey in self._moduleWorkers:
+            # modules in worker processes are connected by the worker manager
             return 0
         if (not isinstance(loaded_module.connectors, OrderedDict)):
             logger.error('Connectors attribute of module {0}.{1} is not a '
@@ -754,6 +814,8 @@ class Manager(QtCore.QObject):
         """
         defined_module = self.tree['defined'][base][key]
         if 'module.Class' in defined_module:
+            if key in self._moduleWorkers:
+                return self.loadWorkerModule(base, key)
             if 'remote' in defined_module:
                 if self.rm is None:
                     logger.error('Remote module functionality disabled. Rpyc not installed.')
@@ -792,19 +854,26 @@ class Manager(QtCore.QObject):
                         '',
                         defined_module['module.Class'])
 
+                    start = time.perf_counter()
                     modObj = self.importModule(base, module_name)
+                    self.startupProfiler.record(base, key, 'import', time.perf_counter() - start)
 
-                    # Ensure that the namespace of a module is reloaded before 
-                    # instantiation. That will not harm anything.
-                    # Even if the import is successful an error might occur 
-                    # during instantiation. E.g. in an abc metaclass, 
+                    # Reload the namespace of the module if its source file changed since it was
+                    # last loaded. Even if the import is successful an error might occur
+                    # during instantiation. E.g. in an abc metaclass,
                     # methods might be missing in a derived interface file.
-                    # Reloading the namespace will prevent the need to restart 
-                    # Qudi, if a module instantiation was not successful upon 
-                    # load.
-                    importlib.reload(modObj)  # keep the namespace of module up to date
-
+                    # Reloading the changed namespace will prevent the need to restart
+                    # Qudi, if a module instantiation was not successful upon
+                    # load. Unchanged modules are not executed a second time.
+                    start = time.perf_counter()
+                    if self.reloadModuleIfChanged(modObj):
+                        self.startupProfiler.record(
+                            base, key, 'reload', time.perf_counter() - start)
+
+                    start = time.perf_counter()
                     self.configureModule(modObj, base, class_name, key, defined_module)
+                    self.startupProfiler.record(
+                        base, key, 'instantiate', time.perf_counter() - start)
                     if 'remoteaccess' in defined_module and defined_module['remoteaccess']:
                         if self.rm is None:
                             logger.error('Remote module sharing functionality disabled. Rpyc not'
@@ -835,7 +904,20 @@ class Manager(QtCore.QObject):
           @return int: 0 on success, -1 on failure
         """
         defined_module = self.tree['defined'][base][key]
-        if 'remote' in defined_module:
+        if key in self._moduleWorkers:
+            worker = self._moduleWorkers[key]
+            try:
+                if worker.isRunning():
+                    worker.reloadModule(key)
+            except:
+                logger.exception('Error while reloading {0} module {1} in worker process {2}.'
+                                 ''.format(base, key, worker.name))
+                return -1
+            with self.lock:
+                self.tree['loaded'][base].pop(key, None)
+            # the worker created a new module object
+            return self.loadWorkerModule(base, key)
+        elif 'remote' in defined_module:
             if self.rm is None:
                 logger.error('Remote functionality not working, check your log.')
                 return -1
@@ -879,10 +961,20 @@ class Manager(QtCore.QObject):
                     '',
                     defined_module['module.Class'])
 
+                start = time.perf_counter()
                 modObj = self.importModule(base, module_name)
+                self.startupProfiler.record(base, key, 'import', time.perf_counter() - start)
                 # des Pudels Kern
-                importlib.reload(modObj)
+                start = time.perf_counter()
+                self.reloadModuleIfChanged(modObj, force=True)
+                self.startupProfiler.record(base, key, 'reload', time.perf_counter() - start)
+                start = time.perf_counter()
                 self.configureModule(modObj, base, class_name, key, defined_module)
+                self.startupProfiler.record(base, key, 'instantiate', time.perf_counter() - start)
+                if self.rm is not None and key in self.rm.sharedModules.storage:
+                    # share the new module object instead of the old one
+                    self.rm.unshareModule(key)
+                    self.rm.shareModule(key, self.tree['loaded'][base][key])
             except:
                 logger.exception('Error while reloading {0} module: {1}'.format(base, key))
                 return -1
@@ -949,6 +1041,14 @@ class Manager(QtCore.QObject):
             logger.error('{0} module {1} not loaded.'.format(base, name))
             return
         module = self.tree['loaded'][base][name]
+        if name in self._moduleWorkers:
+            try:
+                if module.module_state() == 'deactivated':
+                    self._moduleWorkers[name].activateModule(name)
+            except:
+                logger.exception('{0} module {1}: error during activation in worker process:'
+                                 ''.format(base, name))
+            return
         if module.module_state() != 'deactivated' and (
                 self.isModuleDefined(base, name)
                 and 'remote' in self.tree['defined'][base][name]):
@@ -964,6 +1064,7 @@ class Manager(QtCore.QObject):
                 modthread = self.tm.newThread('mod-{0}-{1}'.format(base, name))
                 module.moveToThread(modthread)
                 modthread.start()
+                start = time.perf_counter()
                 success = QtCore.QMetaObject.invokeMethod(
                     module.module_state,
                     'trigger',
@@ -971,7 +1072,9 @@ class Manager(QtCore.QObject):
                     QtCore.Q_RETURN_ARG(bool),
                     QtCore.Q_ARG(str, 'activate'))
             else:
+                start = time.perf_counter()
                 success = module.module_state.activate() # runs on_activate in main thread
+            self.startupProfiler.record(base, name, 'activate', time.perf_counter() - start)
             logger.debug('Activation success: {}'.format(success))
         except:
             logger.exception(
@@ -991,6 +1094,11 @@ class Manager(QtCore.QObject):
             logger.error('{0} module {1} not loaded.'.format(base, name))
             return
         module = self.tree['loaded'][base][name]
+        if (self.tree['global'].get('worker_process')
+                and 'remote' in self.tree['defined'][base][name]):
+            logger.debug('Remote module {0}.{1} is deactivated by its own manager.'
+                         ''.format(base, name))
+            return
         try:
             if not self.isModuleActive(base, name):
                 logger.error('{0} module {1} is not activated.'.format(base, name))
@@ -1002,6 +1110,14 @@ class Manager(QtCore.QObject):
             with self.lock:
                 self.tree['loaded'][base].pop(name)
             return
+        if name in self._moduleWorkers:
+            try:
+                # the worker manager saves the status variables
+                self._moduleWorkers[name].deactivateModule(name)
+            except:
+                logger.exception('{0} module {1}: error during deactivation in worker process:'
+                                 ''.format(base, name))
+            return
         try:
             if module.is_module_threaded:
                 success = QtCore.QMetaObject.invokeMethod(
@@ -1260,6 +1376,12 @@ class Manager(QtCore.QObject):
             activate them.
         """
         deps = self.getAllRecursiveModuleDependencies(self.tree['defined'])
+
+        if self.tree['global'].get('parallel_startup', False):
+            self.startModulesConcurrently(deps)
+            logger.info('Start all modules finished.')
+            return
+
         sorteddeps = toposort(deps)
 
         for module in sorteddeps:
@@ -1269,16 +1391,272 @@ class Manager(QtCore.QObject):
 
         logger.info('Start all modules finished.')
 
+    def startModulesConcurrently(self, deps):
+        """ Load, connect and activate modules level by level of the dependency graph. All
+            modules within one level are independent of each other and are activated in parallel.
+
+          @param dict deps: module dependencies in the format of the toposort function
+
+          @return int: 0 on success, -1 on error
+
+            Threaded modules are activated in their own module thread as usual. Unthreaded
+            modules (usually hardware), GUI modules, remote modules and modules with the config
+            entry 'parallel_activation: False' are activated sequentially in the main thread, since
+            drivers may hold handles that only work in the thread they were created in.
+            A startup timeline with per-module durations is written to the log and kept in
+            self.startupTimeline.
+        """
+        startup_start = time.perf_counter()
+        self.startupTimeline = list()
+        levels = toposort_levels(deps)
+        status = 0
+
+        for level, modules in enumerate(levels):
+            concurrent = list()
+            sequential = list()
+            for mkey in modules:
+                mbase = self.findBase(mkey)
+                entry = OrderedDict()
+                entry['name'] = mkey
+                entry['base'] = mbase
+                entry['level'] = level
+                entry['load'] = 0.0
+                entry['start'] = time.perf_counter() - startup_start
+                entry['activate'] = 0.0
+                entry['thread'] = ''
+                entry['success'] = False
+                if mkey not in self.tree['loaded'][mbase]:
+                    load_start = time.perf_counter()
+                    success = self.loadConfigureModule(mbase, mkey)
+                    if success < 0:
+                        logger.warning('Stopping module loading after loading failure.')
+                        status = -1
+                        break
+                    elif success > 0:
+                        logger.warning('Nonfatal loading error, going on.')
+                    success = self.connectModule(mbase, mkey)
+                    if success < 0:
+                        logger.warning('Stopping loading module {0}.{1} after '
+                                       'connection failure.'.format(mbase, mkey))
+                        status = -1
+                        break
+                    entry['load'] = time.perf_counter() - load_start
+                    if mkey not in self.tree['loaded'][mbase]:
+                        continue
+                elif self.tree['loaded'][mbase][mkey].module_state() != 'deactivated':
+                    if mbase == 'gui':
+                        self.tree['loaded'][mbase][mkey].show()
+                    continue
+
+                self.startupTimeline.append(entry)
+                defined_module = self.tree['defined'][mbase][mkey]
+                if (mbase == 'gui'
+                        or not self.tree['loaded'][mbase][mkey].is_module_threaded
+                        or 'remote' in defined_module
+                        or mkey in self._moduleWorkers
+                        or not defined_module.get('parallel_activation', True)):
+                    sequential.append(entry)
+                else:
+                    concurrent.append(entry)
+
+            self._activateModulesConcurrently(concurrent, sequential, startup_start)
+            if status < 0:
+                break
+
+        self._logStartupTimeline(time.perf_counter() - startup_start)
+        return status
+
+    def _activateModulesConcurrently(self, concurrent, sequential, startup_start):
+        """ Activate a group of independent modules.
+
+          @param list concurrent: startup timeline entries of threaded modules to activate in
+                                  parallel in their module threads
+          @param list sequential: startup timeline entries of modules to activate in the main thread
+          @param float startup_start: time.perf_counter() value at the start of the startup
+        """
+        activators = list()
+        for entry in concurrent:
+            base = entry['base']
+            name = entry['name']
+            module = self.tree['loaded'][base][name]
+            try:
+                module.setStatusVariables(self.loadStatusVariables(base, name))
+                thread_name = 'mod-{0}-{1}'.format(base, name)
+                thread = self.tm.newThread(thread_name)
+                activator = ModuleActivator(module, entry, thread_name)
+                module.moveToThread(thread)
+                activator.moveToThread(thread)
+                thread.start()
+                activators.append(activator)
+            except:
+                logger.exception(
+                    '{0} module {1}: error during activation:'.format(base, name))
+
+        # wait for the concurrent activations in a local event loop so queued calls to the main
+        # thread issued from on_activate are still processed
+        loop = QtCore.QEventLoop()
+        remaining = set(activators)
+
+        def activation_finished(activator):
+            remaining.discard(activator)
+            self.startupProfiler.record(activator.entry['base'],
+                                        activator.entry['name'],
+                                        'activate',
+                                        activator.stop_time - activator.start_time)
+            logger.debug('Activation success: {}'.format(activator.entry['success']))
+            if len(remaining) == 0:
+                loop.quit()
+
+        for activator in activators:
+            activator.sigFinished.connect(activation_finished, QtCore.Qt.QueuedConnection)
+            QtCore.QMetaObject.invokeMethod(activator, 'activate', QtCore.Qt.QueuedConnection)
+
+        # main thread activations overlap with the concurrent ones
+        for entry in sequential:
+            entry['start'] = time.perf_counter() - startup_start
+            self.activateModule(entry['base'], entry['name'])
+            entry['activate'] = time.perf_counter() - startup_start - entry['start']
+            entry['thread'] = 'main'
+            entry['success'] = self.isModuleActive(entry['base'], entry['name'])
+
+        if len(remaining) > 0:
+            loop.exec_()
+
+        for activator in activators:
+            activator.entry['start'] = activator.start_time - startup_start
+            activator.entry['activate'] = activator.stop_time - activator.start_time
+        QtCore.QCoreApplication.instance().processEvents()
+
+    def _logStartupTimeline(self, total_time):
+        """ Write the startup timeline of the last concurrent startup to the log.
+
+          @param float total_time: total duration of the startup in seconds
+        """
+        lines = ['Startup timeline: {0} modules in {1:.3f} s'.format(
+            len(self.startupTimeline), total_time)]
+        lines.append('{0:>5}  {1:<30} {2:>8} {3:>8} {4:>10}  {5}'.format(
+            'level', 'module', 'load/s', 'start/s', 'activate/s', 'thread'))
+        for entry in sorted(self.startupTimeline, key=lambda e: (e['level'], e['start'])):
+            lines.append('{0:>5}  {1:<30} {2:>8.3f} {3:>8.3f} {4:>10.3f}  {5}{6}'.format(
+                entry['level'],
+                '{0}.{1}'.format(entry['base'], entry['name']),
+                entry['load'],
+                entry['start'],
+                entry['activate'],
+                entry['thread'],
+                '' if entry['success'] else ' (failed)'))
+        logger.info('\n'.join(lines))
+
+    def setupWorkerProcesses(self):
+        """ Assign the modules with the config option 'process' to worker processes. Modules
+            with the same process name share a worker, 'process: True' starts a worker for the
+            module alone. Modules of the main process that worker modules connect to are shared
+            through the module server, which is started on a local port if none is configured.
+        """
+        for base in ('hardware', 'logic', 'gui'):
+            for key, defined_module in self.tree['defined'][base].items():
+                if 'process' not in defined_module:
+                    continue
+                name = defined_module['process']
+                if name is True:
+                    name = key
+                if base == 'gui' or 'remote' in defined_module:
+                    logger.error('{0} module {1} can not run in a worker process.'
+                                 ''.format(base, key))
+                    continue
+                if not isinstance(name, str) or not name:
+                    logger.error('Process name of {0} module {1} is not a string.'
+                                 ''.format(base, key))
+                    continue
+                if name not in self.workers:
+                    self.workers[name] = WorkerProcess(self, name)
+                self.workers[name].addModule(base, key)
+                self._moduleWorkers[key] = self.workers[name]
+        if len(self.workers) == 0:
+            return
+        if self.rm is None:
+            logger.error('Worker processes disabled. Rpyc not installed.')
+            self.workers.clear()
+            self._moduleWorkers.clear()
+            return
+        if not self.remote_server:
+            try:
+                self.rm.createServer('localhost', freePort())
+                self.remote_server = True
+            except:
+                logger.exception('Module server for worker processes could not be started.')
+        for worker in self.workers.values():
+            worker.port = freePort()
+        for key, worker in self._moduleWorkers.items():
+            defined_module = self.tree['defined'][worker.modules[key]][key]
+            for target in WorkerProcess.connectionTargets(defined_module):
+                if target not in self._moduleWorkers:
+                    target_module = self.tree['defined'][self.findBase(target)][target]
+                    if 'remote' not in target_module:
+                        target_module['remoteaccess'] = True
+
+    def loadWorkerModule(self, base, key):
+        """ Start the worker process of a module if necessary and load the module as remote
+            module from it. The worker loads, connects and activates the module.
+
+          @param str base: module base package (hardware or logic)
+          @param str key: unique module name
+
+          @return int: 0 on success, -1 on error
+        """
+        worker = self._moduleWorkers[key]
+        try:
+            if not worker.isRunning():
+                server = self.rm.server
+                host = server.host if server.host not in ('', '0.0.0.0') else 'localhost'
+                worker.writeConfig(host, server.port, self._moduleWorkers,
+                                   certfile=server.certfile, keyfile=server.keyfile)
+                if not worker.start():
+                    return -1
+            instance = self.rm.getRemoteModule('localhost', worker.port, key)
+            with self.lock:
+                self.tree['loaded'][base][key] = instance
+            self.sigModulesChanged.emit()
+            logger.info('{0} module {1} loaded in worker process {2}.'
+                        ''.format(base, key, worker.name))
+            if self.tree['defined'][base][key].get('remoteaccess', False):
+                self.rm.shareModule(key, instance)
+        except:
+            logger.exception('Error while loading {0} module {1} in worker process {2}.'
+                             ''.format(base, key, worker.name))
+            return -1
+        return 0
+
+    def stopWorkerProcesses(self):
+        """ Quit all worker processes. """
+        for worker in self.workers.values():
+            worker.stop()
+
     def getStatusDir(self):
         """ Get the directory where the app state is saved, create it if necessary.
 
           @return str: path of application status directory
         """
-        appStatusDir = os.path.join(self.configDir, 'app_status')
+        appStatusDir = self.tree['global'].get('status_dir', None)
+        if appStatusDir is None:
+            appStatusDir = os.path.join(self.configDir, 'app_status')
         if not os.path.isdir(appStatusDir):
             os.makedirs(appStatusDir)
         return appStatusDir
 
+    def getStatusStore(self):
+        """ Get the binary status variable store if it is selected in the global config section
+            with 'status_store: binary'.
+
+          @return StatusStore: binary status store or None if status files are YAML
+        """
+        if self.tree['global'].get('status_store', 'yaml') != 'binary':
+            return None
+        statusdir = self.getStatusDir()
+        if self._statusStore is None or self._statusStore.directory != statusdir:
+            self._statusStore = StatusStore(statusdir)
+        return self._statusStore
+
     @QtCore.Slot(str, str, dict)
     def saveStatusVariables(self, base, module, variables):
         """ If a module has status variables, save them to a file in the application status directory.
@@ -1291,8 +1669,14 @@ class Manager(QtCore.QObject):
             try:
                 statusdir = self.getStatusDir()
                 classname = self.tree['loaded'][base][module].__class__.__name__
-                filename = os.path.join(statusdir,
-                    'status-{0}_{1}_{2}.cfg'.format(classname, base, module))
+                name = 'status-{0}_{1}_{2}'.format(classname, base, module)
+                store = self.getStatusStore()
+                if store is not None:
+                    written = store.save(name, variables)
+                    logger.debug('Saved status of {0}.{1}, wrote {2} array(s).'.format(
+                        base, module, written))
+                    return
+                filename = os.path.join(statusdir, name + '.cfg')
                 config.save(filename, variables)
             except:
                 print(variables)
@@ -1301,6 +1685,8 @@ class Manager(QtCore.QObject):
 
     def loadStatusVariables(self, base, module):
         """ If a status variable file exists for a module, load it into a dictionary.
+            With the binary status store, an existing YAML status file is used as long as the
+            module has no binary status yet.
 
           @param str base: the module category
           @param str module: the unique mduel name
@@ -1310,9 +1696,12 @@ class Manager(QtCore.QObject):
         try:
             statusdir = self.getStatusDir()
             classname = self.tree['loaded'][base][module].__class__.__name__
-            filename = os.path.join(
-                statusdir, 'status-{0}_{1}_{2}.cfg'.format(classname, base, module))
-            if os.path.isfile(filename):
+            name = 'status-{0}_{1}_{2}'.format(classname, base, module)
+            store = self.getStatusStore()
+            filename = os.path.join(statusdir, name + '.cfg')
+            if store is not None and store.exists(name):
+                variables = store.load(name)
+            elif os.path.isfile(filename):
                 variables = config.load(filename)
             else:
                 variables = OrderedDict()
@@ -1327,10 +1716,13 @@ class Manager(QtCore.QObject):
             statusdir = self.getStatusDir()
             classname = self.tree['defined'][base][
                 module]['module.Class'].split('.')[-1]
-            filename = os.path.join(
-                statusdir, 'status-{0}_{1}_{2}.cfg'.format(classname, base, module))
+            name = 'status-{0}_{1}_{2}'.format(classname, base, module)
+            filename = os.path.join(statusdir, name + '.cfg')
             if os.path.isfile(filename):
                 os.remove(filename)
+            store = self.getStatusStore()
+            if store is not None:
+                store.remove(name)
         except:
             logger.exception('Failed to remove module status file.')
 
@@ -1359,6 +1751,7 @@ class Manager(QtCore.QObject):
     @QtCore.Slot()
     def realQuit(self):
         """ Stop all modules, no questions asked. """
+        self.eventLoopMonitor.stop()
         deps = self.getAllRecursiveModuleDependencies(self.tree['loaded'])
         sorteddeps = toposort(deps)
         for b, mods in self.tree['loaded'].items():
@@ -1378,11 +1771,13 @@ class Manager(QtCore.QObject):
                 logger.info('Deactivating module {0}.{1}'.format(base, module))
                 self.deactivateModule(base, module)
             QtCore.QCoreApplication.processEvents()
+        self.stopWorkerProcesses()
         self.sigManagerQuit.emit(self, False)
 
     @QtCore.Slot()
     def restart(self):
         """Nicely request that all modules shut down for application restart."""
+        self.eventLoopMonitor.stop()
         for mbase,bdict in self.tree['loaded'].items():
             for module in bdict:
                 try:
@@ -1416,3 +1811,41 @@ class Manager(QtCore.QObject):
             else:
                 logger.warning('Replacing task runner.')
 
+
+
+class ModuleActivator(QtCore.QObject):
+    """ Activates a module in the thread this object lives in and records the timing.
+
+      Used by the Manager to activate independent threaded modules concurrently in their module
+      threads.
+
+      @signal object sigFinished: emitted with this activator after the activation is done
+    """
+    sigFinished = QtCore.Signal(object)
+
+    def __init__(self, module, entry, thread_name):
+        """ Create a ModuleActivator object
+
+          @param object module: the module to activate
+          @param dict entry: startup timeline entry of the module, gets updated
+          @param str thread_name: name of the thread the activation runs in
+        """
+        super().__init__()
+        self.module = module
+        self.entry = entry
+        self.thread_name = thread_name
+        self.start_time = 0.0
+        self.stop_time = 0.0
+
+    @QtCore.Slot()
+    def activate(self):
+        """ Run the activation of the module and emit sigFinished. """
+        self.start_time = time.perf_counter()
+        try:
+            self.entry['success'] = self.module.module_state.activate()
+        except:
+            logger.exception('{0} module {1}: error during activation:'.format(
+                self.entry['base'], self.entry['name']))
+        self.stop_time = time.perf_counter()
+        self.entry['thread'] = self.thread_name
+        self.sigFinished.emit(self)
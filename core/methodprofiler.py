@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains the profiler that records calls of the methods of Qudi modules.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import bisect
+import functools
+import json
+import logging
+logger = logging.getLogger(__name__)
+import os
+import threading
+import time
+import types
+from qtpy import QtCore
+from collections import OrderedDict, deque
+from .util.mutex import Mutex
+
+# upper bin edges of the latency histograms in seconds, 4 bins per decade from 1 us to 100 s
+HISTOGRAM_EDGES = [10 ** (exponent / 4) for exponent in range(-24, 9)]
+
+
+class MethodStatistics:
+    """ Call statistics of one method of one module. """
+
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'histogram', 'threads')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float('inf')
+        self.maximum = 0.0
+        # one bin more for durations above the last edge
+        self.histogram = [0] * (len(HISTOGRAM_EDGES) + 1)
+        self.threads = set()
+
+    def add(self, duration, thread):
+        self.count += 1
+        self.total += duration
+        self.minimum = min(self.minimum, duration)
+        self.maximum = max(self.maximum, duration)
+        self.histogram[bisect.bisect_left(HISTOGRAM_EDGES, duration)] += 1
+        self.threads.add(thread)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def percentile(self, fraction):
+        """ Estimate a percentile of the durations from the histogram.
+
+          @param float fraction: fraction of the calls between 0 and 1
+
+          @return float: upper edge of the histogram bin of the percentile in seconds
+        """
+        if self.count == 0:
+            return 0.0
+        limit = fraction * self.count
+        cumulated = 0
+        for index, counts in enumerate(self.histogram):
+            cumulated += counts
+            if cumulated >= limit:
+                break
+        if index < len(HISTOGRAM_EDGES):
+            return min(HISTOGRAM_EDGES[index], self.maximum)
+        return self.maximum
+
+
+class MethodProfiler(QtCore.QAbstractTableModel):
+    """ This class records call counts, durations and threads of the methods of instrumented
+        Qudi modules.
+
+      Modules are only instrumented if profiling is switched on in the configuration, otherwise
+      their methods are not touched and there is no overhead. The methods of an instrumented
+      module are replaced by wrappers on the module instance that time every call. The wrappers
+      also run for calls through queued signal connections, so loop bodies driven by signals
+      are measured in their own thread. Recording can be paused, then a wrapper only checks a
+      flag.
+
+      Every call is also kept as an event (up to maxEvents) for the export as a Chrome trace,
+      which can be viewed in chrome://tracing or https://ui.perfetto.dev. The class is a table
+      model that can be displayed in the manager GUI.
+    """
+    _sigChanged = QtCore.Signal()
+
+    def __init__(self, maxEvents=100000):
+        """
+          @param int maxEvents: number of calls kept for the trace export
+        """
+        super().__init__()
+        self.lock = Mutex()
+        self.enabled = True
+        self._statistics = OrderedDict()
+        self._keys = list()
+        self._events = deque(maxlen=maxEvents)
+        self._threadNames = dict()
+        self._changed = False
+        self.headers = ['Module', 'Method', 'Calls', 'Mean [ms]', 'Median [ms]', '95% [ms]',
+                        'Max [ms]', 'Total [ms]', 'Threads']
+        # the table is refreshed at most once per second
+        self._refreshTimer = QtCore.QTimer()
+        self._refreshTimer.setSingleShot(True)
+        self._refreshTimer.setInterval(1000)
+        self._refreshTimer.timeout.connect(self._refresh)
+        # records from other threads start the timer in the thread of the model
+        self._sigChanged.connect(self._refreshTimer.start, QtCore.Qt.QueuedConnection)
+
+    @staticmethod
+    def profiledMethods(module):
+        """ Names of the methods of a module that are instrumented.
+
+          @param object module: Qudi module instance
+
+          @return tuple: method names collected by the module metaclass
+        """
+        return getattr(type(module), '_profiled_methods', tuple())
+
+    def instrument(self, module, name):
+        """ Replace the methods of a module instance by wrappers that record every call.
+
+          @param object module: Qudi module instance
+          @param str name: name of the module in the records
+        """
+        count = 0
+        for methodName in self.profiledMethods(module):
+            method = getattr(module, methodName, None)
+            if not isinstance(method, types.MethodType) or method.__self__ is not module:
+                continue
+            setattr(module, methodName,
+                    types.MethodType(self._wrap(name, methodName, method.__func__), module))
+            count += 1
+        logger.debug('Profiling {0} methods of {1}.'.format(count, name))
+
+    def _wrap(self, moduleName, methodName, function):
+        """ Create the wrapper for one method.
+
+          @param str moduleName: name of the module in the records
+          @param str methodName: name of the method
+          @param function function: function of the method in the module class
+
+          @return function: wrapper with the signature of the function
+        """
+        profiler = self
+
+        @functools.wraps(function)
+        def profiled(module, *args, **kwargs):
+            if not profiler.enabled:
+                return function(module, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(module, *args, **kwargs)
+            finally:
+                profiler.record(moduleName, methodName, start, time.perf_counter() - start)
+
+        # Qt has to call the wrapper, not the slot registered for the class
+        profiled.__dict__.pop('__pyqtSignature__', None)
+        return profiled
+
+    def record(self, moduleName, methodName, start, duration):
+        """ Record one call. Thread safe.
+
+          @param str moduleName: name of the module
+          @param str methodName: name of the method
+          @param float start: start time from time.perf_counter in seconds
+          @param float duration: duration in seconds
+        """
+        thread = threading.get_ident()
+        key = (moduleName, methodName)
+        with self.lock:
+            statistics = self._statistics.get(key)
+            if statistics is None:
+                statistics = self._statistics[key] = MethodStatistics()
+            statistics.add(duration, thread)
+            self._events.append((moduleName, methodName, start, duration, thread))
+            if thread not in self._threadNames:
+                self._threadNames[thread] = self._threadName()
+            changed = self._changed
+            self._changed = True
+        if not changed:
+            self._sigChanged.emit()
+
+    @staticmethod
+    def _threadName():
+        """ Name of the current thread, Qt threads of the thread manager have the name of their
+            module.
+        """
+        name = QtCore.QThread.currentThread().objectName()
+        if not name:
+            name = threading.current_thread().name
+        return name
+
+    @QtCore.Slot()
+    def _refresh(self):
+        """ Update the table with the new records. Runs in the thread of the model.
+        """
+        with self.lock:
+            self._changed = False
+            keys = list(self._statistics)
+        if len(keys) != len(self._keys):
+            self.beginInsertRows(QtCore.QModelIndex(), len(self._keys), len(keys) - 1)
+            self._keys = keys
+            self.endInsertRows()
+        if len(self._keys) > 0:
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(len(self._keys) - 1, len(self.headers) - 1))
+
+    def setEnabled(self, enabled):
+        """ Pause or resume recording. The methods stay instrumented.
+
+          @param bool enabled: record calls
+        """
+        self.enabled = bool(enabled)
+
+    def clear(self):
+        """ Remove all records. """
+        with self.lock:
+            self.beginResetModel()
+            self._statistics.clear()
+            self._keys = list()
+            self._events.clear()
+            self.endResetModel()
+
+    def getStatistics(self):
+        """ Get a summary of all recorded calls.
+
+          @return OrderedDict: {(module, method): dict with count, total, mean, min, max, median,
+                               p95 (all durations in s), histogram (counts per bin of
+                               HISTOGRAM_EDGES and above) and threads (names)}
+        """
+        with self.lock:
+            summary = OrderedDict()
+            for key, statistics in self._statistics.items():
+                summary[key] = OrderedDict([
+                    ('count', statistics.count),
+                    ('total', statistics.total),
+                    ('mean', statistics.mean),
+                    ('min', statistics.minimum),
+                    ('max', statistics.maximum),
+                    ('median', statistics.percentile(0.5)),
+                    ('p95', statistics.percentile(0.95)),
+                    ('histogram', list(statistics.histogram)),
+                    ('threads', sorted(self._threadNames[t] for t in statistics.threads))])
+            return summary
+
+    def exportChromeTrace(self, filename):
+        """ Save the recorded calls in the Chrome trace event format (JSON). The summary of
+            getStatistics is saved with it under the key 'methodStatistics'.
+
+          @param str filename: path of the JSON file
+        """
+        statistics = self.getStatistics()
+        with self.lock:
+            events = list(self._events)
+            threadNames = dict(self._threadNames)
+        pid = os.getpid()
+        traceEvents = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread,
+             'args': {'name': threadName}}
+            for thread, threadName in threadNames.items()]
+        for moduleName, methodName, start, duration, thread in events:
+            traceEvents.append({
+                'name': methodName,
+                'cat': moduleName,
+                'ph': 'X',
+                'ts': 1e6 * start,
+                'dur': 1e6 * duration,
+                'pid': pid,
+                'tid': thread})
+        methodStatistics = list()
+        for (moduleName, methodName), summary in statistics.items():
+            entry = OrderedDict([('module', moduleName), ('method', methodName)])
+            entry.update(summary)
+            methodStatistics.append(entry)
+        with open(filename, 'w') as tracefile:
+            json.dump({
+                'traceEvents': traceEvents,
+                'displayTimeUnit': 'ms',
+                'histogramEdges': HISTOGRAM_EDGES,
+                'methodStatistics': methodStatistics}, tracefile)
+        logger.info('Saved {0} method calls to {1}.'.format(len(events), filename))
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        """ Gives the number of profiled methods that were called.
+
+          @return int: number of methods
+        """
+        return len(self._keys)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        """ Gives the number of columns.
+
+          @return int: number of columns
+        """
+        return len(self.headers)
+
+    def flags(self, index):
+        """ Determines what can be done with entry cells in the table view.
+
+          @param QModelIndex index: cell fo which the flags are requested
+
+          @return Qt.ItemFlags: actins allowed fotr this cell
+        """
+        return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+
+    def data(self, index, role):
+        """ Get data from model for a given cell. Data can have a role that affects display.
+
+          @param QModelIndex index: cell for which data is requested
+          @param ItemDataRole role: role for which data is requested
+
+          @return QVariant: data for given cell and role
+        """
+        if not index.isValid() or role != QtCore.Qt.DisplayRole:
+            return None
+        if not 0 <= index.row() < len(self._keys):
+            return None
+        key = self._keys[index.row()]
+        column = index.column()
+        if column < 2:
+            return key[column]
+        with self.lock:
+            statistics = self._statistics.get(key)
+            if statistics is None:
+                return None
+            if column == 2:
+                return statistics.count
+            elif column == 3:
+                return '{0:.3f}'.format(1e3 * statistics.mean)
+            elif column == 4:
+                return '{0:.3f}'.format(1e3 * statistics.percentile(0.5))
+            elif column == 5:
+                return '{0:.3f}'.format(1e3 * statistics.percentile(0.95))
+            elif column == 6:
+                return '{0:.3f}'.format(1e3 * statistics.maximum)
+            elif column == 7:
+                return '{0:.1f}'.format(1e3 * statistics.total)
+            elif column == 8:
+                return ', '.join(sorted(self._threadNames[t] for t in statistics.threads))
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        """ Data for the table view headers.
+
+          @param int section: number of the column to get header data for
+          @param Qt.Orientation: orientation of header (horizontal or vertical)
+          @param ItemDataRole: role for which to get data
+
+          @return QVariant: header data for given column and role
+        """
+        if not(0 <= section < len(self.headers)):
+            return None
+        elif role != QtCore.Qt.DisplayRole:
+            return None
+        elif orientation != QtCore.Qt.Horizontal:
+            return None
+        else:
+            return self.headers[section]
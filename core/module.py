@@ -21,6 +21,7 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 
 import copy
 import logging
+import types
 import warnings
 from fysom import Fysom  # provides a final state machine
 from collections import OrderedDict
@@ -227,10 +228,13 @@ class ModuleMeta(type(QtCore.QObject)):
     """
     Metaclass for Qudi modules
     """
+    # python modules with base classes whose methods are not profiled
+    unprofiled_modules = ('core.module', 'logic.generic_logic', 'gui.guibase')
 
     def __new__(cls, name, bases, attrs):
         """
-        Collect declared Connectors, ConfigOptions and StatusVars into dictionaries.
+        Collect declared Connectors, ConfigOptions and StatusVars into dictionaries and the
+        names of the methods that can be profiled into a tuple.
 
             @param mcs: class
             @param name: name of class
@@ -244,6 +248,7 @@ class ModuleMeta(type(QtCore.QObject)):
         connectors = OrderedDict()
         config_options = OrderedDict()
         status_vars = OrderedDict()
+        profiled_methods = OrderedDict()
 
         # Accumulate Connector, ConfigOption and StatusVar info from parent classes
         for base in reversed(bases):
@@ -253,6 +258,16 @@ class ModuleMeta(type(QtCore.QObject)):
                 config_options.update(copy.deepcopy(base._config_options))
             if hasattr(base, '_stat_var'):
                 status_vars.update(copy.deepcopy(base._stat_var))
+            if hasattr(base, '_profiled_methods'):
+                profiled_methods.update((method, None) for method in base._profiled_methods)
+
+        # Methods of the module classes can be profiled, but not those of the base classes
+        if attrs.get('__module__') not in cls.unprofiled_modules:
+            for key, value in attrs.items():
+                if (isinstance(value, types.FunctionType)
+                        and not key.startswith('__')
+                        and not key.startswith('_{0}__'.format(name.lstrip('_')))):
+                    profiled_methods[key] = None
 
         # Collect this classes Connector and ConfigOption and StatusVar into dictionaries
         for key, value in attrs.items():
@@ -272,6 +287,7 @@ class ModuleMeta(type(QtCore.QObject)):
         new_class._conn = connectors
         new_class._config_options = config_options
         new_class._stat_vars = status_vars
+        new_class._profiled_methods = tuple(profiled_methods)
 
         return new_class
 
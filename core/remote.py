@@ -23,14 +23,34 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 import logging
 logger = logging.getLogger(__name__)
 
-from qtpy.QtCore import QObject
+from qtpy.QtCore import QObject, QMetaObject, Q_ARG, Qt, Signal
 from urllib.parse import urlparse
+from concurrent.futures import CancelledError, TimeoutError
+import os
+import pickle
+import socket
 import ssl
+import struct
+import threading
+import time
+import weakref
+import zlib
+import numpy as np
 from .util.models import DictTableModel, ListTableModel
 import rpyc
+import rpyc.core.netref
 from rpyc.utils.server import ThreadedServer
 from rpyc.utils.authenticators import SSLAuthenticator
 rpyc.core.protocol.DEFAULT_CONFIG['allow_pickle'] = True
+# asynchronous request wrapper, named 'async' before rpyc 4
+rpyc_async = getattr(rpyc, 'async_', None) or getattr(rpyc, 'async')
+
+# size in bytes of the chunks in which arrays are transferred
+ARRAY_CHUNK_SIZE = 4 * 1024 * 1024
+# arrays up to this size in bytes are sent directly in the reply to packArray
+ARRAY_INLINE_SIZE = 1024 * 1024
+# errors of a remote call that mean that the connection to the server is lost
+CONNECTION_ERRORS = (EOFError, ConnectionError)
 
 
 class RemoteObjectManager(QObject):
@@ -47,6 +67,8 @@ class RemoteObjectManager(QObject):
         self.remoteModules.headers[0] = 'Remote Modules'
         self.sharedModules = DictTableModel()
         self.sharedModules.headers[0] = 'Shared Modules'
+        self.connectionPool = RemoteConnectionPool(
+            keepaliveInterval=manager.tree['global'].get('remote_keepalive', 30))
 
     def makeRemoteService(self):
         """ A function that returns a class containing a module list hat can be manipulated from the host.
@@ -61,13 +83,16 @@ class RemoteObjectManager(QObject):
             def get_service_name():
                 return 'RemoteModule'
 
-            def on_connect(self):
+            def on_connect(self, conn=None):
                 """ code that runs when a connection is created
                     (to init the service, if needed)
                 """
+                # rpyc 4 and later pass the connection instead of setting _conn
+                if conn is not None:
+                    self._conn = conn
                 logger.info('Client connected!')
 
-            def on_disconnect(self):
+            def on_disconnect(self, conn=None):
                 """ code that runs when the connection has already closed
                     (to finalize the service, if needed)
                 """
@@ -87,7 +112,11 @@ class RemoteObjectManager(QObject):
                     for base in ['hardware', 'logic', 'gui']:
                         logger.info('remotesearch: {0}'.format(name))
                         if name in self._manager.tree['defined'][base] and 'remoteaccess' in self._manager.tree['defined'][base][name]:
-                            self._manager.startModule(base, name)
+                            if self._manager.tree['global'].get('worker_process'):
+                                # worker modules live in the main thread of the worker
+                                self._invokeManager('startModule', base, name)
+                            else:
+                                self._manager.startModule(base, name)
                             logger.info('remoteload: {0}{1}'.format(base, name))
                     if name in self.modules.storage:
                         return self.modules.storage[name]
@@ -95,6 +124,87 @@ class RemoteObjectManager(QObject):
                         logger.error('Client requested a module that is not '
                                 'shared.')
                         return None
+
+            def _invokeManager(self, method, *args):
+                """ Call a manager slot in the main thread of the manager and wait. """
+                QMetaObject.invokeMethod(
+                    self._manager,
+                    method,
+                    Qt.BlockingQueuedConnection,
+                    *[Q_ARG(str, arg) for arg in args])
+
+            def exposed_activateModule(self, name):
+                """ Load, connect and activate a module and its dependencies.
+
+                  @param str name: unique module name
+                """
+                name = str(name)
+                self._invokeManager('startModule', self._manager.findBase(name), name)
+
+            def exposed_deactivateModule(self, name):
+                """ Deactivate a module.
+
+                  @param str name: unique module name
+                """
+                name = str(name)
+                self._invokeManager('deactivateModule', self._manager.findBase(name), name)
+
+            def exposed_reloadModule(self, name):
+                """ Reload a module and the modules depending on it and activate them again.
+
+                  @param str name: unique module name
+                """
+                name = str(name)
+                self._invokeManager('restartModuleRecursive', self._manager.findBase(name), name)
+
+            def exposed_quit(self):
+                """ Quit a worker process. Other Qudi instances can not be quit remotely. """
+                if not self._manager.tree['global'].get('worker_process'):
+                    logger.error('Remote quit request refused, this is not a worker process.')
+                    return
+                QMetaObject.invokeMethod(self._manager, 'realQuit', Qt.QueuedConnection)
+
+            def exposed_packArray(self, array, compress=False):
+                """ Prepare a numpy array for the transfer as raw buffer.
+
+                  @param numpy.ndarray array: array to transfer
+                  @param bool compress: compress the chunks with zlib
+
+                  @return tuple(dtype, shape, nbytes, content): content is the raw buffer for
+                          small arrays and an ArrayPacker for large ones. None if the array
+                          can not be packed.
+                """
+                if not isinstance(array, np.ndarray) or array.dtype.hasobject:
+                    return None
+                packer = ArrayPacker(getattr(self, '_conn', None), array, compress)
+                dtype, shape, nbytes = packer.header
+                if nbytes <= ARRAY_INLINE_SIZE:
+                    return dtype, shape, nbytes, packer.exposed_chunk(0, nbytes)
+                return dtype, shape, nbytes, packer
+
+            def exposed_callBatch(self, name, calls):
+                """ Call several methods of a shared module in one request. The calls are
+                    executed in the given order, an exception stops the batch and is raised
+                    on the client.
+
+                  @param str name: unique module name
+                  @param bytes or tuple calls: (method name, args tuple, kwargs as tuple of
+                                               (key, value) pairs) for every call, pickled
+                                               if possible
+
+                  @return bytes or tuple: pickled list of the return values, a tuple of the
+                                          return values if they can not be pickled
+                """
+                module = self.exposed_getModule(name)
+                if isinstance(calls, bytes):
+                    calls = pickle.loads(calls)
+                results = list()
+                for method, args, kwargs in calls:
+                    results.append(getattr(module, method)(*args, **dict(kwargs)))
+                try:
+                    return pickle.dumps(results, protocol=pickle.DEFAULT_PROTOCOL)
+                except Exception:
+                    return tuple(results)
         return RemoteModuleService
 
     def createServer(self, hostname, port, certfile=None, keyfile=None):
@@ -102,7 +212,8 @@ class RemoteObjectManager(QObject):
 
           @param int port: port where the server should be running
         """
-        thread = self.tm.newThread('rpyc-server')
+        # the server blocks the thread, there is no event loop to monitor
+        thread = self.tm.newThread('rpyc-server', monitor=False)
         if certfile is not None and keyfile is not None:
             self.server = RPyCServer(
                 self.makeRemoteService(),
@@ -142,8 +253,9 @@ class RemoteObjectManager(QObject):
 
           @param str name: unique name of the module that should not be accessible any more
         """
-        if name in self.sharedModules.storage:
+        if name not in self.sharedModules.storage:
             logger.error('Module {0} was not shared.'.format(name))
+            return
         self.sharedModules.pop(name)
 
     def getRemoteModuleUrl(self, url, certfile=None, keyfile=None):
@@ -157,7 +269,8 @@ class RemoteObjectManager(QObject):
         """
         parsed = urlparse(url)
         name = parsed.path.replace('/', '')
-        return self.getRemoteModule(parsed.hostname, parsed.port, name)
+        return self.getRemoteModule(
+            parsed.hostname, parsed.port, name, certfile=certfile, keyfile=keyfile)
 
     def getRemoteModule(self, host, port, name, certfile=None, keyfile=None):
         """ Get a remote module via its host, port and name.
@@ -168,11 +281,15 @@ class RemoteObjectManager(QObject):
           @param str certfile: filename of certificate or None if SSL is not used
           @param str keyfile: filename of key or None if SSL is not used
 
-          @return object: remote module
+          @return RemoteModuleProxy: remote module
         """
-        module = RemoteModule(host, port, name, certfile=certfile, keyfile=keyfile)
+        connection = self.connectionPool.getConnection(
+            host, port, certfile=certfile, keyfile=keyfile)
+        module = RemoteModule(connection, name)
+        # fetch the module reference now to fail early if it is not shared
+        module.module
         self.remoteModules.append(module)
-        return module.module
+        return RemoteModuleProxy(module)
 
 
 class RPyCServer(QObject):
@@ -213,18 +330,731 @@ class RPyCServer(QObject):
         self.server.start()
 
 
-class RemoteModule:
-    """ This class represents a module on a remote computer and holds a reference to it.
+class PooledConnection:
+    """ An rpyc connection to a remote module server that is shared by all remote modules of
+        this server. The connection is opened again if it was lost.
     """
-    def __init__(self, host, port, name, certfile=None, keyfile=None):
-        if certfile is not None and keyfile is not None:
-            self.connection = rpyc.ssl_connect(
-                host,
-                port=port,
+    def __init__(self, host, port, certfile=None, keyfile=None):
+        """
+          @param str host: host that the remote module server is running on
+          @param int port: port that the remote module server is listening on
+          @param str certfile: filename of certificate or None if SSL is not used
+          @param str keyfile: filename of key or None if SSL is not used
+        """
+        self.host = host
+        self.port = port
+        self.certfile = certfile
+        self.keyfile = keyfile
+        # incremented on every (re)connect, references obtained before are invalid
+        self.generation = 0
+        self.lastUsed = time.monotonic()
+        self._connection = None
+        self._lock = threading.RLock()
+        self._asyncCallBatch = None
+        self._asyncGeneration = None
+        self._pending = set()
+        self._serveThread = None
+
+    def _connect(self):
+        """ Open a new connection to the server. """
+        if self.certfile is not None and self.keyfile is not None:
+            self._connection = rpyc.ssl_connect(
+                self.host,
+                port=self.port,
                 config={'allow_all_attrs': True},
-                certfile=certfile,
-                keyfile=keyfile)
+                certfile=self.certfile,
+                keyfile=self.keyfile)
         else:
-            self.connection = rpyc.connect(host, port, config={'allow_all_attrs': True})
-        self.module = self.connection.root.getModule(name)
+            self._connection = rpyc.connect(
+                self.host, self.port, config={'allow_all_attrs': True})
+        self.generation += 1
+
+    @property
+    def connection(self):
+        """ The open rpyc connection, connects if there is none. """
+        with self._lock:
+            if self._connection is None or self._connection.closed:
+                self._connect()
+            self.lastUsed = time.monotonic()
+            return self._connection
+
+    def isAlive(self, timeout=3):
+        """ Check the connection with a ping.
+
+          @param float timeout: time in seconds to wait for the answer of the server
+
+          @return bool: server answered
+        """
+        with self._lock:
+            if self._connection is None or self._connection.closed:
+                return False
+            try:
+                self._connection.ping(timeout=timeout)
+            except Exception:
+                return False
+            self.lastUsed = time.monotonic()
+            return True
+
+    def reconnect(self):
+        """ Close the connection and open a new one. """
+        with self._lock:
+            self.close()
+            self._connect()
+            self.lastUsed = time.monotonic()
+        logger.info('Reconnected to remote module server {0}:{1}.'.format(self.host, self.port))
+
+    def callBatchAsync(self, name, packed, future):
+        """ Send a batch of calls without waiting for the answer. Requests sent this way are
+            pipelined, the answers are received by a serving thread while futures are pending.
+
+          @param str name: unique name of the remote module
+          @param packed: calls packed by RemoteModule.packCalls
+          @param RemoteFuture future: future that receives the result
+        """
+        with self._lock:
+            connection = self.connection
+            if self._asyncGeneration != self.generation:
+                self._asyncCallBatch = rpyc_async(connection.root.callBatch)
+                self._asyncGeneration = self.generation
+            asyncResult = self._asyncCallBatch(name, packed)
+            self._pending.add(future)
+            if self._serveThread is None:
+                self._serveThread = threading.Thread(
+                    target=self._serveAsync,
+                    name='rpyc-async-{0}:{1}'.format(self.host, self.port),
+                    daemon=True)
+                self._serveThread.start()
+        asyncResult.add_callback(future._setAsyncResult)
+
+    def _serveAsync(self):
+        """ Receive answers to asynchronous requests until no future is pending. Futures
+            whose deadline has passed fail with a TimeoutError.
+
+            Futures are completed without holding the lock, their callbacks may call remote
+            modules on this connection again.
+        """
+        pending = set()
+        error = EOFError('Connection closed.')
+        try:
+            while True:
+                with self._lock:
+                    self._pending = set(f for f in self._pending if not f.done())
+                    if not self._pending or self._connection is None:
+                        self._serveThread = None
+                        pending = self._pending
+                        self._pending = set()
+                        break
+                    connection = self._connection
+                    now = time.monotonic()
+                    expired = [f for f in self._pending
+                               if f.deadline is not None and now > f.deadline]
+                for future in expired:
+                    future.setException(TimeoutError(
+                        'Remote call {0} timed out.'.format(future.method)))
+                connection.serve(0.05)
+        except CONNECTION_ERRORS as e:
+            error = e
+        except Exception as e:
+            logger.exception('Receiving answers from remote module server {0}:{1} failed.'
+                             ''.format(self.host, self.port))
+            error = e
+        finally:
+            with self._lock:
+                # only still registered if serving failed, then fail all pending futures
+                if self._serveThread is threading.current_thread():
+                    self._serveThread = None
+                    pending = self._pending
+                    self._pending = set()
+            for future in pending:
+                future.setException(error)
+
+    def close(self):
+        """ Close the connection. """
+        with self._lock:
+            if self._connection is not None:
+                try:
+                    self._connection.close()
+                except Exception:
+                    pass
+                self._connection = None
+
+
+class RemoteConnectionPool:
+    """ Keeps one connection per remote module server (host, port and certificate). A
+        background thread pings connections that were idle for the keepalive interval and
+        reconnects them if the server does not answer.
+    """
+    def __init__(self, keepaliveInterval=30, pingTimeout=3):
+        """
+          @param float keepaliveInterval: time in seconds between health checks of idle
+                                          connections, 0 disables the checks
+          @param float pingTimeout: time in seconds to wait for the answer to a ping
+        """
+        self.keepaliveInterval = keepaliveInterval
+        self.pingTimeout = pingTimeout
+        self._connections = dict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def getConnection(self, host, port, certfile=None, keyfile=None):
+        """ Get the pooled connection to a server, it is created and opened if necessary.
+
+          @param str host: host that the remote module server is running on
+          @param int port: port that the remote module server is listening on
+          @param str certfile: filename of certificate or None if SSL is not used
+          @param str keyfile: filename of key or None if SSL is not used
+
+          @return PooledConnection: connection to the server
+        """
+        key = (host, port, certfile, keyfile)
+        with self._lock:
+            if key not in self._connections:
+                connection = PooledConnection(host, port, certfile=certfile, keyfile=keyfile)
+                # open the connection to raise errors right away
+                connection.connection
+                self._connections[key] = connection
+            if self._thread is None and self.keepaliveInterval > 0:
+                self._thread = threading.Thread(
+                    target=self._keepAlive, name='rpyc-keepalive', daemon=True)
+                self._thread.start()
+            return self._connections[key]
+
+    def checkConnections(self, idleTime=0):
+        """ Ping the connections and reconnect the ones where the server did not answer.
+
+          @param float idleTime: only check connections that were not used for this time in s
+
+          @return list(PooledConnection): connections that could not be restored
+        """
+        with self._lock:
+            connections = list(self._connections.values())
+        broken = list()
+        now = time.monotonic()
+        for connection in connections:
+            if now - connection.lastUsed < idleTime:
+                continue
+            if connection.isAlive(timeout=self.pingTimeout):
+                continue
+            logger.warning('Connection to remote module server {0}:{1} lost.'
+                           ''.format(connection.host, connection.port))
+            try:
+                connection.reconnect()
+            except Exception as e:
+                logger.debug('Reconnect to {0}:{1} failed: {2}'
+                             ''.format(connection.host, connection.port, e))
+                broken.append(connection)
+        return broken
+
+    def closeAll(self):
+        """ Stop the health checks and close all connections. """
+        self._stop.set()
+        with self._lock:
+            for connection in self._connections.values():
+                connection.close()
+            self._connections.clear()
+
+    def _keepAlive(self):
+        """ Health check loop of the keepalive thread. """
+        while not self._stop.wait(self.keepaliveInterval):
+            self.checkConnections(idleTime=self.keepaliveInterval)
+
+
+class RemoteModule:
+    """ This class represents a module on a remote computer and holds a reference to it.
+    """
+    def __init__(self, connection, name):
+        """
+          @param PooledConnection connection: pooled connection to the server of the module
+          @param str name: unique name of the remote module
+        """
+        self.pooledConnection = connection
         self.name = name
+        self._module = None
+        self._generation = None
+
+    @property
+    def connection(self):
+        """ The rpyc connection to the server of the module. """
+        return self.pooledConnection.connection
+
+    @property
+    def module(self):
+        """ Reference to the remote module, obtained again after a reconnect. """
+        connection = self.pooledConnection.connection
+        if self._generation != self.pooledConnection.generation:
+            self._module = connection.root.getModule(self.name)
+            self._generation = self.pooledConnection.generation
+        return self._module
+
+    def callBatch(self, calls):
+        """ Call several methods of the remote module in one network round trip.
+
+          @param list calls: method names or tuples (method name, args, kwargs) with optional
+                             args list and kwargs dict
+
+          @return list: return values of the calls, pickled values are transferred as copies
+        """
+        results = self.connection.root.callBatch(self.name, self.packCalls(calls))
+        return self.unpackResults(results)
+
+    def callBatchAsync(self, calls, timeout=None):
+        """ Call several methods of the remote module in one request without waiting.
+
+          @param list calls: method names or tuples (method name, args, kwargs) with optional
+                             args list and kwargs dict
+          @param float timeout: time in seconds after which the future fails, None for no limit
+
+          @return RemoteFuture: future of the list of return values
+        """
+        calls = list(calls)
+        future = RemoteFuture(
+            '{0}.call_batch'.format(self.name), timeout=timeout, convert=self.unpackResults)
+        self.pooledConnection.callBatchAsync(self.name, self.packCalls(calls), future)
+        return future
+
+    def callAsync(self, method, args=tuple(), kwargs=None, timeout=None):
+        """ Call a method of the remote module without waiting for the result.
+
+          @param str method: name of the method
+          @param tuple args: positional arguments
+          @param dict kwargs: keyword arguments
+          @param float timeout: time in seconds after which the future fails, None for no limit
+
+          @return RemoteFuture: future of the return value
+        """
+        future = RemoteFuture(
+            '{0}.{1}'.format(self.name, method),
+            timeout=timeout,
+            convert=lambda results: self.unpackResults(results)[0])
+        self.pooledConnection.callBatchAsync(
+            self.name, self.packCalls([(method, args, kwargs or dict())]), future)
+        return future
+
+    @staticmethod
+    def packCalls(calls):
+        """ Pack method calls for the callBatch request of the remote module service.
+
+          @param list calls: method names or tuples (method name, args, kwargs) with optional
+                             args list and kwargs dict
+
+          @return bytes or tuple: pickled calls, a tuple if the arguments can not be pickled
+        """
+        packed = list()
+        for call in calls:
+            if isinstance(call, str):
+                call = (call, )
+            args = tuple(call[1]) if len(call) > 1 else tuple()
+            kwargs = tuple(call[2].items()) if len(call) > 2 else tuple()
+            packed.append((str(call[0]), args, kwargs))
+        # arguments that are not pickled are passed as references and need extra round trips
+        try:
+            return pickle.dumps(packed, protocol=pickle.DEFAULT_PROTOCOL)
+        except Exception:
+            return tuple(packed)
+
+    @staticmethod
+    def unpackResults(results):
+        """ Unpack the answer of a callBatch request.
+
+          @param bytes or tuple results: answer of the remote module service
+
+          @return list: return values of the calls
+        """
+        if isinstance(results, bytes):
+            return pickle.loads(results)
+        return list(results)
+
+
+class RemoteFuture(QObject):
+    """ Result of an asynchronous call of a remote module method. The interface follows
+        concurrent.futures.Future. sigFinished is emitted with the future when the result
+        arrives, the call failed, timed out or was cancelled. Connected slots of QObjects run
+        in the thread of the receiver, which makes the future usable in Qt event loops.
+
+        A cancelled or timed out call is still executed by the remote module, only its
+        result is discarded.
+    """
+    sigFinished = Signal(object)
+
+    def __init__(self, method, timeout=None, convert=None):
+        """
+          @param str method: name of the called method for messages
+          @param float timeout: time in seconds after which the future fails, None for no limit
+          @param function convert: function applied to the raw answer of the remote service
+        """
+        super().__init__()
+        self.method = method
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self._convert = convert
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._value = None
+        self._exception = None
+        self._cancelled = False
+        self._callbacks = list()
+
+    def done(self):
+        """ @return bool: call finished, failed or was cancelled """
+        return self._finished.is_set()
+
+    def cancelled(self):
+        """ @return bool: future was cancelled """
+        return self._cancelled
+
+    def cancel(self):
+        """ Discard the result of the call.
+
+          @return bool: future was cancelled, False if it was already finished
+        """
+        return self._finish(exception=CancelledError(), cancelled=True)
+
+    def result(self, timeout=None):
+        """ Wait for the return value of the call.
+
+          @param float timeout: time in seconds to wait, None to wait until the call finished
+
+          @return object: return value of the remote method
+        """
+        if not self._finished.wait(timeout):
+            raise TimeoutError('Remote call {0} not finished.'.format(self.method))
+        if self._exception is not None:
+            raise self._exception
+        return self._value
+
+    def exception(self, timeout=None):
+        """ Wait for the call and get the exception it raised.
+
+          @param float timeout: time in seconds to wait, None to wait until the call finished
+
+          @return Exception: exception of the call or None
+        """
+        if not self._finished.wait(timeout):
+            raise TimeoutError('Remote call {0} not finished.'.format(self.method))
+        return self._exception
+
+    def add_done_callback(self, function):
+        """ Call a function with the future as argument when it is done. The function is
+            called right away if the future is already done, otherwise in the thread that
+            received the result.
+
+          @param function function: callback
+        """
+        with self._lock:
+            if not self._finished.is_set():
+                self._callbacks.append(function)
+                return
+        function(self)
+
+    def setResult(self, value):
+        """ Finish the future with a result.
+
+          @param object value: return value of the call
+        """
+        return self._finish(value=value)
+
+    def setException(self, exception):
+        """ Finish the future with an exception.
+
+          @param Exception exception: error of the call
+        """
+        return self._finish(exception=exception)
+
+    def _setAsyncResult(self, asyncResult):
+        """ Callback for the rpyc AsyncResult of the request. """
+        try:
+            value = asyncResult.value
+            if self._convert is not None:
+                value = self._convert(value)
+        except Exception as e:
+            self.setException(e)
+        else:
+            self.setResult(value)
+
+    def _finish(self, value=None, exception=None, cancelled=False):
+        """ Store the outcome of the call if it is not done yet and notify. """
+        with self._lock:
+            if self._finished.is_set():
+                return False
+            self._value = value
+            self._exception = exception
+            self._cancelled = cancelled
+            self._finished.set()
+            callbacks = self._callbacks
+            self._callbacks = list()
+        for callback in callbacks:
+            try:
+                callback(self)
+            except:
+                logger.exception('Error in callback of remote call {0}.'.format(self.method))
+        self.sigFinished.emit(self)
+        return True
+
+
+class AsyncRemoteModule:
+    """ Asynchronous view of a remote module. Calling a method returns a RemoteFuture right
+        away, the request is sent without waiting for earlier requests to be answered.
+    """
+    def __init__(self, remoteModule, timeout=None):
+        """
+          @param RemoteModule remoteModule: the remote module
+          @param float timeout: time in seconds after which calls fail, None for no limit
+        """
+        self._remoteModule = remoteModule
+        self._timeout = timeout
+
+    def with_timeout(self, timeout):
+        """ Asynchronous view of the same module whose calls fail after a timeout.
+
+          @param float timeout: time in seconds after which calls fail, None for no limit
+
+          @return AsyncRemoteModule: asynchronous module view
+        """
+        return AsyncRemoteModule(self._remoteModule, timeout)
+
+    def call_batch(self, calls):
+        """ Call several methods of the remote module in one request.
+
+          @param list calls: method names or tuples (method name, args, kwargs) with optional
+                             args list and kwargs dict
+
+          @return RemoteFuture: future of the list of return values
+        """
+        return self._remoteModule.callBatchAsync(calls, timeout=self._timeout)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self._remoteModule.callAsync(name, args, kwargs, timeout=self._timeout)
+        call.__name__ = name
+        return call
+
+
+class RemoteModuleProxy:
+    """ Stands in for a remote module in the local manager. Attribute access is forwarded to
+        the remote module, if the connection was lost the attribute is looked up again after a
+        reconnect. Calls of remote methods are not repeated.
+    """
+    def __init__(self, remoteModule):
+        """
+          @param RemoteModule remoteModule: the remote module
+        """
+        object.__setattr__(self, '_remoteModule', remoteModule)
+
+    def __getattr__(self, name):
+        remoteModule = object.__getattribute__(self, '_remoteModule')
+        try:
+            return getattr(remoteModule.module, name)
+        except CONNECTION_ERRORS:
+            remoteModule.pooledConnection.reconnect()
+            return getattr(remoteModule.module, name)
+
+    def __setattr__(self, name, value):
+        setattr(object.__getattribute__(self, '_remoteModule').module, name, value)
+
+    def __dir__(self):
+        return dir(object.__getattribute__(self, '_remoteModule').module)
+
+    def __repr__(self):
+        remoteModule = object.__getattribute__(self, '_remoteModule')
+        return '<RemoteModuleProxy rpyc://{0}:{1}/{2}>'.format(
+            remoteModule.pooledConnection.host,
+            remoteModule.pooledConnection.port,
+            remoteModule.name)
+
+    def call_batch(self, calls):
+        """ Call several methods of the remote module in one network round trip.
+
+          @param list calls: method names or tuples (method name, args, kwargs) with optional
+                             args list and kwargs dict
+
+          @return list: return values of the calls
+        """
+        return object.__getattribute__(self, '_remoteModule').callBatch(calls)
+
+    @property
+    def async_(self):
+        """ Asynchronous view of the remote module, e.g. module.async_.get_data_trace()
+            returns a RemoteFuture.
+        """
+        return AsyncRemoteModule(object.__getattribute__(self, '_remoteModule'))
+
+
+class ArrayPacker:
+    """ Holds the raw buffer of a numpy array on the serving side, so the client can fetch it
+        without pickling the whole array through the rpyc channel.
+
+        Unencrypted connections get the buffer through a separate TCP socket that is opened for
+        one transfer (out of band), SSL connections fetch it in chunks through rpyc.
+    """
+    def __init__(self, connection, array, compress=False):
+        """
+          @param rpyc.Connection connection: connection of the client requesting the array or None
+                                             to transfer only through rpyc
+          @param numpy.ndarray array: array to transfer, copied if it is not C contiguous
+          @param bool compress: compress the chunks with zlib
+        """
+        self._connection = connection
+        if not array.flags.c_contiguous:
+            array = array.copy(order='C')
+        self._array = array
+        self._buffer = memoryview(self._array.reshape(-1)).cast('B')
+        self._compress = compress
+        self.header = (self._array.dtype.str, self._array.shape, self._array.nbytes)
+
+    def exposed_chunk(self, start, stop):
+        """ Get a part of the raw buffer through the rpyc channel.
+
+          @param int start: first byte
+          @param int stop: byte after the last byte
+
+          @return bytes: raw or zlib compressed bytes
+        """
+        data = self._buffer[start:stop].tobytes()
+        if self._compress:
+            return zlib.compress(data, 1)
+        return data
+
+    def exposed_openStream(self, chunk_size=ARRAY_CHUNK_SIZE):
+        """ Open a socket that sends the buffer to the first client presenting the token.
+
+          @param int chunk_size: number of bytes sent at once
+
+          @return tuple(port, token): port of the socket or None if the rpyc connection is
+                                      encrypted or unknown, token to send after connecting
+        """
+        if self._connection is None:
+            return None, None
+        sock = self._connection._channel.stream.sock
+        if isinstance(sock, ssl.SSLSocket):
+            return None, None
+        token = os.urandom(16)
+        server = socket.socket(sock.family, socket.SOCK_STREAM)
+        server.bind((sock.getsockname()[0], 0))
+        server.listen(1)
+        server.settimeout(10)
+        threading.Thread(
+            target=self._sendStream,
+            args=(server, token, chunk_size),
+            name='array-stream',
+            daemon=True).start()
+        return server.getsockname()[1], token
+
+    def _sendStream(self, server, token, chunk_size):
+        """ Send the buffer over the stream socket. Compressed chunks are prefixed with their
+            length as 8 byte unsigned integer.
+        """
+        try:
+            client, address = server.accept()
+        except OSError:
+            logger.warning('Array stream client did not connect.')
+            server.close()
+            return
+        server.close()
+        try:
+            client.settimeout(None)
+            if _receiveExactly(client, len(token)) != token:
+                logger.error('Array stream client sent a wrong token.')
+                return
+            for start in range(0, len(self._buffer), chunk_size):
+                chunk = self._buffer[start:start + chunk_size]
+                if self._compress:
+                    chunk = zlib.compress(chunk, 1)
+                    client.sendall(struct.pack('<Q', len(chunk)))
+                client.sendall(chunk)
+        except OSError:
+            logger.exception('Sending array stream failed.')
+        finally:
+            client.close()
+
+
+def _receiveExactly(sock, size):
+    """ Receive exactly size bytes from a socket.
+
+      @param socket sock: connected socket
+      @param int size: number of bytes
+
+      @return bytes: received bytes
+    """
+    data = bytearray(size)
+    _receiveInto(sock, memoryview(data))
+    return bytes(data)
+
+
+def _receiveInto(sock, buffer):
+    """ Fill a buffer from a socket.
+
+      @param socket sock: connected socket
+      @param memoryview buffer: byte buffer to fill
+    """
+    received = 0
+    while received < len(buffer):
+        count = sock.recv_into(buffer[received:])
+        if count == 0:
+            raise EOFError('Array stream closed by peer.')
+        received += count
+
+
+def isRemoteArray(obj):
+    """ Check if an object is a rpyc netref to a numpy array.
+
+      @param object obj: object to check
+
+      @return bool: object is a netref to an ndarray
+    """
+    return (isinstance(obj, rpyc.core.netref.BaseNetref)
+            and type(obj).__name__.split('.')[-1] in ('ndarray', 'memmap'))
+
+
+def obtainArray(obj, compress=False, chunk_size=ARRAY_CHUNK_SIZE):
+    """ Copy a remote numpy array into a local one by transferring its raw buffer.
+
+      Small arrays come with the reply of the server. Large ones are received through a separate
+      socket directly into the new array or, if the rpyc connection is encrypted, fetched in
+      chunks through rpyc.
+
+      @param netref obj: rpyc netref to a numpy array on a Qudi module server
+      @param bool compress: compress the chunks with zlib, useful for slow networks and sparse data
+      @param int chunk_size: number of bytes transferred per chunk
+
+      @return numpy.ndarray: local copy of the array or None if the server can not pack it
+    """
+    connection = object.__getattribute__(obj, '____conn__')
+    if isinstance(connection, weakref.ref):
+        connection = connection()
+    packed = connection.root.packArray(obj, compress)
+    if packed is None:
+        return None
+    dtype, shape, nbytes, packer = packed
+    array = np.empty(tuple(shape), dtype=np.dtype(dtype))
+    buffer = memoryview(array.reshape(-1)).cast('B')
+    if nbytes == 0:
+        return array
+    if isinstance(packer, bytes):
+        buffer[:] = zlib.decompress(packer) if compress else packer
+        return array
+
+    port, token = packer.openStream(chunk_size)
+    if port is None:
+        for start in range(0, nbytes, chunk_size):
+            stop = min(start + chunk_size, nbytes)
+            data = packer.chunk(start, stop)
+            if compress:
+                data = zlib.decompress(data)
+            buffer[start:stop] = data
+        return array
+
+    host = connection._channel.stream.sock.getpeername()[0]
+    with socket.create_connection((host, port), timeout=10) as sock:
+        sock.settimeout(None)
+        sock.sendall(token)
+        if compress:
+            for start in range(0, nbytes, chunk_size):
+                length = struct.unpack('<Q', _receiveExactly(sock, 8))[0]
+                data = zlib.decompress(_receiveExactly(sock, length))
+                buffer[start:start + len(data)] = data
+        else:
+            _receiveInto(sock, buffer)
+    return array
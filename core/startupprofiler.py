@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains the Qudi startup profiler that records how long loading and activating
+each module takes.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import json
+import logging
+logger = logging.getLogger(__name__)
+from qtpy import QtCore
+from collections import OrderedDict
+from .util.mutex import Mutex
+
+
+class StartupProfiler(QtCore.QAbstractTableModel):
+    """ This class keeps track of the durations of the startup phases of every module.
+
+      The phases are 'import', 'reload', 'instantiate' and 'activate'. Every recorded duration
+      is also written to the log as a JSON encoded debug message so it can be evaluated later.
+      The class is a table model that can be displayed in the manager GUI.
+    """
+    phases = ('import', 'reload', 'instantiate', 'activate')
+
+    _sigRecord = QtCore.Signal(str, str, str, float)
+
+    def __init__(self):
+        super().__init__()
+        self._timings = OrderedDict()
+        self.lock = Mutex()
+        self.headers = ['Module', 'Import [ms]', 'Reload [ms]', 'Instantiate [ms]',
+                        'Activate [ms]', 'Total [ms]']
+        # records from other threads are queued into the thread of the model
+        self._sigRecord.connect(self._addRecord)
+
+    def record(self, base, name, phase, duration):
+        """ Record the duration of one startup phase of a module. Thread safe.
+
+          @param str base: module base package (hardware, logic or gui)
+          @param str name: unique module name
+          @param str phase: one of 'import', 'reload', 'instantiate', 'activate'
+          @param float duration: duration in seconds
+        """
+        if phase not in self.phases:
+            logger.error('Unknown startup phase {0}.'.format(phase))
+            return
+        logger.debug(json.dumps({
+            'event': 'module_startup',
+            'base': base,
+            'module': name,
+            'phase': phase,
+            'duration': duration}))
+        self._sigRecord.emit(base, name, phase, duration)
+
+    @QtCore.Slot(str, str, str, float)
+    def _addRecord(self, base, name, phase, duration):
+        """ Add a record to the table. Runs in the thread of the model.
+        """
+        key = '{0}.{1}'.format(base, name)
+        with self.lock:
+            if key not in self._timings:
+                row = len(self._timings)
+                self.beginInsertRows(QtCore.QModelIndex(), row, row)
+                self._timings[key] = OrderedDict((p, None) for p in self.phases)
+                self.endInsertRows()
+            self._timings[key][phase] = duration
+            row = list(self._timings).index(key)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.headers) - 1))
+
+    def clear(self):
+        """ Remove all records. """
+        with self.lock:
+            self.beginResetModel()
+            self._timings.clear()
+            self.endResetModel()
+
+    def getTimings(self):
+        """ Get a copy of all recorded durations.
+
+          @return OrderedDict: {'base.module': {phase: duration in s or None}}
+        """
+        with self.lock:
+            return OrderedDict((k, OrderedDict(v)) for k, v in self._timings.items())
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        """ Gives the number of modules with records.
+
+          @return int: number of modules
+        """
+        return len(self._timings)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        """ Gives the number of columns (module name, phases and total).
+
+          @return int: number of columns
+        """
+        return len(self.headers)
+
+    def flags(self, index):
+        """ Determines what can be done with entry cells in the table view.
+
+          @param QModelIndex index: cell fo which the flags are requested
+
+          @return Qt.ItemFlags: actins allowed fotr this cell
+        """
+        return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+
+    def data(self, index, role):
+        """ Get data from model for a given cell. Data can have a role that affects display.
+
+          @param QModelIndex index: cell for which data is requested
+          @param ItemDataRole role: role for which data is requested
+
+          @return QVariant: data for given cell and role
+        """
+        if not index.isValid() or role != QtCore.Qt.DisplayRole:
+            return None
+        with self.lock:
+            if not 0 <= index.row() < len(self._timings):
+                return None
+            key = list(self._timings)[index.row()]
+            timings = self._timings[key]
+        if index.column() == 0:
+            return key
+        elif index.column() <= len(self.phases):
+            duration = timings[self.phases[index.column() - 1]]
+            return '' if duration is None else '{0:.1f}'.format(1e3 * duration)
+        elif index.column() == len(self.phases) + 1:
+            return '{0:.1f}'.format(1e3 * sum(d for d in timings.values() if d is not None))
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        """ Data for the table view headers.
+
+          @param int section: number of the column to get header data for
+          @param Qt.Orientation: orientation of header (horizontal or vertical)
+          @param ItemDataRole: role for which to get data
+
+          @return QVariant: header data for given column and role
+        """
+        if not(0 <= section < len(self.headers)):
+            return None
+        elif role != QtCore.Qt.DisplayRole:
+            return None
+        elif orientation != QtCore.Qt.Horizontal:
+            return None
+        else:
+            return self.headers[section]
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains a binary, incremental storage backend for module status variables.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+
+import os
+import re
+import shutil
+import zlib
+import numpy
+from collections import OrderedDict
+from . import config
+
+
+class StatusStore:
+    """ Stores the status variables of modules in one directory per module.
+
+      Numpy arrays on the top level of the status variables are written as raw binary .npy
+      blobs (one file per variable) and are loaded as copy-on-write memory maps. All other
+      values are kept in a small YAML index file. On saving only the arrays whose content
+      changed since the last load or save are written, the index is only rewritten if anything
+      changed.
+
+      Layout of a module directory:
+        index.cfg                   YAML with 'variables' (plain values) and 'arrays'
+                                    (file name, checksum, dtype and shape of every blob)
+        <variable>-<checksum>.npy   raw array blobs
+    """
+    index_filename = 'index.cfg'
+
+    def __init__(self, directory):
+        """ Create a status store.
+
+          @param str directory: directory containing the module status directories
+        """
+        self.directory = directory
+        # last written or loaded index per module directory
+        self._indices = dict()
+
+    def getModuleDir(self, name):
+        """ Directory where the status of a module is kept.
+
+          @param str name: unique storage name of the module
+
+          @return str: path of the module status directory
+        """
+        return os.path.join(self.directory, name)
+
+    def exists(self, name):
+        """ Check if a status was saved for a module.
+
+          @param str name: unique storage name of the module
+
+          @return bool: status index exists
+        """
+        return os.path.isfile(os.path.join(self.getModuleDir(name), self.index_filename))
+
+    def load(self, name):
+        """ Load the status variables of a module.
+
+          @param str name: unique storage name of the module
+
+          @return OrderedDict: status variable names and values
+        """
+        moduledir = self.getModuleDir(name)
+        index = self._readIndex(name)
+        variables = OrderedDict(index['variables'])
+        for varname, blob in index['arrays'].items():
+            path = os.path.join(moduledir, blob['file'])
+            try:
+                if numpy.prod(blob['shape']) == 0:
+                    variables[varname] = numpy.load(path)
+                else:
+                    variables[varname] = numpy.load(path, mmap_mode='c')
+            except:
+                logger.exception('Failed to load status variable {0} of {1} from {2}.'
+                                 ''.format(varname, name, path))
+        return variables
+
+    def save(self, name, variables):
+        """ Save the status variables of a module. Only changed arrays are written.
+
+          @param str name: unique storage name of the module
+          @param dict variables: status variable names and values
+
+          @return int: number of array blobs that were written
+        """
+        moduledir = self.getModuleDir(name)
+        os.makedirs(moduledir, exist_ok=True)
+        old_index = self._readIndex(name)
+
+        index = OrderedDict()
+        index['variables'] = OrderedDict()
+        index['arrays'] = OrderedDict()
+        written = 0
+        for varname, value in variables.items():
+            if not self._isBlob(value):
+                index['variables'][varname] = value
+                continue
+            checksum = self._checksum(value)
+            blob = OrderedDict()
+            blob['file'] = '{0}-{1:08x}.npy'.format(re.sub(r'[^\w\-]', '_', varname), checksum)
+            blob['checksum'] = checksum
+            blob['dtype'] = value.dtype.str
+            blob['shape'] = list(value.shape)
+            old_blob = old_index['arrays'].get(varname)
+            path = os.path.join(moduledir, blob['file'])
+            if old_blob != blob or not os.path.isfile(path):
+                numpy.save(path, value, allow_pickle=False)
+                written += 1
+            index['arrays'][varname] = blob
+
+        if written > 0 or not self._equal(index, old_index):
+            tmp_filename = os.path.join(moduledir, self.index_filename + '.tmp')
+            config.save(tmp_filename, index)
+            os.replace(tmp_filename, os.path.join(moduledir, self.index_filename))
+        self._indices[name] = index
+        self._removeStaleBlobs(name, index)
+        return written
+
+    def remove(self, name):
+        """ Remove the saved status of a module.
+
+          @param str name: unique storage name of the module
+        """
+        self._indices.pop(name, None)
+        moduledir = self.getModuleDir(name)
+        if os.path.isdir(moduledir):
+            shutil.rmtree(moduledir, ignore_errors=True)
+
+    def _readIndex(self, name):
+        """ Get the index of a module from cache or file.
+        """
+        if name in self._indices:
+            return self._indices[name]
+        index = OrderedDict([('variables', OrderedDict()), ('arrays', OrderedDict())])
+        filename = os.path.join(self.getModuleDir(name), self.index_filename)
+        if os.path.isfile(filename):
+            loaded = config.load(filename)
+            index['variables'].update(loaded.get('variables', None) or OrderedDict())
+            index['arrays'].update(loaded.get('arrays', None) or OrderedDict())
+        self._indices[name] = index
+        return index
+
+    def _removeStaleBlobs(self, name, index):
+        """ Delete blob files that are not referenced by the index anymore. Files that are still
+            memory mapped somewhere (Windows) are kept and removed on a later save.
+        """
+        moduledir = self.getModuleDir(name)
+        used = set(blob['file'] for blob in index['arrays'].values())
+        for filename in os.listdir(moduledir):
+            if filename.endswith('.npy') and filename not in used:
+                try:
+                    os.remove(os.path.join(moduledir, filename))
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _isBlob(value):
+        """ Top level numpy arrays without python objects are stored as binary blobs. """
+        return isinstance(value, numpy.ndarray) and not value.dtype.hasobject
+
+    @staticmethod
+    def _checksum(array):
+        """ Fast checksum of the array content. """
+        return zlib.crc32(numpy.ascontiguousarray(array).view(numpy.uint8).ravel()) & 0xffffffff
+
+    @staticmethod
+    def _equal(index1, index2):
+        """ Compare two indices, values that can not be compared count as different. """
+        try:
+            return bool(index1 == index2)
+        except:
+            return False
@@ -30,16 +30,22 @@ from .util.mutex import Mutex
 class ThreadManager(QtCore.QAbstractTableModel):
     """ This class keeps track of all the QThreads that are needed somewhere.
     """
-    def __init__(self):
+    def __init__(self, monitor=None):
+        """
+          @param EventLoopMonitor monitor: monitor of the event loops of the new threads or None
+        """
         super().__init__()
+        self.monitor = monitor
         self._threads = OrderedDict()
         self.lock = Mutex()
         self.headers = ['Name', 'Thread']
         self.thread = QtCore.QThread.currentThread()
 
-    def newThread(self, name):
+    def newThread(self, name, monitor=True):
         """ Create a new thread with a name, return its object
           @param str name: unique name of thread
+          @param bool monitor: watch the event loop of the thread, False for threads that do not
+                               run an event loop
 
           @return QThread: new thred, none if failed
         """
@@ -52,6 +58,8 @@ class ThreadManager(QtCore.QAbstractTableModel):
             self._threads[name] = ThreadItem(name)
             self._threads[name].sigThreadHasQuit.connect(self.cleanupThread, QtCore.Qt.QueuedConnection)
             self.endInsertRows()
+        if monitor and self.monitor is not None:
+            self.monitor.addThread(name, self._threads[name].thread)
         return self._threads[name].thread
 
     def quitThread(self, name):
@@ -92,6 +100,8 @@ class ThreadManager(QtCore.QAbstractTableModel):
                 self.beginRemoveRows(QtCore.QModelIndex(), row, row)
                 self._threads.pop(name)
                 self.endRemoveRows()
+            if self.monitor is not None:
+                self.monitor.removeThread(name)
 
     def quitAllThreads(self):
         """Stop event loop of all QThreads.
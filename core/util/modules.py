@@ -134,6 +134,32 @@ def toposort(deps, cost=None):
     return order
 
 
+def toposort_levels(deps):
+    """Group the nodes of a dependency graph into levels. All nodes in one level only depend on
+    nodes of lower levels and can therefore be handled independently of each other.
+
+      @param dict deps: Dictionary describing dependencies where a:[b,c]
+                        means "a depends on b and c"
+
+      @return list: list of lists of nodes, the first level has no dependencies
+
+    Example::
+
+        deps = {'a': ['b', 'c'], 'c': ['b', 'd'], 'e': ['b']}
+        toposort_levels(deps)
+        => [['b', 'd'], ['c', 'e'], ['a']]
+    """
+    level = {}
+    for node in toposort(deps):
+        node_deps = deps.get(node, [])
+        level[node] = 1 + max(level[dep] for dep in node_deps) if len(node_deps) > 0 else 0
+
+    levels = [[] for i in range(max(level.values()) + 1)] if len(level) > 0 else []
+    for node, node_level in level.items():
+        levels[node_level].append(node)
+    return levels
+
+
 def isBase(base):
     """Is the given base one of the three allowed ones?
       @return bool: base is allowed
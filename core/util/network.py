@@ -19,13 +19,34 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
+import logging
 import rpyc.core.netref
 import rpyc.utils.classic
 
-def netobtain(obj):
-    """
+logger = logging.getLogger(__name__)
+
+
+def netobtain(obj, compress=False):
+    """ Get a local copy of an object if it is a rpyc remote object.
+
+      Numpy arrays are transferred as raw buffers in chunks (see core.remote.obtainArray),
+      everything else is pickled through the rpyc channel.
+
+      @param object obj: local object or rpyc netref
+      @param bool compress: compress transferred arrays with zlib
+
+      @return object: local object
     """
     if isinstance(obj, rpyc.core.netref.BaseNetref):
+        from core.remote import isRemoteArray, obtainArray
+        if isRemoteArray(obj):
+            try:
+                array = obtainArray(obj, compress=compress)
+                if array is not None:
+                    return array
+            except Exception:
+                logger.debug('Binary array transfer failed, falling back to obtain.',
+                             exc_info=True)
         return rpyc.utils.classic.obtain(obj)
     else:
         return obj
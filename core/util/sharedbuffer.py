@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains a shared memory ring buffer to pass numpy arrays between processes on the
+same computer.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import mmap
+import os
+import re
+import tempfile
+import time
+import uuid
+import numpy as np
+
+# maximum number of dimensions of the arrays in a ring buffer
+MAX_DIMENSIONS = 4
+
+_HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('slots', '<u4'),
+    ('slot_size', '<u8'),
+    ('dtype', 'S32'),
+    ('sequence', '<u8')])
+_SLOT_DTYPE = np.dtype([
+    ('sequence', '<u8'),
+    ('ndim', '<u8'),
+    ('shape', '<u8', (MAX_DIMENSIONS, ))])
+_MAGIC = b'QRB1'
+_ALIGNMENT = 64
+
+
+def sharedBufferDirectory():
+    """ Directory of the files backing the ring buffers. On Linux this is the RAM based
+        /dev/shm, elsewhere the temporary directory of the user.
+
+      @return str: directory path
+    """
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def _align(size):
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+class SharedRingBuffer:
+    """ Ring buffer of numpy arrays in shared memory.
+
+      One process creates the buffer and publishes arrays into it, every published array gets
+      the next sequence number. Other processes on the same computer attach to the buffer by its
+      name and read arrays by sequence number. Only the name and the sequence numbers have to be
+      passed over a control channel (e.g. a remote module call), the data never goes through a
+      socket.
+
+      Readers can get views into the shared memory without copying. The writer does not wait for
+      readers: a slot is overwritten when the buffer wrapped around, which is detected with the
+      sequence number of the slot. A view is only valid as long as isValid(sequence) is True, get
+      a copy if the data has to be kept.
+
+      Layout: header (magic, number of slots, slot size in bytes, dtype, last sequence number),
+      slot headers (sequence number, ndim, shape) and the slot data, each part 64 byte aligned.
+    """
+
+    def __init__(self, name, create=False, dtype=None, slotShape=None, slots=16):
+        """ Create or attach to a ring buffer. Use SharedRingBuffer.create and
+            SharedRingBuffer.attach.
+
+          @param str name: name of the buffer, unique on this computer
+          @param bool create: create a new buffer instead of attaching to an existing one
+          @param dtype: data type of the arrays (only for create)
+          @param tuple slotShape: largest shape of an array (only for create)
+          @param int slots: number of arrays kept in the buffer (only for create)
+        """
+        if not re.match(r'^[\w\-.]+$', name):
+            raise ValueError('Invalid shared buffer name {0}.'.format(name))
+        self.name = name
+        self.filename = os.path.join(sharedBufferDirectory(), 'qudi-{0}.buf'.format(name))
+        self.isOwner = create
+        if create:
+            dtype = np.dtype(dtype)
+            if dtype.hasobject:
+                raise TypeError('Arrays with python objects can not be shared.')
+            slotSize = _align(int(np.prod(slotShape)) * dtype.itemsize)
+            size = (_align(_HEADER_DTYPE.itemsize)
+                    + _align(slots * _SLOT_DTYPE.itemsize)
+                    + slots * slotSize)
+            with open(self.filename, 'wb') as bufferfile:
+                bufferfile.truncate(size)
+            self._openMap(size)
+            self._header['magic'] = _MAGIC
+            self._header['slots'] = slots
+            self._header['slot_size'] = slotSize
+            self._header['dtype'] = dtype.str.encode('ascii')
+            self._header['sequence'] = 0
+            self._layout()
+        else:
+            self._openMap(os.path.getsize(self.filename))
+            if self._header['magic'].item() != _MAGIC:
+                self.close()
+                raise ValueError('{0} is not a shared ring buffer.'.format(self.filename))
+            self._layout()
+
+    @classmethod
+    def create(cls, name, dtype, slotShape, slots=16):
+        """ Create a ring buffer. An existing buffer with the same name is replaced.
+
+          @param str name: name of the buffer, unique on this computer
+          @param dtype: data type of the arrays
+          @param tuple slotShape: largest shape of a published array, arrays with the same or
+                                  fewer elements fit in a slot
+          @param int slots: number of arrays kept in the buffer
+
+          @return SharedRingBuffer: the new buffer
+        """
+        return cls(name, create=True, dtype=dtype, slotShape=slotShape, slots=slots)
+
+    @classmethod
+    def attach(cls, name):
+        """ Attach to a ring buffer created by another process on this computer.
+
+          @param str name: name of the buffer
+
+          @return SharedRingBuffer: the attached buffer
+        """
+        return cls(name)
+
+    def _openMap(self, size):
+        with open(self.filename, 'r+b') as bufferfile:
+            self._map = mmap.mmap(bufferfile.fileno(), size)
+        self._header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=self._map)
+
+    def _layout(self):
+        self.slots = int(self._header['slots'])
+        self.slotSize = int(self._header['slot_size'])
+        self.dtype = np.dtype(self._header['dtype'].item().decode('ascii'))
+        offset = _align(_HEADER_DTYPE.itemsize)
+        self._slotHeaders = np.ndarray(
+            (self.slots, ), dtype=_SLOT_DTYPE, buffer=self._map, offset=offset)
+        self._dataOffset = offset + _align(self.slots * _SLOT_DTYPE.itemsize)
+
+    @property
+    def sequence(self):
+        """ Sequence number of the last published array, 0 if nothing was published. """
+        return int(self._header['sequence'])
+
+    def publish(self, array):
+        """ Copy an array into the next slot.
+
+          @param numpy.ndarray array: array with at most MAX_DIMENSIONS dimensions that fits
+                                      into a slot, converted to the buffer dtype
+
+          @return int: sequence number of the array
+        """
+        array = np.asarray(array, dtype=self.dtype)
+        if array.nbytes > self.slotSize:
+            raise ValueError('Array of {0} bytes does not fit into a slot of {1} bytes.'
+                             ''.format(array.nbytes, self.slotSize))
+        if array.ndim > MAX_DIMENSIONS:
+            raise ValueError('Arrays with more than {0} dimensions can not be shared.'
+                             ''.format(MAX_DIMENSIONS))
+        sequence = self.sequence + 1
+        slot = self._slotHeaders[(sequence - 1) % self.slots]
+        # invalidate the slot while it is written
+        slot['sequence'] = 0
+        self._slotView((sequence - 1) % self.slots, array.shape)[...] = array
+        slot['ndim'] = array.ndim
+        slot['shape'][:] = 0
+        slot['shape'][:array.ndim] = array.shape
+        slot['sequence'] = sequence
+        self._header['sequence'] = sequence
+        return sequence
+
+    def isValid(self, sequence):
+        """ Check if the array with a sequence number is still in the buffer.
+
+          @param int sequence: sequence number
+
+          @return bool: array was published and not overwritten
+        """
+        if sequence < 1:
+            return False
+        return int(self._slotHeaders[(sequence - 1) % self.slots]['sequence']) == sequence
+
+    def get(self, sequence=None, copy=True):
+        """ Read an array from the buffer.
+
+          @param int sequence: sequence number, None for the last published array
+          @param bool copy: return a copy, otherwise a read-only view into the shared memory
+                            which is only valid as long as isValid(sequence) is True
+
+          @return numpy.ndarray: the array
+        """
+        if sequence is None:
+            sequence = self.sequence
+        slot = self._slotHeaders[(sequence - 1) % self.slots]
+        if sequence < 1 or int(slot['sequence']) != sequence:
+            raise LookupError('Array {0} of shared buffer {1} is not available.'
+                              ''.format(sequence, self.name))
+        ndim = int(slot['ndim'])
+        shape = tuple(int(n) for n in slot['shape'][:ndim])
+        view = self._slotView((sequence - 1) % self.slots, shape)
+        if copy:
+            view = view.copy()
+        else:
+            view.flags.writeable = False
+        if not self.isValid(sequence):
+            raise LookupError('Array {0} of shared buffer {1} was overwritten while reading.'
+                              ''.format(sequence, self.name))
+        return view
+
+    def wait(self, sequence, timeout=None, interval=0.0005):
+        """ Wait until an array with at least the given sequence number was published.
+
+          @param int sequence: sequence number to wait for
+          @param float timeout: time in seconds to wait at most, None to wait forever
+          @param float interval: polling interval in seconds
+
+          @return int: last sequence number, smaller than sequence on timeout
+        """
+        start = time.monotonic()
+        while self.sequence < sequence:
+            if timeout is not None and time.monotonic() - start > timeout:
+                break
+            time.sleep(interval)
+        return self.sequence
+
+    def _slotView(self, slot, shape):
+        return np.ndarray(shape,
+                          dtype=self.dtype,
+                          buffer=self._map,
+                          offset=self._dataOffset + slot * self.slotSize)
+
+    def close(self):
+        """ Close the buffer. The creator also removes the backing file. Views returned by get
+            must not be used afterwards.
+        """
+        self._header = None
+        self._slotHeaders = None
+        try:
+            self._map.close()
+        except BufferError:
+            # views into the buffer still exist, the memory is released with them
+            pass
+        if self.isOwner:
+            try:
+                os.remove(self.filename)
+            except OSError:
+                pass
+
+
+class SharedArrayPublisher:
+    """ Publishes the arrays of a producer (e.g. the traces of a hardware module) into a
+        SharedRingBuffer that is created with the first array.
+
+      The buffer is replaced by a new one with a new name if an array does not fit into a slot or
+      has another dtype, readers attach to the new buffer by its name. The names are unique on the
+      computer, so several Qudi instances can publish the same kind of data.
+    """
+
+    def __init__(self, prefix, slots=16):
+        """
+          @param str prefix: start of the buffer names, e.g. the module name
+          @param int slots: number of arrays kept in the buffer
+        """
+        self.prefix = re.sub(r'[^\w\-.]', '_', prefix)
+        self.slots = slots
+        self.buffer = None
+
+    def publish(self, array):
+        """ Copy an array into the shared buffer.
+
+          @param numpy.ndarray array: array to publish
+
+          @return tuple(str, int): name of the buffer and sequence number of the array
+        """
+        array = np.asarray(array)
+        if (self.buffer is None
+                or self.buffer.dtype != array.dtype
+                or array.nbytes > self.buffer.slotSize):
+            self.close()
+            name = '{0}-{1}-{2}'.format(self.prefix, os.getpid(), uuid.uuid4().hex[:8])
+            self.buffer = SharedRingBuffer.create(
+                name, array.dtype, (max(array.size, 1), ), slots=self.slots)
+        return self.buffer.name, self.buffer.publish(array)
+
+    def close(self):
+        """ Close and remove the buffer. """
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+
+
+class SharedArrayReader:
+    """ Reads arrays published by a SharedArrayPublisher in another process, attaches to the
+        buffers by name when they are first needed.
+    """
+
+    def __init__(self):
+        self.buffer = None
+
+    def get(self, name, sequence, copy=True):
+        """ Read an array from a shared buffer.
+
+          @param str name: name of the buffer
+          @param int sequence: sequence number of the array
+          @param bool copy: return a copy, otherwise a read-only view (see SharedRingBuffer.get)
+
+          @return numpy.ndarray: the array
+
+          Raises OSError if the buffer is not on this computer and LookupError if the array was
+          overwritten already.
+        """
+        if self.buffer is None or self.buffer.name != name:
+            self.close()
+            self.buffer = SharedRingBuffer.attach(name)
+        return self.buffer.get(sequence, copy=copy)
+
+    def close(self):
+        """ Detach from the buffer. """
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
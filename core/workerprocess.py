@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains the worker processes that run selected Qudi modules outside of the main
+process.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+
+import copy
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+from . import config
+
+# global config entries that are not passed on to worker processes
+_MAIN_ONLY_GLOBALS = ('startup', 'module_server', 'serveraddress', 'serverport', 'certfile',
+                      'keyfile', 'stylesheet', 'parallel_startup')
+
+
+def freePort(host='localhost'):
+    """ Find a TCP port that is not in use.
+
+      @param str host: interface to check
+
+      @return int: port number
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+    finally:
+        sock.close()
+
+
+class WorkerProcess:
+    """ A headless Qudi instance in a separate process that runs some modules of the main
+        configuration.
+
+      The worker gets a generated configuration with its modules and a module server on a local
+      port. Connectors of these modules to modules of the main process or of other workers are
+      configured as remote modules. The main process accesses the worker modules as remote
+      modules and forwards activation, deactivation and reloading to the worker manager.
+    """
+
+    def __init__(self, manager, name):
+        """
+          @param Manager manager: main manager
+          @param str name: name of the worker, modules with the same process name share it
+        """
+        self.manager = manager
+        self.name = name
+        self.modules = OrderedDict()
+        self.port = None
+        self.process = None
+        self.configFile = None
+
+    def addModule(self, base, key):
+        """ Run a module in this worker.
+
+          @param str base: module base package (hardware or logic)
+          @param str key: unique module name
+        """
+        self.modules[key] = base
+
+    def isRunning(self):
+        """ @return bool: worker process is running """
+        return self.process is not None and self.process.poll() is None
+
+    def writeConfig(self, mainHost, mainPort, workers, certfile=None, keyfile=None):
+        """ Generate the configuration file of the worker.
+
+          @param str mainHost: address of the module server of the main process
+          @param int mainPort: port of the module server of the main process
+          @param dict workers: all workers by module name
+          @param str certfile: SSL certificate of the main module server or None
+          @param str keyfile: SSL key of the main module server or None
+
+          @return str: path of the configuration file
+        """
+        if self.port is None:
+            self.port = freePort()
+        mainConfig = config.load(self.manager.configFile)
+        cfg = OrderedDict()
+        cfg['global'] = OrderedDict()
+        for key, value in mainConfig.get('global', OrderedDict()).items():
+            if key not in _MAIN_ONLY_GLOBALS:
+                cfg['global'][key] = value
+        cfg['global']['module_server'] = OrderedDict([('address', 'localhost'),
+                                                      ('port', self.port)])
+        cfg['global']['worker_process'] = self.name
+        cfg['global']['status_dir'] = self.manager.getStatusDir()
+        for base in ('hardware', 'logic'):
+            cfg[base] = OrderedDict()
+
+        for key, base in self.modules.items():
+            definition = copy.deepcopy(self.manager.tree['defined'][base][key])
+            definition.pop('process', None)
+            definition['remoteaccess'] = True
+            cfg[base][key] = definition
+            for target in self.connectionTargets(definition):
+                if target in self.modules:
+                    continue
+                targetBase = self.manager.findBase(target)
+                targetDefinition = self.manager.tree['defined'][targetBase][target]
+                remote = OrderedDict()
+                remote['module.Class'] = targetDefinition['module.Class']
+                if target in workers:
+                    remote['remote'] = 'rpyc://localhost:{0}/{1}'.format(
+                        workers[target].port, target)
+                elif 'remote' in targetDefinition:
+                    remote['remote'] = targetDefinition['remote']
+                    for option in ('certfile', 'keyfile'):
+                        if option in targetDefinition:
+                            remote[option] = targetDefinition[option]
+                else:
+                    remote['remote'] = 'rpyc://{0}:{1}/{2}'.format(mainHost, mainPort, target)
+                    if certfile is not None and keyfile is not None:
+                        remote['certfile'] = certfile
+                        remote['keyfile'] = keyfile
+                cfg[targetBase][target] = remote
+
+        self.configFile = os.path.join(
+            self.manager.getStatusDir(), 'worker-{0}.cfg'.format(self.name))
+        config.save(self.configFile, cfg)
+        return self.configFile
+
+    @staticmethod
+    def connectionTargets(definition):
+        """ Names of the modules a module definition connects to. """
+        targets = list()
+        for target in definition.get('connect', OrderedDict()).values():
+            if isinstance(target, str):
+                targets.append(target.split('.')[0])
+        return targets
+
+    def start(self, timeout=60):
+        """ Start the worker process and wait until its module server accepts connections.
+
+          @param float timeout: time in seconds to wait for the module server
+
+          @return bool: worker is ready
+        """
+        env = os.environ.copy()
+        if sys.platform == 'win32':
+            try:
+                from _winapi import DuplicateHandle, GetCurrentProcess, DUPLICATE_SAME_ACCESS
+            except ImportError:
+                from _subprocess import DuplicateHandle, GetCurrentProcess, DUPLICATE_SAME_ACCESS
+            pid = GetCurrentProcess()
+            handle = DuplicateHandle(pid, pid, pid, 0, True, DUPLICATE_SAME_ACCESS)
+            env['QUDI_PARENT_PID'] = str(int(handle))
+        else:
+            env['QUDI_PARENT_PID'] = str(os.getpid())
+        env.pop('QUDI_INTERRUPT_EVENT', None)
+        logger.info('Starting worker process {0} for {1}.'.format(
+            self.name, ', '.join(self.modules)))
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'core', '--no-gui', '--config', self.configFile],
+            cwd=self.manager.getMainDir(),
+            env=env,
+            close_fds=False)
+
+        start = time.monotonic()
+        while time.monotonic() - start < timeout:
+            if not self.isRunning():
+                logger.error('Worker process {0} exited with code {1}.'.format(
+                    self.name, self.process.returncode))
+                return False
+            try:
+                socket.create_connection(('localhost', self.port), timeout=1).close()
+                return True
+            except OSError:
+                time.sleep(0.2)
+        logger.error('Worker process {0} did not start its module server.'.format(self.name))
+        return False
+
+    def _service(self):
+        """ Root of the module service of the worker. """
+        return self.manager.rm.connectionPool.getConnection('localhost', self.port).connection.root
+
+    def activateModule(self, key):
+        """ Load, connect and activate a module in the worker.
+
+          @param str key: unique module name
+        """
+        self._service().activateModule(key)
+
+    def deactivateModule(self, key):
+        """ Deactivate a module in the worker, it saves the status variables.
+
+          @param str key: unique module name
+        """
+        self._service().deactivateModule(key)
+
+    def reloadModule(self, key):
+        """ Reload the code of a module and its dependent modules in the worker and activate
+            them again.
+
+          @param str key: unique module name
+        """
+        self._service().reloadModule(key)
+
+    def stop(self, timeout=30):
+        """ Quit the worker manager, which deactivates all its modules. The process is killed
+            if it does not exit within the timeout.
+
+          @param float timeout: time in seconds to wait for the worker to exit
+        """
+        if not self.isRunning():
+            return
+        try:
+            self._service().quit()
+            self.process.wait(timeout)
+        except Exception:
+            logger.exception('Worker process {0} did not quit, killing it.'.format(self.name))
+            self.process.kill()
+            self.process.wait()
+        logger.info('Worker process {0} stopped.'.format(self.name))
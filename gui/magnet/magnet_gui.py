@@ -1457,11 +1457,14 @@ class MagnetGui(GUIBase):
                 low_centile = 0.0
 
             # mask the array such that the arrays will be
-            masked_image = np.ma.masked_equal(self._2d_alignment_ImageItem.image, 0.0)
+            # (NaN marks points which are not measured in an adaptive alignment)
+            masked_image = np.ma.masked_equal(
+                np.ma.masked_invalid(self._2d_alignment_ImageItem.image), 0.0)
 
             if len(masked_image.compressed()) == 0:
-                cb_min = np.percentile(self._2d_alignment_ImageItem.image, low_centile)
-                cb_max = np.percentile(self._2d_alignment_ImageItem.image, high_centile)
+                image = np.nan_to_num(self._2d_alignment_ImageItem.image)
+                cb_min = np.percentile(image, low_centile)
+                cb_max = np.percentile(image, high_centile)
             else:
                 cb_min = np.percentile(masked_image.compressed(), low_centile)
                 cb_max = np.percentile(masked_image.compressed(), high_centile)
@@ -1485,15 +1488,16 @@ class MagnetGui(GUIBase):
             if np.isclose(low_centile, 0.0):
                 low_centile = 0.0
 
-            # mask the array in order to mark the values which are zeros with
-            # True, the rest with False:
-            masked_image = np.ma.masked_equal(matrix_data, 0.0)
+            # mask the array in order to mark the values which are zeros or
+            # not measured (NaN) with True, the rest with False:
+            masked_image = np.ma.masked_equal(np.ma.masked_invalid(matrix_data), 0.0)
 
             # compress the 2D masked array to a 1D array where the zero values
             # are excluded:
             if len(masked_image.compressed()) == 0:
-                cb_min = np.percentile(self._2d_alignment_ImageItem.image, low_centile)
-                cb_max = np.percentile(self._2d_alignment_ImageItem.image, high_centile)
+                image = np.nan_to_num(self._2d_alignment_ImageItem.image)
+                cb_min = np.percentile(image, low_centile)
+                cb_max = np.percentile(image, high_centile)
             else:
                 cb_min = np.percentile(masked_image.compressed(), low_centile)
                 cb_max = np.percentile(masked_image.compressed(), high_centile)
@@ -29,14 +29,23 @@ import os
 import html
 
 import sys
+from collections import deque
 
 
 class LogModel(QtCore.QAbstractTableModel):
     """ This is a Qt model that represents the log for dislpay in a QTableView.
+
+      The entries are kept in a ring buffer with a maximum number of entries,
+      the oldest entries are discarded when new ones are added. Entries are
+      added in batches, so that the views are updated once per batch.
+      An entry is a list [name, time, level, message, category], only the
+      first four are shown.
     """
 
-    def __init__(self, **kwargs):
+    def __init__(self, maxEntries=1000, **kwargs):
         """ Set up the model.
+
+          @param int maxEntries: maximum number of log entries stored
         """
         super().__init__(**kwargs)
         self.header = ['Name', 'Time', 'Level', 'Message']
@@ -47,14 +56,53 @@ class LogModel(QtCore.QAbstractTableModel):
             'error':    QtGui.QColor('#F11'),
             'critical': QtGui.QColor('#FF00FF')
         }
-        self.entries = list()
+        self._maxEntries = max(1, int(maxEntries))
+        self._ring = [None] * self._maxEntries
+        self._start = 0
+        self._count = 0
+
+    def maxEntries(self):
+        """ Gives the maximum number of log entries stored in the model.
+
+          @return int: maximum number of log entries
+        """
+        return self._maxEntries
+
+    def setMaxEntries(self, maxEntries):
+        """ Change the maximum number of log entries, the newest entries are
+            kept.
+
+          @param int maxEntries: maximum number of log entries stored
+        """
+        maxEntries = max(1, int(maxEntries))
+        if maxEntries == self._maxEntries:
+            return
+        self.beginResetModel()
+        kept = [self.entry(row) for row in range(max(0, self._count - maxEntries), self._count)]
+        self._maxEntries = maxEntries
+        self._ring = kept + [None] * (maxEntries - len(kept))
+        self._start = 0
+        self._count = len(kept)
+        self.endResetModel()
+
+    def entry(self, row):
+        """ Gives a stored log entry.
+
+          @param int row: row of the entry
+
+          @return list: [name, time, level, message, category] or None if
+                        there is no such row
+        """
+        if not 0 <= row < self._count:
+            return None
+        return self._ring[(self._start + row) % self._maxEntries]
 
     def rowCount(self, parent=QtCore.QModelIndex()):
         """ Gives th number of log entries  stored in the model.
 
           @return int: number of log entries stored
         """
-        return len(self.entries)
+        return self._count
 
     def columnCount(self, parent=QtCore.QModelIndex()):
         """ Gives the number of columns each log entry has.
@@ -84,16 +132,19 @@ class LogModel(QtCore.QAbstractTableModel):
         """
         if not index.isValid():
             return None
+        entry = self.entry(index.row())
+        if entry is None:
+            return None
         elif role == QtCore.Qt.TextColorRole:
             try:
-                return self.fgColor[self.entries[index.row()][2]]
+                return self.fgColor[entry[2]]
             except KeyError:
-                print('fgcolor', self.entries[index.row()][2])
+                print('fgcolor', entry[2])
                 return QtGui.QColor('#FFF')
         elif role == QtCore.Qt.DisplayRole:
-            return self.entries[index.row()][index.column()]
+            return entry[index.column()]
         elif role == QtCore.Qt.EditRole:
-            return self.entries[index.row()][index.column()]
+            return entry[index.column()]
         else:
             return None
 
@@ -108,15 +159,15 @@ class LogModel(QtCore.QAbstractTableModel):
           @return bool: True if setting data succeeded, False otherwise
         """
         if role == QtCore.Qt.EditRole:
-            try:
-                self.entries[index.row()][index.column()] = value
-            except Exception as e:
-                print(e)
+            entry = self.entry(index.row())
+            if entry is None or not 0 <= index.column() < len(self.header):
                 return False
+            entry[index.column()] = value
             topleft = self.createIndex(index.row(), 0)
             bottomright = self.createIndex(index.row(), 3)
             self.dataChanged.emit(topleft, bottomright)
             return True
+        return False
 
     def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
         """ Data for the table view headers.
@@ -136,69 +187,59 @@ class LogModel(QtCore.QAbstractTableModel):
         else:
             return self.header[section]
 
-    def insertRows(self, row, count, parent=QtCore.QModelIndex()):
-        """ Insert empty rows (log entries) into the model.
-
-          @param int row: before which row to insert new rows
-          @param int count: how many rows to insert
-          @param QModelIndex parent: patent model index
+    def addEntries(self, entries):
+        """ Append log entries to the model, the oldest entries are discarded
+            if there are more than the maximum number of entries.
 
-          @return bool: True if insertion succeeded, False otherwise
+          @param list entries: log entries in list format (list of lists of
+                               5 elements)
         """
-        self.beginInsertRows(parent, row, row + count - 1)
-        insertion = list()
-        for ii in range(count):
-            insertion.append([None, None, None, None])
-        self.entries[row:row] = insertion
-        self.endInsertRows()
-        return True
-
-    def addRow(self, row, data, parent=QtCore.QModelIndex()):
-        """ Add a single log entry to model.
-          @param int row: row before which to insert log entry
-          @param list data: log entry in list format (5 elements)
-          @param QModelIndex parent: parent model index
-
-          @return bool: True if adding entry succeede, False otherwise
-        """
-        return self.addRows(row, [data], parent)
-
-    def addRows(self, row, data, parent=QtCore.QModelIndex()):
-        """ Add a log entries to model.
-          @param int row: row before which to insert log entry
-          @param list data: log entries in list format (list of lists of
-                            4 elements)
-          @param QModelIndex parent: parent model index
-
-          @return bool: True if adding entry succeede, False otherwise
-        """
-        count = len(data)
-        self.beginInsertRows(parent, row, row + count - 1)
-        self.entries[row:row] = data
+        entries = list(entries)[-self._maxEntries:]
+        if len(entries) == 0:
+            return
+        overflow = self._count + len(entries) - self._maxEntries
+        if overflow > 0:
+            self.removeRows(0, overflow)
+        self.beginInsertRows(QtCore.QModelIndex(), self._count, self._count + len(entries) - 1)
+        for entry in entries:
+            self._ring[(self._start + self._count) % self._maxEntries] = entry
+            self._count += 1
         self.endInsertRows()
-        topleft = self.createIndex(row, 0)
-        bottomright = self.createIndex(row, 3)
-        self.dataChanged.emit(topleft, bottomright)
-        return True
 
     def removeRows(self, row, count, parent=QtCore.QModelIndex()):
-        """ Remove rows (log entries) from model.
+        """ Remove the oldest rows (log entries) from model.
 
-          @param int row: from which row on to remove rows
+          @param int row: from which row on to remove rows, only 0 is possible
           @param int count: how many rows to remove
           @param QModelIndex parent: parent model index
 
           @return bool: True if removal succeeded, False otherwise
         """
+        if row != 0 or count <= 0 or count > self._count:
+            return False
         self.beginRemoveRows(parent, row, row + count - 1)
-        self.entries[row:row + count] = []
+        for ii in range(count):
+            self._ring[(self._start + ii) % self._maxEntries] = None
+        self._start = (self._start + count) % self._maxEntries
+        self._count -= count
         self.endRemoveRows()
         return True
 
+    def clear(self):
+        """ Remove all log entries. """
+        self.beginResetModel()
+        self._ring = [None] * self._maxEntries
+        self._start = 0
+        self._count = 0
+        self.endResetModel()
+
 
 class LogFilter(QtCore.QSortFilterProxyModel):
     """ A subclass of QProxyFilterModel that determines which log entries
         contained in the log model are shown in the view.
+
+      The filter reads the level and category of the entries directly from
+      the LogModel.
     """
 
     def __init__(self, parent=None):
@@ -207,7 +248,8 @@ class LogFilter(QtCore.QSortFilterProxyModel):
           @param QObject parent: parent object of filter
         """
         super().__init__(parent)
-        self.show_levels = ['info', 'warning', 'error', 'critical']
+        self.show_levels = {'info', 'warning', 'error', 'critical'}
+        self.show_categories = None
 
     def filterAcceptsRow(self, sourceRow, sourceParent):
         """ Determine wheter row (log entry) should be shown.
@@ -219,12 +261,10 @@ class LogFilter(QtCore.QSortFilterProxyModel):
           @return bool: True if row (log entry) should be shown, False
                         otherwise
         """
-        indexLevel = self.sourceModel().index(sourceRow, 2)
-        level = self.sourceModel().data(indexLevel,
-                                        QtCore.Qt.DisplayRole)
-        if level is None:
+        entry = self.sourceModel().entry(sourceRow)
+        if entry is None or entry[2] not in self.show_levels:
             return False
-        return level in self.show_levels
+        return self.show_categories is None or entry[4] in self.show_categories
 
     def lessThan(self, left, right):
         """ Comparison function for sorting rows (log entries)
@@ -247,10 +287,33 @@ class LogFilter(QtCore.QSortFilterProxyModel):
 
           @param list(str) levels: list of all levels that should be shown
         """
-        self.show_levels = levels
+        self.show_levels = set(levels)
+        self.invalidateFilter()
+
+    def setCategories(self, categories):
+        """ Set the categories (core, gui, logic, hardware or other) of the
+            messages shown through the filter.
+
+          @param list(str) categories: list of the categories that should be
+                                       shown, None to show all
+        """
+        self.show_categories = None if categories is None else set(categories)
         self.invalidateFilter()
 
 
+def logCategory(name):
+    """ Category of a log entry from the name of its logger.
+
+      @param str name: name of the logger
+
+      @return str: core, gui, logic, hardware or other
+    """
+    category = name.split('.', 1)[0]
+    if category in ('core', 'gui', 'logic', 'hardware'):
+        return category
+    return 'other'
+
+
 class AutoToolTipDelegate(QtWidgets.QStyledItemDelegate):
     """ A subclass of QStyledItemDelegate to display a tooltip if the text
         doesn't fit into the cell.
@@ -272,7 +335,7 @@ class AutoToolTipDelegate(QtWidgets.QStyledItemDelegate):
         if e.type() == QtCore.QEvent.ToolTip:
             rect = view.visualRect(index)
             size = self.sizeHint(option, index)
-            if rect.width() < size.width():
+            if rect.width() < size.width() or rect.height() < size.height():
                 tooltip = index.data(QtCore.Qt.DisplayRole)
                 QtWidgets.QToolTip.showText(
                     e.globalPos(),
@@ -289,6 +352,7 @@ class LogWidget(QtWidgets.QWidget):
     """
     sigDisplayEntry = QtCore.Signal(object)  # for thread-safetyness
     sigAddEntry = QtCore.Signal(object)  # for thread-safetyness
+    sigAddEntries = QtCore.Signal(object)  # for thread-safetyness
     sigScrollToAnchor = QtCore.Signal(object)  # for internal use.
 
     def __init__(self, manager=None, **kwargs):
@@ -307,8 +371,16 @@ class LogWidget(QtWidgets.QWidget):
 
         self.logLength = 1000
 
+        # Incoming entries are collected and added to the model in batches,
+        # only the newest entries that fit into the model are kept
+        self._pendingEntries = deque(maxlen=self.logLength)
+        self._insertTimer = QtCore.QTimer()
+        self._insertTimer.setSingleShot(True)
+        self._insertTimer.setInterval(100)
+        self._insertTimer.timeout.connect(self._insertPendingEntries)
+
         # Set up data model and visibility filter
-        self.model = LogModel()
+        self.model = LogModel(maxEntries=self.logLength)
         self.filtermodel = LogFilter()
         self.filtermodel.setSourceModel(self.model)
         self.output.setModel(self.filtermodel)
@@ -326,7 +398,7 @@ class LogWidget(QtWidgets.QWidget):
             self.output.horizontalHeader().setResizeMode(
                 3, QtWidgets.QHeaderView.ResizeToContents)
             self.output.verticalHeader().setResizeMode(
-                QtWidgets.QHeaderView.ResizeToContents)
+                QtWidgets.QHeaderView.Interactive)
         else:
             self.output.horizontalHeader().setSectionResizeMode(
                 0, QtWidgets.QHeaderView.Interactive)
@@ -337,7 +409,10 @@ class LogWidget(QtWidgets.QWidget):
             self.output.horizontalHeader().setSectionResizeMode(
                 3, QtWidgets.QHeaderView.ResizeToContents)
             self.output.verticalHeader().setSectionResizeMode(
-                QtWidgets.QHeaderView.ResizeToContents)
+                QtWidgets.QHeaderView.Interactive)
+            # only look at the visible and some more entries for the column
+            # widths instead of all of them after every batch
+            self.output.horizontalHeader().setResizeContentsPrecision(100)
         self.output.setTextElideMode(QtCore.Qt.ElideRight)
         self.output.setItemDelegate(AutoToolTipDelegate(self.output))
 
@@ -345,6 +420,7 @@ class LogWidget(QtWidgets.QWidget):
         self.sigDisplayEntry.connect(self.displayEntry,
                                      QtCore.Qt.QueuedConnection)
         self.sigAddEntry.connect(self.addEntry, QtCore.Qt.QueuedConnection)
+        self.sigAddEntries.connect(self.addEntries, QtCore.Qt.QueuedConnection)
         self.filterTree.itemChanged.connect(self.setCheckStates)
 
     def setManager(self, manager):
@@ -380,8 +456,47 @@ class LogWidget(QtWidgets.QWidget):
         if not isGuiThread:
             self.sigAddEntry.emit(entry)
             return
-        if self.model.rowCount() > self.logLength:
-            self.model.removeRows(0, self.model.rowCount() - self.logLength)
+        self.addEntries([entry])
+
+    def addEntries(self, entries):
+        """Add log entries to the log view. They are shown with the next
+           batch, at most 100 ms later.
+
+          @param list entries: log entries in dict format
+        """
+        isGuiThread = QtCore.QThread.currentThread(
+        ) == QtCore.QCoreApplication.instance().thread()
+        if not isGuiThread:
+            self.sigAddEntries.emit(entries)
+            return
+        self._pendingEntries.extend(entries)
+        if not self._insertTimer.isActive():
+            self._insertTimer.start()
+
+    def _insertPendingEntries(self):
+        """Add the collected log entries to the model in one batch.
+        """
+        entries = [self._logEntryRow(entry) for entry in self._pendingEntries]
+        self._pendingEntries.clear()
+        self.model.addEntries(entries)
+        # the rows have a fixed height, only the new entries with several
+        # lines (e.g. tracebacks) are resized
+        rowCount = self.model.rowCount()
+        for row in range(max(0, rowCount - len(entries)), rowCount):
+            if '\n' in self.model.entry(row)[3]:
+                index = self.filtermodel.mapFromSource(self.model.index(row, 0))
+                if index.isValid():
+                    self.output.resizeRowToContents(index.row())
+        self.output.scrollToBottom()
+
+    @staticmethod
+    def _logEntryRow(entry):
+        """Convert a log entry to a row of the model.
+
+          @param dict entry: log entry in dict format
+
+          @return list: [name, time, level, message, category]
+        """
         text = entry['message']
         if entry.get('exception') is not None:
             if 'reasons' in entry['exception']:
@@ -390,9 +505,8 @@ class LogWidget(QtWidgets.QWidget):
                 text += '\n' + entry['exception']['message']
             for line in entry['exception']['traceback']:
                 text += '\n' + str(line)
-        logEntry = [entry['name'], entry['timestamp'], entry['level'], text]
-        self.model.addRow(self.model.rowCount(), logEntry)
-        self.output.scrollToBottom()
+        return [entry['name'], entry['timestamp'], entry['level'], text,
+                logCategory(entry['name'])]
 
     def displayEntry(self, entry):
         """ Scroll to entry in QTableView.
@@ -410,6 +524,8 @@ class LogWidget(QtWidgets.QWidget):
         """
         if length > 0:
             self.logLength = length
+            self._pendingEntries = deque(self._pendingEntries, maxlen=length)
+            self.model.setMaxEntries(length)
 
     def setCheckStates(self, item, column):
         """ Set state of the checkbox in the filter list and update log view.
@@ -417,22 +533,41 @@ class LogWidget(QtWidgets.QWidget):
           @param int item: Item number
           @param int column: Column number
         """
-        # check all / uncheck all
-        if item == self.filterTree.topLevelItem(1):
-            if item.checkState(0):
-                for ii in range(item.childCount()):
-                    item.child(ii).setCheckState(0, QtCore.Qt.Checked)
-        elif item.parent() == self.filterTree.topLevelItem(1):
-            if not item.checkState(0):
-                self.filterTree.topLevelItem(1).setCheckState(0,
-                                                              QtCore.Qt.Unchecked)
+        # check all / uncheck all, item 1 holds the levels and item 2 the
+        # categories
+        for group in (self.filterTree.topLevelItem(1),
+                      self.filterTree.topLevelItem(2)):
+            if group is None:
+                continue
+            if item == group:
+                if item.checkState(0):
+                    for ii in range(item.childCount()):
+                        item.child(ii).setCheckState(0, QtCore.Qt.Checked)
+            elif item.parent() == group:
+                if not item.checkState(0):
+                    group.setCheckState(0, QtCore.Qt.Unchecked)
 
         # level filter
-        levelFilter = []
-        for ii in range(self.filterTree.topLevelItem(1).childCount()):
-            child = self.filterTree.topLevelItem(1).child(ii)
-            if self.filterTree.topLevelItem(1).checkState(0) \
-                    or child.checkState(0):
-                text = child.text(0)
-                levelFilter.append(str(text))
+        levelFilter = self._checkedFilters(self.filterTree.topLevelItem(1))
         self.filtermodel.setLevels(levelFilter)
+
+        # category filter
+        if self.filterTree.topLevelItem(2) is not None:
+            categoryFilter = self._checkedFilters(
+                self.filterTree.topLevelItem(2))
+            self.filtermodel.setCategories(categoryFilter)
+
+    def _checkedFilters(self, group):
+        """ Get the checked entries of a group in the filter list.
+
+          @param QTreeWidgetItem group: top level item of the group
+
+          @return list(str): texts of the checked entries, all if the group
+                             itself is checked
+        """
+        checked = []
+        for ii in range(group.childCount()):
+            child = group.child(ii)
+            if group.checkState(0) or child.checkState(0):
+                checked.append(str(child.text(0)))
+        return checked
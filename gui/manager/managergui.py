@@ -143,9 +143,11 @@ class ManagerGui(GUIBase):
         self._manager.sigShutdownAcknowledge.connect(self.promptForShutdown)
         # Log widget
         self._mw.logwidget.setManager(self._manager)
+        self._mw.logwidget.setLogLength(
+            self._manager.tree['global'].get('log_max_entries', 1000))
         for loghandler in logging.getLogger().handlers:
             if isinstance(loghandler, core.logger.QtLogHandler):
-                loghandler.sigLoggedMessage.connect(self.handleLogEntry)
+                loghandler.sigLoggedMessages.connect(self.handleLogEntries)
         # Module widgets
         self.sigStartModule.connect(self._manager.startModule)
         self.sigReloadModule.connect(self._manager.restartModuleRecursive)
@@ -164,6 +166,16 @@ class ManagerGui(GUIBase):
         self.startIPythonWidget()
         # thread widget
         self._mw.threadWidget.threadListView.setModel(self._manager.tm)
+        self._mw.threadWidget.eventLoopTableView.setModel(self._manager.eventLoopMonitor)
+        # startup profile widget
+        self._mw.startupWidget.startupTableView.setModel(self._manager.startupProfiler)
+        # method profile widget
+        self._mw.profileWidget.profileTableView.setModel(self._manager.methodProfiler)
+        self._mw.profileWidget.recordCheckBox.setChecked(self._manager.methodProfiler.enabled)
+        self._mw.profileWidget.recordCheckBox.toggled.connect(
+            self._manager.methodProfiler.setEnabled)
+        self._mw.profileWidget.clearButton.clicked.connect(self._manager.methodProfiler.clear)
+        self._mw.profileWidget.exportButton.clicked.connect(self.exportMethodProfile)
         # remote widget
         # hide remote menu item if rpyc is not available
         self._mw.actionRemoteView.setVisible(self._manager.rm is not None)
@@ -184,6 +196,8 @@ class ManagerGui(GUIBase):
         self._mw.configDisplayDockWidget.hide()
         self._mw.remoteDockWidget.hide()
         self._mw.threadDockWidget.hide()
+        self._mw.startupDockWidget.hide()
+        self._mw.profileDockWidget.hide()
         self._mw.show()
 
     def on_deactivate(self):
@@ -240,24 +254,32 @@ class ManagerGui(GUIBase):
         self._mw.consoleDockWidget.setVisible(True)
         self._mw.remoteDockWidget.setVisible(False)
         self._mw.threadDockWidget.setVisible(False)
+        self._mw.startupDockWidget.setVisible(False)
+        self._mw.profileDockWidget.setVisible(False)
         self._mw.logDockWidget.setVisible(True)
 
         self._mw.actionConfigurationView.setChecked(False)
         self._mw.actionConsoleView.setChecked(True)
         self._mw.actionRemoteView.setChecked(False)
         self._mw.actionThreadsView.setChecked(False)
+        self._mw.actionStartupProfileView.setChecked(False)
+        self._mw.actionMethodProfileView.setChecked(False)
         self._mw.actionLogView.setChecked(True)
 
         self._mw.configDisplayDockWidget.setFloating(False)
         self._mw.consoleDockWidget.setFloating(False)
         self._mw.remoteDockWidget.setFloating(False)
         self._mw.threadDockWidget.setFloating(False)
+        self._mw.startupDockWidget.setFloating(False)
+        self._mw.profileDockWidget.setFloating(False)
         self._mw.logDockWidget.setFloating(False)
 
         self._mw.addDockWidget(QtCore.Qt.DockWidgetArea(8), self._mw.configDisplayDockWidget)
         self._mw.addDockWidget(QtCore.Qt.DockWidgetArea(2), self._mw.consoleDockWidget)
         self._mw.addDockWidget(QtCore.Qt.DockWidgetArea(8), self._mw.remoteDockWidget)
         self._mw.addDockWidget(QtCore.Qt.DockWidgetArea(8), self._mw.threadDockWidget)
+        self._mw.addDockWidget(QtCore.Qt.DockWidgetArea(8), self._mw.startupDockWidget)
+        self._mw.addDockWidget(QtCore.Qt.DockWidgetArea(8), self._mw.profileDockWidget)
         self._mw.addDockWidget(QtCore.Qt.DockWidgetArea(8), self._mw.logDockWidget)
 
     def handleLogEntry(self, entry):
@@ -266,9 +288,18 @@ class ManagerGui(GUIBase):
 
             @param dict entry: Log entry
         """
-        self._mw.logwidget.addEntry(entry)
-        if entry['level'] == 'error' or entry['level'] == 'critical':
-            self.errorDialog.show(entry)
+        self.handleLogEntries([entry])
+
+    def handleLogEntries(self, entries):
+        """ Forward a batch of log entries to the log widget and show an error
+            popup for the error messages.
+
+            @param list entries: Log entries
+        """
+        self._mw.logwidget.addEntries(entries)
+        for entry in entries:
+            if entry['level'] == 'error' or entry['level'] == 'critical':
+                self.errorDialog.show(entry)
 
     def startIPython(self):
         """ Create an IPython kernel manager and kernel.
@@ -516,6 +547,19 @@ Go, play.
             self.sigSaveConfig.emit(filename)
 
 
+    def exportMethodProfile(self):
+        """ Ask the user for a file where the recorded method calls should be saved to as a
+            Chrome trace.
+        """
+        filename = QtWidgets.QFileDialog.getSaveFileName(
+            self._mw,
+            'Export method profile',
+            self._manager.getStatusDir(),
+            'Trace files (*.json)')[0]
+        if filename != '':
+            self._manager.methodProfiler.exportChromeTrace(filename)
+
+
 class ManagerMainWindow(QtWidgets.QMainWindow):
 
     """ This class represents the Manager Window.
@@ -875,27 +875,28 @@ class PoiManagerGui(GUIBase):
 
         self.log.debug('starting redraw_poi_markers {0}'.format(time.time()))
 
-        for key in self._poi_manager_logic.get_all_pois():
-            if key is not 'crosshair' and key is not 'sample':
-                position = self._poi_manager_logic.get_poi_position(poikey=key)
-                position = position[:2]
-
-                if key in self._markers.keys():
-                    self._markers[key].set_position(position)
-                    self._markers[key].deselect()
-                else:
-                    # Create Region of Interest as marker:
-                    marker = PoiMark(
-                        position,
-                        poi=self._poi_manager_logic.poi_list[key],
-                        click_action=self.select_poi_from_marker,
-                        movable=False,
-                        scaleSnap=False,
-                        snapSize=1.0e-6)
-
-                    # Add to the Map Widget
-                    marker.add_to_viewwidget(self._mw.roi_map_ViewWidget)
-                    self._markers[key] = marker
+        # The positions of all POIs are calculated at once, only the markers that moved or
+        # were selected are redrawn
+        keys, positions = self._poi_manager_logic.get_poi_positions()
+        for key, position in zip(keys, positions[:, :2]):
+            if key in self._markers:
+                marker = self._markers[key]
+                if marker.selected or not np.array_equal(marker.position, position):
+                    marker.set_position(position)
+                    marker.deselect()
+            else:
+                # Create Region of Interest as marker:
+                marker = PoiMark(
+                    position,
+                    poi=self._poi_manager_logic.poi_list[key],
+                    click_action=self.select_poi_from_marker,
+                    movable=False,
+                    scaleSnap=False,
+                    snapSize=1.0e-6)
+
+                # Add to the Map Widget
+                marker.add_to_viewwidget(self._mw.roi_map_ViewWidget)
+                self._markers[key] = marker
 
         if self._poi_manager_logic.active_poi is not None:
             active_poi_key = self._poi_manager_logic.active_poi.get_key()
@@ -26,12 +26,41 @@ import numpy as np
 
 from core.module import Base, ConfigOption
 from core.util.modules import get_main_dir
+from core.util.sharedbuffer import SharedArrayPublisher
 from interface.fast_counter_interface import FastCounterInterface
 
 
 class FastCounterDummy(Base, FastCounterInterface):
-    """This is the Interface class to define the controls for the simple
-    microwave hardware.
+    """ Dummy fast counter.
+
+    With trace_mode 'file' every trace is the demo trace (or the trace given with
+    load_trace). The text file is converted once into a .npy file in the status directory
+    which is loaded on the following starts.
+
+    With trace_mode 'synthetic' the traces of a pulsed measurement are simulated: laser
+    pulses with a fluorescence that drops at the start of the pulse for spins in the dark
+    state, the dark state population oscillates over the laser pulses like in a Rabi
+    measurement. The counts accumulate with the time the measurement runs (one sweep per
+    record length or per all gates) and get Poisson noise.
+
+    get_data_trace_shared publishes the trace into a shared memory ring buffer and returns only
+    its name and sequence number, a logic in another Qudi instance (e.g. a worker process) on
+    the same computer reads the trace from there instead of receiving it over the remote module
+    connection.
+
+    Example config:
+
+    fastcounter_dummy:
+        module.Class: 'fast_counter_dummy.FastCounterDummy'
+        gated: False
+        trace_mode: 'synthetic'
+        number_of_laser_pulses: 50   # ungated only, gated uses the number of gates
+        laser_length: 3e-6      # in s
+        count_rate: 2e5         # counts/s of the bright state during the laser pulses
+        contrast: 0.3
+        poisson_noise: True
+        data_latency: 0         # in s, wait in get_data_trace
+        command_latency: 0      # in s, wait in start, stop and pause
     """
     _modclass = 'fastcounterinterface'
     _modtype = 'hardware'
@@ -39,6 +68,14 @@ class FastCounterDummy(Base, FastCounterInterface):
     # config option
     _gated = ConfigOption('gated', False, missing='warn')
     trace_path = ConfigOption('load_trace', None)
+    _trace_mode = ConfigOption('trace_mode', 'file')
+    _number_of_laser_pulses = ConfigOption('number_of_laser_pulses', 50)
+    _laser_length = ConfigOption('laser_length', 3e-6)
+    _count_rate = ConfigOption('count_rate', 2e5)
+    _contrast = ConfigOption('contrast', 0.3)
+    _poisson_noise = ConfigOption('poisson_noise', True)
+    _data_latency = ConfigOption('data_latency', 0.5)
+    _command_latency = ConfigOption('command_latency', 1.0)
 
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
@@ -61,12 +98,24 @@ class FastCounterDummy(Base, FastCounterInterface):
         self.statusvar = 0
         self._binwidth = 1
         self._gate_length_bins = 8192
+        self._number_of_gates = 0
+        self._count_data = None
+        self._expected_counts = None
+        self._sweep_time = 0
+        self._elapsed_time = 0
+        self._run_start = None
+        self._accumulated_sweeps = 0
+        self._shared_trace = SharedArrayPublisher(self._name)
+        if self._trace_mode not in ('file', 'synthetic'):
+            self.log.error('Unknown trace_mode {0}, using file.'.format(self._trace_mode))
+            self._trace_mode = 'file'
         return
 
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
         self.statusvar = -1
+        self._shared_trace.close()
         return
 
     def get_constraints(self):
@@ -130,6 +179,9 @@ class FastCounterDummy(Base, FastCounterInterface):
         self._gate_length_bins = int(np.rint(record_length_s / bin_width_s))
         actual_binwidth = self._binwidth * 1000 / 950e9
         actual_length = self._gate_length_bins * actual_binwidth
+        self._number_of_gates = number_of_gates
+        if self._trace_mode == 'synthetic':
+            self._expected_counts = self._synthetic_trace(actual_binwidth)
         self.statusvar = 1
         return actual_binwidth, actual_length, number_of_gates
 
@@ -147,30 +199,114 @@ class FastCounterDummy(Base, FastCounterInterface):
         return self.statusvar
 
     def start_measure(self):
-        time.sleep(1)
+        time.sleep(self._command_latency)
         self.statusvar = 2
+        if self._trace_mode == 'synthetic':
+            if self._expected_counts is None:
+                self._expected_counts = self._synthetic_trace(self.get_binwidth())
+            self._count_data = np.zeros(self._expected_counts.shape, dtype='int64')
+            self._accumulated_sweeps = 0
+            self._elapsed_time = 0
+            self._run_start = time.monotonic()
+            return 0
         try:
-            self._count_data = np.loadtxt(self.trace_path, dtype='int64')
+            self._count_data = self._load_trace()
         except:
+            self.log.exception('Could not load the trace {0}.'.format(self.trace_path))
             return -1
 
         if self._gated:
             self._count_data = self._count_data.transpose()
         return 0
 
+    def _load_trace(self):
+        """ Load the trace file. The text file is parsed once and saved as .npy file in the
+        status directory, which is loaded instead as long as it is newer than the text file.
+
+        @return numpy.ndarray: the trace (dtype int64)
+        """
+        trace_name = os.path.splitext(os.path.basename(self.trace_path))[0]
+        cache_path = os.path.join(self._manager.getStatusDir(),
+                                  'fastcounterdummy-{0}.npy'.format(trace_name))
+        if (os.path.isfile(cache_path)
+                and os.path.getmtime(cache_path) >= os.path.getmtime(self.trace_path)):
+            return np.load(cache_path)
+        trace = np.loadtxt(self.trace_path, dtype='int64')
+        try:
+            np.save(cache_path, trace)
+        except OSError:
+            self.log.warning('Could not save the trace cache {0}.'.format(cache_path))
+        return trace
+
+    def _synthetic_trace(self, binwidth):
+        """ Expected counts per bin and sweep of a pulsed measurement.
+
+        @param float binwidth: width of a bin in seconds
+
+        @return numpy.ndarray: 1D array for an ungated counter, 2D array (gates, bins) for a
+                               gated counter
+        """
+        delay_bins = int(round(100e-9 / binwidth))
+        if self._gated:
+            pulses = max(1, self._number_of_gates)
+            pulse_bins = self._gate_length_bins
+        else:
+            pulses = max(1, self._number_of_laser_pulses)
+            pulse_bins = self._gate_length_bins // pulses
+        laser_bins = max(0, min(int(round(self._laser_length / binwidth)),
+                                pulse_bins - delay_bins))
+
+        # dark state population of every laser pulse and fluorescence drop during
+        # the spin polarization (300 ns) at the start of the pulse
+        dark_population = np.sin(np.linspace(0, 2 * np.pi, pulses)) ** 2
+        polarization = np.exp(-np.arange(laser_bins) * binwidth / 300e-9)
+        counts = np.full((pulses, pulse_bins), 0.01)
+        counts[:, delay_bins:delay_bins + laser_bins] = (
+            1 - self._contrast * dark_population[:, np.newaxis] * polarization)
+        counts *= self._count_rate * binwidth
+
+        self._sweep_time = pulses * pulse_bins * binwidth
+        if self._gated:
+            return counts
+        trace = np.full(self._gate_length_bins, 0.01 * self._count_rate * binwidth)
+        trace[:pulses * pulse_bins] = counts.ravel()
+        return trace
+
+    def _accumulate(self):
+        """ Add the counts of the sweeps since the last call to the synthetic trace. """
+        elapsed = self._elapsed_time
+        if self._run_start is not None:
+            elapsed += time.monotonic() - self._run_start
+        sweeps = int(elapsed / self._sweep_time) if self._sweep_time > 0 else 0
+        new_sweeps = sweeps - self._accumulated_sweeps
+        if new_sweeps <= 0:
+            return
+        expected = self._expected_counts * new_sweeps
+        if self._poisson_noise:
+            self._count_data += np.random.poisson(expected)
+        else:
+            self._count_data += np.rint(expected).astype('int64')
+        self._accumulated_sweeps = sweeps
+
     def pause_measure(self):
         """ Pauses the current measurement.
 
         Fast counter must be initially in the run state to make it pause.
         """
-        time.sleep(1)
+        time.sleep(self._command_latency)
+        if self._run_start is not None:
+            self._elapsed_time += time.monotonic() - self._run_start
+            self._run_start = None
         self.statusvar = 3
         return 0
 
     def stop_measure(self):
         """ Stop the fast counter. """
 
-        time.sleep(1)
+        time.sleep(self._command_latency)
+        if self._run_start is not None:
+            self._elapsed_time += time.monotonic() - self._run_start
+            self._run_start = None
         self.statusvar = 1
         return 0
 
@@ -180,6 +316,8 @@ class FastCounterDummy(Base, FastCounterInterface):
         If fast counter is in pause state, then fast counter will be continued.
         """
 
+        if self._trace_mode == 'synthetic' and self._run_start is None:
+            self._run_start = time.monotonic()
         self.statusvar = 2
         return 0
 
@@ -214,9 +352,21 @@ class FastCounterDummy(Base, FastCounterInterface):
         """
 
         # include an artificial waiting time
-        time.sleep(0.5)
+        time.sleep(self._data_latency)
+        if self._trace_mode == 'synthetic' and self._count_data is not None:
+            self._accumulate()
+            return self._count_data.copy()
         return self._count_data
 
+    def get_data_trace_shared(self):
+        """ Publishes the current timetrace (see get_data_trace) into a shared memory ring
+        buffer.
+
+        @return tuple(str, int): name of the buffer (core.util.sharedbuffer.SharedRingBuffer)
+                                 and sequence number of the trace
+        """
+        return self._shared_trace.publish(self.get_data_trace())
+
     def get_frequency(self):
         freq = 950.
         time.sleep(0.5)
@@ -20,18 +20,94 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
+import threading
+import time
 from collections import OrderedDict
+from qtpy import QtCore
 
-from core.module import Base
+from core.module import Base, ConfigOption
 from interface.magnet_interface import MagnetInterface
 
 
 class MagnetAxisDummy:
-    """ Generic dummy magnet representing one axis. """
-    def __init__(self, label):
+    """ Generic dummy magnet representing one axis.
+
+    Without a velocity the axis jumps to every new position. With a velocity
+    (and optionally an acceleration) a move takes time: the position follows a
+    trapezoidal velocity profile and the status reports a moving axis until
+    the target is reached.
+    """
+    def __init__(self, label, vel=None, acc=None):
         self.label = label
-        self.pos = 0.0
-        self.status = 0, {0: 'MagnetDummy Idle'}
+        self.vel = vel
+        self.acc = acc
+        self._start_pos = 0.0
+        self._target_pos = 0.0
+        self._move_start = 0.0
+        self._move_duration = 0.0
+
+    @property
+    def pos(self):
+        """ Current position of the axis. """
+        elapsed = time.monotonic() - self._move_start
+        if elapsed >= self._move_duration:
+            return self._target_pos
+        distance = abs(self._target_pos - self._start_pos)
+        direction = 1 if self._target_pos >= self._start_pos else -1
+        return self._start_pos + direction * self._travelled(distance, elapsed)
+
+    @pos.setter
+    def pos(self, target):
+        """ Start a move to a new position. """
+        start = self.pos
+        self._start_pos = start
+        self._target_pos = target
+        self._move_start = time.monotonic()
+        self._move_duration = self._duration(abs(target - start))
+
+    @property
+    def status(self):
+        """ Status number and status dict of the axis. """
+        if self.is_moving():
+            return 1, {1: 'MagnetDummy moving'}
+        return 0, {0: 'MagnetDummy Idle'}
+
+    def is_moving(self):
+        return time.monotonic() - self._move_start < self._move_duration
+
+    def remaining_time(self):
+        """ Time in s until the current move has finished. """
+        return max(0.0, self._move_duration - (time.monotonic() - self._move_start))
+
+    def stop(self):
+        """ Stop at the current position. """
+        self._target_pos = self.pos
+        self._move_duration = 0.0
+
+    def _peak_vel(self, distance):
+        if not self.acc:
+            return self.vel
+        return min(self.vel, (distance * self.acc) ** 0.5)
+
+    def _duration(self, distance):
+        if not self.vel or distance == 0:
+            return 0.0
+        peak_vel = self._peak_vel(distance)
+        if not self.acc:
+            return distance / peak_vel
+        return distance / peak_vel + peak_vel / self.acc
+
+    def _travelled(self, distance, elapsed):
+        peak_vel = self._peak_vel(distance)
+        if not self.acc:
+            return peak_vel * elapsed
+        ramp_time = peak_vel / self.acc
+        remaining = self._move_duration - elapsed
+        if elapsed < ramp_time:
+            return self.acc * elapsed ** 2 / 2
+        if remaining < ramp_time:
+            return distance - self.acc * remaining ** 2 / 2
+        return peak_vel * (elapsed - ramp_time / 2)
 
 
 class MagnetDummy(Base, MagnetInterface):
@@ -42,14 +118,23 @@ class MagnetDummy(Base, MagnetInterface):
     _modtype = 'MagnetDummy'
     _modclass = 'hardware'
 
+    # simulated motion, without a velocity every move is instantaneous
+    _velocity = ConfigOption('velocity', None)  # in m/s
+    _acceleration = ConfigOption('acceleration', None)  # in m/s^2
+    _angular_velocity = ConfigOption('angular_velocity', None)  # in °/s
+
+    # emitted with the positions of all axes when a movement has finished
+    sigMoveFinished = QtCore.Signal(dict)
+
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
 
         #these label should be actually set by the config.
-        self._x_axis = MagnetAxisDummy('x')
-        self._y_axis = MagnetAxisDummy('y')
-        self._z_axis = MagnetAxisDummy('z')
-        self._phi_axis = MagnetAxisDummy('phi')
+        self._x_axis = MagnetAxisDummy('x', self._velocity, self._acceleration)
+        self._y_axis = MagnetAxisDummy('y', self._velocity, self._acceleration)
+        self._z_axis = MagnetAxisDummy('z', self._velocity, self._acceleration)
+        self._phi_axis = MagnetAxisDummy('phi', self._angular_velocity)
+        self._finish_timer = None
 
     #TODO: Checks if configuration is set and is reasonable
 
@@ -61,7 +146,8 @@ class MagnetDummy(Base, MagnetInterface):
     def on_deactivate(self):
         """ Deactivate the module properly.
         """
-        pass
+        if self._finish_timer is not None:
+            self._finish_timer.cancel()
 
     def get_constraints(self):
         """ Retrieve the hardware constrains from the motor device.
@@ -98,7 +184,7 @@ class MagnetDummy(Base, MagnetInterface):
         axis0['vel_max'] = 100e-3
         axis0['vel_step'] = 0.01e-3
         axis0['acc_min'] = 0.1e-3
-        axis0['acc_max'] = 0.0
+        axis0['acc_max'] = self._acceleration if self._acceleration else 0.0
         axis0['acc_step'] = 0.0
 
         axis1 = {}
@@ -112,7 +198,7 @@ class MagnetDummy(Base, MagnetInterface):
         axis1['vel_max'] = 100e-3
         axis1['vel_step'] = 0.01e-3
         axis1['acc_min'] = 0.1e-3
-        axis1['acc_max'] = 0.0
+        axis1['acc_max'] = self._acceleration if self._acceleration else 0.0
         axis1['acc_step'] = 0.0
 
         axis2 = {}
@@ -126,7 +212,7 @@ class MagnetDummy(Base, MagnetInterface):
         axis2['vel_max'] = 100e-3
         axis2['vel_step'] = 0.01e-3
         axis2['acc_min'] = 0.1e-3
-        axis2['acc_max'] = 0.0
+        axis2['acc_max'] = self._acceleration if self._acceleration else 0.0
         axis2['acc_step'] = 0.0
 
         axis3 = {}
@@ -245,6 +331,8 @@ class MagnetDummy(Base, MagnetInterface):
             else:
                 self._phi_axis.pos = self._phi_axis.pos + move_phi
 
+        self._schedule_move_finished()
+
     def move_abs(self, param_dict):
         """ Moves magnet to absolute position (absolute movement)
 
@@ -320,11 +408,16 @@ class MagnetDummy(Base, MagnetInterface):
             else:
                 self._phi_axis.pos = desired_pos
 
+        self._schedule_move_finished()
+
     def abort(self):
         """ Stops movement of the stage
 
         @return int: error code (0:OK, -1:error)
         """
+        for axis in self._axes():
+            axis.stop()
+        self._schedule_move_finished()
         self.log.info('MagnetDummy: Movement stopped!')
         return 0
 
@@ -396,6 +489,24 @@ class MagnetDummy(Base, MagnetInterface):
 
         return status
 
+    def wait_until_reached(self, param_list=None, timeout=None):
+        """ Wait until the axes have finished their current movement.
+
+        @param list param_list: optional, labels of the axes to wait for. If
+                                nothing is passed, wait for all axes.
+        @param float timeout: optional, maximal waiting time in seconds
+
+        @return bool: True if the movement has finished, False if the timeout
+                      has passed before.
+        """
+        remaining = max([axis.remaining_time() for axis in self._axes()
+                         if param_list is None or axis.label in param_list] + [0.0])
+        if timeout is not None and remaining > timeout:
+            time.sleep(timeout)
+            return False
+        time.sleep(remaining)
+        return True
+
     def calibrate(self, param_list=None):
         """ Calibrates the magnet stage.
 
@@ -430,6 +541,7 @@ class MagnetDummy(Base, MagnetInterface):
             self._z_axis.pos = 0.0
             self._phi_axis.pos = 0.0
 
+        self._schedule_move_finished()
         return 0
 
     def get_velocity(self, param_list=None):
@@ -444,22 +556,14 @@ class MagnetDummy(Base, MagnetInterface):
         @return dict : with the axis label as key and the velocity as item.
         """
         vel = {}
-        if param_list is not None:
-            if self._x_axis.label in param_list:
-                vel[self._x_axis.label] = self._x_axis.vel
-            if self._y_axis.label in param_list:
-                vel[self._x_axis.label] = self._y_axis.vel
-            if self._z_axis.label in param_list:
-                vel[self._x_axis.label] = self._z_axis.vel
-            if self._phi_axis.label in param_list:
-                vel[self._phi_axis.label] = self._phi_axis.vel
-
-        else:
-            vel[self._x_axis.label] = self._x_axis.get_vel
-            vel[self._y_axis.label] = self._y_axis.get_vel
-            vel[self._z_axis.label] = self._z_axis.get_vel
-            vel[self._phi_axis.label] = self._phi_axis.vel
-
+        constraints = self.get_constraints()
+        for axis in self._axes():
+            if param_list is None or axis.label in param_list:
+                # an axis without velocity jumps, report the maximal velocity
+                if axis.vel:
+                    vel[axis.label] = axis.vel
+                else:
+                    vel[axis.label] = constraints[axis.label]['vel_max']
         return vel
 
     def set_velocity(self, param_dict=None):
@@ -608,3 +712,20 @@ class MagnetDummy(Base, MagnetInterface):
         """
         raise InterfaceImplementationError('magnet_interface>initialize')
         return -1
+
+    def _axes(self):
+        return self._x_axis, self._y_axis, self._z_axis, self._phi_axis
+
+    def _schedule_move_finished(self):
+        """ Emit sigMoveFinished when all axes have stopped. """
+        if self._finish_timer is not None:
+            self._finish_timer.cancel()
+        remaining = max(axis.remaining_time() for axis in self._axes())
+        self._finish_timer = threading.Timer(remaining, self._move_finished)
+        self._finish_timer.daemon = True
+        self._finish_timer.start()
+
+    def _move_finished(self):
+        # a new movement may have started in the meantime, it has its own timer
+        if not any(axis.is_moving() for axis in self._axes()):
+            self.sigMoveFinished.emit(self.get_pos())
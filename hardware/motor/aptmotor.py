@@ -40,6 +40,7 @@ from ctypes import c_long, c_buffer, c_float, windll, pointer
 from interface.motor_interface import MotorInterface
 import os
 import platform
+import time
 
 
 class APTMotor():
@@ -1192,6 +1193,29 @@ class APTStage(Base, MotorInterface):
 
         return status
 
+    def wait_until_reached(self, param_list=None, timeout=None):
+        """ Wait until the axes have finished their current movement.
+
+        @param list param_list: optional, labels of the axes to wait for. If
+                                nothing is passed, wait for all axes.
+        @param float timeout: optional, maximal waiting time in seconds
+
+        @return bool: True if the movement has finished, False if the timeout
+                      has passed before.
+
+        The controller reports the movement in its status bits, these are
+        polled every 10 ms.
+        """
+        if param_list is None:
+            param_list = list(self._axis_dict)
+        axes = [self._axis_dict[label] for label in param_list if label in self._axis_dict]
+        start = time.monotonic()
+        while any(axis.get_status()[0] in (1, 2) for axis in axes):
+            if timeout is not None and time.monotonic() - start > timeout:
+                return False
+            time.sleep(0.01)
+        return True
+
     def calibrate(self, param_list=None):
         """ Calibrates the stage.
 
@@ -21,15 +21,21 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 """
 
 from collections import OrderedDict
+import threading
 import time
+from qtpy import QtCore
 
-from core.module import Base
+from core.module import Base, ConfigOption
+from hardware.magnet.magnet_dummy import MagnetAxisDummy
 from interface.motor_interface import MotorInterface
 
-class MotorAxisDummy:
+class MotorAxisDummy(MagnetAxisDummy):
     """ Generic dummy motor representing one axis. """
-    def __init__(self, label):
-        self.label = label
+
+    @property
+    def status(self):
+        """ Status number of the axis (0: idle, 1: moving). """
+        return 1 if self.is_moving() else 0
 
 
 class MotorDummy(Base, MotorInterface):
@@ -38,6 +44,15 @@ class MotorDummy(Base, MotorInterface):
     _modclass = 'MotorDummy'
     _modtype = 'hardware'
 
+    # Without a velocity every movement is instantaneous after a fixed waiting
+    # time, with a velocity the movements are simulated.
+    _velocity = ConfigOption('velocity', None)  # in m/s
+    _acceleration = ConfigOption('acceleration', None)  # in m/s^2
+    _angular_velocity = ConfigOption('angular_velocity', None)  # in °/s
+
+    # emitted with the positions of all axes when a movement has finished
+    sigMoveFinished = QtCore.Signal(dict)
+
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
 
@@ -48,12 +63,13 @@ class MotorDummy(Base, MotorInterface):
             self.log.info('{0}: {1}'.format(key,config[key]))
 
         # these label should be actually set by the config.
-        self._x_axis = MotorAxisDummy('x')
-        self._y_axis = MotorAxisDummy('y')
-        self._z_axis = MotorAxisDummy('z')
-        self._phi_axis = MotorAxisDummy('phi')
+        self._x_axis = MotorAxisDummy('x', self._velocity, self._acceleration)
+        self._y_axis = MotorAxisDummy('y', self._velocity, self._acceleration)
+        self._z_axis = MotorAxisDummy('z', self._velocity, self._acceleration)
+        self._phi_axis = MotorAxisDummy('phi', self._angular_velocity)
 
         self._wait_after_movement = 1 #in seconds
+        self._finish_timer = None
 
     #TODO: Checks if configuration is set and is reasonable
 
@@ -68,18 +84,9 @@ class MotorDummy(Base, MotorInterface):
         self._z_axis.pos = 0.0
         self._phi_axis.pos = 0.0
 
-        self._x_axis.vel = 1.0
-        self._y_axis.vel = 1.0
-        self._z_axis.vel = 1.0
-        self._phi_axis.vel = 1.0
-
-        self._x_axis.status = 0
-        self._y_axis.status = 0
-        self._z_axis.status = 0
-        self._phi_axis.status = 0
-
     def on_deactivate(self):
-        pass
+        if self._finish_timer is not None:
+            self._finish_timer.cancel()
 
 
     def get_constraints(self):
@@ -260,6 +267,8 @@ class MotorDummy(Base, MotorInterface):
                 self._make_wait_after_movement()
                 self._phi_axis.pos = self._phi_axis.pos + move_phi
 
+        self._schedule_move_finished()
+
 
     def move_abs(self, param_dict):
         """ Moves stage to absolute position (absolute movement)
@@ -336,6 +345,8 @@ class MotorDummy(Base, MotorInterface):
                 self._make_wait_after_movement()
                 self._phi_axis.pos = desired_pos
 
+        self._schedule_move_finished()
+
 
 
     def abort(self):
@@ -343,6 +354,9 @@ class MotorDummy(Base, MotorInterface):
 
         @return int: error code (0:OK, -1:error)
         """
+        for axis in self._axes():
+            axis.stop()
+        self._schedule_move_finished()
         self.log.info('MotorDummy: Movement stopped!')
         return 0
 
@@ -415,6 +429,24 @@ class MotorDummy(Base, MotorInterface):
         return status
 
 
+    def wait_until_reached(self, param_list=None, timeout=None):
+        """ Wait until the axes have finished their current movement.
+
+        @param list param_list: optional, labels of the axes to wait for. If
+                                nothing is passed, wait for all axes.
+        @param float timeout: optional, maximal waiting time in seconds
+
+        @return bool: True if the movement has finished, False if the timeout
+                      has passed before.
+        """
+        remaining = max([axis.remaining_time() for axis in self._axes()
+                         if param_list is None or axis.label in param_list] + [0.0])
+        if timeout is not None and remaining > timeout:
+            time.sleep(timeout)
+            return False
+        time.sleep(remaining)
+        return True
+
     def calibrate(self, param_list=None):
         """ Calibrates the stage.
 
@@ -449,6 +481,7 @@ class MotorDummy(Base, MotorInterface):
             self._z_axis.pos = 0.0
             self._phi_axis.pos = 0.0
 
+        self._schedule_move_finished()
         return 0
 
     def get_velocity(self, param_list=None):
@@ -462,22 +495,15 @@ class MotorDummy(Base, MotorInterface):
 
         @return dict : with the axis label as key and the velocity as item.
         """
+        constraints = self.get_constraints()
         vel = {}
-        if param_list is not None:
-            if self._x_axis.label in param_list:
-                vel[self._x_axis.label] = self._x_axis.vel
-            if self._y_axis.label in param_list:
-                vel[self._x_axis.label] = self._y_axis.vel
-            if self._z_axis.label in param_list:
-                vel[self._x_axis.label] = self._z_axis.vel
-            if self._phi_axis.label in param_list:
-                vel[self._phi_axis.label] = self._phi_axis.vel
-
-        else:
-            vel[self._x_axis.label] = self._x_axis.get_vel
-            vel[self._y_axis.label] = self._y_axis.get_vel
-            vel[self._z_axis.label] = self._z_axis.get_vel
-            vel[self._phi_axis.label] = self._phi_axis.vel
+        for axis in self._axes():
+            if param_list is None or axis.label in param_list:
+                # an axis without a velocity moves as fast as possible
+                if axis.vel is None:
+                    vel[axis.label] = constraints[axis.label]['vel_max']
+                else:
+                    vel[axis.label] = axis.vel
 
         return vel
 
@@ -496,7 +522,7 @@ class MotorDummy(Base, MotorInterface):
             desired_vel = param_dict[self._x_axis.label]
             constr = constraints[self._x_axis.label]
 
-            if not(constr['vel_min'] <= desired_pos <= constr['vel_max']):
+            if not(constr['vel_min'] <= desired_vel <= constr['vel_max']):
                 self.log.warning('Cannot make absolute movement of the axis '
                         '"{0}" to possition {1}, since it exceeds the limits '
                         '[{2},{3}] ! Command is ignored!'.format(
@@ -510,7 +536,7 @@ class MotorDummy(Base, MotorInterface):
             desired_vel = param_dict[self._y_axis.label]
             constr = constraints[self._y_axis.label]
 
-            if not(constr['vel_min'] <= desired_pos <= constr['vel_max']):
+            if not(constr['vel_min'] <= desired_vel <= constr['vel_max']):
                 self.log.warning('Cannot make absolute movement of the axis '
                         '"{0}" to possition {1}, since it exceeds the limits '
                         '[{2},{3}] ! Command is ignored!'.format(
@@ -524,7 +550,7 @@ class MotorDummy(Base, MotorInterface):
             desired_vel = param_dict[self._z_axis.label]
             constr = constraints[self._z_axis.label]
 
-            if not(constr['vel_min'] <= desired_pos <= constr['vel_max']):
+            if not(constr['vel_min'] <= desired_vel <= constr['vel_max']):
                 self.log.warning('Cannot make absolute movement of the axis '
                         '"{0}" to possition {1}, since it exceeds the limits '
                         '[{2},{3}] ! Command is ignored!'.format(
@@ -538,7 +564,7 @@ class MotorDummy(Base, MotorInterface):
             desired_vel = param_dict[self._phi_axis.label]
             constr = constraints[self._phi_axis.label]
 
-            if not(constr['vel_min'] <= desired_pos <= constr['vel_max']):
+            if not(constr['vel_min'] <= desired_vel <= constr['vel_max']):
                 self.log.warning('Cannot make absolute movement of the axis '
                         '"{0}" to possition {1}, since it exceeds the limits '
                         '[{2},{3}] ! Command is ignored!'.format(
@@ -551,5 +577,24 @@ class MotorDummy(Base, MotorInterface):
 
     def _make_wait_after_movement(self):
         """ Define a time which the dummy should wait after each movement. """
-        time.sleep(self._wait_after_movement)
+        # simulated movements take their time anyway
+        if self._velocity is None:
+            time.sleep(self._wait_after_movement)
+
+    def _axes(self):
+        return self._x_axis, self._y_axis, self._z_axis, self._phi_axis
+
+    def _schedule_move_finished(self):
+        """ Emit sigMoveFinished when all axes have stopped. """
+        if self._finish_timer is not None:
+            self._finish_timer.cancel()
+        remaining = max(axis.remaining_time() for axis in self._axes())
+        self._finish_timer = threading.Timer(remaining, self._move_finished)
+        self._finish_timer.daemon = True
+        self._finish_timer.start()
+
+    def _move_finished(self):
+        # a new movement may have started in the meantime, it has its own timer
+        if not any(axis.is_moving() for axis in self._axes()):
+            self.sigMoveFinished.emit(self.get_pos())
 
@@ -31,6 +31,7 @@ from interface.slow_counter_interface import SlowCounterInterface
 from interface.slow_counter_interface import SlowCounterConstraints
 from interface.slow_counter_interface import CountingMode
 from interface.fast_counter_interface import FastCounterInterface
+from hardware.picoquant.tttr import TTTRHistogram, T2_RESOLUTION_PS
 
 # =============================================================================
 # Wrapper around the PHLib.DLL. The current file is based on the header files
@@ -125,6 +126,10 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
         self._photon_source2 = None #for compatibility reasons with second APD
         self._count_channel = 1
 
+        # histogram of the fast counter, built from the TTTR records
+        self._histogram = None
+        self.data_trace = np.zeros(0, dtype=np.int64)
+
         #locking for thread safety
         self.threadlock = Mutex()
 
@@ -1051,29 +1056,43 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
 
     #FIXME: The interface connection to the fast counter must be established!
 
-    def configure(self, bin_width_ns, record_length_ns, number_of_gates = 0):
+    def configure(self, bin_width_s, record_length_s, number_of_gates = 0):
         """
         Configuration of the fast counter.
-        bin_width_ns: Length of a single time bin in the time trace histogram
-                      in nanoseconds.
-        record_length_ns: Total length of the timetrace/each single gate in
-                          nanoseconds.
+        bin_width_s: Length of a single time bin in the time trace histogram
+                     in seconds, rounded to a multiple of the resolution.
+        record_length_s: Total length of the timetrace/each single gate in
+                         seconds.
         number_of_gates: Number of gates in the pulse sequence. Ignore for
                          ungated counter.
-        """
-#        self.initialize(mode=3)
-        self._bin_width_ns = bin_width_ns
-        self._record_length_ns = record_length_ns
-        self._number_of_gates = number_of_gates
 
-        #FIXME: actualle only an unsigned array will be needed. Change that later.
-#        self.data_trace = np.zeros(number_of_gates, dtype=np.int64 )
-        self.data_trace = [0]*number_of_gates
-        self.count = 0
+        The device is initialized in T3 mode if this is the configured mode,
+        otherwise in T2 mode. In T2 mode the time trace is the histogram of the
+        photon times after the last sync (input channel 0), in T3 mode of the
+        start-stop times.
 
-        self.result = []
-        self.initialize(2)
-        return
+        @return tuple(binwidth_s, record_length_s, number_of_gates): actual values
+        """
+        tttr_mode = self.MODE_T3 if self._mode == self.MODE_T3 else self.MODE_T2
+        self.initialize(tttr_mode)
+        if tttr_mode == self.MODE_T3:
+            resolution_ps = int(round(self.get_resolution()))
+        else:
+            resolution_ps = T2_RESOLUTION_PS
+        bin_width_ps = max(1, int(round(bin_width_s * 1e12 / resolution_ps))) * resolution_ps
+        number_of_bins = max(1, int(round(record_length_s * 1e12 / bin_width_ps)))
+
+        self._bin_width_ns = bin_width_ps / 1e3
+        self._record_length_ns = number_of_bins * bin_width_ps / 1e3
+        self._number_of_gates = number_of_gates
+        with self.threadlock:
+            self._histogram = TTTRHistogram(tttr_mode,
+                                            bin_width_ps,
+                                            number_of_bins,
+                                            resolution_ps=resolution_ps,
+                                            channels=(self._count_channel, ))
+            self.data_trace = self._histogram.histogram
+        return self._bin_width_ns * 1e-9, self._record_length_ns * 1e-9, number_of_gates
 
     def get_status(self):
         """
@@ -1108,7 +1127,7 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
         Continues the current measurement if the fast counter is in pause state.
         """
         self.meas_run = True
-        self.start(self._record_length_ns/1e6)
+        self.start(self.ACQTMAX)
 
     def is_gated(self):
         """
@@ -1121,8 +1140,7 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
         """
         returns the width of a single timebin in the timetrace in seconds
         """
-        #FIXME: Must be implemented
-        return 2e-9
+        return self._bin_width_ns * 1e-9
 
     def get_data_trace(self):
         """
@@ -1135,9 +1153,8 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
           - If the counter is gated it will return a 2D-numpy-array with
             returnarray[gate_index, timebin_index]
         """
-
-
-        return self.data_trace
+        with self.threadlock:
+            return self.data_trace.copy()
 
 
 
@@ -1150,12 +1167,15 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
         """
         Starts the fast counter.
         """
-        self.lock()
+        self.module_state.lock()
 
         self.meas_run = True
+        if self._histogram is not None:
+            with self.threadlock:
+                self._histogram.clear()
 
-        # start the device:
-        self.start(int(self._record_length_ns/1e6))
+        # start the device, the measurement runs until it is stopped:
+        self.start(self.ACQTMAX)
 
         self.sigReadoutPicoharp.emit()
 
@@ -1172,15 +1192,14 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
 #        buffer, actual_counts = [1,2,3,4,5,6,7,8,9], 9
 
         # This analysis signel should be analyzed in a queued thread:
-        self.sigAnalyzeData.emit(buffer[0:actual_counts-1], actual_counts)
+        self.sigAnalyzeData.emit(buffer[:actual_counts], actual_counts)
 
         if not self.meas_run:
             with self.threadlock:
-                self.unlock()
-                self.stop_device
+                self.module_state.unlock()
+                self.stop_device()
                 return
 
-        print('get new data.')
         # get the next data:
         self.sigReadoutPicoharp.emit()
 
@@ -1264,38 +1283,16 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
         sync-counter: can hold up to 2^16 = 65536 events. It that number is
                       reached overflow will be set. That means all 4 bits in
                       the channel-number are set to high (i.e. 1).
-        """
 
-        # at first just a simple test
-        time.sleep(0.2)
-
-        self.data_trace[self.count] = actual_counts
-        self.count += 1
-
-        if self.count > self._number_of_gates-1:
-            self.count = 0
+        The records are decoded with numpy operations on the whole array (see
+        hardware/picoquant/tttr.py) and the photons of the counting channel are
+        added to the histogram of the time trace.
+        """
+        if self._histogram is None:
+            return
+        with self.threadlock:
+            self._histogram.add(arr_data[:actual_counts])
 
         if actual_counts == self.TTREADMAX:
-            self.log.warning('Overflow!')
-
-        print('Data analyzed.')
-
-#        self.result = []
-#        for entry in arr_data[0:actual_counts-1]:
-#
-#            # apply three bitmasks to extract the relavent numbers:
-#            overflow = entry & (2**(32-1) )
-#            marker_ch = entry & (2**(32-2)  + 2**(32-3) + 2**(32-4))
-#            time_tag = entry & (2**32 -1 - 2**(32-1) + 2**(32-2) + 2**(32-3) + 2**(32-4))
-
-
-
-
-
-
-
-
-
-
-
-
+            self.log.warning('FIFO readout reached the maximal number of records, '
+                             'the FIFO may overflow.')
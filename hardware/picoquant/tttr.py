@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains the decoder for the time-tagged time-resolved (TTTR) records of the
+PicoHarp 300 and a generator of synthetic records.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import numpy as np
+from collections import namedtuple
+
+# Record formats of the PicoHarp 300, bits starting from the MSB:
+#   T2: channel 4 bit | time tag 28 bit (4 ps resolution), channel 0 is the sync input
+#   T3: channel 4 bit | start-stop time (dtime) 12 bit | sync counter (nsync) 16 bit
+# Channel 15 marks a special record: if the marker bits (lower 4 bits of the time tag in T2,
+# of dtime in T3) are zero, it is an overflow of the time tag or sync counter, otherwise the bits
+# are external markers.
+SPECIAL_CHANNEL = 15
+T2_WRAPAROUND = 210698240
+T2_RESOLUTION_PS = 4
+T3_WRAPAROUND = 65536
+OVERFLOW_RECORD = np.uint32(SPECIAL_CHANNEL << 28)
+
+T2Events = namedtuple('T2Events', ['channel', 'time', 'marker', 'marker_time', 'overflows'])
+T2Events.__doc__ = """ Decoded T2 records.
+
+channel: numpy.uint8 array, channel of every photon (0 is the sync input)
+time: numpy.int64 array, arrival time of every photon in units of 4 ps
+marker: numpy.uint8 array, marker bits of every marker record
+marker_time: numpy.int64 array, time of every marker record in units of 4 ps
+overflows: int, number of overflow records
+"""
+
+T3Events = namedtuple('T3Events', ['channel', 'nsync', 'dtime', 'marker', 'marker_nsync',
+                                   'overflows'])
+T3Events.__doc__ = """ Decoded T3 records.
+
+channel: numpy.uint8 array, channel of every photon
+nsync: numpy.int64 array, number of the sync period of every photon
+dtime: numpy.uint16 array, time since the sync of every photon in units of the resolution
+marker: numpy.uint8 array, marker bits of every marker record
+marker_nsync: numpy.int64 array, sync period of every marker record
+overflows: int, number of overflow records
+"""
+
+
+def decode_t2(records, overflow_time=0):
+    """ Decode T2 records without a loop over the records.
+
+    @param numpy.ndarray records: uint32 records as read from the FIFO
+    @param int overflow_time: time of the last overflow of the previous records in units of
+                              4 ps, 0 for the first records of a measurement
+
+    @return T2Events: decoded photons and markers, times include the overflows
+    """
+    records = np.asarray(records, dtype=np.uint32)
+    channel = (records >> 28).astype(np.uint8)
+    timetag = (records & 0x0FFFFFFF).astype(np.int64)
+    special = channel == SPECIAL_CHANNEL
+    marker_bits = (timetag & 0xF).astype(np.uint8)
+    overflow = special & (marker_bits == 0)
+    # every record is shifted by all overflows before it
+    time = timetag + overflow_time + T2_WRAPAROUND * np.cumsum(overflow, dtype=np.int64)
+    is_marker = special & ~overflow
+    return T2Events(channel=channel[~special],
+                    time=time[~special],
+                    marker=marker_bits[is_marker],
+                    marker_time=time[is_marker],
+                    overflows=int(np.count_nonzero(overflow)))
+
+
+def decode_t3(records, overflow_sync=0):
+    """ Decode T3 records without a loop over the records.
+
+    @param numpy.ndarray records: uint32 records as read from the FIFO
+    @param int overflow_sync: sync count of the last overflow of the previous records, 0 for
+                              the first records of a measurement
+
+    @return T3Events: decoded photons and markers, sync counts include the overflows
+    """
+    records = np.asarray(records, dtype=np.uint32)
+    channel = (records >> 28).astype(np.uint8)
+    dtime = ((records >> 16) & 0x0FFF).astype(np.uint16)
+    nsync = (records & 0xFFFF).astype(np.int64)
+    special = channel == SPECIAL_CHANNEL
+    marker_bits = (dtime & 0xF).astype(np.uint8)
+    overflow = special & (marker_bits == 0)
+    nsync += overflow_sync + T3_WRAPAROUND * np.cumsum(overflow, dtype=np.int64)
+    is_marker = special & ~overflow
+    return T3Events(channel=channel[~special],
+                    nsync=nsync[~special],
+                    dtime=dtime[~special],
+                    marker=marker_bits[is_marker],
+                    marker_nsync=nsync[is_marker],
+                    overflows=int(np.count_nonzero(overflow)))
+
+
+def split_channels(channel, values):
+    """ Split decoded values by channel.
+
+    @param numpy.ndarray channel: channel of every value
+    @param numpy.ndarray values: e.g. the times of the photons
+
+    @return dict: {channel: values of this channel}
+    """
+    return {int(c): values[channel == c] for c in np.unique(channel)}
+
+
+class TTTRHistogram:
+    """ Histogram of the photon arrival times after the sync, built incrementally from blocks of
+    TTTR records.
+
+    In T2 mode the arrival time is the time since the last photon on the sync channel (0), the
+    last sync of a block is kept for the photons at the start of the next block. In T3 mode it is
+    the start-stop time of the record. Overflows are carried from block to block, so the blocks
+    have to be added in the order they were read.
+    """
+
+    def __init__(self, mode, bin_width_ps, number_of_bins, resolution_ps=T2_RESOLUTION_PS,
+                 channels=(1, )):
+        """
+        @param int mode: 2 for T2, 3 for T3 records
+        @param int bin_width_ps: width of a histogram bin in ps, a multiple of the resolution
+        @param int number_of_bins: number of histogram bins, later photons are ignored
+        @param int resolution_ps: resolution of the time tags (T2) or dtimes (T3) in ps
+        @param tuple channels: detector channels counted in the histogram
+        """
+        if mode not in (2, 3):
+            raise ValueError('TTTR mode has to be 2 or 3, not {0}.'.format(mode))
+        self.mode = mode
+        self.resolution_ps = int(resolution_ps)
+        self.bin_width_ps = int(bin_width_ps)
+        self.units_per_bin = max(1, self.bin_width_ps // self.resolution_ps)
+        self.channels = np.asarray(channels, dtype=np.uint8)
+        # lookup table of the counted channels, indexed by the 4 bit channel of a record
+        self._channel_mask = np.zeros(16, dtype=bool)
+        self._channel_mask[self.channels] = True
+        self.histogram = np.zeros(int(number_of_bins), dtype=np.int64)
+        self.clear()
+
+    def clear(self):
+        """ Reset the histogram and the state of the decoder for a new measurement. """
+        self.histogram[:] = 0
+        self.overflow = 0
+        self.last_sync = None
+        self.records = 0
+        self.photons = 0
+        self.markers = 0
+
+    def add(self, records):
+        """ Decode a block of records and add its photons to the histogram.
+
+        @param numpy.ndarray records: uint32 records in the order they were read
+
+        @return int: number of photons added to the histogram
+        """
+        self.records += len(records)
+        if self.mode == 2:
+            events = decode_t2(records, self.overflow)
+            self.overflow += T2_WRAPAROUND * events.overflows
+            delays = self._t2_delays(events)
+        else:
+            events = decode_t3(records, self.overflow)
+            self.overflow += T3_WRAPAROUND * events.overflows
+            delays = events.dtime[self._channel_mask[events.channel]].astype(np.int64)
+        self.markers += len(events.marker)
+        bins = delays // self.units_per_bin
+        bins = bins[bins < len(self.histogram)]
+        self.histogram += np.bincount(bins, minlength=len(self.histogram))
+        self.photons += len(bins)
+        return len(bins)
+
+    def _t2_delays(self, events):
+        """ Times of the detector photons since the last sync in units of the resolution. """
+        is_sync = events.channel == 0
+        # index of the last sync at or before every photon, -1 if there was none in this block
+        last_sync = np.maximum.accumulate(np.where(is_sync, np.arange(len(is_sync)), -1))
+        sync_time = events.time[np.maximum(last_sync, 0)]
+        detected = self._channel_mask[events.channel]
+        if self.last_sync is None:
+            detected &= last_sync >= 0
+        else:
+            sync_time = np.where(last_sync >= 0, sync_time, self.last_sync)
+        if np.any(is_sync):
+            self.last_sync = int(events.time[is_sync][-1])
+        return (events.time - sync_time)[detected]
+
+
+def generate_records(mode, profile, bin_width_ps, sync_period_ps, syncs, photons_per_sync,
+                     resolution_ps=T2_RESOLUTION_PS, channel=1, marker_period=0, seed=None):
+    """ Generate synthetic records of a pulsed measurement, e.g. to test or benchmark the
+    decoder without a device.
+
+    The arrival times after each sync follow a profile given as histogram, each photon is placed
+    uniformly within its bin on the time grid of the resolution. Records are time ordered and
+    contain the overflows of the time tag (T2) or sync counter (T3) like the device.
+
+    @param int mode: 2 for T2, 3 for T3 records
+    @param numpy.ndarray profile: relative photon probability per bin after a sync
+    @param int bin_width_ps: width of a profile bin in ps, a multiple of the resolution
+    @param int sync_period_ps: time between two syncs in ps
+    @param int syncs: number of sync periods
+    @param float photons_per_sync: mean number of photons per sync (Poisson distributed)
+    @param int resolution_ps: resolution of the start-stop time in T3 mode, T2 time tags always
+                              have a resolution of 4 ps
+    @param int channel: detector channel of the photons
+    @param int marker_period: a marker record (marker 1) is written every marker_period syncs,
+                              0 for no markers
+    @param int seed: seed of the random generator
+
+    @return tuple(numpy.ndarray, numpy.ndarray): uint32 records and the exact histogram of the
+                                                 generated photons in the bins of the profile
+    """
+    rng = np.random.RandomState(seed)
+    profile = np.asarray(profile, dtype=float)
+    counts = rng.poisson(photons_per_sync, syncs)
+    photon_sync = np.repeat(np.arange(syncs, dtype=np.int64), counts)
+    photon_bin = rng.choice(len(profile), size=len(photon_sync), p=profile / profile.sum())
+    expected = np.bincount(photon_bin, minlength=len(profile)).astype(np.int64)
+
+    if mode == 2:
+        resolution_ps = T2_RESOLUTION_PS
+    units_per_bin = bin_width_ps // resolution_ps
+
+    if mode == 2:
+        delay = photon_bin * units_per_bin + rng.randint(0, units_per_bin, len(photon_bin))
+        period = sync_period_ps // T2_RESOLUTION_PS
+        sync_times = np.arange(syncs, dtype=np.int64) * period
+        times = np.concatenate([sync_times, sync_times[photon_sync] + delay])
+        channels = np.concatenate([np.zeros(syncs, dtype=np.uint32),
+                                   np.full(len(delay), channel, dtype=np.uint32)])
+        if marker_period > 0:
+            marker_times = sync_times[::marker_period] & ~np.int64(0xF)
+            times = np.concatenate([times, marker_times])
+            channels = np.concatenate([channels, np.full(
+                len(marker_times), SPECIAL_CHANNEL, dtype=np.uint32)])
+        order = np.argsort(times, kind='mergesort')
+        times = times[order]
+        channels = channels[order]
+        records = (channels << 28) | (times % T2_WRAPAROUND).astype(np.uint32)
+        records[channels == SPECIAL_CHANNEL] |= np.uint32(1)
+        wraps = times // T2_WRAPAROUND
+    else:
+        if len(profile) * units_per_bin > 4096:
+            raise ValueError('The profile does not fit into the 12 bit start-stop time.')
+        dtime = photon_bin * units_per_bin + rng.randint(0, units_per_bin, len(photon_bin))
+        nsync = photon_sync
+        channels = np.full(len(dtime), channel, dtype=np.uint32)
+        if marker_period > 0:
+            marker_sync = np.arange(0, syncs, marker_period, dtype=np.int64)
+            nsync = np.concatenate([nsync, marker_sync])
+            dtime = np.concatenate([dtime, np.ones(len(marker_sync), dtype=np.int64)])
+            channels = np.concatenate([channels, np.full(
+                len(marker_sync), SPECIAL_CHANNEL, dtype=np.uint32)])
+            order = np.argsort(nsync, kind='mergesort')
+            nsync = nsync[order]
+            dtime = dtime[order]
+            channels = channels[order]
+        records = ((channels << 28)
+                   | (dtime.astype(np.uint32) << 16)
+                   | (nsync % T3_WRAPAROUND).astype(np.uint32))
+        wraps = nsync // T3_WRAPAROUND
+
+    # an overflow record before the first record after every wrap around
+    overflow_positions = np.searchsorted(wraps, np.arange(1, wraps[-1] + 1 if len(wraps) else 1))
+    records = np.insert(records, overflow_positions, OVERFLOW_RECORD)
+    return records.astype(np.uint32), expected
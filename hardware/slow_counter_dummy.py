@@ -21,7 +21,6 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 
 import numpy as np
 
-import random
 import time
 
 from core.module import Base, ConfigOption
@@ -32,8 +31,30 @@ from interface.slow_counter_interface import CountingMode
 
 class SlowCounterDummy(Base, SlowCounterInterface):
 
-    """This is the Interface class to define the controls for the simple
-    microwave hardware.
+    """ Dummy slow counter.
+
+    The counts of every call of get_counter are generated as one block per channel with
+    vectorized random numbers. The dark/bright distributions simulate a blinking emitter
+    (exponential dwell times in the bright and dark state), with correlated_channels all
+    channels see the same emitter, otherwise every channel blinks on its own. With
+    bleaching_time the signal decays exponentially with the counting time.
+
+    By default get_counter sleeps for the duration of the requested samples. In free running
+    mode the counter runs on a monotonic clock from set_up_counter on and get_counter only
+    waits until the requested samples would have been acquired, so the time spent between the
+    calls does not slow down the count rate.
+
+    Example config:
+
+    slowcounter_dummy:
+        module.Class: 'slow_counter_dummy.SlowCounterDummy'
+        clock_frequency: 100
+        samples_number: 10
+        source_channels: 2
+        count_distribution: 'dark_bright_poisson'
+        correlated_channels: True
+        bleaching_time: 0       # in s, 0 for no bleaching
+        free_running: False
     """
     _modclass = 'SlowCounterDummy'
     _modtype = 'hardware'
@@ -43,6 +64,9 @@ class SlowCounterDummy(Base, SlowCounterInterface):
     _samples_number = ConfigOption('samples_number', 10, missing='warn')
     source_channels = ConfigOption('source_channels', 2, missing='warn')
     dist = ConfigOption('count_distribution', 'dark_bright_gaussian')
+    _correlated_channels = ConfigOption('correlated_channels', False)
+    _bleaching_time = ConfigOption('bleaching_time', 0)
+    _free_running = ConfigOption('free_running', False)
 
     # 'No parameter "count_distribution" given in the configuration for the'
     # 'Slow Counter Dummy. Possible distributions are "dark_bright_gaussian",'
@@ -69,10 +93,12 @@ class SlowCounterDummy(Base, SlowCounterInterface):
         self.life_time_bright = 0.08  # 80 millisecond
         self.life_time_dark = 0.04  # 40 milliseconds
 
-        # needed for the life time simulation
-        self.current_dec_time = self.life_time_bright
-        self.curr_state_b = True
-        self.total_time = 0.0
+        # needed for the life time simulation: state and remaining dwell time per channel
+        channels = 1 if self._correlated_channels else self.source_channels
+        self.curr_state_b = np.ones(channels, dtype=bool)
+        self.remaining_time = np.full(channels, self.life_time_bright)
+        self.counting_time = 0.0
+        self._deadline = None
 
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
@@ -122,6 +148,7 @@ class SlowCounterDummy(Base, SlowCounterInterface):
 
         self.log.warning('slowcounterdummy>set_up_counter')
         time.sleep(0.1)
+        self._deadline = time.monotonic()
         return 0
 
     def get_counter(self, samples=None):
@@ -129,14 +156,24 @@ class SlowCounterDummy(Base, SlowCounterInterface):
 
         @param int samples: if defined, number of samples to read in one go
 
-        @return float: the photon counts per second
+        @return numpy.ndarray: the photon counts per second, shape (channels, samples)
         """
-        count_data = np.array(
-            [self._simulate_counts(samples) + i * self.mean_signal
-                for i, ch in enumerate(self.get_counter_channels())]
-            )
-
-        time.sleep(1 / self._clock_frequency * samples)
+        if samples is None:
+            samples = int(self._samples_number)
+        else:
+            samples = int(samples)
+        count_data = self._simulate_counts(samples)
+        count_data += (np.arange(self.source_channels, dtype=np.int64)
+                       * int(self.mean_signal))[:, np.newaxis]
+
+        duration = samples / self._clock_frequency
+        if self._free_running and self._deadline is not None:
+            self._deadline += duration
+            delay = self._deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        else:
+            time.sleep(duration)
         return count_data
 
     def get_counter_channels(self):
@@ -147,70 +184,79 @@ class SlowCounterDummy(Base, SlowCounterInterface):
         return ['Ctr{0}'.format(i) for i in range(self.source_channels)]
 
     def _simulate_counts(self, samples=None):
-        """ Simulate counts signal from an APD.  This can be called for each dummy counter channel.
+        """ Simulate the count signal of APDs for all channels.
 
         @param int samples: if defined, number of samples to read in one go
 
-        @return float: the photon counts per second
+        @return numpy.ndarray: the photon counts per second, shape (channels, samples)
         """
-
         if samples is None:
             samples = int(self._samples_number)
         else:
             samples = int(samples)
+        shape = (self.source_channels, samples)
+        timestep = 1 / self._clock_frequency
+
+        mean = np.full(shape, float(self.mean_signal))
+        if self.dist in ('dark_bright_gaussian', 'dark_bright_poisson'):
+            bright = self._blinking_states(samples, timestep)
+            mean = np.where(bright, mean, self.mean_signal2)
+        if self._bleaching_time > 0:
+            times = self.counting_time + timestep * np.arange(1, samples + 1)
+            mean *= np.exp(-times / self._bleaching_time)
+        self.counting_time += timestep * samples
+
+        if self.dist == 'single_gaussian':
+            count_data = np.random.normal(mean, self.noise_amplitude / 2)
+        elif self.dist == 'dark_bright_gaussian':
+            count_data = np.random.normal(mean, self.noise_amplitude)
+        elif self.dist == 'exponential':
+            count_data = np.random.exponential(mean)
+        elif self.dist in ('single_poisson', 'dark_bright_poisson'):
+            count_data = np.random.poisson(mean)
+        else:
+            # make uniform as default
+            count_data = mean + np.random.uniform(
+                -self.noise_amplitude / 2, self.noise_amplitude / 2, shape)
+        return np.clip(count_data, 0, None).astype(np.int64)
 
-        timestep = 1 / self._clock_frequency * samples
-
-        # count data will be written here in the NumPy array
-        count_data = np.empty([samples], dtype=np.uint32)
-
-        for i in range(samples):
-            if self.dist == 'single_gaussian':
-                count_data[i] = np.random.normal(self.mean_signal, self.noise_amplitude / 2)
-            elif self.dist == 'dark_bright_gaussian':
-                self.total_time = self.total_time + timestep
-                if self.total_time > self.current_dec_time:
-                    if self.curr_state_b:
-                        self.curr_state_b = False
-                        self.current_dec_time = np.random.exponential(self.life_time_dark)
-                        count_data[i] = np.random.poisson(self.mean_signal)
-                    else:
-                        self.curr_state_b = True
-                        self.current_dec_time = np.random.exponential(self.life_time_bright)
-                    self.total_time = 0.0
-
-                count_data[i] = (np.random.normal(self.mean_signal, self.noise_amplitude) * self.curr_state_b
-                                + np.random.normal(self.mean_signal2, self.noise_amplitude) * (1-self.curr_state_b))
-
-            elif self.dist == 'uniform':
-                count_data[i] = self.mean_signal + random.uniform(-self.noise_amplitude / 2, self.noise_amplitude / 2)
-
-            elif self.dist == 'exponential':
-                count_data[i] = np.random.exponential(self.mean_signal)
-
-            elif self.dist == 'single_poisson':
-                count_data[i] = np.random.poisson(self.mean_signal)
-
-            elif self.dist == 'dark_bright_poisson':
-                self.total_time = self.total_time + timestep
-
-                if self.total_time > self.current_dec_time:
-                    if self.curr_state_b:
-                        self.curr_state_b = False
-                        self.current_dec_time = np.random.exponential(self.life_time_dark)
-                        count_data[i] = np.random.poisson(self.mean_signal)
-                    else:
-                        self.curr_state_b = True
-                        self.current_dec_time = np.random.exponential(self.life_time_bright)
-                    self.total_time = 0.0
-
-                count_data[i] = (np.random.poisson(self.mean_signal) * self.curr_state_b
-                                + np.random.poisson(self.mean_signal2) * (1-self.curr_state_b))
-            else:
-                # make uniform as default
-                count_data[0][i] = self.mean_signal + random.uniform(-self.noise_amplitude/2, self.noise_amplitude/2)
+    def _blinking_states(self, samples, timestep):
+        """ Bright or dark state of the emitter at every sample. The dwell times in the states
+        are exponentially distributed, the state and the remaining dwell time are kept for the
+        next block.
 
-        return count_data
+        @param int samples: number of samples
+        @param float timestep: time between two samples in seconds
+
+        @return numpy.ndarray: bool array of shape (channels, samples), True for bright
+        """
+        duration = samples * timestep
+        sample_times = timestep * np.arange(1, samples + 1)
+        states = np.empty((len(self.curr_state_b), samples), dtype=bool)
+        for channel, bright in enumerate(self.curr_state_b):
+            # dwell times of the following states, alternating starting with the other state
+            first_life_time, second_life_time = ((self.life_time_dark, self.life_time_bright)
+                                                 if bright else
+                                                 (self.life_time_bright, self.life_time_dark))
+            dwell_times = [np.array([self.remaining_time[channel]])]
+            total = self.remaining_time[channel]
+            while total <= duration:
+                count = int(duration / min(first_life_time, second_life_time)) + 10
+                block = np.empty(2 * count)
+                block[0::2] = np.random.exponential(first_life_time, count)
+                block[1::2] = np.random.exponential(second_life_time, count)
+                dwell_times.append(block)
+                total += block.sum()
+            switch_times = np.cumsum(np.concatenate(dwell_times))
+            switches = np.searchsorted(switch_times, sample_times, side='left')
+            states[channel] = (switches % 2 == 0) == bright
+            # state and remaining dwell time after the block
+            last = np.searchsorted(switch_times, duration, side='left')
+            self.curr_state_b[channel] = (last % 2 == 0) == bright
+            self.remaining_time[channel] = switch_times[last] - duration
+        if len(self.curr_state_b) < self.source_channels:
+            states = np.repeat(states, self.source_channels, axis=0)
+        return states
 
     def close_counter(self):
         """ Closes the counter and cleans up afterwards.
@@ -41,6 +41,7 @@ class SpectrometerInterfaceDummy(Base,SpectrometerInterface):
         """
         self._fitLogic = self.fitlogic()
         self.exposure = 0.1
+        self._model_spectrum = None
 
     def on_deactivate(self):
         """ Deactivate module.
@@ -58,6 +59,21 @@ class SpectrometerInterfaceDummy(Base,SpectrometerInterface):
         data[0] = np.arange(730, 750, 20/length)
         data[1] = np.random.uniform(0, 2000, length)
 
+        # the noiseless spectrum is only calculated once
+        if self._model_spectrum is None:
+            self._model_spectrum = self._calculate_model_spectrum(data[0])
+        data[1] += self._model_spectrum
+
+        time.sleep(self.exposure)
+        return data
+
+    def _calculate_model_spectrum(self, wavelengths):
+        """ Calculate the noiseless silicon vacancy spectrum.
+
+            @param ndarray wavelengths: wavelengths of the spectrum
+
+            @return ndarray: intensities at the given wavelengths
+        """
         lorentz, params = self._fitLogic.make_multiplelorentzian_model(no_of_functions=4)
         sigma = 0.05
         params.add('l0_amplitude', value=2000)
@@ -74,10 +90,7 @@ class SpectrometerInterfaceDummy(Base,SpectrometerInterface):
         params.add('l3_sigma', value=1.5*sigma)
         params.add('offset', value=50000.)
 
-        data[1] += lorentz.eval(x=data[0], params=params)
-
-        time.sleep(self.exposure)
-        return data
+        return lorentz.eval(x=wavelengths, params=params)
 
     def saveSpectrum(self, path, postfix = ''):
         """ Dummy save function.
@@ -163,3 +163,17 @@ class FastCounterInterface(metaclass=InterfaceMetaclass):
             returnarray[gate_index, timebin_index]
         """
         pass
+
+    def get_data_trace_shared(self):
+        """ Publishes the current timetrace (see get_data_trace) into a shared memory ring
+        buffer (core.util.sharedbuffer.SharedArrayPublisher) and returns where to find it.
+
+        @return tuple(str, int) or numpy.ndarray: name of the buffer and sequence number of
+                                                  the trace, or the trace itself if the
+                                                  hardware does not use shared memory
+
+        Optional: by default this falls back to get_data_trace and returns the trace itself,
+        the caller then has to transfer it over the remote connection as usual. Hardware that
+        is often run in a worker process should implement it to avoid copying large traces.
+        """
+        return self.get_data_trace()
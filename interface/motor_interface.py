@@ -164,6 +164,25 @@ class MotorInterface(metaclass=InterfaceMetaclass):
         """
         pass
 
+    def wait_until_reached(self, param_list=None, timeout=None):
+        """ Wait until the axes have finished their current movement.
+
+        @param list param_list: optional, labels of the axes to wait for. If
+                                nothing is passed, wait for all axes.
+        @param float timeout: optional, maximal waiting time in seconds
+
+        @return bool: True if the movement has finished, False if the timeout
+                      has passed before. None if the hardware cannot report
+                      the end of a movement, then the caller has to check the
+                      position itself.
+
+        Optional: implement this method for controllers that report whether
+        they are moving. Such hardware should also emit a signal
+            sigMoveFinished = QtCore.Signal(dict)
+        with the positions of all axes whenever a movement has finished.
+        """
+        return None
+
     @abc.abstractmethod
     def calibrate(self, param_list=None):
         """ Calibrates the stage.
@@ -20,6 +20,8 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
+from qtpy import QtCore
+
 from core.module import Connector
 from logic.generic_logic import GenericLogic
 from interface.magnet_interface import MagnetInterface
@@ -35,6 +37,7 @@ class MagnetMotorInterfuse(GenericLogic, MagnetInterface):
     # connect to the in connector of the logic.
     motorstage = Connector(interface='MotorInterface')
 
+    sigMoveFinished = QtCore.Signal(dict)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -49,11 +52,15 @@ class MagnetMotorInterfuse(GenericLogic, MagnetInterface):
         """
 
         self._motor_device = self.motorstage()
+        # pass on the end of movements if the motor reports them
+        if hasattr(self._motor_device, 'sigMoveFinished'):
+            self._motor_device.sigMoveFinished.connect(self.sigMoveFinished)
 
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
-        pass
+        if hasattr(self._motor_device, 'sigMoveFinished'):
+            self._motor_device.sigMoveFinished.disconnect(self.sigMoveFinished)
 
     def get_constraints(self):
         """ Retrieve the hardware constrains from the magnet driving device.
@@ -144,6 +151,17 @@ class MagnetMotorInterfuse(GenericLogic, MagnetInterface):
         """
         return self._motor_device.get_status(param_list)
 
+    def wait_until_reached(self, param_list=None, timeout=None):
+        """ Wait until the axes have finished their current movement.
+
+        @param list param_list: optional, labels of the axes to wait for. If
+                                nothing is passed, wait for all axes.
+        @param float timeout: optional, maximal waiting time in seconds
+
+        @return bool: True if finished, False on timeout. None if the motor
+                      cannot report the end of a movement.
+        """
+        return self._motor_device.wait_until_reached(param_list, timeout)
 
     def calibrate(self, param_list=None):
         """ Calibrates the stage.
@@ -202,6 +202,30 @@ class MagnetMotorXYZROTInterfuse(GenericLogic, MagnetInterface):
         status_xyz.update(status_rot)
         return status_xyz
 
+    def wait_until_reached(self, param_list=None, timeout=None):
+        """ Wait until the axes have finished their current movement.
+
+        @param list param_list: optional, labels of the axes to wait for. If
+                                nothing is passed, wait for all axes.
+        @param float timeout: optional, maximal waiting time in seconds
+
+        @return bool: True if finished, False on timeout. None if one of the
+                      motors cannot report the end of a movement.
+        """
+        if param_list is None:
+            list_xyz, list_rot = None, None
+        else:
+            list_xyz, list_rot = self._split_list(param_list)
+        reached = list()
+        # the rotation moves at the same time, so its wait is mostly over
+        # when the xyz stage has arrived
+        if list_xyz is None or list_xyz != []:
+            reached.append(self._motor_device_xyz.wait_until_reached(list_xyz, timeout))
+        if list_rot is None or list_rot != []:
+            reached.append(self._motor_device_rot.wait_until_reached(list_rot, timeout))
+        if None in reached:
+            return None
+        return all(reached)
 
     def calibrate(self, param_list=None):
         """ Calibrates the stage.
@@ -27,6 +27,8 @@ import time
 from collections import OrderedDict
 from core.module import Connector, ConfigOption, StatusVar
 from logic.generic_logic import GenericLogic
+from logic import magnet_pathways
+from logic import magnet_refinement
 from qtpy import QtCore
 from interface.slow_counter_interface import CountingMode
 
@@ -86,8 +88,18 @@ class MagnetLogic(GenericLogic):
     align_2d_axis1_step = StatusVar('align_2d_axis1_step', 1e-3)
     align_2d_axis1_vel = StatusVar('align_2d_axis1_vel', 10e-6)
     curr_2d_pathway_mode = StatusVar('curr_2d_pathway_mode', 'snake-wise')
-
+    # adaptive 2D alignment: start on a coarse grid (every stride-th point)
+    # and refine only where the figure of merit is interesting
+    align_2d_adaptive = StatusVar('align_2d_adaptive', False)
+    align_2d_adaptive_stride = StatusVar('align_2d_adaptive_stride', 4)
+    align_2d_adaptive_peak_fraction = StatusVar('align_2d_adaptive_peak_fraction', 0.2)
+    align_2d_adaptive_gradient_fraction = StatusVar('align_2d_adaptive_gradient_fraction', 0.2)
+
+    # maximal time between two position checks while the magnet moves
     _checktime = StatusVar('_checktime', 2.5)
+    # minimal time between two position checks close to the expected arrival,
+    # only used for hardware which cannot report the end of a movement
+    _min_poll_interval = ConfigOption('min_position_poll_interval', 0.05)
     _1D_axis0_data = StatusVar('_1D_axis0_data', np.zeros(2))
     _2D_axis0_data = StatusVar('_2D_axis0_data', np.zeros(2))
     _2D_axis1_data = StatusVar('_2D_axis1_data', np.zeros(2))
@@ -224,7 +236,7 @@ class MagnetLogic(GenericLogic):
         self._sigStepwiseAlignmentNext.connect(self._stepwise_loop_body,
                                                QtCore.Qt.QueuedConnection)
 
-        self.pathway_modes = ['spiral-in', 'spiral-out', 'snake-wise', 'diagonal-snake-wise']
+        self.pathway_modes = list(magnet_pathways.PATHWAY_MODES)
 
         # relative movement settings
 
@@ -470,173 +482,272 @@ class MagnetLogic(GenericLogic):
         of speed during the move.
         """
 
-        # calculate number of steps (those are NOT the number of points!)
-        axis0_num_of_steps = int(axis0_range/axis0_step)
-        axis1_num_of_steps = int(axis1_range/axis1_step)
-
-        # make an array of movement steps
-        axis0_steparray = [axis0_step] * axis0_num_of_steps
-        axis1_steparray = [axis1_step] * axis1_num_of_steps
-
-        pathway = []
-
-        #FIXME: create these path modes:
-        if self.curr_2d_pathway_mode == 'spiral-in':
-            self.log.error('The pathway creation method "{0}" through the '
-                    'matrix is not implemented yet!\nReturn an empty '
-                    'patharray.'.format(self.curr_2d_pathway_mode))
-            return [], []
-
-        elif self.curr_2d_pathway_mode == 'spiral-out':
+        if self.curr_2d_pathway_mode not in self.pathway_modes:
             self.log.error('The pathway creation method "{0}" through the '
                     'matrix is not implemented yet!\nReturn an empty '
                     'patharray.'.format(self.curr_2d_pathway_mode))
             return [], []
 
-        elif self.curr_2d_pathway_mode == 'diagonal-snake-wise':
-            self.log.error('The pathway creation method "{0}" through the '
-                    'matrix is not implemented yet!\nReturn an empty '
-                    'patharray.'.format(self.current_2d_pathway_mode))
-            return [], []
-
-        elif self.curr_2d_pathway_mode == 'selected-points':
-            self.log.error('The pathway creation method "{0}" through the '
-                    'matrix is not implemented yet!\nReturn an empty '
-                    'patharray.'.format(self.current_2d_pathway_mode))
-            return [], []
+        axis0_positions, axis1_positions = self._create_2d_grid(
+            axis0_name, axis0_range, axis0_step,
+            axis1_name, axis1_range, axis1_step, init_pos)
+
+        velocities, accelerations = self._get_motion_limits([axis0_name, axis1_name])
+        order = magnet_pathways.grid_order(
+            self.curr_2d_pathway_mode,
+            axis0_positions,
+            axis1_positions,
+            velocities,
+            accelerations,
+            start=np.array([init_pos[axis0_name], init_pos[axis1_name]]))
+
+        return self._create_2d_pathway_entries(axis0_name, axis0_positions,
+                                               axis1_name, axis1_positions,
+                                               order, axis0_vel, axis1_vel)
+
+    def _create_2d_grid(self, axis0_name, axis0_range, axis0_step,
+                        axis1_name, axis1_range, axis1_step, init_pos):
+        """ Positions of the 2D alignment grid around the initial position.
+
+        @return tuple(numpy.ndarray, numpy.ndarray): positions along axis0 and
+                                                     along axis1
+        """
+        # calculate number of steps (those are NOT the number of points!)
+        axis0_num_of_steps = int(axis0_range/axis0_step)
+        axis1_num_of_steps = int(axis1_range/axis1_step)
 
-        # choose the snake-wise as default for now.
-        else:
+        # the grid starts at the lower corner of the range around the initial
+        # position:
+        axis0_start = init_pos[axis0_name] - axis0_range/2
+        axis1_start = init_pos[axis1_name] - axis1_range/2
+        axis0_positions = np.round(
+            axis0_start + axis0_step * np.arange(axis0_num_of_steps + 1), 7)
+        axis1_positions = np.round(
+            axis1_start + axis1_step * np.arange(axis1_num_of_steps + 1), 7)
+        return axis0_positions, axis1_positions
+
+    def _create_2d_pathway_entries(self, axis0_name, axis0_positions,
+                                   axis1_name, axis1_positions, order,
+                                   axis0_vel=None, axis1_vel=None,
+                                   first_index=0):
+        """ Pathway entries and back map for grid points in a given order.
+
+        @param numpy.ndarray order: grid indices (axis0, axis1) of the points
+                                    in the order of the pathway
+        @param int first_index: pathway index of the first point
+
+        @return tuple(list, dict): the pathway and the back map, see
+                                   _create_2d_pathway
+        """
+        pathway = []
 
-            # create a snake-wise stepping procedure through the matrix:
-            self.log.debug(axis0_name)
-            self.log.debug(axis0_range)
-            self.log.debug(init_pos[axis0_name])
-            axis0_pos = round(init_pos[axis0_name] - axis0_range/2, 7)
-            axis1_pos = round(init_pos[axis1_name] - axis1_range/2, 7)
+        # that is a map to transform a pathway index value back to an
+        # absolute position and index. That will be important for saving the
+        # data corresponding to a certain path_index value.
+        back_map = dict()
 
-            # append again so that the for loop later will run once again
-            # through the axis0 array but the last value of axis1_steparray will
-            # not be performed.
-            axis1_steparray.append(axis1_num_of_steps)
+        for path_index, (axis0_index, axis1_index) in enumerate(order, first_index):
+            axis0_index = int(axis0_index)
+            axis1_index = int(axis1_index)
+            axis0_pos = float(axis0_positions[axis0_index])
+            axis1_pos = float(axis1_positions[axis1_index])
 
             # step_config is the dict containing the commands for one pathway
-            # entry. Move at first to start position:
+            # entry, all movements are absolute:
             step_config = dict()
-
-            if axis0_vel is None:
-                step_config[axis0_name] = {'move_abs': axis0_pos}
-            else:
-                step_config[axis0_name] = {'move_abs': axis0_pos, 'move_vel': axis0_vel}
-
-            if axis1_vel is None:
-                step_config[axis1_name] = {'move_abs': axis1_pos}
-            else:
-                step_config[axis1_name] = {'move_abs': axis1_pos, 'move_vel': axis1_vel}
-
+            step_config[axis0_name] = {'move_abs': axis0_pos}
+            step_config[axis1_name] = {'move_abs': axis1_pos}
+            if axis0_vel is not None:
+                step_config[axis0_name]['move_vel'] = axis0_vel
+            if axis1_vel is not None:
+                step_config[axis1_name]['move_vel'] = axis1_vel
             pathway.append(step_config)
 
-            path_index = 0
-
-            # these indices should be used to facilitate the mapping to a 2D
-            # array, since the
-            axis0_index = 0
-            axis1_index = 0
-
-            # that is a map to transform a pathway index value back to an
-            # absolute position and index. That will be important for saving the
-            # data corresponding to a certain path_index value.
-            back_map = dict()
             back_map[path_index] = {axis0_name: axis0_pos,
                                     axis1_name: axis1_pos,
                                     'index': (axis0_index, axis1_index)}
 
-            path_index += 1
-            # axis0_index += 1
-
-            go_pos_dir = True
-            for step_in_axis1 in axis1_steparray:
-
-                if go_pos_dir:
-                    go_pos_dir = False
-                    direction = +1
-                else:
-                    go_pos_dir = True
-                    direction = -1
-
-                for step_in_axis0 in axis0_steparray:
-
-                    axis0_index += direction
-                    # make move along axis0:
-                    step_config = dict()
-
-                    # relative movement:
-                    # step_config[axis0_name] = {'move_rel': direction*step_in_axis0}
-
-                    # absolute movement:
-                    axis0_pos =round(axis0_pos + direction*step_in_axis0, 7)
-
-                    # if axis0_vel is None:
-                    #     step_config[axis0_name] = {'move_abs': axis0_pos}
-                    #     step_config[axis1_name] = {'move_abs': axis1_pos}
-                    # else:
-                    #     step_config[axis0_name] = {'move_abs': axis0_pos,
-                    #                                'move_vel': axis0_vel}
-                    if axis1_vel is None and axis0_vel is None:
-                        step_config[axis0_name] = {'move_abs': axis0_pos}
-                        step_config[axis1_name] = {'move_abs': axis1_pos}
-                    else:
-                        step_config[axis0_name] = {'move_abs': axis0_pos}
-                        step_config[axis1_name] = {'move_abs': axis1_pos}
-
-                        if axis0_vel is not None:
-                            step_config[axis0_name] = {'move_abs': axis0_pos, 'move_vel': axis0_vel}
-
-                        if axis1_vel is not None:
-                            step_config[axis1_name] = {'move_abs': axis1_pos, 'move_vel': axis1_vel}
-
-                    # append to the pathway
-                    pathway.append(step_config)
-                    back_map[path_index] = {axis0_name: axis0_pos,
-                                            axis1_name: axis1_pos,
-                                            'index': (axis0_index, axis1_index)}
-                    path_index += 1
-
-                if (axis1_index+1) >= len(axis1_steparray):
-                    break
-
-                # make a move along axis1:
-                step_config = dict()
-
-                # relative movement:
-                # step_config[axis1_name] = {'move_rel' : step_in_axis1}
-
-                # absolute movement:
-                axis1_pos = round(axis1_pos + step_in_axis1, 7)
-
-                if axis1_vel is None and axis0_vel is None:
-                    step_config[axis0_name] = {'move_abs': axis0_pos}
-                    step_config[axis1_name] = {'move_abs': axis1_pos}
-                else:
-                    step_config[axis0_name] = {'move_abs': axis0_pos}
-                    step_config[axis1_name] = {'move_abs': axis1_pos}
+        return pathway, back_map
 
-                    if axis0_vel is not None:
-                        step_config[axis0_name] = {'move_abs': axis0_pos, 'move_vel': axis0_vel}
+    def _create_2d_adaptive_pathway(self, axis0_name, axis0_range, axis0_step,
+                                    axis1_name, axis1_range, axis1_step, init_pos,
+                                    axis0_vel=None, axis1_vel=None):
+        """ Create the pathway of the first (coarse) pass of an adaptive 2D
+        alignment.
 
-                    if axis1_vel is not None:
-                        step_config[axis1_name] = {'move_abs': axis1_pos, 'move_vel': axis1_vel}
+        The parameters are the same as for _create_2d_pathway, the step is
+        the target resolution. Only every align_2d_adaptive_stride-th point of
+        the grid is in the pathway, ordered by the current pathway mode. The
+        refinement passes are appended by _refine_2d_pathway.
 
-                pathway.append(step_config)
-                axis1_index += 1
-                back_map[path_index] = {axis0_name: axis0_pos,
-                                        axis1_name: axis1_pos,
-                                        'index': (axis0_index, axis1_index)}
-                path_index += 1
+        @return tuple(list, dict): the pathway and the back map, the indices
+                                   in the back map refer to the full grid
+        """
+        if self.curr_2d_pathway_mode not in self.pathway_modes:
+            self.log.error('The pathway creation method "{0}" through the '
+                    'matrix is not implemented yet!\nReturn an empty '
+                    'patharray.'.format(self.curr_2d_pathway_mode))
+            return [], []
 
+        axis0_positions, axis1_positions = self._create_2d_grid(
+            axis0_name, axis0_range, axis0_step,
+            axis1_name, axis1_range, axis1_step, init_pos)
+        cells, points = magnet_refinement.initial_cells(
+            len(axis0_positions), len(axis1_positions), self.align_2d_adaptive_stride)
+
+        # order the coarse sub-grid like a full grid
+        coarse0 = np.unique(points[:, 0])
+        coarse1 = np.unique(points[:, 1])
+        velocities, accelerations = self._get_motion_limits([axis0_name, axis1_name])
+        order = magnet_pathways.grid_order(
+            self.curr_2d_pathway_mode,
+            axis0_positions[coarse0],
+            axis1_positions[coarse1],
+            velocities,
+            accelerations,
+            start=np.array([init_pos[axis0_name], init_pos[axis1_name]]))
+        order = np.column_stack((coarse0[order[:, 0]], coarse1[order[:, 1]]))
+
+        self._adaptive_grid = {'axis0_name': axis0_name,
+                               'axis0_positions': axis0_positions,
+                               'axis0_vel': axis0_vel,
+                               'axis1_name': axis1_name,
+                               'axis1_positions': axis1_positions,
+                               'axis1_vel': axis1_vel}
+        self._adaptive_cells = cells
+        self._adaptive_planned = np.zeros((len(axis0_positions), len(axis1_positions)),
+                                          dtype=bool)
+        self._adaptive_planned[points[:, 0], points[:, 1]] = True
+        self._adaptive_pass = 0
+
+        return self._create_2d_pathway_entries(axis0_name, axis0_positions,
+                                               axis1_name, axis1_positions,
+                                               order, axis0_vel, axis1_vel)
+
+    def _refine_2d_pathway(self):
+        """ Append the next refinement pass of an adaptive 2D alignment to the
+        pathway.
+
+        The cells of the last pass close to the maximum of the measured figure
+        of merit or with a large change of it are split and their new corners
+        are appended to the pathway and the back map, in an order with a short
+        travel time from the current position.
+
+        @return int: number of new points, 0 if the target resolution is
+                     reached everywhere it is needed
+        """
+        grid = self._adaptive_grid
+        self._adaptive_cells, points = magnet_refinement.refine(
+            self._2D_data_matrix,
+            self._adaptive_cells,
+            self._adaptive_planned,
+            self.align_2d_adaptive_peak_fraction,
+            self.align_2d_adaptive_gradient_fraction)
+        if len(points) == 0:
+            return 0
+
+        axis_names = [grid['axis0_name'], grid['axis1_name']]
+        velocities, accelerations = self._get_motion_limits(axis_names)
+        curr_pos = self.get_pos(axis_names)
+        positions = np.column_stack((grid['axis0_positions'][points[:, 0]],
+                                     grid['axis1_positions'][points[:, 1]]))
+        if magnet_pathways.velocities_known(velocities):
+            order = magnet_pathways.optimize_order(
+                positions, velocities, accelerations,
+                start=np.array([curr_pos[name] for name in axis_names]))
+        else:
+            order = np.arange(len(points))
+
+        pathway, back_map = self._create_2d_pathway_entries(
+            grid['axis0_name'], grid['axis0_positions'],
+            grid['axis1_name'], grid['axis1_positions'],
+            points[order], grid['axis0_vel'], grid['axis1_vel'],
+            first_index=len(self._pathway))
+        self._pathway.extend(pathway)
+        self._backmap.update(back_map)
+        self._adaptive_planned[points[:, 0], points[:, 1]] = True
+        self._adaptive_pass += 1
+
+        self.log.info('Adaptive 2D alignment: refinement pass {0:d} with {1:d} '
+                      'new points ({2:d} of {3:d} grid points).'.format(
+                          self._adaptive_pass,
+                          len(points),
+                          int(np.count_nonzero(self._adaptive_planned)),
+                          self._adaptive_planned.size))
+        return len(points)
+
+    def _get_motion_limits(self, axis_names):
+        """ Velocity and acceleration of the axes for the travel time estimate.
+
+        @param list axis_names: labels of the axes
+
+        @return tuple(list, list): the current velocity of every axis (the
+                                   maximal velocity if the hardware does not
+                                   report it, None if neither is known) and
+                                   the maximal acceleration of every axis
+                                   (None if not constrained)
+        """
+        constraints = self.get_hardware_constraints()
+        try:
+            current_vel = self._magnet_device.get_velocity(axis_names)
+        except Exception:
+            current_vel = dict()
+        if not isinstance(current_vel, dict):
+            current_vel = dict()
+
+        velocities = []
+        accelerations = []
+        for axis_name in axis_names:
+            vel = current_vel.get(axis_name)
+            if not isinstance(vel, (int, float)) or vel <= 0:
+                vel = constraints[axis_name].get('vel_max')
+            velocities.append(vel)
+            acc = constraints[axis_name].get('acc_max')
+            accelerations.append(acc if acc else None)
+        return velocities, accelerations
+
+    def estimate_2d_alignment_time(self, pathway=None, backmap=None):
+        """ Estimate the duration of a 2D alignment.
+
+        @param list pathway: pathway of the alignment, the current one if None
+        @param dict backmap: back map of the pathway, the current one if None
+
+        @return dict: estimated 'travel' time of the magnet (including the
+                      moves to the first point and back to the initial
+                      position), 'measurement' time of all points and the
+                      'total' time, all in s. Travel and total time are None
+                      if the velocity of an axis is unknown.
+        """
+        if pathway is None:
+            pathway = self._pathway
+        if backmap is None:
+            backmap = self._backmap
+
+        axis_names = [self.align_2d_axis0_name, self.align_2d_axis1_name]
+        velocities, accelerations = self._get_motion_limits(axis_names)
+        if magnet_pathways.velocities_known(velocities):
+            init_pos = self.get_pos(axis_names)
+            points = [[init_pos[name] for name in axis_names]]
+            points += [[backmap[index][name] for name in axis_names]
+                       for index in range(len(pathway))]
+            points.append(points[0])
+            travel = magnet_pathways.path_travel_time(points, velocities, accelerations)
+        else:
+            travel = None
 
+        if self.curr_alignment_method == '2d_fluorescence':
+            point_time = self._fluorescence_integration_time
+        elif self.curr_alignment_method == '2d_odmr':
+            point_time = self.odmr_2d_low_runtime
+            if not self.odmr_2d_single_trans:
+                point_time += self.odmr_2d_high_runtime
+        else:
+            # the duration of the other measurements is not known in advance
+            point_time = 0
+        measurement = point_time * len(pathway)
 
-        return pathway, back_map
+        total = None if travel is None else travel + measurement
+        return {'travel': travel, 'measurement': measurement, 'total': total}
 
 
     def _create_2d_cont_pathway(self, pathway):
@@ -767,7 +878,11 @@ class MagnetLogic(GenericLogic):
             # current measurement point
             self._pathway_index = 0
 
-            self._pathway, self._backmap = self._create_2d_pathway(self.align_2d_axis0_name,
+            if self.align_2d_adaptive:
+                create_pathway = self._create_2d_adaptive_pathway
+            else:
+                create_pathway = self._create_2d_pathway
+            self._pathway, self._backmap = create_pathway(self.align_2d_axis0_name,
                                                                    self.align_2d_axis0_range,
                                                                    self.align_2d_axis0_step,
                                                                    self.align_2d_axis1_name,
@@ -777,10 +892,36 @@ class MagnetLogic(GenericLogic):
                                                                    self.align_2d_axis0_vel,
                                                                    self.align_2d_axis1_vel)
 
-            # determine the start point, either relative or absolute!
-            # Now the absolute position will be used:
-            axis0_start = self._backmap[0][self.align_2d_axis0_name]
-            axis1_start = self._backmap[0][self.align_2d_axis1_name]
+            if len(self._pathway) == 0:
+                return -1
+
+            estimate = self.estimate_2d_alignment_time()
+            if estimate['total'] is None:
+                self.log.info('Estimated duration of the {3}2D alignment with {0:d} '
+                              'points along the "{1}" pathway: measurement {2:.0f} s, '
+                              'the travel time is unknown since the hardware does not '
+                              'report the velocity of the axes.'.format(
+                                  len(self._pathway),
+                                  self.curr_2d_pathway_mode,
+                                  estimate['measurement'],
+                                  'first pass of the adaptive ' if self.align_2d_adaptive else ''))
+            else:
+                self.log.info('Estimated duration of the {5}2D alignment with {0:d} '
+                              'points along the "{1}" pathway: {2:.0f} s (travel '
+                              '{3:.0f} s, measurement {4:.0f} s).'.format(
+                                  len(self._pathway),
+                                  self.curr_2d_pathway_mode,
+                                  estimate['total'],
+                                  estimate['travel'],
+                                  estimate['measurement'],
+                                  'first pass of the adaptive ' if self.align_2d_adaptive else ''))
+
+            # the matrix starts at the grid index (0, 0), which is not
+            # necessarily the first point of the pathway:
+            first = next(index for index in self._backmap
+                         if self._backmap[index]['index'] == (0, 0))
+            axis0_start = self._backmap[first][self.align_2d_axis0_name]
+            axis1_start = self._backmap[first][self.align_2d_axis1_name]
 
             prepared_graph = self._prepare_2d_graph(
                 axis0_start,
@@ -791,6 +932,9 @@ class MagnetLogic(GenericLogic):
                 self.align_2d_axis1_step)
 
             self._2D_data_matrix, self._2D_axis0_data, self._2D_axis1_data = prepared_graph
+            if self.align_2d_adaptive:
+                # points which are not measured stay NaN
+                self._2D_data_matrix[:] = np.nan
 
             self._2D_add_data_matrix = np.zeros(shape=np.shape(self._2D_data_matrix), dtype=object)
 
@@ -836,18 +980,7 @@ class MagnetLogic(GenericLogic):
         # self.set_velocity(move_dict_vel)
         self._magnet_device.move_abs(move_dict_abs)
         # self.move_rel(move_dict_rel)
-        while self._check_is_moving():
-            time.sleep(self._checktime)
-            self.log.debug("Went into while loop in _move_to_curr_pathway_index")
-
-        # this function will return to this function if position is reached:
-        start_pos = self._saved_pos_before_align
-        end_pos = dict()
-        for axis_name in self._saved_pos_before_align:
-            end_pos[axis_name] = self._backmap[self._pathway_index][axis_name]
-
-
-        self.log.debug("(first movement) magnet moving ? {0}".format(self._check_is_moving()))
+        self._wait_until_reached(move_dict_abs)
 
 
         if stepwise_meas:
@@ -910,6 +1043,10 @@ class MagnetLogic(GenericLogic):
         # increase the index
         self._pathway_index += 1
 
+        if self._pathway_index >= len(self._pathway) and self.align_2d_adaptive:
+            # all points of this pass are measured, go on with a finer one
+            self._refine_2d_pathway()
+
         if (self._pathway_index) < len(self._pathway):
 
             #
@@ -921,21 +1058,7 @@ class MagnetLogic(GenericLogic):
             # commenting this out for now, because it is kind of useless for us
             # self.set_velocity(move_dict_vel)
             self._magnet_device.move_abs(move_dict_abs)
-
-            while self._check_is_moving():
-                time.sleep(self._checktime)
-                self.log.debug("Went into while loop in stepwise_loop_body")
-
-            self.log.debug("stepwise_loop_body reports magnet moving ? {0}".format(self._check_is_moving()))
-
-            # this function will return to this function if position is reached:
-            start_pos = dict()
-            end_pos = dict()
-            for axis_name in self._saved_pos_before_align:
-                start_pos[axis_name] = self._backmap[self._pathway_index - 1][axis_name]
-                end_pos[axis_name] = self._backmap[self._pathway_index][axis_name]
-
-
+            self._wait_until_reached(move_dict_abs)
 
             # rerun this loop again
             self._sigStepwiseAlignmentNext.emit()
@@ -980,9 +1103,7 @@ class MagnetLogic(GenericLogic):
             last_pos[axis_name] = self._backmap[self._pathway_index-1][axis_name]
 
         self._magnet_device.move_abs(self._saved_pos_before_align)
-
-        while self._check_is_moving():
-            time.sleep(self._checktime)
+        self._wait_until_reached(self._saved_pos_before_align)
 
         self.sigMeasurementFinished.emit()
 
@@ -995,55 +1116,94 @@ class MagnetLogic(GenericLogic):
 
 
     def _check_position_reached_loop(self, start_pos_dict, end_pos_dict):
-        """ Perform just a while loop, which checks everytime the conditions
+        """ Wait until the magnet has reached the end position.
 
         @param dict start_pos_dict: the position in this dictionary must be
                                     absolute positions!
-        @param dict end_pos_dict:
-        @param float checktime: the checktime in seconds
-
-        @return:
+        @param dict end_pos_dict: absolute end positions of the movement
 
-        Whenever the magnet has passed 95% of the way, the method will return.
-
-        Check also whether the difference in position increases again, and if so
-        stop the measurement and raise an error, since either the velocity was
-        too fast or the magnet does not move further.
+        @return bool: True if the position was reached
         """
+        return self._wait_until_reached(end_pos_dict)
 
+    def _wait_until_reached(self, target_dict):
+        """ Wait until the magnet has finished a movement to a target position.
 
-        distance_init = 0.0
-        constraints = self.get_hardware_constraints()
-        minimal_distance = 0.0
-        for axis_label in start_pos_dict:
-            distance_init = (end_pos_dict[axis_label] - start_pos_dict[axis_label])**2
-            minimal_distance = minimal_distance + (constraints[axis_label]['pos_step'])**2
-        distance_init = np.sqrt(distance_init)
-        minimal_distance = np.sqrt(minimal_distance)
-
-        # take 97% distance tolerance:
-        distance_tolerance = 0.03 * distance_init
+        @param dict target_dict: absolute target positions of the moved axes
 
-        current_dist = 0.0
+        @return bool: True if the position was reached, False on a timeout or
+                      a stopped measurement
 
+        Hardware which reports the end of its movements waits natively, in
+        slices of at most _checktime seconds to react to a stop request. For
+        other hardware the arrival is predicted from the axis velocities and
+        the position is polled rarely at first (at most every _checktime
+        seconds) and densely around the expected arrival.
+        """
+        axis_names = list(target_dict)
+        if len(axis_names) == 0:
+            return True
+        velocities, accelerations = self._get_motion_limits(axis_names)
+        if magnet_pathways.velocities_known(velocities):
+            curr_pos = self._magnet_device.get_pos(axis_names)
+            predicted = float(magnet_pathways.move_time(
+                [curr_pos[axis_name] for axis_name in axis_names],
+                [target_dict[axis_name] for axis_name in axis_names],
+                velocities, accelerations))
+            # generous timeout, the velocity of the hardware might be lower
+            # than reported
+            timeout = 2 * predicted + 5
+        else:
+            # without velocities the duration of the move is unknown, wait
+            # until the position is reached or the measurement is stopped
+            timeout = None
+
+        reached = self._wait_natively(axis_names, timeout)
+        if reached is None:
+            constraints = self.get_hardware_constraints()
+            tolerances = [constraints[axis_name]['pos_step'] for axis_name in axis_names]
+            reached, polls = magnet_pathways.wait_for_position(
+                self._magnet_device.get_pos, target_dict, velocities, accelerations,
+                tolerances, timeout=timeout, min_interval=self._min_poll_interval,
+                max_interval=self._checktime,
+                stop_requested=lambda: self._stop_measure)
+            self.log.debug('Checked the position {0} times to reach {1}.'.format(
+                polls, target_dict))
+
+        if not reached and not self._stop_measure:
+            if timeout is None:
+                self.log.warning('The magnet did not reach the position {0}.'.format(
+                    target_dict))
+            else:
+                self.log.warning('The magnet did not reach the position {0} within '
+                                 '{1:.1f} s.'.format(target_dict, timeout))
+        self.sigPosChanged.emit(self._magnet_device.get_pos())
+        self.sigPosReached.emit()
+        return reached
+
+    def _wait_natively(self, axis_names, timeout):
+        """ Wait with the hardware until the axes have finished their movement.
+
+        @param list axis_names: labels of the moving axes
+        @param float timeout: maximal waiting time in s or None to wait without
+                              limit
+
+        @return bool: True if the movement has finished, False on a timeout or
+                      a stopped measurement, None if the hardware cannot
+                      report the end of a movement
+        """
+        start = time.monotonic()
         while True:
-            time.sleep(self._checktime)
-
-            curr_pos = self.get_pos(list(end_pos_dict))
-
-            for axis_label in start_pos_dict:
-                current_dist = (end_pos_dict[axis_label] - curr_pos[axis_label])**2
-
-            current_dist = np.sqrt(current_dist)
-
-            self.sigPosChanged.emit(curr_pos)
-
-            if (current_dist <= distance_tolerance) or (current_dist <= minimal_distance) or self._stop_measure:
-                self.sigPosReached.emit()
-
-                break
-
-        #return either pos reached signal of check position
+            wait = self._checktime
+            if timeout is not None:
+                wait = min(wait, max(timeout - (time.monotonic() - start), 0))
+            reached = self._magnet_device.wait_until_reached(axis_names, wait)
+            if reached is None or reached:
+                return reached
+            if self._stop_measure:
+                return False
+            if timeout is not None and time.monotonic() - start >= timeout:
+                return False
 
     def _check_is_moving(self):
         """
@@ -1856,7 +2016,12 @@ class MagnetLogic(GenericLogic):
         if self._stop_measurement_time is not None:
             parameters['Measurement stop time'] = self._stop_measurement_time
         parameters['Time at Data save'] = timestamp
-        parameters['Pathway of the magnet alignment'] = 'Snake-wise steps'
+        parameters['Pathway of the magnet alignment'] = self.curr_2d_pathway_mode
+        if self.align_2d_adaptive:
+            parameters['Adaptive refinement'] = OrderedDict([
+                ('coarse stride', self.align_2d_adaptive_stride),
+                ('peak fraction', self.align_2d_adaptive_peak_fraction),
+                ('gradient fraction', self.align_2d_adaptive_gradient_fraction)])
 
         for index, entry in enumerate(self._pathway):
             parameters['index_'+str(index)] = entry
@@ -1873,23 +2038,29 @@ class MagnetLogic(GenericLogic):
 
         self.log.debug('Magnet 2D data saved to:\n{0}'.format(filepath))
 
-        # prepare the data in a dict or in an OrderedDict:
+        # prepare the data in a dict or in an OrderedDict, that is the list of
+        # all points in the order of the measurement:
+        axis0_name = self.align_2d_axis0_name
+        axis1_name = self.align_2d_axis1_name
         add_data = OrderedDict()
         axis0_data = np.zeros(len(self._backmap))
         axis1_data = np.zeros(len(self._backmap))
+        meas_data = np.zeros(len(self._backmap))
         param_data = np.zeros(len(self._backmap), dtype='object')
 
         for backmap_index in self._backmap:
-            axis0_data[backmap_index] = self._backmap[backmap_index][self._axis0_name]
-            axis1_data[backmap_index] = self._backmap[backmap_index][self._axis1_name]
+            axis0_data[backmap_index] = self._backmap[backmap_index][axis0_name]
+            axis1_data[backmap_index] = self._backmap[backmap_index][axis1_name]
+            meas_data[backmap_index] = self._2D_data_matrix[self._backmap[backmap_index]['index']]
             param_data[backmap_index] = str(self._2D_add_data_matrix[self._backmap[backmap_index]['index']])
 
         constr = self.get_hardware_constraints()
-        units_axis0 = constr[self._axis0_name]['unit']
-        units_axis1 = constr[self._axis1_name]['unit']
+        units_axis0 = constr[axis0_name]['unit']
+        units_axis1 = constr[axis1_name]['unit']
 
-        add_data['{0} values ({1})'.format(self._axis0_name, units_axis0)] = axis0_data
-        add_data['{0} values ({1})'.format(self._axis1_name, units_axis1)] = axis1_data
+        add_data['{0} values ({1})'.format(axis0_name, units_axis0)] = axis0_data
+        add_data['{0} values ({1})'.format(axis1_name, units_axis1)] = axis1_data
+        add_data['measured values'] = meas_data
         add_data['all measured additional parameter'] = param_data
 
 
@@ -1902,8 +2073,8 @@ class MagnetLogic(GenericLogic):
         x_val = self._2D_axis0_data
         y_val = self._2D_axis1_data
         save_dict = OrderedDict()
-        axis0_key = '{0} values ({1})'.format(self._axis0_name, units_axis0)
-        axis1_key = '{0} values ({1})'.format(self._axis1_name, units_axis1)
+        axis0_key = '{0} values ({1})'.format(axis0_name, units_axis0)
+        axis1_key = '{0} values ({1})'.format(axis1_name, units_axis1)
         counts_key = 'counts (c/s)'
         save_dict[axis0_key] = []
         save_dict[axis1_key] = []
@@ -2129,5 +2300,58 @@ class MagnetLogic(GenericLogic):
         '''Return the current value'''
         return self.align_2d_axis1_vel
 
+    def set_2d_pathway_mode(self, mode):
+        '''Set the pathway through the 2D alignment matrix, one of
+        self.pathway_modes'''
+        if mode not in self.pathway_modes:
+            self.log.error('Unknown pathway mode "{0}", use one of {1}. The '
+                           'mode is not changed.'.format(mode, self.pathway_modes))
+        else:
+            self.curr_2d_pathway_mode = mode
+        return self.curr_2d_pathway_mode
 
-
+    def get_2d_pathway_mode(self):
+        '''Return the current value'''
+        return self.curr_2d_pathway_mode
+
+    def set_2d_adaptive(self, adaptive=None, stride=None, peak_fraction=None,
+                        gradient_fraction=None):
+        """ Set the parameters of the adaptive 2D alignment.
+
+        @param bool adaptive: optional, measure adaptively instead of the full
+                              grid
+        @param int stride: optional, distance of the points of the coarse
+                           first pass in grid steps
+        @param float peak_fraction: optional, refine where the figure of merit
+                                    is within this fraction of its range from
+                                    the maximum
+        @param float gradient_fraction: optional, refine where the figure of
+                                        merit changes by more than this
+                                        fraction of its range within a cell
+
+        @return dict: the current parameters, see get_2d_adaptive
+        """
+        if adaptive is not None:
+            self.align_2d_adaptive = bool(adaptive)
+        if stride is not None:
+            if int(stride) < 1:
+                self.log.error('The stride of the adaptive 2D alignment has to '
+                               'be at least 1, it is not changed.')
+            else:
+                self.align_2d_adaptive_stride = int(stride)
+        if peak_fraction is not None:
+            self.align_2d_adaptive_peak_fraction = float(peak_fraction)
+        if gradient_fraction is not None:
+            self.align_2d_adaptive_gradient_fraction = float(gradient_fraction)
+        return self.get_2d_adaptive()
+
+    def get_2d_adaptive(self):
+        """ Get the parameters of the adaptive 2D alignment.
+
+        @return dict: 'adaptive', 'stride', 'peak_fraction' and
+                      'gradient_fraction'
+        """
+        return {'adaptive': self.align_2d_adaptive,
+                'stride': self.align_2d_adaptive_stride,
+                'peak_fraction': self.align_2d_adaptive_peak_fraction,
+                'gradient_fraction': self.align_2d_adaptive_gradient_fraction}
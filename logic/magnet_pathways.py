@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains the pathways of the MagnetLogic through a grid of magnet positions and
+an estimate of the travel time of a magnet stage along a pathway.
+
+The travel time of one move is modelled per axis with a trapezoidal velocity profile (constant
+acceleration up to the velocity, constant velocity, constant deceleration). All axes of a move
+start together, so a move takes as long as its slowest axis. The same model is used to reorder
+arbitrary sets of points for a short total travel time (nearest neighbour tour improved by
+2-opt) and to predict the arrival of a stage that cannot report the end of a move.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import time
+
+import numpy as np
+
+PATHWAY_MODES = ('spiral-in', 'spiral-out', 'snake-wise', 'diagonal-snake-wise',
+                 'travel-optimized')
+
+
+############################################################################
+#                                                                          #
+#                         Orders of grid points                            #
+#                                                                          #
+############################################################################
+
+def snake_order(num_axis0, num_axis1):
+    """ Meander through the grid: along axis0, one step along axis1, back along axis0, ...
+
+    @param int num_axis0: number of points along axis0
+    @param int num_axis1: number of points along axis1
+
+    @return numpy.ndarray: grid indices (axis0 index, axis1 index) in the order of the pathway,
+                           shape (num_axis0 * num_axis1, 2)
+    """
+    index1 = np.repeat(np.arange(num_axis1), num_axis0)
+    index0 = np.tile(np.arange(num_axis0), num_axis1)
+    backwards = index1 % 2 == 1
+    index0[backwards] = num_axis0 - 1 - index0[backwards]
+    return np.column_stack((index0, index1))
+
+
+def diagonal_snake_order(num_axis0, num_axis1):
+    """ Meander along the diagonals of the grid, i.e. the lines of constant
+        axis0 index + axis1 index. Both axes move in every step.
+
+    @param int num_axis0: number of points along axis0
+    @param int num_axis1: number of points along axis1
+
+    @return numpy.ndarray: grid indices in the order of the pathway, shape (points, 2)
+    """
+    index0, index1 = np.meshgrid(np.arange(num_axis0), np.arange(num_axis1), indexing='ij')
+    index0 = index0.ravel()
+    index1 = index1.ravel()
+    diagonal = index0 + index1
+    # even diagonals end at axis1 index 0, odd ones at axis0 index 0
+    direction = np.where(diagonal % 2 == 0, index0, -index0)
+    order = np.lexsort((direction, diagonal))
+    return np.column_stack((index0[order], index1[order]))
+
+
+def spiral_order(num_axis0, num_axis1, inwards=True):
+    """ Spiral along the border of the grid to its center (or from the center outwards).
+
+    @param int num_axis0: number of points along axis0
+    @param int num_axis1: number of points along axis1
+    @param bool inwards: start at the corner (True) or at the center (False)
+
+    @return numpy.ndarray: grid indices in the order of the pathway, shape (points, 2)
+    """
+    low0, high0 = 0, num_axis0 - 1
+    low1, high1 = 0, num_axis1 - 1
+    pieces = []
+    while low0 <= high0 and low1 <= high1:
+        steps = np.arange(low0, high0 + 1)
+        pieces.append(np.column_stack((steps, np.full(len(steps), low1))))
+        steps = np.arange(low1 + 1, high1 + 1)
+        pieces.append(np.column_stack((np.full(len(steps), high0), steps)))
+        if low1 < high1:
+            steps = np.arange(high0 - 1, low0 - 1, -1)
+            pieces.append(np.column_stack((steps, np.full(len(steps), high1))))
+        if low0 < high0:
+            steps = np.arange(high1 - 1, low1, -1)
+            pieces.append(np.column_stack((np.full(len(steps), low0), steps)))
+        low0, high0, low1, high1 = low0 + 1, high0 - 1, low1 + 1, high1 - 1
+    order = np.vstack(pieces).astype(int)
+    if not inwards:
+        order = order[::-1]
+    return order
+
+
+def grid_order(mode, axis0_positions, axis1_positions, velocities=None, accelerations=None,
+               start=None):
+    """ Order of the points of a grid for one of the pathway modes.
+
+    @param str mode: one of PATHWAY_MODES
+    @param numpy.ndarray axis0_positions: positions of the grid along axis0
+    @param numpy.ndarray axis1_positions: positions of the grid along axis1
+    @param list velocities: velocities of axis0 and axis1 (only 'travel-optimized')
+    @param list accelerations: accelerations of axis0 and axis1 or None (only
+                               'travel-optimized')
+    @param numpy.ndarray start: position (axis0, axis1) of the magnet before the first move
+                                (only 'travel-optimized')
+
+    @return numpy.ndarray: grid indices in the order of the pathway, shape (points, 2)
+
+    'travel-optimized' falls back to 'snake-wise' if the velocity of an axis is unknown.
+    """
+    num_axis0 = len(axis0_positions)
+    num_axis1 = len(axis1_positions)
+    if mode == 'spiral-in':
+        return spiral_order(num_axis0, num_axis1, inwards=True)
+    elif mode == 'spiral-out':
+        return spiral_order(num_axis0, num_axis1, inwards=False)
+    elif mode == 'diagonal-snake-wise':
+        return diagonal_snake_order(num_axis0, num_axis1)
+    elif mode == 'snake-wise':
+        return snake_order(num_axis0, num_axis1)
+    elif mode == 'travel-optimized':
+        if not velocities_known(velocities):
+            return snake_order(num_axis0, num_axis1)
+        axis0_positions = np.asarray(axis0_positions, dtype=float)
+        axis1_positions = np.asarray(axis1_positions, dtype=float)
+
+        def travel_time(indices):
+            points = np.column_stack((axis0_positions[indices[:, 0]],
+                                      axis1_positions[indices[:, 1]]))
+            return path_travel_time(points, velocities, accelerations, start)
+
+        indices = snake_order(num_axis0, num_axis1)
+        points = np.column_stack((axis0_positions[indices[:, 0]],
+                                  axis1_positions[indices[:, 1]]))
+        order = optimize_order(points, velocities, accelerations, start=start)
+        # the regular pathways are hard to beat on a full grid, keep the fastest order
+        candidates = [indices[order]]
+        candidates += [grid_order(regular, axis0_positions, axis1_positions)
+                       for regular in PATHWAY_MODES if regular != 'travel-optimized']
+        return min(candidates, key=travel_time)
+    raise ValueError('Unknown pathway mode "{0}", use one of {1}.'.format(mode, PATHWAY_MODES))
+
+
+############################################################################
+#                                                                          #
+#                            Travel time model                             #
+#                                                                          #
+############################################################################
+
+def velocities_known(velocities):
+    """ Check whether the travel time can be modelled, i.e. a velocity is known for every axis.
+
+    @param list velocities: velocity of every axis (entries may be None) or None
+
+    @return bool: all velocities are known and positive
+    """
+    if velocities is None:
+        return False
+    return all(vel is not None and vel > 0 for vel in velocities)
+
+
+def axis_move_time(distance, velocity, acceleration=None):
+    """ Time of a move of one axis with a trapezoidal (or triangular) velocity profile.
+
+    @param numpy.ndarray distance: distances of the moves (sign is ignored)
+    @param float velocity: maximal velocity of the axis
+    @param float acceleration: acceleration and deceleration of the axis, None or 0 for an
+                               instant change of the velocity
+
+    @return numpy.ndarray: durations of the moves in s
+    """
+    distance = np.abs(distance)
+    if not acceleration or acceleration <= 0:
+        return distance / velocity
+    # distance needed to accelerate to the velocity and to stop again
+    ramp_distance = velocity ** 2 / acceleration
+    return np.where(distance >= ramp_distance,
+                    distance / velocity + velocity / acceleration,
+                    2 * np.sqrt(distance / acceleration))
+
+
+def move_time(start, end, velocities, accelerations=None):
+    """ Time of moves of all axes started together, i.e. the time of the slowest axis.
+
+    @param numpy.ndarray start: start positions, shape (..., axes)
+    @param numpy.ndarray end: end positions, shape broadcastable to start
+    @param list velocities: velocity of every axis
+    @param list accelerations: acceleration of every axis (entries may be None) or None
+
+    @return numpy.ndarray: durations of the moves in s, shape (...)
+    """
+    difference = np.asarray(end, dtype=float) - np.asarray(start, dtype=float)
+    if accelerations is None:
+        accelerations = [None] * difference.shape[-1]
+    times = [axis_move_time(difference[..., axis], velocities[axis], accelerations[axis])
+             for axis in range(difference.shape[-1])]
+    return np.max(times, axis=0)
+
+
+def path_travel_time(points, velocities, accelerations=None, start=None):
+    """ Total travel time along the points of a pathway.
+
+    @param numpy.ndarray points: positions in the order of the pathway, shape (points, axes)
+    @param list velocities: velocity of every axis
+    @param list accelerations: acceleration of every axis or None
+    @param numpy.ndarray start: position before the first move or None to start at the
+                                first point
+
+    @return float: travel time in s
+    """
+    points = np.asarray(points, dtype=float)
+    if start is not None:
+        points = np.vstack((start, points))
+    if len(points) < 2:
+        return 0.0
+    return float(np.sum(move_time(points[:-1], points[1:], velocities, accelerations)))
+
+
+############################################################################
+#                                                                          #
+#                          Travel time optimizer                           #
+#                                                                          #
+############################################################################
+
+def nearest_neighbour_order(points, velocities, accelerations=None, start=None):
+    """ Greedy tour that always moves to the point with the shortest move time.
+
+    @param numpy.ndarray points: positions, shape (points, axes)
+    @param list velocities: velocity of every axis
+    @param list accelerations: acceleration of every axis or None
+    @param numpy.ndarray start: position before the first move or None to start at the
+                                first point
+
+    @return numpy.ndarray: indices of the points in the order of the tour
+    """
+    points = np.asarray(points, dtype=float)
+    remaining = np.ones(len(points), dtype=bool)
+    order = np.empty(len(points), dtype=int)
+    if start is None:
+        current = points[0]
+    else:
+        current = np.asarray(start, dtype=float)
+    for step in range(len(points)):
+        times = move_time(current, points, velocities, accelerations)
+        times[~remaining] = np.inf
+        index = int(np.argmin(times))
+        order[step] = index
+        remaining[index] = False
+        current = points[index]
+    return order
+
+
+def two_opt(points, order, velocities, accelerations=None, start=None, max_passes=20):
+    """ Improve an open tour by reversing segments as long as the travel time decreases.
+
+    The first point of the tour stays first if there is no start position. All segment
+    reversals that begin after one tour position are checked at once, so a pass needs
+    O(points) vectorized evaluations.
+
+    @param numpy.ndarray points: positions, shape (points, axes)
+    @param numpy.ndarray order: indices of the points in the order of the initial tour
+    @param list velocities: velocity of every axis
+    @param list accelerations: acceleration of every axis or None
+    @param numpy.ndarray start: position before the first move or None
+    @param int max_passes: maximal number of passes through the tour
+
+    @return numpy.ndarray: indices of the points in the order of the improved tour
+    """
+    points = np.asarray(points, dtype=float)
+    order = np.array(order, dtype=int)
+    if start is None:
+        nodes = order.copy()
+        path = points[nodes]
+        offset = 0
+    else:
+        # the start position is a fixed node in front of the tour
+        nodes = np.concatenate(([-1], order))
+        path = np.vstack((start, points[order]))
+        offset = 1
+    num = len(path)
+    for _ in range(max_passes):
+        improved = False
+        for first in range(num - 2):
+            # reverse path[first + 1:last + 1] for all last >= first + 2
+            last = np.arange(first + 2, num)
+            edge = move_time(path[first], path[first + 1], velocities, accelerations)
+            delta = move_time(path[first], path[last], velocities, accelerations) - edge
+            inner = last < num - 1
+            following = last[inner] + 1
+            delta[inner] += (
+                move_time(path[first + 1], path[following], velocities, accelerations)
+                - move_time(path[last[inner]], path[following], velocities, accelerations))
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-12:
+                end = last[best] + 1
+                path[first + 1:end] = path[first + 1:end][::-1]
+                nodes[first + 1:end] = nodes[first + 1:end][::-1]
+                improved = True
+        if not improved:
+            break
+    return nodes[offset:]
+
+
+def optimize_order(points, velocities, accelerations=None, start=None, max_passes=20):
+    """ Order of points with a short total travel time (nearest neighbour tour improved by
+        2-opt).
+
+    @param numpy.ndarray points: positions, shape (points, axes)
+    @param list velocities: velocity of every axis
+    @param list accelerations: acceleration of every axis or None
+    @param numpy.ndarray start: position before the first move or None
+    @param int max_passes: maximal number of 2-opt passes
+
+    @return numpy.ndarray: indices of the points in the optimized order
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) < 3:
+        return nearest_neighbour_order(points, velocities, accelerations, start)
+    order = nearest_neighbour_order(points, velocities, accelerations, start)
+    return two_opt(points, order, velocities, accelerations, start, max_passes)
+
+
+############################################################################
+#                                                                          #
+#                       Waiting for the end of a move                      #
+#                                                                          #
+############################################################################
+
+def wait_for_position(get_pos, target, velocities, accelerations=None, tolerances=None,
+                      timeout=None, min_interval=0.05, max_interval=1.0, stop_requested=None):
+    """ Wait until a stage has reached a target position, for stages that cannot report the
+        end of a move.
+
+    The arrival is predicted with the move time model. The position is polled rarely while
+    the arrival is far away (after 3/4 of the predicted remaining time, at most every
+    max_interval) and every min_interval close to it. The prediction is corrected with every
+    polled position.
+
+    @param callable get_pos: returns the current positions as a dict {axis label: position}
+    @param dict target: target positions {axis label: position}
+    @param list velocities: velocity of every axis in the order of target, without a known
+                            velocity for every axis the position is polled every max_interval
+    @param list accelerations: acceleration of every axis (entries may be None) or None
+    @param list tolerances: distance to the target of every axis that counts as reached, None
+                            for 1e-9 on every axis
+    @param float timeout: maximal waiting time in s or None to wait without limit
+    @param float min_interval: shortest time between two polls in s
+    @param float max_interval: longest time between two polls in s
+    @param callable stop_requested: returns True if the waiting should be stopped, or None
+
+    @return tuple(bool, int): target reached, number of polls
+    """
+    labels = list(target)
+    target_pos = np.array([target[label] for label in labels], dtype=float)
+    if tolerances is None:
+        tolerances = [1e-9] * len(labels)
+    tolerances = np.asarray(tolerances, dtype=float)
+
+    start = time.monotonic()
+    polls = 0
+    arrival = None
+    while True:
+        pos_dict = get_pos(labels)
+        polls += 1
+        pos = np.array([pos_dict[label] for label in labels], dtype=float)
+        if np.all(np.abs(pos - target_pos) <= tolerances):
+            return True, polls
+        elapsed = time.monotonic() - start
+        if timeout is not None and elapsed >= timeout:
+            return False, polls
+        if stop_requested is not None and stop_requested():
+            return False, polls
+        if velocities_known(velocities):
+            # a move from rest takes longer than the rest of a running move, so the first
+            # prediction is kept as long as it is later than the polled one
+            remaining = float(move_time(pos, target_pos, velocities, accelerations))
+            if arrival is None:
+                arrival = remaining
+            else:
+                remaining = min(remaining, arrival - elapsed)
+            interval = min(max_interval, max(min_interval, 0.75 * remaining))
+        else:
+            interval = max_interval
+        if timeout is not None:
+            interval = min(interval, timeout - elapsed)
+        time.sleep(interval)
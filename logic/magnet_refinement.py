@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains the adaptive refinement of the 2D alignment of the MagnetLogic.
+
+The alignment grid with the target resolution is measured hierarchically. A coarse sub-grid
+(every stride-th point) is measured first, it divides the grid into rectangular cells. The
+figure of merit inside a cell is interpolated bilinearly from its four corners, so the
+interpolated maximum of a cell is its largest corner and the spread of the corners bounds the
+error of the interpolation (large for a high gradient). Only the cells close to the maximum
+or with a large spread are split into four and the new corners are measured in the next pass,
+until the cells have the size of one grid step.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import numpy as np
+
+
+def grid_indices(num_points, stride):
+    """ Indices of a coarse sub-grid along one axis, the last point is always included.
+
+    @param int num_points: number of points of the full grid along the axis
+    @param int stride: distance of the coarse points in grid steps
+
+    @return numpy.ndarray: sorted indices
+    """
+    stride = max(1, int(stride))
+    return np.unique(np.append(np.arange(0, num_points, stride), num_points - 1))
+
+
+def unique_rows(rows):
+    """ Unique rows of an integer array sorted lexicographically, like numpy.unique with
+        axis=0 which needs numpy 1.13.
+
+    @param numpy.ndarray rows: integer array, shape (rows, columns)
+
+    @return numpy.ndarray: the unique rows
+    """
+    rows = np.asarray(rows, dtype=int)
+    if len(rows) == 0:
+        return rows
+    rows = rows[np.lexsort(rows.T[::-1])]
+    keep = np.ones(len(rows), dtype=bool)
+    keep[1:] = np.any(rows[1:] != rows[:-1], axis=1)
+    return rows[keep]
+
+
+def initial_cells(num_axis0, num_axis1, stride):
+    """ Cells between the points of the coarse sub-grid.
+
+    @param int num_axis0: number of points of the full grid along axis0
+    @param int num_axis1: number of points of the full grid along axis1
+    @param int stride: distance of the coarse points in grid steps
+
+    @return tuple(numpy.ndarray, numpy.ndarray): cells as rows (axis0 low, axis0 high,
+                                                 axis1 low, axis1 high) with grid indices
+                                                 of their corners, shape (cells, 4), and
+                                                 grid indices of the coarse points, shape
+                                                 (points, 2)
+    """
+    indices0 = grid_indices(num_axis0, stride)
+    indices1 = grid_indices(num_axis1, stride)
+    # a grid with a single point along an axis has cells of zero width there
+    bounds0 = np.column_stack((indices0[:-1], indices0[1:])) if len(indices0) > 1 \
+        else np.array([[0, 0]])
+    bounds1 = np.column_stack((indices1[:-1], indices1[1:])) if len(indices1) > 1 \
+        else np.array([[0, 0]])
+    cells = np.column_stack((np.repeat(bounds0, len(bounds1), axis=0),
+                             np.tile(bounds1, (len(bounds0), 1))))
+    points = np.column_stack((np.repeat(indices0, len(indices1)),
+                              np.tile(indices1, len(indices0))))
+    return cells, points
+
+
+def cells_to_refine(matrix, cells, peak_fraction=0.2, gradient_fraction=0.2):
+    """ Select the cells which have to be measured with a finer resolution.
+
+    @param numpy.ndarray matrix: measured figure of merit on the full grid, NaN where not
+                                 measured, shape (num_axis0, num_axis1)
+    @param numpy.ndarray cells: cells with measured corners, shape (cells, 4)
+    @param float peak_fraction: cells whose interpolated maximum is within this fraction
+                                of the value range from the overall maximum are refined
+    @param float gradient_fraction: cells whose corners spread by more than this fraction
+                                    of the value range are refined
+
+    @return numpy.ndarray: boolean mask of the cells to refine
+    """
+    cells = np.asarray(cells, dtype=int).reshape(-1, 4)
+    splittable = (cells[:, 1] - cells[:, 0] > 1) | (cells[:, 3] - cells[:, 2] > 1)
+    if len(cells) == 0 or np.all(np.isnan(matrix)):
+        return splittable
+    corners = np.stack((matrix[cells[:, 0], cells[:, 2]], matrix[cells[:, 0], cells[:, 3]],
+                        matrix[cells[:, 1], cells[:, 2]], matrix[cells[:, 1], cells[:, 3]]),
+                       axis=1)
+    value_min = np.nanmin(matrix)
+    value_max = np.nanmax(matrix)
+    value_range = value_max - value_min
+    if value_range <= 0:
+        # a flat figure of merit has nothing to resolve
+        return np.zeros(len(cells), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        cell_max = np.nanmax(corners, axis=1)
+        spread = cell_max - np.nanmin(corners, axis=1)
+        near_peak = cell_max >= value_max - peak_fraction * value_range
+        steep = spread >= gradient_fraction * value_range
+    # cells with an unmeasured corner are uncertain
+    uncertain = np.any(np.isnan(corners), axis=1)
+    return splittable & (near_peak | steep | uncertain)
+
+
+def split_cells(cells):
+    """ Split cells at their centers into (up to) four cells.
+
+    @param numpy.ndarray cells: cells, shape (cells, 4)
+
+    @return numpy.ndarray: the new cells, shape (new cells, 4)
+    """
+    cells = np.asarray(cells, dtype=int).reshape(-1, 4)
+    low0, high0, low1, high1 = cells.T
+    mid0 = (low0 + high0) // 2
+    mid1 = (low1 + high1) // 2
+    halves0 = [(low0, mid0), (mid0, high0)]
+    halves1 = [(low1, mid1), (mid1, high1)]
+    children = np.vstack([np.column_stack((a0, b0, a1, b1))
+                          for a0, b0 in halves0 for a1, b1 in halves1])
+    parents = np.tile(cells, (4, 1))
+    # a cell of one grid step (or of zero width) is not split along that axis, one of its
+    # halves is empty then
+    keep0 = (children[:, 1] > children[:, 0]) | (parents[:, 1] == parents[:, 0])
+    keep1 = (children[:, 3] > children[:, 2]) | (parents[:, 3] == parents[:, 2])
+    return unique_rows(children[keep0 & keep1])
+
+
+def cell_corners(cells):
+    """ Grid indices of the corners of cells.
+
+    @param numpy.ndarray cells: cells, shape (cells, 4)
+
+    @return numpy.ndarray: unique grid indices, shape (points, 2)
+    """
+    cells = np.asarray(cells, dtype=int).reshape(-1, 4)
+    corners = np.vstack((cells[:, [0, 2]], cells[:, [0, 3]], cells[:, [1, 2]], cells[:, [1, 3]]))
+    return unique_rows(corners)
+
+
+def refine(matrix, cells, measured, peak_fraction=0.2, gradient_fraction=0.2):
+    """ One refinement step: split the interesting cells and find the points to measure.
+
+    @param numpy.ndarray matrix: measured figure of merit on the full grid, NaN where not
+                                 measured
+    @param numpy.ndarray cells: cells of the last pass, shape (cells, 4)
+    @param numpy.ndarray measured: boolean mask of the measured (or already planned) grid
+                                   points, shape of matrix
+    @param float peak_fraction: see cells_to_refine
+    @param float gradient_fraction: see cells_to_refine
+
+    @return tuple(numpy.ndarray, numpy.ndarray): the cells of the next pass, shape
+                                                 (cells, 4) and grid indices of the new
+                                                 points, shape (points, 2). No new points
+                                                 means the refinement is finished.
+    """
+    cells = np.asarray(cells, dtype=int).reshape(-1, 4)
+    while True:
+        selected = cells_to_refine(matrix, cells, peak_fraction, gradient_fraction)
+        if not np.any(selected):
+            return np.zeros((0, 4), dtype=int), np.zeros((0, 2), dtype=int)
+        cells = split_cells(cells[selected])
+        corners = cell_corners(cells)
+        new_points = corners[~measured[corners[:, 0], corners[:, 1]]]
+        # the corners of the new cells may all be known from neighbouring cells already,
+        # then the new cells are refined right away
+        if len(new_points) > 0:
+            return cells, new_points
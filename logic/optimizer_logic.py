@@ -26,6 +26,7 @@ import time
 from logic.generic_logic import GenericLogic
 from core.module import Connector, ConfigOption, StatusVar
 from core.util.mutex import Mutex
+from logic.refocus_fit_methods import FastFitResult, fit_twoDgaussian, fit_gaussianlinearoffset
 
 
 class OptimizerLogic(GenericLogic):
@@ -40,6 +41,13 @@ class OptimizerLogic(GenericLogic):
     confocalscanner1 = Connector(interface='ConfocalScannerInterface')
     fitlogic = Connector(interface='FitLogic')
 
+    # declare config options
+    # 'lmfit' uses the generic FitLogic models, 'fast' the specialized refocus fitters with
+    # analytic Jacobians from logic/refocus_fit_methods.py
+    _refocus_fit_method = ConfigOption('refocus_fit_method', 'lmfit')
+    # downsampling factor of the XY image for a first coarse fit (only for 'fast' fit method)
+    _refocus_fit_downsampling = ConfigOption('refocus_fit_downsampling', 1)
+
     # declare status vars
     _clock_frequency = StatusVar('clock_frequency', 50)
     return_slowness = StatusVar(default=20)
@@ -112,6 +120,12 @@ class OptimizerLogic(GenericLogic):
         self._current_z = (self.z_range[0] + self.z_range[1]) / 2
         self._current_a = 0.0
 
+        if self._refocus_fit_method not in ('lmfit', 'fast'):
+            self.log.warning('Unknown refocus_fit_method "{0}" in config. Valid methods are '
+                             '"lmfit" and "fast". Falling back to "lmfit".'
+                             ''.format(self._refocus_fit_method))
+            self._refocus_fit_method = 'lmfit'
+
         ###########################
         # Fit Params and Settings #
         model, params = self._fit_logic.make_gaussianlinearoffset_model()
@@ -386,15 +400,21 @@ class OptimizerLogic(GenericLogic):
 
     def _set_optimized_xy_from_fit(self):
         """Fit the completed xy optimizer scan and set the optimized xy position."""
-        fit_x, fit_y = np.meshgrid(self._X_values, self._Y_values)
-        xy_fit_data = self.xy_refocus_image[:, :, 3].ravel()
-        axes = np.empty((len(self._X_values) * len(self._Y_values), 2))
-        axes = (fit_x.flatten(), fit_y.flatten())
-        result_2D_gaus = self._fit_logic.make_twoDgaussian_fit(
-            xy_axes=axes,
-            data=xy_fit_data,
-            estimator=self._fit_logic.estimate_twoDgaussian_MLE
-        )
+        if self._refocus_fit_method == 'fast':
+            result_2D_gaus = fit_twoDgaussian(
+                x_axis=self._X_values,
+                y_axis=self._Y_values,
+                image=self.xy_refocus_image[:, :, 3],
+                downsampling=self._refocus_fit_downsampling)
+        else:
+            fit_x, fit_y = np.meshgrid(self._X_values, self._Y_values)
+            xy_fit_data = self.xy_refocus_image[:, :, 3].ravel()
+            axes = (fit_x.flatten(), fit_y.flatten())
+            result_2D_gaus = self._fit_logic.make_twoDgaussian_fit(
+                xy_axes=axes,
+                data=xy_fit_data,
+                estimator=self._fit_logic.estimate_twoDgaussian_MLE
+            )
         # print(result_2D_gaus.fit_report())
 
         if result_2D_gaus.success is False:
@@ -442,6 +462,10 @@ class OptimizerLogic(GenericLogic):
                 x_axis=self._zimage_Z_values,
                 data=self.z_refocus_line[:, self.opt_channel],
                 add_params=adjusted_param)
+        elif self._refocus_fit_method == 'fast' and not any(self.use_custom_params.values()):
+            result = fit_gaussianlinearoffset(
+                x_axis=self._zimage_Z_values,
+                data=self.z_refocus_line[:, self.opt_channel])
         else:
             if any(self.use_custom_params.values()):
                 result = self._fit_logic.make_gausspeaklinearoffset_fit(
@@ -456,7 +480,8 @@ class OptimizerLogic(GenericLogic):
                     units='m',
                     estimator=self._fit_logic.estimate_gaussianlinearoffset_peak
                     )
-        self.z_params = result.params
+        if not isinstance(result, FastFitResult):
+            self.z_params = result.params
 
         if result.success is False:
             self.log.error('error in 1D Gaussian Fit.')
@@ -471,9 +496,12 @@ class OptimizerLogic(GenericLogic):
                 if result.best_values['center'] >= self.z_range[0] and result.best_values['center'] <= self.z_range[1]:
                     self.optim_pos_z = result.best_values['center']
                     self.optim_sigma_z = result.best_values['sigma']
-                    gauss, params = self._fit_logic.make_gaussianlinearoffset_model()
-                    self.z_fit_data = gauss.eval(
-                        x=self._fit_zimage_Z_values, params=result.params)
+                    if isinstance(result, FastFitResult):
+                        self.z_fit_data = result.best_fit
+                    else:
+                        gauss, params = self._fit_logic.make_gaussianlinearoffset_model()
+                        self.z_fit_data = gauss.eval(
+                            x=self._fit_zimage_Z_values, params=result.params)
                 else:  # new pos is too far away
                     # checks if new pos is too high
                     self.optim_sigma_z = 0.
@@ -29,6 +29,8 @@ import scipy.ndimage as ndimage
 import scipy.ndimage.filters as filters
 import time
 
+from scipy.spatial import cKDTree
+
 from collections import OrderedDict
 from core.module import Connector, StatusVar
 from core.util.mutex import Mutex
@@ -37,6 +39,159 @@ from logic.generic_logic import GenericLogic
 from qtpy import QtCore
 
 
+class PoiCoordinates:
+
+    """
+    The coordinates in sample of many PoIs, kept in one contiguous array.
+
+    Every PoI occupies one row of the array, the rows of deleted PoIs are filled with the last
+    row. A KD-tree of the coordinates for the search of PoIs near a position is built on
+    demand and invalidated by every change.
+    """
+
+    def __init__(self, capacity=64):
+        self._coords = np.zeros((max(1, capacity), 3))
+        self._keys = []
+        self._rows = {}
+        self._tree = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    @property
+    def keys(self):
+        """ The keys of the PoIs in the order of the rows.
+
+        @return list: PoI keys
+        """
+        return self._keys
+
+    @property
+    def coords(self):
+        """ The coordinates of all PoIs in the order of the keys. Do not modify.
+
+        @return numpy.ndarray: coordinates in sample, shape (PoIs, 3)
+        """
+        return self._coords[:len(self._keys)]
+
+    @property
+    def tree(self):
+        """ KD-tree of the coordinates, rebuilt if the coordinates were changed.
+
+        @return cKDTree: tree of the coordinates, None if there is no PoI
+        """
+        if self._tree is None and len(self._keys) > 0:
+            self._tree = cKDTree(self.coords)
+        return self._tree
+
+    def add(self, keys, coords):
+        """ Add PoIs or replace the coordinates of existing ones.
+
+        @param list keys: keys of the PoIs
+        @param float[][3] coords: coordinates in sample of the PoIs
+        """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+        new_keys = [key for key in keys if key not in self._rows]
+        needed = len(self._keys) + len(new_keys)
+        if needed > len(self._coords):
+            capacity = max(needed, 2 * len(self._coords))
+            grown = np.zeros((capacity, 3))
+            grown[:len(self._keys)] = self.coords
+            self._coords = grown
+        for key in new_keys:
+            self._rows[key] = len(self._keys)
+            self._keys.append(key)
+        self._coords[[self._rows[key] for key in keys]] = coords
+        self._tree = None
+
+    def remove(self, key):
+        """ Remove a PoI. The last PoI takes its row.
+
+        @param str key: key of the PoI
+        """
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last_key = self._keys.pop()
+        if last_key != key:
+            self._coords[row] = self._coords[len(self._keys)]
+            self._keys[row] = last_key
+            self._rows[last_key] = row
+        self._tree = None
+
+    def clear(self):
+        """ Remove all PoIs. """
+        self._keys = []
+        self._rows = {}
+        self._tree = None
+
+    def get(self, key):
+        """ Coordinates of one PoI.
+
+        @param str key: key of the PoI
+
+        @return numpy.ndarray: coordinates in sample, shape (3,)
+        """
+        return self._coords[self._rows[key]].copy()
+
+    def get_many(self, keys):
+        """ Coordinates of several PoIs.
+
+        @param list keys: keys of the PoIs
+
+        @return numpy.ndarray: coordinates in sample, shape (PoIs, 3)
+        """
+        return self._coords[[self._rows[key] for key in keys]].reshape(-1, 3)
+
+    def set(self, key, coords):
+        """ Change the coordinates of one PoI.
+
+        @param str key: key of the PoI
+        @param float[3] coords: coordinates in sample
+        """
+        self._coords[self._rows[key]] = coords
+        self._tree = None
+
+    def set_all(self, coords):
+        """ Change the coordinates of all PoIs at once.
+
+        @param numpy.ndarray coords: coordinates in sample in the order of the keys,
+                                     shape (PoIs, 3)
+        """
+        self._coords[:len(self._keys)] = coords
+        self._tree = None
+
+    def nearest(self, position, max_distance=np.inf):
+        """ The PoI closest to a position.
+
+        @param float[3] position: coordinates in sample
+        @param float max_distance: only PoIs closer than this are found
+
+        @return tuple(str, float): key and distance of the PoI, (None, inf) if there is none
+        """
+        if self.tree is None:
+            return None, np.inf
+        distance, row = self.tree.query(position, distance_upper_bound=max_distance)
+        if row >= len(self._keys):
+            return None, np.inf
+        return self._keys[row], distance
+
+    def within(self, position, radius):
+        """ The PoIs within a distance of a position.
+
+        @param float[3] position: coordinates in sample
+        @param float radius: maximal distance
+
+        @return list: keys of the PoIs
+        """
+        if self.tree is None:
+            return []
+        return [self._keys[row] for row in sorted(self.tree.query_ball_point(position, radius))]
+
+
 class PoI:
 
     """
@@ -49,11 +204,15 @@ class PoI:
         self.log = logging.getLogger(__name__)
 
         # The POI has fixed coordinates relative to the sample, enabling a map to be saved.
-        self._coords_in_sample = [0, 0, 0]
+        # If the POI belongs to a PoiCoordinates store, the coordinates are kept there.
+        self._coords_in_sample = np.zeros(3)
+        self._coords_store = None
 
         # The POI is at a scanner position, which may vary with time (drift).  This time
         # trace records every time+position when the POI position was explicitly known.
-        self._position_time_trace = []
+        # Rows of (time, x, y, z), the array grows by doubling its length.
+        self._position_time_trace = np.zeros((2, 4))
+        self._history_length = 0
 
         # To avoid duplication while algorithmically setting POIs, we need the key string to
         # go to sub-second. This requires the datetime module.
@@ -72,8 +231,8 @@ class PoI:
             # Store the time in the history log as seconds since 1970,
             # rather than as a datetime object.
             creation_time_sec = (self._creation_time - datetime.utcfromtimestamp(0)).total_seconds()
-            self._position_time_trace.append([creation_time_sec, pos[0], pos[1], pos[2]])
-            self._coords_in_sample = pos
+            self._append_to_history(creation_time_sec, pos)
+            self._coords_in_sample = np.array(pos, dtype=float)
 
         if name is None:
             self._name = self._creation_time.strftime('poi_%H%M%S')
@@ -85,10 +244,23 @@ class PoI:
             'name': self._name,
             'key': self._key,
             'time': self._creation_time,
-            'pos': self._coords_in_sample,
-            'history': self._position_time_trace
+            'pos': self.get_coords_in_sample().tolist(),
+            'history': self.get_position_history().tolist()
         }
 
+    def attach_coords_store(self, store):
+        """ Keep the coordinates in sample in a PoiCoordinates store shared with other POIs.
+
+        @param PoiCoordinates store: the store, None to keep the coordinates in the POI again
+        """
+        if store is None:
+            if self._coords_store is not None:
+                self._coords_in_sample = self.get_coords_in_sample()
+                self._coords_store.remove(self._key)
+        else:
+            store.add([self._key], [self.get_coords_in_sample()])
+        self._coords_store = store
+
     def set_coords_in_sample(self, coords=None):
         """ Defines the position of the poi relative to the sample,
         allowing a sample map to be constructed.  Once set, these
@@ -99,12 +271,30 @@ class PoI:
         @param float[3] coords: relative position of poi in sample
         """
 
-        if coords is not None:  # FIXME: Futurewarning fired here.
+        if coords is not None:
             if len(coords) != 3:
                 self.log.error('Given position does not contain 3 '
                                'dimensions.'
                                )
-            self._coords_in_sample = [coords[0], coords[1], coords[2]]
+            coords = np.array([coords[0], coords[1], coords[2]], dtype=float)
+            if self._coords_store is not None:
+                self._coords_store.set(self._key, coords)
+            else:
+                self._coords_in_sample = coords
+
+    def _append_to_history(self, timestamp, position):
+        """ Append a row to the position history, growing the array if it is full.
+
+        @param float timestamp: seconds since 1970
+        @param float[3] position: position coordinates of the poi
+        """
+        if self._history_length == len(self._position_time_trace):
+            grown = np.zeros((2 * len(self._position_time_trace), 4))
+            grown[:self._history_length] = self._position_time_trace
+            self._position_time_trace = grown
+        self._position_time_trace[self._history_length] = (
+            timestamp, position[0], position[1], position[2])
+        self._history_length += 1
 
     def add_position_to_history(self, position=None):
         """ Adds an explicitly known position+time to the history of the POI.
@@ -120,16 +310,27 @@ class PoI:
         elif isinstance(position, (list, tuple)) and not len(position) == 3:
             return -1
         else:
-            self._position_time_trace.append(
-                [time.time(), position[0], position[1], position[2]])
+            self._append_to_history(time.time(), position)
+            return 0
+
+    def set_position_history(self, history):
+        """ Replace the whole position history, e.g. when loading a saved POI.
+
+        @param float[][4] history: rows of (time, x, y, z)
+        """
+        history = np.array(history, dtype=float).reshape(-1, 4)
+        self._position_time_trace = np.zeros((max(2, len(history)), 4))
+        self._position_time_trace[:len(history)] = history
+        self._history_length = len(history)
 
     def get_coords_in_sample(self):
         """ Returns the coordinates of the POI relative to the sample.
 
         @return float[3]: the POI coordinates.
         """
-
-        return self._coords_in_sample
+        if self._coords_store is not None:
+            return self._coords_store.get(self._key)
+        return self._coords_in_sample.copy()
 
     def set_name(self, name=None):
         """ Sets the name of the poi.
@@ -144,7 +345,7 @@ class PoI:
         if name is not None:
             self._name = name
             return 0
-        if len(self._position_time_trace) > 0:
+        if self._history_length > 0:
             self._name = time.strftime('Point_%Y%m%d_%M%S%', self._creation_time)
             return -1
         else:
@@ -171,7 +372,16 @@ class PoI:
         @return float[][4]: the whole position history
         """
 
-        return np.array(self._position_time_trace)
+        return self._position_time_trace[:self._history_length].copy()
+
+    def get_last_position(self):
+        """ Returns the last known position without copying the whole history.
+
+        @return float[3]: the last position, zeros if the history is empty
+        """
+        if self._history_length == 0:
+            return np.zeros(3)
+        return self._position_time_trace[self._history_length - 1, 1:4].copy()
 
     def delete_last_position(self, empty_array_completely=False):
         """ Delete the last position in the history.
@@ -182,10 +392,9 @@ class PoI:
         @return float[4]: the position just deleted.
         """
         # do not delete initial position
-        if len(self._position_time_trace) > 1:
-            return self._position_time_trace.pop()
-        elif empty_array_completely:
-            return self._position_time_trace.pop()
+        if self._history_length > 1 or (empty_array_completely and self._history_length > 0):
+            self._history_length -= 1
+            return self._position_time_trace[self._history_length].tolist()
         else:
             self.log.error('Position was not deleted, initial point of history reached.')
             return [-1., -1., -1., -1.]
@@ -232,6 +441,9 @@ class PoiManagerLogic(GenericLogic):
         # locking for thread safety
         self.threadlock = Mutex()
 
+        # coordinates in sample of all POIs except crosshair and sample
+        self._poi_coords = PoiCoordinates()
+
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
@@ -268,14 +480,7 @@ class PoiManagerLogic(GenericLogic):
         """
         # If there are only 2 POIs (sample and crosshair) then the newly added POI needs to start the sample drift logging.
         if len(self.poi_list) == 2:
-            self.poi_list['sample']._creation_time = time.time()
-            # When the poimanager is activated the 'sample' poi is created because it is needed
-            # from the beginning for various functionalities. If the tracking of the sample is started it has
-            # to be reset such that this first point is deleted here
-            # Probably this can be solved a lot nicer.
-            self.poi_list['sample'].delete_last_position(empty_array_completely=True)
-            self.poi_list['sample'].add_position_to_history(position=[0, 0, 0])
-            self.poi_list['sample'].set_coords_in_sample(coords=[0, 0, 0])
+            self._start_sample_tracking()
 
         if position is None:
             position = self._confocal_logic.get_position()[:3]
@@ -288,9 +493,10 @@ class PoiManagerLogic(GenericLogic):
         self.poi_list[new_poi.get_key()] = new_poi
 
         # The POI coordinates are set relative to the last known sample position
-        most_recent_sample_pos = self.poi_list['sample'].get_position_history()[-1, :][1:4]
-        this_poi_coords = position - most_recent_sample_pos
+        most_recent_sample_pos = self.poi_list['sample'].get_last_position()
+        this_poi_coords = np.asarray(position, dtype=float) - most_recent_sample_pos
         new_poi.set_coords_in_sample(coords=this_poi_coords)
+        new_poi.attach_coords_store(self._poi_coords)
 
         # Since POI was created at current scanner position, it automatically
         # becomes the active POI.
@@ -301,6 +507,58 @@ class PoiManagerLogic(GenericLogic):
 
         return new_poi.get_key()
 
+    def add_pois(self, positions, keys=None, names=None, emit_change=True):
+        """ Creates many new pois at once and adds them to the list.
+
+        @param float[][3] positions: scanner positions of the new pois
+        @param list keys: (optional) keys of the new pois, generated if not given
+        @param list names: (optional) names of the new pois
+
+        @return list: keys of the new pois
+
+        Unlike add_poi this does not change the active POI, so that thousands of POIs (e.g.
+        from autofind_pois) are added with a single update of the GUI.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        if len(positions) == 0:
+            return []
+        if keys is None:
+            # The creation time alone does not give unique keys in a tight loop
+            prefix = datetime.now().strftime('poi_%Y%m%d_%H%M_%S_%f')
+            keys = ['{0}_{1:d}'.format(prefix, index) for index in range(len(positions))]
+        if names is None:
+            names = [None] * len(positions)
+        if len(keys) != len(positions) or len(names) != len(positions):
+            self.log.error('The number of keys or names does not match the number of POIs.')
+            return []
+
+        if len(self.poi_list) == 2:
+            self._start_sample_tracking()
+
+        for position, key, name in zip(positions, keys, names):
+            new_poi = PoI(pos=position, name=name, key=key)
+            new_poi._coords_store = self._poi_coords
+            self.poi_list[key] = new_poi
+
+        # The POI coordinates are set relative to the last known sample position
+        most_recent_sample_pos = self.poi_list['sample'].get_last_position()
+        self._poi_coords.add(keys, positions - most_recent_sample_pos)
+
+        if emit_change:
+            self.signal_poi_updated.emit()
+        return list(keys)
+
+    def _start_sample_tracking(self):
+        """ Reset the sample history when the first POI is added. """
+        self.poi_list['sample']._creation_time = time.time()
+        # When the poimanager is activated the 'sample' poi is created because it is needed
+        # from the beginning for various functionalities. If the tracking of the sample is started it has
+        # to be reset such that this first point is deleted here
+        # Probably this can be solved a lot nicer.
+        self.poi_list['sample'].delete_last_position(empty_array_completely=True)
+        self.poi_list['sample'].add_position_to_history(position=[0, 0, 0])
+        self.poi_list['sample'].set_coords_in_sample(coords=[0, 0, 0])
+
     def get_confocal_image_data(self):
         """ Get the current confocal xy scan data to hold as image of ROI"""
 
@@ -371,6 +629,7 @@ class PoiManagerLogic(GenericLogic):
             if poikey is 'crosshair' or poikey is 'sample':
                 self.log.warning('You cannot delete the crosshair or sample.')
                 return -1
+            self.poi_list[poikey].attach_coords_store(None)
             del self.poi_list[poikey]
 
             # If the active poi was deleted, there is no way to automatically choose
@@ -447,7 +706,7 @@ class PoiManagerLogic(GenericLogic):
         if poikey is not None and poikey in self.poi_list.keys():
 
             poi_coords = self.poi_list[poikey].get_coords_in_sample()
-            sample_pos = self.poi_list['sample'].get_position_history()[-1, :][1:4]
+            sample_pos = self.poi_list['sample'].get_last_position()
             return sample_pos + poi_coords
 
         else:
@@ -455,6 +714,42 @@ class PoiManagerLogic(GenericLogic):
                 poikey))
             return [-1., -1., -1.]
 
+    def get_poi_positions(self):
+        """ Returns the current positions of all POIs except crosshair and sample.
+
+        @return tuple(list, numpy.ndarray): keys of the POIs and their positions, shape (POIs, 3)
+
+        The sample drift is applied to all POIs at once.
+        """
+        sample_pos = self.poi_list['sample'].get_last_position()
+        return list(self._poi_coords.keys), self._poi_coords.coords + sample_pos
+
+    def get_closest_poi(self, position=None, max_distance=None):
+        """ Finds the POI closest to a scanner position.
+
+        @param float[3] position: (optional) scanner position, the current one if not given
+        @param float max_distance: (optional) only POIs closer than this are found
+
+        @return string: key of the closest POI, None if there is none
+        """
+        if position is None:
+            position = self._confocal_logic.get_position()[:3]
+        if max_distance is None:
+            max_distance = np.inf
+        coords = np.asarray(position, dtype=float) - self.poi_list['sample'].get_last_position()
+        return self._poi_coords.nearest(coords, max_distance)[0]
+
+    def get_pois_near(self, position, radius):
+        """ Finds the POIs within a distance of a scanner position.
+
+        @param float[3] position: scanner position
+        @param float radius: maximal distance from the position
+
+        @return list: keys of the POIs
+        """
+        coords = np.asarray(position, dtype=float) - self.poi_list['sample'].get_last_position()
+        return self._poi_coords.within(coords, radius)
+
     def set_new_position(self, poikey=None, newpos=None):
         """
         Moves the given POI to a new position, and uses this information to update
@@ -479,7 +774,7 @@ class PoiManagerLogic(GenericLogic):
 
             # Calculate sample shift and add it to the trace of 'sample' POI
             sample_shift = newpos - self.get_poi_position(poikey=poikey)
-            sample_shift += self.poi_list['sample'].get_position_history()[-1, :][1:4]
+            sample_shift += self.poi_list['sample'].get_last_position()
             self.poi_list['sample'].add_position_to_history(position=sample_shift)
 
             # signal POI has been updated (this will cause GUI to redraw)
@@ -505,7 +800,7 @@ class PoiManagerLogic(GenericLogic):
             this_poi = self.poi_list[poikey]
             return_val = this_poi.add_position_to_history(position=newpos)
 
-            sample_pos = self.poi_list['sample'].get_position_history()[-1, :][1:4]
+            sample_pos = self.poi_list['sample'].get_last_position()
 
             new_coords = newpos - sample_pos
 
@@ -656,6 +951,7 @@ class PoiManagerLogic(GenericLogic):
 
         del self.poi_list
         self.poi_list = dict()
+        self._poi_coords = PoiCoordinates()
 
         self.active_poi = None
 
@@ -685,7 +981,7 @@ class PoiManagerLogic(GenericLogic):
             else:
                 self.active_poi = None
 
-        elif poikey in self.get_all_pois():
+        elif poikey in self.poi_list:
             # If poikey is the current active POI then do nothing
             if self.poi_list[poikey] == self.active_poi:
                 return
@@ -719,28 +1015,15 @@ class PoiManagerLogic(GenericLogic):
         # We will fill the data OderedDict to send to savelogic
         data = OrderedDict()
 
-        # Lists for each column of the output file
-        poinames = []
-        poikeys = []
-        x_coords = []
-        y_coords = []
-        z_coords = []
-
-        for poikey in self.get_all_pois(abc_sort=True):
-            if poikey is not 'sample' and poikey is not 'crosshair':
-                thispoi = self.poi_list[poikey]
+        # Columns of the output file, sample and crosshair are not in the coordinate store
+        poikeys = [key for key in self.get_all_pois(abc_sort=True) if key in self._poi_coords]
+        coords = self._poi_coords.get_many(poikeys)
 
-                poinames.append(thispoi.get_name())
-                poikeys.append(poikey)
-                x_coords.append(thispoi.get_coords_in_sample()[0])
-                y_coords.append(thispoi.get_coords_in_sample()[1])
-                z_coords.append(thispoi.get_coords_in_sample()[2])
-
-        data['POI Name'] = np.array(poinames)
+        data['POI Name'] = np.array([self.poi_list[key].get_name() for key in poikeys])
         data['POI Key'] = np.array(poikeys)
-        data['X'] = np.array(x_coords)
-        data['Y'] = np.array(y_coords)
-        data['Z'] = np.array(z_coords)
+        data['X'] = coords[:, 0]
+        data['Y'] = coords[:, 1]
+        data['Z'] = coords[:, 2]
 
         self._save_logic.save_data(
             data,
@@ -757,26 +1040,30 @@ class PoiManagerLogic(GenericLogic):
         if filename is None:
             return -1
 
+        saved_poi_names = []
+        saved_poi_keys = []
+        saved_poi_coords = []
         with open(filename, 'r') as roifile:
             for line in roifile:
                 if line[0] != '#' and line.split()[0] != 'NaN':
-                    saved_poi_name = line.split()[0]
-                    saved_poi_key = line.split()[1]
-                    saved_poi_coords = [
-                        float(line.split()[2]), float(line.split()[3]), float(line.split()[4])]
-
-                    this_poi_key = self.add_poi(
-                        position=saved_poi_coords,
-                        key=saved_poi_key,
-                        emit_change=False)
-                    self.rename_poi(poikey=this_poi_key, name=saved_poi_name, emit_change=False)
-
-            # Now that all the POIs are created, emit the signal for other things (ie gui) to update
-            self.signal_poi_updated.emit()
+                    fields = line.split()
+                    saved_poi_names.append(fields[0])
+                    saved_poi_keys.append(fields[1])
+                    saved_poi_coords.append([float(fields[2]), float(fields[3]), float(fields[4])])
+
+        self.add_pois(saved_poi_coords, keys=saved_poi_keys, names=saved_poi_names,
+                      emit_change=False)
+        # The last loaded POI becomes the active one, as if they were added one by one
+        if len(saved_poi_keys) > 0:
+            self.set_active_poi(poikey=saved_poi_keys[-1])
+
+        # Now that all the POIs are created, emit the signal for other things (ie gui) to update
+        self.signal_poi_updated.emit()
         return 0
 
     @poi_list.constructor
     def dict_to_poi_list(self, val):
+        self._poi_coords = PoiCoordinates()
         pdict = {}
         # initially add crosshair to the pois
         crosshair = PoI(pos=[0, 0, 0], name='crosshair')
@@ -795,7 +1082,9 @@ class PoiManagerLogic(GenericLogic):
                         newpoi = PoI(name=poidict['name'], key=poidict['key'])
                         newpoi.set_coords_in_sample(poidict['pos'])
                         newpoi._creation_time = poidict['time']
-                        newpoi._position_time_trace = poidict['history']
+                        newpoi.set_position_history(poidict['history'])
+                        if key not in ('crosshair', 'sample'):
+                            newpoi.attach_coords_store(self._poi_coords)
                         pdict[key] = newpoi
                 except Exception as e:
                     self.log.exception('Could not load PoI {0}: {1}'.format(key, poidict))
@@ -821,7 +1110,7 @@ class PoiManagerLogic(GenericLogic):
                 if len(val['pos']) >= 3:
                     newpoi = PoI(pos=val['pos'], name=val['name'], key=val['key'])
                     newpoi._creation_time = val['time']
-                    newpoi._position_time_trace = val['history']
+                    newpoi.set_position_history(val['history'])
                     return newpoi
         except Exception as e:
             self.log.exception('Could not load active poi {0}'.format(val))
@@ -832,7 +1121,8 @@ class PoiManagerLogic(GenericLogic):
             produce a new vector rnew that has exactly the same relation to rotated/shifted/tilted
             reference positions a2, b2, c2.
 
-            @param np.array r: position to be remapped.
+            @param np.array r: position to be remapped, or many positions as rows of an array
+                               with shape (positions, 3).
 
             @param np.array a1: initial location of ref1.
 
@@ -936,10 +1226,12 @@ class PoiManagerLogic(GenericLogic):
                         )
                        )
 
-        # To find the new position of r, displace by (a2 - a1) and do the rotations
-        a1r = r - a1
+        # To find the new position of r, displace by (a2 - a1) and do the rotations.
+        # Both rotations are combined, so that all rows of r are remapped at once.
+        a1r = np.asarray(r, dtype=float) - a1
+        rotation = np.asarray(np.dot(m2, m1))
 
-        rnew = a2 + np.array(np.dot(m2, np.array(np.dot(m1, a1r))[0]))[0]
+        rnew = a2 + np.dot(a1r, rotation.T)
 
         return rnew
 
@@ -959,15 +1251,19 @@ class PoiManagerLogic(GenericLogic):
         @param ref3_newpos: similar, ref3.
         """
 
-        for poikey in self.get_all_pois(abc_sort=True):
-            if poikey is not 'sample' and poikey is not 'crosshair':
-                thispoi = self.poi_list[poikey]
+        if len(self._poi_coords) == 0:
+            return
 
-                old_coords = thispoi.get_coords_in_sample()
+        # All POIs are remapped at once, then moved like with move_coords
+        new_positions = self.triangulate(self._poi_coords.coords, ref1_coords, ref2_coords, ref3_coords, ref1_newpos, ref2_newpos, ref3_newpos)
 
-                new_coords = self.triangulate(old_coords, ref1_coords, ref2_coords, ref3_coords, ref1_newpos, ref2_newpos, ref3_newpos)
+        for poikey, newpos in zip(self._poi_coords.keys, new_positions):
+            self.poi_list[poikey].add_position_to_history(position=newpos)
+
+        sample_pos = self.poi_list['sample'].get_last_position()
+        self._poi_coords.set_all(new_positions - sample_pos)
 
-                self.move_coords(poikey=poikey, newpos=new_coords)
+        self.signal_poi_updated.emit()
 
     def autofind_pois(self, neighborhood_size=1, min_threshold=10000, max_threshold=1e6):
         """Automatically search the xy scan image for POIs.
@@ -977,6 +1273,10 @@ class PoiManagerLogic(GenericLogic):
         @param min_threshold: POIs must have c/s above this threshold.
 
         @param max_threshold: POIs must have c/s below this threshold.
+
+        @return list: keys of the new POIs
+
+        Spots closer than the neighborhood to an existing POI or to a brighter spot are skipped.
         """
 
         # Calculate the neighborhood size in pixels from the image range and resolution
@@ -995,15 +1295,31 @@ class PoiManagerLogic(GenericLogic):
         maxima = (data == data_max)
         data_min = filters.minimum_filter(data, 3 * neighborhood_pix)
         diff = ((data_max - data_min) > min_threshold)
-        maxima[diff is False] = 0
+        maxima[~diff] = False
+        maxima[data_max > max_threshold] = False
 
         labeled, num_objects = ndimage.label(maxima)
+        if num_objects == 0:
+            return []
         xy = np.array(ndimage.center_of_mass(data, labeled, range(1, num_objects + 1)))
-
-        for count, pix_pos in enumerate(xy):
-            poi_pos = self.roi_map_data[pix_pos[0], pix_pos[1], :][0:3]
-            this_poi_key = self.add_poi(position=poi_pos, emit_change=False)
-            self.rename_poi(poikey=this_poi_key, name='spot' + str(count), emit_change=False)
-
-        # Now that all the POIs are created, emit the signal for other things (ie gui) to update
-        self.signal_poi_updated.emit()
+        pixels = np.rint(xy).astype(int)
+        brightness = data[pixels[:, 0], pixels[:, 1]]
+        positions = self.roi_map_data[pixels[:, 0], pixels[:, 1], 0:3]
+
+        # Remove the spots that are already known or that belong to a brighter spot
+        min_distance = neighborhood_pix / pixels_per_micron
+        coords = positions - self.poi_list['sample'].get_last_position()
+        keep = np.ones(len(positions), dtype=bool)
+        if self._poi_coords.tree is not None:
+            distances = self._poi_coords.tree.query(coords, distance_upper_bound=min_distance)[0]
+            keep[np.isfinite(distances)] = False
+        neighbours = cKDTree(coords).query_ball_point(coords, min_distance)
+        for spot in np.argsort(-brightness, kind='mergesort'):
+            if keep[spot]:
+                for other in neighbours[spot]:
+                    if other != spot:
+                        keep[other] = False
+        positions = positions[keep]
+
+        # Adding all POIs at once emits the signal for other things (ie gui) to update only once
+        return self.add_pois(positions, names=['spot' + str(count) for count in range(len(positions))])
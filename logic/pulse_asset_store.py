@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the indexed storage for saved pulse blocks, ensembles and sequences.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import pickle
+import sqlite3
+
+from collections import OrderedDict
+from core.util.mutex import Mutex
+
+
+class PulseAssetStore:
+    """ SQLite database holding one pickled pulse asset (PulseBlock, PulseBlockEnsemble or
+    PulseSequence) per row. Single assets can be inserted, updated, deleted and loaded without
+    touching the other assets. The connection can be used from several threads.
+    """
+
+    def __init__(self, filename):
+        """
+        @param str filename: path of the database file, created if it does not exist
+        """
+        self.filename = filename
+        self._lock = Mutex()
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        with self._lock:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS assets (name TEXT PRIMARY KEY, data BLOB NOT NULL)')
+            self._connection.commit()
+
+    def close(self):
+        """ Close the database connection. """
+        with self._lock:
+            self._connection.close()
+
+    def names(self):
+        """ Names of all stored assets in the order they were first saved.
+
+        @return list: asset names
+        """
+        with self._lock:
+            cursor = self._connection.execute('SELECT name FROM assets ORDER BY rowid')
+            return [row[0] for row in cursor]
+
+    def load(self, name):
+        """ Load a single asset.
+
+        @param str name: name of the asset
+
+        @return object: the unpickled asset
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT data FROM assets WHERE name=?', (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return pickle.loads(row[0])
+
+    def save(self, name, asset):
+        """ Insert or update a single asset. An updated asset keeps its position.
+
+        @param str name: name of the asset
+        @param object asset: the asset object to pickle
+        """
+        data = sqlite3.Binary(pickle.dumps(asset, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            cursor = self._connection.execute(
+                'UPDATE assets SET data=? WHERE name=?', (data, name))
+            if cursor.rowcount == 0:
+                self._connection.execute(
+                    'INSERT INTO assets (name, data) VALUES (?, ?)', (name, data))
+            self._connection.commit()
+
+    def save_many(self, assets):
+        """ Insert or update several assets in one transaction.
+
+        @param dict assets: asset names and objects
+        """
+        with self._lock:
+            for name, asset in assets.items():
+                data = sqlite3.Binary(pickle.dumps(asset, protocol=pickle.HIGHEST_PROTOCOL))
+                cursor = self._connection.execute(
+                    'UPDATE assets SET data=? WHERE name=?', (data, name))
+                if cursor.rowcount == 0:
+                    self._connection.execute(
+                        'INSERT INTO assets (name, data) VALUES (?, ?)', (name, data))
+            self._connection.commit()
+
+    def delete(self, name):
+        """ Delete a single asset.
+
+        @param str name: name of the asset
+        """
+        with self._lock:
+            self._connection.execute('DELETE FROM assets WHERE name=?', (name,))
+            self._connection.commit()
+
+
+class PulseAssetDict(OrderedDict):
+    """ Ordered dictionary of saved pulse assets backed by a PulseAssetStore.
+
+    All names are known from the start, the asset objects are unpickled from the database on
+    first access. Setting or deleting an item writes only this asset to the database.
+    """
+
+    _not_loaded = object()
+
+    def __init__(self, store):
+        """
+        @param PulseAssetStore store: database holding the assets
+        """
+        super().__init__()
+        self.store = store
+        for name in store.names():
+            OrderedDict.__setitem__(self, name, self._not_loaded)
+
+    def __getitem__(self, name):
+        asset = OrderedDict.__getitem__(self, name)
+        if asset is self._not_loaded:
+            asset = self.store.load(name)
+            OrderedDict.__setitem__(self, name, asset)
+        return asset
+
+    def __setitem__(self, name, asset):
+        self.store.save(name, asset)
+        OrderedDict.__setitem__(self, name, asset)
+
+    def __delitem__(self, name):
+        OrderedDict.__delitem__(self, name)
+        self.store.delete(name)
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def pop(self, name, *default):
+        if name not in self:
+            if default:
+                return default[0]
+            raise KeyError(name)
+        asset = self[name]
+        del self[name]
+        return asset
+
+    def values(self):
+        return [self[name] for name in self]
+
+    def items(self):
+        return [(name, self[name]) for name in self]
+
+    def update(self, *args, **kwargs):
+        assets = OrderedDict(*args, **kwargs)
+        self.store.save_many(assets)
+        for name, asset in assets.items():
+            OrderedDict.__setitem__(self, name, asset)
+
+    def copy(self):
+        return OrderedDict(self.items())
+
+    def is_loaded(self, name):
+        """ Check if the asset object was already read from the database.
+
+        @param str name: name of the asset
+
+        @return bool: asset is in memory
+        """
+        return OrderedDict.__getitem__(self, name) is not self._not_loaded
+
+
+def open_asset_dict(directory, db_filename, legacy_filename):
+    """ Open the asset database in a directory. If the database does not exist yet but a legacy
+    pickled dictionary of all assets does, its content is imported once. The legacy file is
+    left untouched.
+
+    @param str directory: directory of the asset type
+    @param str db_filename: file name of the database
+    @param str legacy_filename: file name of the legacy pickled dictionary
+
+    @return PulseAssetDict: dictionary of the saved assets
+    """
+    db_path = os.path.join(directory, db_filename)
+    legacy_path = os.path.join(directory, legacy_filename)
+    is_new = not os.path.isfile(db_path)
+    store = PulseAssetStore(db_path)
+    if is_new and os.path.isfile(legacy_path):
+        with open(legacy_path, 'rb') as infile:
+            store.save_many(pickle.load(infile))
+    return PulseAssetDict(store)
@@ -27,8 +27,10 @@ import datetime
 import matplotlib.pyplot as plt
 
 from core.module import Connector, ConfigOption, StatusVar
+from core.remote import RemoteModuleProxy
 from core.util.mutex import Mutex
 from core.util.network import netobtain
+from core.util.sharedbuffer import SharedArrayReader
 from core.util import units
 from logic.generic_logic import GenericLogic
 
@@ -50,6 +52,8 @@ class PulsedMeasurementLogic(GenericLogic):
     pulsegenerator = Connector(interface='PulserInterface')
 
     raw_data_save_type = ConfigOption('raw_data_save_type', 'text')
+    # read the traces of a remote fast counter on the same computer from shared memory
+    _fast_counter_shared_memory = ConfigOption('fast_counter_shared_memory', True)
 
     # status vars
     fast_counter_record_length = StatusVar(default=3.e-6)
@@ -173,6 +177,9 @@ class PulsedMeasurementLogic(GenericLogic):
         self._pulse_extraction_logic = self.pulseextractionlogic()
         self._fast_counter_device = self.fastcounter()
         self._save_logic = self.savelogic()
+        self._shared_trace = SharedArrayReader()
+        self._use_shared_trace = (self._fast_counter_shared_memory
+                                  and isinstance(self._fast_counter_device, RemoteModuleProxy))
         self._fit_logic = self.fitlogic()
         self._pulse_generator_device = self.pulsegenerator()
         self._mycrowave_source_device = self.microwave()
@@ -234,6 +241,7 @@ class PulsedMeasurementLogic(GenericLogic):
 
         if self.module_state() != 'idle' and self.module_state() != 'deactivated':
             self.stop_pulsed_measurement()
+        self._shared_trace.close()
 
         self._statusVariables['number_of_lasers'] = self.number_of_lasers
         self._statusVariables['controlled_vals'] = list(self.controlled_vals)
@@ -717,6 +725,37 @@ class PulsedMeasurementLogic(GenericLogic):
                     self.analysis_timer = None
         return
 
+    def _get_fast_counter_data(self):
+        """ Get the current timetrace of the fast counter.
+
+        A remote fast counter (e.g. in a worker process) that supports it publishes the trace
+        into shared memory and only sends the buffer name and the sequence number. Fast counters
+        that do not support it return the trace itself from get_data_trace_shared. If the buffer
+        is not on this computer the trace is transferred over the remote connection.
+
+        @return numpy.ndarray: the timetrace
+        """
+        if self._use_shared_trace:
+            try:
+                shared = self._fast_counter_device.get_data_trace_shared()
+                if isinstance(shared, tuple):
+                    return self._shared_trace.get(str(shared[0]), int(shared[1]))
+                self.log.debug('The fast counter does not publish its traces into shared memory.')
+                self._use_shared_trace = False
+                return netobtain(shared)
+            except AttributeError:
+                self.log.debug('The fast counter does not publish its traces into shared memory.')
+                self._use_shared_trace = False
+            except (OSError, ValueError):
+                self.log.info('The shared memory of the fast counter is not on this computer, the '
+                              'traces are transferred over the remote connection.')
+                self._use_shared_trace = False
+                self._shared_trace.close()
+            except LookupError:
+                # the trace was overwritten by later ones before it was read
+                pass
+        return netobtain(self._fast_counter_device.get_data_trace())
+
     def _pulsed_analysis_loop(self):
         """ Acquires laser pulses from fast counter,
             calculates fluorescence signal and creates plots.
@@ -725,7 +764,7 @@ class PulsedMeasurementLogic(GenericLogic):
             if self.module_state() == 'locked':
 
                 # get raw data from fast counter
-                fc_data = netobtain(self._fast_counter_device.get_data_trace())
+                fc_data = self._get_fast_counter_data()
                 # Convert returned numpy array to int64 dtype if necessary
                 if fc_data.dtype != np.int64:
                     fc_data = fc_data.astype('int64')
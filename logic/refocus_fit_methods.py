@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains fast, specialized fit routines for the refocus models used
+by the OptimizerLogic (2D gaussian in the XY plane and 1D gaussian with linear
+offset along Z).
+
+In contrast to the generic lmfit based fits of the FitLogic, the residuals here
+are fully vectorized and the Jacobians are calculated analytically, so the
+least-squares solver does not need to differentiate numerically. The fits are
+performed on normalized axes and data to keep the problem well conditioned.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import numpy as np
+from collections import OrderedDict
+from scipy.optimize import least_squares
+
+
+class FastFitResult:
+    """ Minimal fit result container mimicking the attributes of lmfit.model.ModelResult that are
+    used by the OptimizerLogic (success, best_values, best_fit, message).
+    """
+
+    def __init__(self, success, best_values, best_fit, message='', nfev=0):
+        self.success = bool(success)
+        self.best_values = best_values
+        self.best_fit = best_fit
+        self.message = message
+        self.nfev = nfev
+
+
+############################################################################
+#                                                                          #
+#                 2D gaussian (XY refocus) with analytic Jacobian          #
+#                                                                          #
+############################################################################
+
+def twoDgaussian_function(u, v, amplitude, center_x, center_y, sigma_x, sigma_y, theta, offset):
+    """ Two dimensional (rotated) gaussian. Same definition as the FitLogic twoDgaussian model.
+
+    @param numpy.ndarray u: x coordinates (any shape)
+    @param numpy.ndarray v: y coordinates (same shape as u)
+    @param float amplitude: Amplitude of gaussian
+    @param float center_x: x value of maximum
+    @param float center_y: y value of maximum
+    @param float sigma_x: standard deviation in x direction
+    @param float sigma_y: standard deviation in y direction
+    @param float theta: angle for eliptical gaussians
+    @param float offset: offset
+
+    @return numpy.ndarray: function values with the same shape as u
+    """
+    a, b, c = _twoDgaussian_coefficients(sigma_x, sigma_y, theta)
+    du = u - center_x
+    dv = v - center_y
+    return offset + amplitude * np.exp(-(a * du * du + 2 * b * du * dv + c * dv * dv))
+
+
+def _twoDgaussian_coefficients(sigma_x, sigma_y, theta):
+    """ Quadratic form coefficients a, b, c of the rotated 2D gaussian. """
+    cos2 = np.cos(theta) ** 2
+    sin2 = np.sin(theta) ** 2
+    sin_2t = np.sin(2 * theta)
+    isx2 = 1 / (2 * sigma_x ** 2)
+    isy2 = 1 / (2 * sigma_y ** 2)
+    a = cos2 * isx2 + sin2 * isy2
+    b = sin_2t * (isy2 - isx2) / 2
+    c = sin2 * isx2 + cos2 * isy2
+    return a, b, c
+
+
+def _twoDgaussian_residual(p, u, v, data):
+    return twoDgaussian_function(u, v, *p) - data
+
+
+def _twoDgaussian_jacobian(p, u, v, data):
+    """ Analytic Jacobian of the 2D gaussian with respect to
+    (amplitude, center_x, center_y, sigma_x, sigma_y, theta, offset).
+    """
+    amplitude, center_x, center_y, sigma_x, sigma_y, theta, offset = p
+    a, b, c = _twoDgaussian_coefficients(sigma_x, sigma_y, theta)
+    du = u - center_x
+    dv = v - center_y
+    du2 = du * du
+    dudv = du * dv
+    dv2 = dv * dv
+    expo = np.exp(-(a * du2 + 2 * b * dudv + c * dv2))
+    a_expo = amplitude * expo
+
+    cos2 = np.cos(theta) ** 2
+    sin2 = np.sin(theta) ** 2
+    sin_2t = np.sin(2 * theta)
+    cos_2t = np.cos(2 * theta)
+    sx3 = sigma_x ** 3
+    sy3 = sigma_y ** 3
+    diff = 1 / (2 * sigma_y ** 2) - 1 / (2 * sigma_x ** 2)
+
+    jac = np.empty((u.size, 7))
+    jac[:, 0] = expo
+    jac[:, 1] = a_expo * (2 * a * du + 2 * b * dv)
+    jac[:, 2] = a_expo * (2 * b * du + 2 * c * dv)
+    # d/d sigma_x
+    jac[:, 3] = -a_expo * (-cos2 / sx3 * du2 + sin_2t / sx3 * dudv - sin2 / sx3 * dv2)
+    # d/d sigma_y
+    jac[:, 4] = -a_expo * (-sin2 / sy3 * du2 - sin_2t / sy3 * dudv - cos2 / sy3 * dv2)
+    # d/d theta
+    jac[:, 5] = -a_expo * (sin_2t * diff * du2 + 2 * cos_2t * diff * dudv - sin_2t * diff * dv2)
+    jac[:, 6] = 1.
+    return jac
+
+
+def _block_average(x_axis, y_axis, image, factor):
+    """ Downsample the axes and the image (rows: y, columns: x) by averaging factor x factor
+    blocks. Incomplete blocks at the edges are discarded.
+    """
+    n_y = (image.shape[0] // factor) * factor
+    n_x = (image.shape[1] // factor) * factor
+    image = image[:n_y, :n_x].reshape(n_y // factor, factor, n_x // factor, factor)
+    x_ds = x_axis[:n_x].reshape(-1, factor).mean(axis=1)
+    y_ds = y_axis[:n_y].reshape(-1, factor).mean(axis=1)
+    return x_ds, y_ds, image.mean(axis=(1, 3))
+
+
+def _estimate_twoDgaussian(u, v, data):
+    """ Moment based estimator on normalized coordinates (see estimate_twoDgaussian_MLE). """
+    offset = float(np.min(data))
+    weights = data - offset
+    norm = np.sum(weights)
+    amplitude = float(np.max(data)) - offset
+    if norm <= 0:
+        return np.array([amplitude, np.mean(u), np.mean(v), 0.25, 0.25, 0., offset])
+    center_x = np.sum(u * weights) / norm
+    center_y = np.sum(v * weights) / norm
+    # second moments are biased high by the background, so clip them to a sensible range
+    sigma_x = np.clip(np.sqrt(np.sum(weights * (u - center_x) ** 2) / norm), 0.02, 0.5)
+    sigma_y = np.clip(np.sqrt(np.sum(weights * (v - center_y) ** 2) / norm), 0.02, 0.5)
+    return np.array([amplitude, center_x, center_y, sigma_x, sigma_y, 0., offset])
+
+
+def fit_twoDgaussian(x_axis, y_axis, image, downsampling=1, initial_guess=None):
+    """ Fast 2D gaussian fit of a refocus image.
+
+    @param numpy.ndarray x_axis: 1D array of x positions (image columns)
+    @param numpy.ndarray y_axis: 1D array of y positions (image rows)
+    @param numpy.ndarray image: 2D data with shape (len(y_axis), len(x_axis))
+    @param int downsampling: optional, if > 1 a first fit is performed on an image downsampled
+                             by this factor and used as start value for the full resolution fit.
+    @param dict initial_guess: optional, start values (same keys as best_values of the result)
+
+    @return FastFitResult: fit result. The keys of best_values are identical to the lmfit
+                           twoDgaussian model (amplitude, center_x, center_y, sigma_x, sigma_y,
+                           theta, offset).
+    """
+    x_axis = np.asarray(x_axis, dtype=float)
+    y_axis = np.asarray(y_axis, dtype=float)
+    image = np.asarray(image, dtype=float)
+
+    # Normalize the axes with a common length scale (keeps theta meaningful) and the data
+    x0 = (x_axis[0] + x_axis[-1]) / 2
+    y0 = (y_axis[0] + y_axis[-1]) / 2
+    length_scale = max(abs(x_axis[-1] - x_axis[0]), abs(y_axis[-1] - y_axis[0]))
+    if length_scale == 0:
+        length_scale = 1.
+    data_scale = float(np.max(np.abs(image)))
+    if data_scale == 0:
+        data_scale = 1.
+
+    u_axis = (x_axis - x0) / length_scale
+    v_axis = (y_axis - y0) / length_scale
+    norm_image = image / data_scale
+
+    min_step = min(np.min(np.abs(np.diff(u_axis))) if u_axis.size > 1 else 1.,
+                   np.min(np.abs(np.diff(v_axis))) if v_axis.size > 1 else 1.)
+    lower = np.array([0., -1.5, -1.5, min_step / 2, min_step / 2, -np.inf, -np.inf])
+    upper = np.array([np.inf, 1.5, 1.5, 3., 3., np.inf, np.inf])
+
+    if initial_guess is not None:
+        p0 = np.array([initial_guess['amplitude'] / data_scale,
+                       (initial_guess['center_x'] - x0) / length_scale,
+                       (initial_guess['center_y'] - y0) / length_scale,
+                       initial_guess['sigma_x'] / length_scale,
+                       initial_guess['sigma_y'] / length_scale,
+                       initial_guess['theta'],
+                       initial_guess['offset'] / data_scale])
+    else:
+        p0 = None
+
+    stages = [1]
+    if downsampling > 1 and min(image.shape) // downsampling >= 3:
+        stages.insert(0, int(downsampling))
+
+    nfev = 0
+    result = None
+    for factor in stages:
+        if factor > 1:
+            u_ax, v_ax, data = _block_average(u_axis, v_axis, norm_image, factor)
+        else:
+            u_ax, v_ax, data = u_axis, v_axis, norm_image
+        u, v = np.meshgrid(u_ax, v_ax)
+        u = u.ravel()
+        v = v.ravel()
+        data = data.ravel()
+        if p0 is None:
+            p0 = _estimate_twoDgaussian(u, v, data)
+        p0 = np.clip(p0, lower, upper)
+        result = least_squares(_twoDgaussian_residual,
+                               p0,
+                               jac=_twoDgaussian_jacobian,
+                               bounds=(lower, upper),
+                               args=(u, v, data),
+                               x_scale='jac',
+                               method='trf')
+        nfev += result.nfev
+        p0 = result.x
+
+    p = result.x
+    success = result.success and np.all(np.isfinite(p))
+    best_values = OrderedDict()
+    best_values['amplitude'] = p[0] * data_scale
+    best_values['center_x'] = p[1] * length_scale + x0
+    best_values['center_y'] = p[2] * length_scale + y0
+    best_values['sigma_x'] = abs(p[3]) * length_scale
+    best_values['sigma_y'] = abs(p[4]) * length_scale
+    best_values['theta'] = p[5] % np.pi
+    best_values['offset'] = p[6] * data_scale
+
+    grid_x, grid_y = np.meshgrid(x_axis, y_axis)
+    best_fit = twoDgaussian_function(grid_x, grid_y, *best_values.values()).ravel()
+    return FastFitResult(success, best_values, best_fit, result.message, nfev)
+
+
+############################################################################
+#                                                                          #
+#        1D gaussian with linear offset (Z refocus) with analytic Jacobian #
+#                                                                          #
+############################################################################
+
+def gaussianlinearoffset_function(x, amplitude, center, sigma, offset, slope):
+    """ Gaussian peak on top of a linear background.
+
+    @param numpy.ndarray x: independent variable
+    @param float amplitude: height of the gaussian
+    @param float center: center of the gaussian
+    @param float sigma: standard deviation of the gaussian
+    @param float offset: background level at x = 0
+    @param float slope: slope of the background
+
+    @return numpy.ndarray: function values
+    """
+    return offset + slope * x + amplitude * np.exp(-(x - center) ** 2 / (2 * sigma ** 2))
+
+
+def _gaussianlinearoffset_residual(p, x, data):
+    return gaussianlinearoffset_function(x, *p) - data
+
+
+def _gaussianlinearoffset_jacobian(p, x, data):
+    """ Analytic Jacobian with respect to (amplitude, center, sigma, offset, slope). """
+    amplitude, center, sigma, offset, slope = p
+    dx = x - center
+    expo = np.exp(-dx * dx / (2 * sigma ** 2))
+    jac = np.empty((x.size, 5))
+    jac[:, 0] = expo
+    jac[:, 1] = amplitude * expo * dx / sigma ** 2
+    jac[:, 2] = amplitude * expo * dx * dx / sigma ** 3
+    jac[:, 3] = 1.
+    jac[:, 4] = x
+    return jac
+
+
+def fit_gaussianlinearoffset(x_axis, data, peak=True):
+    """ Fast 1D gaussian fit with linear offset of a Z refocus line.
+
+    @param numpy.ndarray x_axis: 1D axis values
+    @param numpy.ndarray data: 1D data, same length as x_axis
+    @param bool peak: True for a peak (positive amplitude), False for a dip
+
+    @return FastFitResult: fit result. The keys of best_values are amplitude, center, sigma,
+                           fwhm, offset and slope.
+    """
+    x_axis = np.asarray(x_axis, dtype=float)
+    data = np.asarray(data, dtype=float)
+
+    x0 = (x_axis[0] + x_axis[-1]) / 2
+    length_scale = abs(x_axis[-1] - x_axis[0])
+    if length_scale == 0:
+        length_scale = 1.
+    data_scale = float(np.max(np.abs(data)))
+    if data_scale == 0:
+        data_scale = 1.
+    u = (x_axis - x0) / length_scale
+    norm_data = data / data_scale
+
+    # Estimator: background from the line through the end points, peak from the extremum
+    edge = max(1, u.size // 10)
+    offset = (np.mean(norm_data[:edge]) + np.mean(norm_data[-edge:])) / 2
+    slope = (np.mean(norm_data[-edge:]) - np.mean(norm_data[:edge])) / max(
+        np.mean(u[-edge:]) - np.mean(u[:edge]), 1e-12)
+    background = offset + slope * u
+    peak_data = norm_data - background if peak else background - norm_data
+    index = np.argmax(peak_data)
+    amplitude = peak_data[index]
+    center = u[index]
+    # width from the area below the peak
+    area = np.sum(np.clip(peak_data, 0, None)) * (abs(u[-1] - u[0]) / max(u.size - 1, 1))
+    sigma = np.clip(area / (amplitude * np.sqrt(2 * np.pi)) if amplitude > 0 else 0.1, 0.01, 1.)
+    if not peak:
+        amplitude = -amplitude
+
+    min_step = np.min(np.abs(np.diff(u))) if u.size > 1 else 1.
+    if peak:
+        lower = np.array([0., -1., min_step / 2, -np.inf, -np.inf])
+        upper = np.array([np.inf, 1., 2., np.inf, np.inf])
+    else:
+        lower = np.array([-np.inf, -1., min_step / 2, -np.inf, -np.inf])
+        upper = np.array([0., 1., 2., np.inf, np.inf])
+    p0 = np.clip(np.array([amplitude, center, sigma, offset, slope]), lower, upper)
+
+    result = least_squares(_gaussianlinearoffset_residual,
+                           p0,
+                           jac=_gaussianlinearoffset_jacobian,
+                           bounds=(lower, upper),
+                           args=(u, norm_data),
+                           x_scale='jac',
+                           method='trf')
+
+    p = result.x
+    success = result.success and np.all(np.isfinite(p))
+    best_values = OrderedDict()
+    best_values['amplitude'] = p[0] * data_scale
+    best_values['center'] = p[1] * length_scale + x0
+    best_values['sigma'] = abs(p[2]) * length_scale
+    best_values['fwhm'] = 2.3548200450309493 * best_values['sigma']
+    # background in unnormalized coordinates: offset + slope * x
+    best_values['slope'] = p[4] * data_scale / length_scale
+    best_values['offset'] = p[3] * data_scale - best_values['slope'] * x0
+
+    best_fit = gaussianlinearoffset_function(x_axis,
+                                             best_values['amplitude'],
+                                             best_values['center'],
+                                             best_values['sigma'],
+                                             best_values['offset'],
+                                             best_values['slope'])
+    return FastFitResult(success, best_values, best_fit, result.message, result.nfev)
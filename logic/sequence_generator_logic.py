@@ -24,7 +24,6 @@ import importlib
 import inspect
 import numpy as np
 import os
-import pickle
 import sys
 import time
 
@@ -38,6 +37,7 @@ from logic.pulse_objects import PulseBlockElement
 from logic.pulse_objects import PulseBlock
 from logic.pulse_objects import PulseBlockEnsemble
 from logic.pulse_objects import PulseSequence
+from logic.pulse_asset_store import open_asset_dict
 from logic.generic_logic import GenericLogic
 from logic.sampling_functions import SamplingFunctions
 from logic.samples_write_methods import SamplesWriteMethods
@@ -191,6 +191,10 @@ class SequenceGeneratorLogic(GenericLogic, SamplingFunctions, SamplesWriteMethod
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
+        for asset_dict in (self.saved_pulse_blocks, self.saved_pulse_block_ensembles,
+                           self.saved_pulse_sequences):
+            if hasattr(asset_dict, 'store'):
+                asset_dict.store.close()
         return
 
     def _attach_predefined_methods(self):
@@ -351,7 +355,6 @@ class SequenceGeneratorLogic(GenericLogic, SamplingFunctions, SamplesWriteMethod
         block.name = name
         self.current_block = block
         self.saved_pulse_blocks[name] = block
-        self._save_blocks_to_file()
         self.sigBlockDictUpdated.emit(self.saved_pulse_blocks)
         return
 
@@ -381,7 +384,6 @@ class SequenceGeneratorLogic(GenericLogic, SamplingFunctions, SamplesWriteMethod
                 if self.current_block.name == name:
                     self.current_block = None
                     self.sigCurrentBlockUpdated.emit(self.current_block)
-            self._save_blocks_to_file()
             self.sigBlockDictUpdated.emit(self.saved_pulse_blocks)
         else:
             self.log.warning('PulseBlock object with name "{0}" not found in saved '
@@ -389,47 +391,18 @@ class SequenceGeneratorLogic(GenericLogic, SamplingFunctions, SamplesWriteMethod
         return
 
     def _get_blocks_from_file(self):
-        """ Update the saved_pulse_block dict from file """
-        block_files = [f for f in os.listdir(self.block_dir) if 'block_dict.blk' in f]
-        if len(block_files) == 0:
-            self.log.info('No serialized block dict was found in {0}.'.format(self.block_dir))
-            self.saved_pulse_blocks = OrderedDict()
-            self.sigBlockDictUpdated.emit(self.saved_pulse_blocks)
-            return
-        # raise error if more than one file is present
-        if len(block_files) > 1:
-            self.log.error('More than one serialized block dict was found in {0}.\n'
-                           'Using {1}.'.format(self.block_dir, block_files[-1]))
-        block_files = block_files[-1]
+        """ Open the database of saved pulse blocks. Only the names are read, the PulseBlock
+        objects are loaded on first access. """
         try:
-            with open(os.path.join(self.block_dir, block_files), 'rb') as infile:
-                self.saved_pulse_blocks = pickle.load(infile)
+            self.saved_pulse_blocks = open_asset_dict(self.block_dir, 'pulse_blocks.db',
+                                                      'block_dict.blk')
         except:
             self.saved_pulse_blocks = OrderedDict()
-            self.log.error('Failed to deserialize ensemble dict "{0}" from "{1}".'
-                           ''.format(block_files, self.block_dir))
+            self.log.exception('Failed to open pulse blocks database in "{0}".'
+                               ''.format(self.block_dir))
         self.sigBlockDictUpdated.emit(self.saved_pulse_blocks)
         return
 
-    def _save_blocks_to_file(self):
-        """ Saves the saved_pulse_block dict to file """
-        try:
-            with open(os.path.join(self.block_dir, 'block_dict.blk.tmp'), 'wb') as outfile:
-                pickle.dump(self.saved_pulse_blocks, outfile)
-        except:
-            self.log.error('Failed to serialize ensemble dict in "{0}".'
-                           ''.format(os.path.join(self.block_dir, 'block_dict.blk.tmp')))
-            return
-        # remove old file and rename temp file
-        try:
-            os.rename(os.path.join(self.block_dir, 'block_dict.blk.tmp'),
-                      os.path.join(self.block_dir, 'block_dict.blk'))
-        except WindowsError:
-            os.remove(os.path.join(self.block_dir, 'block_dict.blk'))
-            os.rename(os.path.join(self.block_dir, 'block_dict.blk.tmp'),
-                      os.path.join(self.block_dir, 'block_dict.blk'))
-        return
-
     def save_ensemble(self, name, ensemble):
         """ Saves a PulseBlockEnsemble with name name to file.
 
@@ -440,7 +413,6 @@ class SequenceGeneratorLogic(GenericLogic, SamplingFunctions, SamplesWriteMethod
         ensemble.name = name
         self.current_ensemble = ensemble
         self.saved_pulse_block_ensembles[name] = ensemble
-        self._save_ensembles_to_file()
         self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
         return
 
@@ -478,7 +450,6 @@ class SequenceGeneratorLogic(GenericLogic, SamplingFunctions, SamplesWriteMethod
                 if self.current_ensemble.name == name:
                     self.current_ensemble = None
                     self.sigCurrentEnsembleUpdated.emit(self.current_ensemble)
-            self._save_ensembles_to_file()
             self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
         else:
             self.log.warning('PulseBlockEnsemble object with name "{0}" not found in saved '
@@ -486,48 +457,19 @@ class SequenceGeneratorLogic(GenericLogic, SamplingFunctions, SamplesWriteMethod
         return
 
     def _get_ensembles_from_file(self):
-        """ Update the saved_pulse_block_ensembles dict from file """
-        ensemble_files = [f for f in os.listdir(self.ensemble_dir) if 'ensemble_dict.ens' in f]
-        if len(ensemble_files) == 0:
-            self.log.info('No serialized ensembles dict was found in {0}.'
-                          ''.format(self.ensemble_dir))
-            self.saved_pulse_block_ensembles = OrderedDict()
-            self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
-            return
-        # raise error if more than one file is present
-        if len(ensemble_files) > 1:
-            self.log.error('More than one serialized ensemble dict was found in {0}.\n'
-                           'Using {1}.'.format(self.ensemble_dir, ensemble_files[-1]))
-        ensemble_files = ensemble_files[-1]
+        """ Open the database of saved pulse block ensembles. Only the names are read, the
+        PulseBlockEnsemble objects are loaded on first access. """
         try:
-            with open(os.path.join(self.ensemble_dir, ensemble_files), 'rb') as infile:
-                self.saved_pulse_block_ensembles = pickle.load(infile)
+            self.saved_pulse_block_ensembles = open_asset_dict(self.ensemble_dir,
+                                                               'pulse_ensembles.db',
+                                                               'ensemble_dict.ens')
         except:
             self.saved_pulse_block_ensembles = OrderedDict()
-            self.log.error('Failed to deserialize ensemble dict "{0}" from "{1}".'
-                           ''.format(ensemble_files, self.ensemble_dir))
+            self.log.exception('Failed to open pulse block ensembles database in "{0}".'
+                               ''.format(self.ensemble_dir))
         self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
         return
 
-    def _save_ensembles_to_file(self):
-        """ Saves the saved_pulse_block_ensembles dict to file """
-        try:
-            with open(os.path.join(self.ensemble_dir, 'ensemble_dict.ens.tmp'), 'wb') as outfile:
-                pickle.dump(self.saved_pulse_block_ensembles, outfile)
-        except:
-            self.log.error('Failed to serialize ensemble dict in "{0}".'
-                           ''.format(os.path.join(self.ensemble_dir, 'ensemble_dict.ens.tmp')))
-            return
-        # remove old file and rename temp file
-        try:
-            os.rename(os.path.join(self.ensemble_dir, 'ensemble_dict.ens.tmp'),
-                      os.path.join(self.ensemble_dir, 'ensemble_dict.ens'))
-        except WindowsError:
-            os.remove(os.path.join(self.ensemble_dir, 'ensemble_dict.ens'))
-            os.rename(os.path.join(self.ensemble_dir, 'ensemble_dict.ens.tmp'),
-                      os.path.join(self.ensemble_dir, 'ensemble_dict.ens'))
-        return
-
     def save_sequence(self, name, sequence):
         """ Serialize the PulseSequence object with name 'name' to file.
 
@@ -541,7 +483,6 @@ class SequenceGeneratorLogic(GenericLogic, SamplingFunctions, SamplesWriteMethod
         sequence.name = name
         self.current_sequence = sequence
         self.saved_pulse_sequences[name] = sequence
-        self._save_sequences_to_file()
         self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
         return
 
@@ -582,7 +523,6 @@ class SequenceGeneratorLogic(GenericLogic, SamplingFunctions, SamplesWriteMethod
                 if self.current_sequence.name == name:
                     self.current_sequence = None
                     self.sigCurrentSequenceUpdated.emit(self.current_sequence)
-            self._save_sequences_to_file()
             self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
         else:
             self.log.warning('PulseBlockEnsemble object with name "{0}" not found in saved '
@@ -618,47 +558,18 @@ class SequenceGeneratorLogic(GenericLogic, SamplingFunctions, SamplesWriteMethod
         return
 
     def _get_sequences_from_file(self):
-        """ Update the saved_pulse_sequences dict from file """
-        sequence_files = [f for f in os.listdir(self.sequence_dir) if 'sequence_dict.sequ' in f]
-        if len(sequence_files) == 0:
-            self.log.info('No serialized sequence dict was found in {0}.'.format(self.sequence_dir))
-            self.saved_pulse_sequences = OrderedDict()
-            self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
-            return
-        # raise error if more than one file is present
-        if len(sequence_files) > 1:
-            self.log.error('More than one serialized sequence dict was found in {0}.\n'
-                           'Using {1}.'.format(self.sequence_dir, sequence_files[-1]))
-        sequence_files = sequence_files[-1]
+        """ Open the database of saved pulse sequences. Only the names are read, the PulseSequence
+        objects are loaded on first access. """
         try:
-            with open(os.path.join(self.sequence_dir, sequence_files), 'rb') as infile:
-                self.saved_pulse_sequences = pickle.load(infile)
+            self.saved_pulse_sequences = open_asset_dict(self.sequence_dir, 'pulse_sequences.db',
+                                                         'sequence_dict.sequ')
         except:
             self.saved_pulse_sequences = OrderedDict()
-            self.log.error('Failed to deserialize sequence dict "{0}" from "{1}".'
-                           ''.format(sequence_files, self.sequence_dir))
+            self.log.exception('Failed to open pulse sequences database in "{0}".'
+                               ''.format(self.sequence_dir))
         self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
         return
 
-    def _save_sequences_to_file(self):
-        """ Saves the saved_pulse_sequences dict to file """
-        try:
-            with open(os.path.join(self.sequence_dir, 'sequence_dict.sequ.tmp'), 'wb') as outfile:
-                pickle.dump(self.saved_pulse_sequences, outfile)
-        except:
-            self.log.error('Failed to serialize ensemble dict in "{0}".'
-                           ''.format(os.path.join(self.sequence_dir, 'sequence_dict.sequ.tmp')))
-            return
-        # remove old file and rename temp file
-        try:
-            os.rename(os.path.join(self.sequence_dir, 'sequence_dict.sequ.tmp'),
-                      os.path.join(self.sequence_dir, 'sequence_dict.sequ'))
-        except WindowsError:
-            os.remove(os.path.join(self.sequence_dir, 'sequence_dict.sequ'))
-            os.rename(os.path.join(self.sequence_dir, 'sequence_dict.sequ.tmp'),
-                      os.path.join(self.sequence_dir, 'sequence_dict.sequ'))
-        return
-
     #---------------------------------------------------------------------------
     #                    END sequence/block generation
     #---------------------------------------------------------------------------
@@ -33,6 +33,98 @@ from logic.generic_logic import GenericLogic
 from qtpy import QtCore
 
 
+class RaggedBinnings:
+    """ All binnings of a single shot signal stored in one flat array.
+
+    Binning i has the bin width widths[i] and is data[offsets[i]:offsets[i + 1]]. Indexing and
+    iterating gives these slices as views, so the object can be used like a list of arrays.
+    """
+
+    def __init__(self, data, offsets, widths):
+        """
+        @param numpy.ndarray data: binned values of all binnings, concatenated along axis 0
+        @param numpy.ndarray offsets: start index of every binning in data plus the total length
+        @param numpy.ndarray widths: number of rows summed up in one bin for every binning
+        """
+        self.data = data
+        self.offsets = offsets
+        self.widths = widths
+
+    @classmethod
+    def from_signal(cls, signal, max_width):
+        """ Calculate all binnings with bin widths 1 to max_width from a cumulative sum.
+        Incomplete bins at the end of the signal are dropped.
+
+        @param numpy.ndarray signal: summed laser pulses, dimensionality is n_rows x n_laserpulses
+        @param int max_width: largest number of rows summed up in one bin
+
+        @return RaggedBinnings: all binnings of the signal
+        """
+        n_rows = signal.shape[0]
+        widths = np.arange(1, max(max_width, 0) + 1, dtype=np.int64)
+        counts = n_rows // widths
+        offsets = np.zeros(len(widths) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        cumsum = np.zeros((n_rows + 1,) + signal.shape[1:], dtype=np.result_type(signal, np.int64))
+        np.cumsum(signal, axis=0, out=cumsum[1:])
+        # end index of every bin of every binning
+        bin_widths = np.repeat(widths, counts)
+        bin_numbers = np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts) + 1
+        ends = bin_widths * bin_numbers
+        return cls(cumsum[ends] - cumsum[ends - bin_widths], offsets, widths)
+
+    def normalized(self):
+        """ Normalized signal (a - b) / (a + b) of the first two laser pulses of every bin.
+
+        @return RaggedBinnings: binnings of the normalized signal
+        """
+        data = (self.data[:, 0] - self.data[:, 1]) / (self.data[:, 0] + self.data[:, 1])
+        return RaggedBinnings(data, self.offsets, self.widths)
+
+    def save(self, filename):
+        """ Save the binnings to a numpy .npz file with the arrays data, offsets and widths.
+
+        @param str filename: path of the file
+        """
+        np.savez(filename, data=self.data, offsets=self.offsets, widths=self.widths)
+
+    @classmethod
+    def load(cls, filename):
+        """ Load binnings saved with save. Bin lists saved as .npy files by older versions,
+        with the binning of width i + 1 at index i, are converted.
+
+        @param str filename: path of the .npz or the old .npy file
+
+        @return RaggedBinnings: the loaded binnings
+        """
+        if filename.endswith('.npy'):
+            bin_list = list(np.load(filename, allow_pickle=True))
+            offsets = np.zeros(len(bin_list) + 1, dtype=np.int64)
+            np.cumsum([len(binning) for binning in bin_list], out=offsets[1:])
+            if bin_list:
+                data = np.concatenate(bin_list)
+            else:
+                data = np.empty(0)
+            return cls(data, offsets, np.arange(1, len(bin_list) + 1, dtype=np.int64))
+        with np.load(filename) as npz:
+            return cls(npz['data'], npz['offsets'], npz['widths'])
+
+    def __len__(self):
+        return len(self.widths)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Binning index out of range.')
+        return self.data[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
 class SingleShotLogic(GenericLogic):
     """ This class brings raw data coming from fastcounter measurements (gated or ungated)
         into trace form processable by the trace_analysis_logic.
@@ -198,9 +290,9 @@ class SingleShotLogic(GenericLogic):
         start_stop_tupel_list = self.find_laser(smoothing=smoothing, n_laserpulses=n_laserpulses)
         if self.data_dict:
             data = self.data_dict['raw_data']
-            for row in data:
-                laser_pulses = [np.sum(row[jj[0]:jj[1]]) for jj in start_stop_tupel_list]
-                sum_single_pulses.append(laser_pulses)
+            sum_single_pulses = [np.sum(data[:, start:stop], axis=1)
+                                 for start, stop in start_stop_tupel_list]
+            return np.array(sum_single_pulses).T
         else:
             self.log.error('Pull data from fastcounting device using get_data function before trying to sum_laserpulse.')
 
@@ -227,64 +319,32 @@ class SingleShotLogic(GenericLogic):
 
     def calc_all_binnings(self, num_bins=100):
         """
-        calculate reasonable binnings of the signal
+        calculate reasonable binnings of the signal. All binnings are calculated at once from the
+        cumulative sum of the signal.
         @param int num_bins: minimal number the binnings can have
-        @return list bin_list: Contains the arrays with the binned data.
+        @return RaggedBinnings bin_list: Contains the arrays with the binned data.
                                Data is structured as follows: bin_list[0] is the
                                initial binning given by the measurement and then going up.
         """
 
-        if self.data_dict:
-            data = self.data_dict
-        else:
+        if not self.data_dict:
             self.log.error('Pull data from fastcounting device using get_data function '
                            'before trying to calc_all_binnings.')
+            return RaggedBinnings(np.empty((0, 2)), np.zeros(1, dtype=np.int64),
+                                  np.empty(0, dtype=np.int64))
 
-        NN = data['n_rows']
-        # this is just a guess value, at some point it doesn't make
-        # sense anymore to further decrease the number of bins
-        max_bin = NN // num_bins
-        count_var = 1
-        bin_list = []
-        temp_list = []
-        signal = self.sum_laserpulse()
-        while count_var <= max_bin:
-            # check if the the first run through loop was done
-            if temp_list:
-                app_arr = np.array(temp_list)
-                bin_list.append(app_arr)
-                temp_list = []
-            jj = 0
-            while jj < NN:
-                sum_ind = np.linspace(jj, jj + count_var - 1, count_var, dtype=np.int)
-                # make sure we don't try to adress not reserved memory
-                jj += count_var
-                if sum_ind[-1] < NN:
-                    # normalize
-                    temp_list.append(np.array([np.sum(signal[sum_ind, 0]), np.sum(signal[sum_ind, 1])]))
-                else:
-                    jj = NN
-            count_var += 1
-
-        return np.array(bin_list)
+        max_width = self.data_dict['n_rows'] // num_bins
+        return RaggedBinnings.from_signal(self.sum_laserpulse(), max_width)
 
     def calc_all_binnings_normalized(self, num_bins=100):
         """
         Calculate all normalized binnings from singleshot data
         @param integer num_bins: Tells how many data points should still remain ( in this sense restricts the maximum
                                  number of data points added up together )
-        @return list normalized_bin_list: The entries are numpy arrays that represent different binnings
-                                          ( 1 to n values)
+        @return RaggedBinnings normalized_bin_list: The entries are numpy arrays that represent
+                                                    different binnings ( 1 to n values)
         """
-
-        bin_list = self.calc_all_binnings(num_bins=num_bins)
-        normalized_bin_list = []
-        for binning in bin_list:
-            normalized_binning = (binning[:, 0] - binning[:, 1])/(binning[:, 0] + binning[:, 1])
-            normalized_bin_list.append(normalized_binning)
-
-        return np.array(normalized_bin_list)
-
+        return self.calc_all_binnings(num_bins=num_bins).normalized()
 
     def get_timetrace(self):
         """
@@ -297,7 +357,7 @@ class SingleShotLogic(GenericLogic):
         # what needs to be done here now is the basic evaluation steps like fit, threshold
         # readout fidelity
 
-        bin_list = self.calc_all_binnings(self, num_bins=100)
+        bin_list = self.calc_all_binnings(num_bins=100)
 
         param_dict_list = []
         fidelity_list = []
@@ -448,7 +508,7 @@ class SingleShotLogic(GenericLogic):
 
             normalized_bin_list = self.calc_all_binnings_normalized()
             save_path2 = os.path.join(filepath, filelabel2)
-            np.save(save_path2, normalized_bin_list)
+            normalized_bin_list.save(save_path2)
             if visualize:
                 visualize_path = os.path.join(filepath, timestamp_str + '_visualize_bins')
                 os.mkdir(visualize_path)
@@ -462,7 +522,7 @@ class SingleShotLogic(GenericLogic):
 
             bin_list = self.calc_all_binnings()
             save_path1 = os.path.join(filepath, filelabel1)
-            np.save(save_path1, bin_list)
+            bin_list.save(save_path1)
 
         meta_data_dict = copy.deepcopy(self.data_dict)
         meta_data_dict.pop('raw_data')
@@ -518,7 +578,7 @@ class SingleShotLogic(GenericLogic):
         @param record_length:
         @return:
         """
-        normalized_bin_list = self.calc_all_binnings_normalized(self, num_bins=100)
+        normalized_bin_list = self.calc_all_binnings_normalized(num_bins=100)
 
         # for now take only the initial binning
         data = normalized_bin_list[0]
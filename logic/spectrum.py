@@ -23,13 +23,65 @@ from qtpy import QtCore
 from collections import OrderedDict
 import numpy as np
 import matplotlib.pyplot as plt
+import os
+import time
 
-from core.module import Connector
+from core.module import Connector, ConfigOption
 from core.util.mutex import Mutex
 from core.util.network import netobtain
 from logic.generic_logic import GenericLogic
 
 
+class DifferentialSpectrumWorker(QtCore.QObject):
+
+    """ Helper class that records pairs of modulation on/off spectra in a separate thread. """
+
+    # phases of one iteration of the differential spectrum loop
+    timing_phases = ('modulation_on', 'record_on', 'modulation_off', 'record_off', 'accumulate',
+                     'write_raw')
+
+    sigFinished = QtCore.Signal()
+
+    def __init__(self, parentclass):
+        super().__init__()
+
+        # remember the reference to the parent class to access functions ad settings
+        self._parentclass = parentclass
+
+    @QtCore.Slot()
+    def run(self):
+        """ Record and accumulate on/off pairs until the differential measurement is stopped.
+            The data of the logic is published at most every gui_update_interval seconds.
+        """
+        parent = self._parentclass
+        spectrometer = parent._spectrometer_device
+        last_update = time.perf_counter()
+
+        while parent._continue_differential:
+            t0 = time.perf_counter()
+            parent.toggle_modulation(on=True)
+            t1 = time.perf_counter()
+            signal_on = netobtain(spectrometer.recordSpectrum())[1, :]
+            t2 = time.perf_counter()
+            parent.toggle_modulation(on=False)
+            t3 = time.perf_counter()
+            signal_off = netobtain(spectrometer.recordSpectrum())[1, :]
+            t4 = time.perf_counter()
+            parent._accumulate_pair(signal_on, signal_off)
+            t5 = time.perf_counter()
+            parent._write_raw_pair(signal_on, signal_off)
+            t6 = time.perf_counter()
+            parent._iteration_timings.append(
+                (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t6 - t5))
+
+            if t6 - last_update >= parent._gui_update_interval:
+                parent._publish_differential_data()
+                last_update = t6
+
+        parent._publish_differential_data()
+        self.sigFinished.emit()
+
+
 class SpectrumLogic(GenericLogic):
 
     """This logic module gathers data from the spectrometer.
@@ -46,6 +98,10 @@ class SpectrumLogic(GenericLogic):
     odmrlogic1 = Connector(interface='ODMRLogic')
     savelogic = Connector(interface='SaveLogic')
 
+    # config opts
+    _gui_update_interval = ConfigOption('gui_update_interval', 0.5)
+    _save_raw_spectra = ConfigOption('save_raw_spectra', True)
+
     def __init__(self, **kwargs):
         """ Create SpectrometerLogic object with connectors.
 
@@ -68,13 +124,33 @@ class SpectrumLogic(GenericLogic):
         self._odmr_logic = self.odmrlogic1()
         self._save_logic = self.savelogic()
 
-        self.sig_next_diff_loop.connect(self._loop_differential_spectrum)
+        self._continue_differential = False
+        # the worker is in its acquisition loop (it can still be after a stop)
+        self._differential_running = False
+        self._start_pending = False
+        self._raw_file = None
+        self._raw_filename = ''
+        self._iteration_timings = list()
+        self.diff_spec_variance = OrderedDict()
+
+        # create an indepentent thread for the differential spectrum acquisition
+        self.acquisition_thread = QtCore.QThread()
+        self._diff_worker = DifferentialSpectrumWorker(self)
+        self._diff_worker.moveToThread(self.acquisition_thread)
+        self.sig_next_diff_loop.connect(self._diff_worker.run, QtCore.Qt.QueuedConnection)
+        self._diff_worker.sigFinished.connect(self._differential_finished,
+                                              QtCore.Qt.QueuedConnection)
+        self.acquisition_thread.start()
 
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
-        if self.module_state() != 'idle' and self.module_state() != 'deactivated':
-            pass
+        self._continue_differential = False
+        self.acquisition_thread.quit()
+        self.acquisition_thread.wait()
+        self.sig_next_diff_loop.disconnect()
+        self._diff_worker.sigFinished.disconnect()
+        self._close_raw_file()
 
     def get_single_spectrum(self):
         """ Record a single spectrum from the spectrometer.
@@ -97,9 +173,19 @@ class SpectrumLogic(GenericLogic):
 
     def start_differential_spectrum(self):
         """Start a differential spectrum acquisition.  An initial spectrum is recorded to initialise the data arrays to the right size.
-        """
 
-        self._continue_differential = True
+        The modulation on/off pairs are recorded in a worker thread. Sums and sums of squares of
+        the on, off and differential signals are accumulated in place, every raw spectrum is
+        appended to a raw data file (config option save_raw_spectra).
+        """
+        if self._continue_differential:
+            self.log.warning('Differential spectrum acquisition is already running.')
+            return
+        if self._differential_running:
+            # the worker still records the last pair of the stopped acquisition and writes it to
+            # the raw file, start when it has finished
+            self._start_pending = True
+            return
 
         # Taking a demo spectrum gives us the wavelength values and the length of the spectrum data.
         demo_data = netobtain(self._spectrometer_device.recordSpectrum())
@@ -108,59 +194,179 @@ class SpectrumLogic(GenericLogic):
         empty_signal = np.zeros(len(wavelengths))
 
         # Using this information to initialise the differential spectrum data arrays.
-        self.spectrum_data = np.array([wavelengths, empty_signal])
-        self.diff_spec_data_mod_on = np.array([wavelengths, empty_signal])
-        self.diff_spec_data_mod_off = np.array([wavelengths, empty_signal])
-        self.repetition_count = 0
+        with self.threadlock:
+            self.spectrum_data = np.array([wavelengths, empty_signal])
+            self.diff_spec_data_mod_on = np.array([wavelengths, empty_signal])
+            self.diff_spec_data_mod_off = np.array([wavelengths, empty_signal])
+            self.repetition_count = 0
+            self._wavelengths = wavelengths.copy()
+            self._sum_on = np.zeros(len(wavelengths))
+            self._sum_off = np.zeros(len(wavelengths))
+            self._sum_sq_on = np.zeros(len(wavelengths))
+            self._sum_sq_off = np.zeros(len(wavelengths))
+            self._sum_sq_diff = np.zeros(len(wavelengths))
+            self._buffer = np.zeros(len(wavelengths))
+            self._iteration_timings = list()
+            self._acquisition_start = time.time()
+
+        self._close_raw_file()
+        if self._save_raw_spectra:
+            self._open_raw_file()
 
         # Starting the measurement loop
-        self._loop_differential_spectrum()
+        self.resume_differential_spectrum()
 
     def resume_differential_spectrum(self):
         """Resume a differential spectrum acquisition.
         """
+        if self._continue_differential:
+            return
+        if len(self.diff_spec_data_mod_on) == 0:
+            self.log.error('No differential spectrum to resume. Start a new one instead.')
+            return
 
         self._continue_differential = True
+        self._start_pending = False
+        if self._differential_running:
+            # stopped but not finished yet, the worker just stays in its loop
+            return
 
         # Starting the measurement loop
-        self._loop_differential_spectrum()
+        self._differential_running = True
+        self.sig_next_diff_loop.emit()
 
-    def _loop_differential_spectrum(self):
-        """ This loop toggles the modulation and iteratively records a differential spectrum.
+    def stop_differential_spectrum(self):
+        """Stop an ongoing differential spectrum acquisition
         """
 
-        # If the loop should not continue, then return immediately without
-        # emitting any signal to repeat.
-        if not self._continue_differential:
-            return
-
-        # Otherwise, we make a measurement and then emit a signal to repeat this loop.
-
-        # Toggle on, take spectrum and add data to the mod_on data
-        self.toggle_modulation(on=True)
-        these_data = netobtain(self._spectrometer_device.recordSpectrum())
-        self.diff_spec_data_mod_on[1, :] += these_data[1, :]
+        self._continue_differential = False
+        self._start_pending = False
 
-        # Toggle off, take spectrum and add data to the mod_off data
-        self.toggle_modulation(on=False)
-        these_data = netobtain(self._spectrometer_device.recordSpectrum())
-        self.diff_spec_data_mod_off[1, :] += these_data[1, :]
+    def _differential_finished(self):
+        """ Called when the worker has left the acquisition loop. Logs the timing summary and
+        starts an acquisition requested while the worker was still running.
+        """
+        if self._continue_differential:
+            # resumed after the worker left the loop but before this was called
+            self.sig_next_diff_loop.emit()
+            return
+        self._differential_running = False
+        if self._raw_file is not None:
+            self._raw_file.flush()
+        timings = self.get_iteration_timings()
+        if len(timings['total']) > 0:
+            self.log.debug('Differential spectrum: {0} pairs, mean durations per pair: {1}'.format(
+                len(timings['total']),
+                ', '.join('{0} {1:.1f} ms'.format(phase, 1e3 * np.mean(durations))
+                          for phase, durations in timings.items())))
+        if self._start_pending:
+            self._start_pending = False
+            self.start_differential_spectrum()
+
+    def _accumulate_pair(self, signal_on, signal_off):
+        """ Add an on/off pair of spectra to the running sums. Runs in the worker thread.
+
+          @param numpy.ndarray signal_on: intensities with modulation on
+          @param numpy.ndarray signal_off: intensities with modulation off
+        """
+        with self.threadlock:
+            self._sum_on += signal_on
+            self._sum_off += signal_off
+            np.multiply(signal_on, signal_on, out=self._buffer)
+            self._sum_sq_on += self._buffer
+            np.multiply(signal_off, signal_off, out=self._buffer)
+            self._sum_sq_off += self._buffer
+            np.subtract(signal_on, signal_off, out=self._buffer)
+            self._buffer *= self._buffer
+            self._sum_sq_diff += self._buffer
+            self.repetition_count += 1
+
+    def _publish_differential_data(self):
+        """ Copy the running sums to the data arrays read by the GUI and tell it to update.
+        """
+        with self.threadlock:
+            count = self.repetition_count
+            self.diff_spec_data_mod_on = np.array([self._wavelengths, self._sum_on])
+            self.diff_spec_data_mod_off = np.array([self._wavelengths, self._sum_off])
+            self.spectrum_data = np.array([self._wavelengths, self._sum_on - self._sum_off])
+            variance = OrderedDict()
+            if count > 1:
+                for key, sums, sums_sq in (
+                        ('mod_on', self._sum_on, self._sum_sq_on),
+                        ('mod_off', self._sum_off, self._sum_sq_off),
+                        ('differential', self._sum_on - self._sum_off, self._sum_sq_diff)):
+                    variance[key] = np.maximum(sums_sq - sums * sums / count, 0) / (count - 1)
+            self.diff_spec_variance = variance
+        self.sig_specdata_updated.emit()
 
-        self.repetition_count += 1    # increment the loop count
+    def get_iteration_timings(self):
+        """ Durations of the phases of every on/off pair of the current differential spectrum.
 
-        # Calculate the differential spectrum
-        self.spectrum_data[1, :] = self.diff_spec_data_mod_on[
-            1, :] - self.diff_spec_data_mod_off[1, :]
+          @return OrderedDict: phase name and numpy array of durations in s. The phases are
+                               modulation_on, record_on, modulation_off, record_off, accumulate,
+                               write_raw and total.
+        """
+        timings = np.array(self._iteration_timings).reshape(
+            -1, len(DifferentialSpectrumWorker.timing_phases))
+        result = OrderedDict()
+        for index, phase in enumerate(DifferentialSpectrumWorker.timing_phases):
+            result[phase] = timings[:, index]
+        result['total'] = timings.sum(axis=1)
+        return result
+
+    def _open_raw_file(self):
+        """ Create the append-only raw data file of a differential spectrum. Every row holds
+            pair index, modulation (1 on, 0 off), time since start in s and the intensities.
+            The first row holds pair index -1, the number of wavelengths, 0 and the wavelengths.
+        """
+        filepath = self._save_logic.get_path_for_module(module_name='spectra')
+        self._raw_filename = os.path.join(
+            filepath,
+            time.strftime('%Y%m%d-%H%M-%S', time.localtime(self._acquisition_start))
+            + '_differential_spectrum_raw.dat')
+        try:
+            self._raw_file = open(self._raw_filename, 'ab')
+            self._raw_file.write(
+                np.concatenate(([-1, len(self._wavelengths), 0], self._wavelengths)).astype(np.float64).tobytes())
+        except OSError:
+            self.log.exception('Could not open raw spectrum file {0}.'.format(self._raw_filename))
+            self._raw_file = None
+
+    def _write_raw_pair(self, signal_on, signal_off):
+        """ Append an on/off pair of raw spectra to the raw data file. Runs in the worker thread.
+        """
+        if self._raw_file is None:
+            return
+        header = np.array([[self.repetition_count - 1, 1], [self.repetition_count - 1, 0]])
+        rows = np.empty((2, 3 + len(signal_on)), dtype=np.float64)
+        rows[:, :2] = header
+        rows[:, 2] = time.time() - self._acquisition_start
+        rows[0, 3:] = signal_on
+        rows[1, 3:] = signal_off
+        self._raw_file.write(rows.tobytes())
+        self._raw_file.flush()
+
+    def _close_raw_file(self):
+        """ Close the raw data file of the last differential spectrum.
+        """
+        if self._raw_file is not None:
+            self._raw_file.close()
+            self._raw_file = None
 
-        self.sig_specdata_updated.emit()
+    @staticmethod
+    def load_raw_spectra(filename):
+        """ Load a raw data file written during a differential spectrum acquisition.
 
-        self.sig_next_diff_loop.emit()
+          @param str filename: path of the raw data file
 
-    def stop_differential_spectrum(self):
-        """Stop an ongoing differential spectrum acquisition
+          @return tuple(wavelengths, records): numpy array of the wavelengths and 2D numpy array
+                  with one row per spectrum (pair index, modulation, time, intensities)
         """
-
-        self._continue_differential = False
+        raw = np.fromfile(filename, dtype=np.float64)
+        # the first row holds the number of wavelengths in the modulation column
+        row_length = 3 + int(raw[1])
+        records = raw[:len(raw) - len(raw) % row_length].reshape(-1, row_length)
+        return records[0, 3:], records[1:]
 
     def toggle_modulation(self, on):
         """ Toggle the modulation.
@@ -193,6 +399,12 @@ class SpectrumLogic(GenericLogic):
             data['signal_mod_on'] = self.diff_spec_data_mod_on[1, :]
             data['signal_mod_off'] = self.diff_spec_data_mod_off[1, :]
             data['differential'] = self.spectrum_data[1, :]
+            if 'differential' in self.diff_spec_variance:
+                # standard deviation of the summed differential signal
+                data['differential_error'] = np.sqrt(
+                    self.repetition_count * self.diff_spec_variance['differential'])
+            if self._raw_filename:
+                parameters['Raw spectra file'] = self._raw_filename
         else:
             data['signal'] = self.spectrum_data[1, :]
 
@@ -201,7 +413,7 @@ class SpectrumLogic(GenericLogic):
 
         fig, ax1 = plt.subplots()
 
-        ax1.plot(data['wavelength'], data['signal'])
+        ax1.plot(data['wavelength'], self.spectrum_data[1, :])
 
         ax1.set_xlabel('Wavelength (nm)')
         ax1.set_ylabel('Signal (arb. u.)')
@@ -235,36 +235,27 @@ class TraceAnalysisLogic(GenericLogic):
                       float lifetime_dark: the lifetime in the dark state in s
                       float lifetime_bright: lifetime in the bright state in s
         """
-        no_flip = 0.0
+        trace = np.asarray(trace)
+        current = trace[:-1]
+        following = trace[1:]
 
         if analyze_mode == 'full':
-            for ii in range(len(trace) - 1):
-                if trace[ii] > threshold and trace[ii + 1] > threshold:
-                    no_flip = no_flip + 1
-
-                elif trace[ii] < threshold and trace[ii + 1] < threshold:
-                    no_flip = no_flip + 1
-
+            no_flip = np.count_nonzero((current > threshold) & (following > threshold))
+            no_flip += np.count_nonzero((current < threshold) & (following < threshold))
             probability = 1.0 - (no_flip / len(trace))
             lost_events = 0.0
 
         if analyze_mode == 'dark':
-            dark_counter = 0.0
-            for ii in range(len(trace) - 1):
-                if trace[ii] < threshold:
-                    dark_counter = dark_counter + 1
-                    if trace[ii + 1] < threshold:
-                        no_flip = no_flip + 1
+            is_dark = current < threshold
+            dark_counter = float(np.count_nonzero(is_dark))
+            no_flip = np.count_nonzero(is_dark & (following < threshold))
             probability = 1.0 - (no_flip / dark_counter)
             lost_events = (1.0 - (dark_counter / len(trace))) * 100
 
         if analyze_mode == 'bright':
-            bright_counter = 0.0
-            for ii in range(len(trace) - 1):
-                if trace[ii] > threshold:
-                    bright_counter = bright_counter + 1
-                    if trace[ii + 1] > threshold:
-                        no_flip = no_flip + 1
+            is_bright = current > threshold
+            bright_counter = float(np.count_nonzero(is_bright))
+            no_flip = np.count_nonzero(is_bright & (following > threshold))
             probability = 1.0 - (no_flip / bright_counter)
             lost_events = (1.0 - (bright_counter / len(trace))) * 100
 
@@ -285,39 +276,12 @@ class TraceAnalysisLogic(GenericLogic):
                       float lifetime_dark: the lifetime in the dark state in s
                       float lifetime_bright: lifetime in the bright state in s
         """
-        no_flip = 0.0
-        flip = 0.0
-
-        # find all indices in the trace-array, where the value is above init_threshold[1]
-        init_high = np.where(trace[:-1] > init_threshold[1])[0]
-        # find all indices in the trace-array, where the value is below init_threshold[0]
-        init_low = np.where(trace[:-1] < init_threshold[0])[0]
-        # find all indices in the trace-array, where the value is above ana_threshold[1]
-        ana_high = np.where(trace > ana_threshold[1])[0]
-        # find all indices in the trace-array, where the value is below ana_threshold[0]
-        ana_low = np.where(trace < ana_threshold[0])[0]
-
-        if analyze_mode == 'bright' or analyze_mode == 'full':
-            # analyze the trace where the data were the nuclear was initalized into one direction
-            for index in init_high:
-                # check if the following data point is in the analysis array
-                if index + 1 in ana_high:
-                    no_flip = no_flip + 1
-                elif index + 1 in ana_low:
-                    flip = flip + 1
-
-        if analyze_mode == 'dark' or analyze_mode == 'full':
-            # repeat the same if the nucleus was initalized into the other array
-            for index in init_low:
-                # check if the following data point is in the analysis array
-                if index + 1 in ana_high:
-                    flip = flip + 1
-                elif index + 1 in ana_low:
-                    no_flip = no_flip + 1
+        flip, no_flip = self._count_flips(trace, init_threshold, ana_threshold, analyze_mode)
 
         # the flip probability is given by the number of flips divided by the total number of analyzed data points
         if (flip + no_flip) == 0:
             self.log.error('There is not enough data to anaylsis SSR!')
+            probability = np.nan
         else:
             probability = flip / (flip + no_flip)
         # the number of lost events is given by the length of the time_trace minus the number of analyzed data points
@@ -365,33 +329,7 @@ class TraceAnalysisLogic(GenericLogic):
             self.log.warning('Not enough data points yet!')
 
         # calculate the flip probability
-        no_flip = 0.0
-        flip = 0.0
-        # find all indices in the trace-array, where the value is above init_threshold[1]
-        init_high = np.where(trace[:-1] > init_threshold[1])[0]
-        # find all indices in the trace-array, where the value is below init_threshold[0]
-        init_low = np.where(trace[:-1] < init_threshold[0])[0]
-        # find all indices in the trace-array, where the value is above ana_threshold[1]
-        ana_high = np.where(trace > ana_threshold[1])[0]
-        # find all indices in the trace-array, where the value is below ana_threshold[0]
-        ana_low = np.where(trace < ana_threshold[0])[0]
-
-        if analyze_mode == 'bright' or analyze_mode == 'full':
-            # analyze the trace where the data were the nuclear was initalized into one direction
-            for index in init_high:
-                # check if the following data point is in the analysis array
-                if index + 1 in ana_high:
-                    no_flip = no_flip + 1
-                elif index + 1 in ana_low:
-                    flip = flip + 1
-        if analyze_mode == 'dark' or analyze_mode == 'full':
-            # repeat the same if the nucleus was initalized into the other array
-            for index in init_low:
-                # check if the following data point is in the analysis array
-                if index + 1 in ana_high:
-                    flip = flip + 1
-                elif index + 1 in ana_low:
-                    no_flip = no_flip + 1
+        flip, no_flip = self._count_flips(trace, init_threshold, ana_threshold, analyze_mode)
 
         # the flip probability is given by the number of flips divided by the total number of analyzed data points
         if (flip + no_flip) == 0:
@@ -410,6 +348,34 @@ class TraceAnalysisLogic(GenericLogic):
 
         return self.spin_flip_prob, lost_events, hist_fit_x, hist_fit_y, fit_result
 
+    def _count_flips(self, trace, init_threshold, ana_threshold, analyze_mode):
+        """ Count the flips and non-flips between consecutive data points of a trace.
+
+        A data point above init_threshold[1] (below init_threshold[0]) initializes the bright
+        (dark) state, the following data point is analyzed as bright if it is above
+        ana_threshold[1] and otherwise as dark if it is below ana_threshold[0].
+        @param np.array trace: 1D trace of data
+        @param list init_threshold: lower and upper threshold for the initialization
+        @param list ana_threshold: lower and upper threshold for the analysis
+        @param str analyze_mode: 'full', 'bright' or 'dark' initialization is analyzed
+        @return tuple(flip, no_flip): number of flipped and not flipped data points
+        """
+        trace = np.asarray(trace)
+        init_high = trace[:-1] > init_threshold[1]
+        init_low = trace[:-1] < init_threshold[0]
+        ana_high = trace[1:] > ana_threshold[1]
+        ana_low = (trace[1:] < ana_threshold[0]) & ~ana_high
+
+        flip = 0
+        no_flip = 0
+        if analyze_mode == 'bright' or analyze_mode == 'full':
+            no_flip += np.count_nonzero(init_high & ana_high)
+            flip += np.count_nonzero(init_high & ana_low)
+        if analyze_mode == 'dark' or analyze_mode == 'full':
+            flip += np.count_nonzero(init_low & ana_high)
+            no_flip += np.count_nonzero(init_low & ana_low)
+        return float(flip), float(no_flip)
+
     def analyze_flip_prob_postselect(self):
         """ Post select the data trace so that the flip probability is only
             calculated from a jump from below a threshold value to an value
@@ -505,50 +471,7 @@ class TraceAnalysisLogic(GenericLogic):
                                                                                distr='gaussian_normalized')
                 threshold = threshold_fit
 
-            # helper functions to get and analyze the timetrace
-            def analog_digitial_converter(cut_off, data):
-                digital_trace = []
-                for data_point in data:
-                    if data_point >= cut_off:
-                        digital_trace.append(1)
-                    else:
-                        digital_trace.append(0)
-                return digital_trace
-
-            def time_in_high_low(digital_trace, dt):
-                """
-                What I need this function to do is to get all consecutive {1, ... , n} 1s or 0s and add
-                them up and put into a list to later make a histogram from them.
-                """
-                occurances = []
-                index = 0
-                index2 = 0
-
-                while (index < len(digital_trace)):
-                    occurances.append(0)
-                    # start following the consecutive 1s
-                    while (digital_trace[index] == 1):
-                        occurances[index2] += 1
-                        if index == (len(digital_trace) - 1):
-                            occurances = np.array(occurances)
-                            return occurances * dt
-                        else:
-                            index += 1
-                    if digital_trace[index - 1] == 1:
-                        index2 += 1
-                        occurances.append(0)
-                    # start following the consecutive 0s
-                    while (digital_trace[index] == 0):
-                        occurances[index2] -= 1
-                        if index == (len(digital_trace) - 1):
-                            occurances = np.array(occurances)
-                            return occurances * dt
-                        else:
-                            index += 1
-                    index2 += 1
-
-            digital_trace = analog_digitial_converter(threshold, trace)
-            time_array = time_in_high_low(digital_trace, dt)
+            time_array = self.calculate_dwell_times(trace, threshold, dt)
 
             # now we need to make a histogram as well as a fit
             # what would be a good estimate for the number of bins
@@ -557,15 +480,12 @@ class TraceAnalysisLogic(GenericLogic):
             # number of steps in between, rather not use that for now
             # est_bins = np.int(longest/dt)
 
-            time_array_high = np.array([ii for ii in filter(lambda x: x > 0, time_array)])
-            time_array_low = np.array([ii for ii in filter(lambda x: x < 0, time_array)])
+            time_array_high = time_array[time_array > 0]
+            time_array_low = time_array[time_array < 0]
 
             # get lifetime of bright state
             time_hist_high = np.histogram(time_array_high, bins=num_bins)
-            vals = [i for i in filter(lambda x: x[1] > 0, enumerate(time_hist_high[0][0:num_bins]))]
-
-            indices = np.array([val[0] for val in vals])
-            indices = np.array([np.int(indice) for indice in indices])
+            indices = np.flatnonzero(time_hist_high[0][0:num_bins] > 0)
             self.log.debug('threshold {0}'.format(threshold))
             self.log.debug('time_array:{0}'.format(time_array))
             self.log.debug('time_array_high:{0}'.format(time_array_high))
@@ -587,10 +507,8 @@ class TraceAnalysisLogic(GenericLogic):
 
             # get lifetime of dark state
             time_hist_low = np.histogram(time_array_low, bins=num_bins)
-            vals = [i for i in filter(lambda x: x[1] > 0, enumerate(time_hist_low[0][0:num_bins]))]
-            indices = np.array([val[0] for val in vals])
-            indices = np.array([np.int(indice) for indice in indices])
-            values = np.array([val[1] for val in vals])
+            indices = np.flatnonzero(time_hist_low[0][0:num_bins] > 0)
+            values = time_hist_low[0][indices]
             # positive axis
             mirror_axis = -time_hist_low[1][indices]
             result = self._fit_logic.make_decayexponential_fit(mirror_axis,
@@ -607,6 +525,24 @@ class TraceAnalysisLogic(GenericLogic):
 
         return lifetime_dict
 
+    def calculate_dwell_times(self, trace, threshold, dt):
+        """ Digitize a trace and calculate the duration of every run of consecutive data points
+            in the same state.
+        @param np.array trace: 1D trace of data
+        @param float threshold: data points greater or equal are in the high state
+        @param float dt: time between two data points
+        @return np.array: duration of every run in order of appearance. Runs in the high state
+                          are positive, runs in the low state negative.
+        """
+        digital_trace = np.asarray(trace) >= threshold
+        if len(digital_trace) == 0:
+            return np.zeros(0)
+        # run length encoding: a run starts at the first point and after every transition
+        transitions = np.flatnonzero(digital_trace[1:] != digital_trace[:-1]) + 1
+        run_starts = np.concatenate(([0], transitions))
+        run_lengths = np.diff(np.append(run_starts, len(digital_trace)))
+        return np.where(digital_trace[run_starts], run_lengths, -run_lengths) * dt
+
     def do_gaussian_fit(self, axis, data):
         """ Perform a gaussian fit.
         @param axis:
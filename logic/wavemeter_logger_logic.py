@@ -34,6 +34,53 @@ from logic.generic_logic import GenericLogic
 from core.util.mutex import Mutex
 
 
+class SampleBuffer:
+
+    """ Growing numpy buffer for rows of samples.
+
+    The rows are stored in a preallocated array whose capacity is doubled when it is full, so
+    appending is amortised O(new rows) and the stored rows are always available as one array.
+    """
+
+    def __init__(self, columns, capacity=1024):
+        """ Create an empty buffer.
+
+        @param int columns: number of values per sample
+        @param int capacity: number of samples to preallocate
+        """
+        self._array = np.empty((capacity, columns))
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def data(self):
+        """ View of the stored samples.
+
+        @return numpy.ndarray: array of shape (samples, columns)
+        """
+        return self._array[:self._length]
+
+    def append(self, rows):
+        """ Append samples to the buffer.
+
+        @param numpy.ndarray rows: array of shape (samples, columns)
+        """
+        rows = np.asarray(rows, dtype=self._array.dtype).reshape(-1, self._array.shape[1])
+        end = self._length + len(rows)
+        if end > len(self._array):
+            grown = np.empty((max(end, 2 * len(self._array)), self._array.shape[1]))
+            grown[:self._length] = self._array[:self._length]
+            self._array = grown
+        self._array[self._length:end] = rows
+        self._length = end
+
+    def clear(self):
+        """ Remove all samples, the capacity is kept. """
+        self._length = 0
+
+
 class HardwarePull(QtCore.QObject):
 
     """ Helper class for running the hardware communication in a separate thread. """
@@ -71,8 +118,8 @@ class HardwarePull(QtCore.QObject):
 
         # only wavelength >200 nm make sense, ignore the rest
         if self._parentclass.current_wavelength > 200:
-            self._parentclass._wavelength_data.append(
-                np.array([time_stamp, self._parentclass.current_wavelength])
+            self._parentclass._wavelength_buffer.append(
+                (time_stamp, self._parentclass.current_wavelength)
             )
 
         # check if we have a new min or max and save it if so
@@ -126,10 +173,16 @@ class WavemeterLoggerLogic(GenericLogic):
 
         self._acqusition_start_time = 0
         self._bins = 200
-        self._data_index = 0
 
         self._recent_wavelength_window = [0, 0]
-        self.counts_with_wavelength = []
+        # rows of (time, wavelength) and of (time, counts, interpolated wavelength)
+        self._wavelength_buffer = SampleBuffer(2)
+        self._counts_buffer = SampleBuffer(3)
+        # number of rows of the counts buffer that are in the histogram and its range
+        self._histogram_index = 0
+        self._histogram_range = None
+        self._recent_sum = np.zeros(3)
+        self._recent_count = 0
 
         self._xmin = 650
         self._xmax = 750
@@ -141,7 +194,8 @@ class WavemeterLoggerLogic(GenericLogic):
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
-        self._wavelength_data = []
+        self._wavelength_buffer.clear()
+        self._counts_buffer.clear()
 
         self.stopRequested = False
 
@@ -183,6 +237,9 @@ class WavemeterLoggerLogic(GenericLogic):
             )
         self.histogram = np.zeros(self.histogram_axis.shape)
         self.envelope_histogram = np.zeros(self.histogram_axis.shape)
+        self.rawhisto = np.zeros(self.histogram_axis.shape)
+        self.sumhisto = np.ones(self.histogram_axis.shape) * 1.0e-10
+        self._histogram_range = (self._bins, self._xmin, self._xmax)
 
         self.sig_update_histogram_next.connect(
             self._attach_counts_to_wavelength,
@@ -218,6 +275,16 @@ class WavemeterLoggerLogic(GenericLogic):
         if len(self.fc.fit_list) > 0:
             self._statusVariables['fits'] = self.fc.save_to_dict()
 
+    @property
+    def _wavelength_data(self):
+        """ Recorded wavelength samples as array of rows (time, wavelength). """
+        return self._wavelength_buffer.data
+
+    @property
+    def counts_with_wavelength(self):
+        """ Counts with interpolated wavelength as array of rows (time, counts, wavelength). """
+        return self._counts_buffer.data
+
     def get_max_wavelength(self):
         """ Current maximum wavelength of the scan.
 
@@ -246,18 +313,21 @@ class WavemeterLoggerLogic(GenericLogic):
             @param float xmin: new minimum wavelength
             @param float xmax: new maximum wavelength
         """
-        if bins is not None:
-            self._bins = bins
-        if xmin is not None:
-            self._xmin = xmin
-        if xmax is not None:
-            self._xmax = xmax
-
-        # create a new x axis from xmin to xmax with bins points
-        self.rawhisto = np.zeros(self._bins)
-        self.envelope_histogram = np.zeros(self._bins)
-        self.sumhisto = np.ones(self._bins) * 1.0e-10
-        self.histogram_axis = np.linspace(self._xmin, self._xmax, self._bins)
+        with self.threadlock:
+            if bins is not None:
+                self._bins = bins
+            if xmin is not None:
+                self._xmin = xmin
+            if xmax is not None:
+                self._xmax = xmax
+
+            # create a new x axis from xmin to xmax with bins points, the histogram is rebuilt
+            # from the stitched data in the next update because the range changed
+            self.rawhisto = np.zeros(self._bins)
+            self.envelope_histogram = np.zeros(self._bins)
+            self.sumhisto = np.ones(self._bins) * 1.0e-10
+            self.histogram = np.zeros(self._bins)
+            self.histogram_axis = np.linspace(self._xmin, self._xmax, self._bins)
         self.sig_update_histogram_next.emit(True)
 
     def get_fit_functions(self):
@@ -298,19 +368,17 @@ class WavemeterLoggerLogic(GenericLogic):
 
         if not resume:
             self._acqusition_start_time = self._counter_logic._saving_start_time
-            self._wavelength_data = []
-
-            self.data_index = 0
+            self._wavelength_buffer.clear()
 
             self._recent_wavelength_window = [0, 0]
-            self.counts_with_wavelength = []
+            self._counts_buffer.clear()
 
-            self.rawhisto = np.zeros(self._bins)
-            self.sumhisto = np.ones(self._bins) * 1.0e-10
+            # force a rebuild of the (empty) histogram
+            self._histogram_range = None
             self.intern_xmax = -1.0
             self.intern_xmin = 1.0e10
-            self.recent_avg = [0, 0, 0]
-            self.recent_count = 0
+            self._recent_sum = np.zeros(3)
+            self._recent_count = 0
 
         # start the measuring thread
         self.sig_handle_timer.emit(True)
@@ -380,13 +448,13 @@ class WavemeterLoggerLogic(GenericLogic):
         # Stitch interpolated wavelength into latest counts array
         latest_stitched_data = np.insert(latest_counts, 2, values=interpolated_wavelengths, axis=1)
 
-        # Add this latest data to the list of counts vs wavelength
-        self.counts_with_wavelength += latest_stitched_data.tolist()
+        # Add this latest data of the first channel to the counts vs wavelength buffer
+        self._counts_buffer.append(latest_stitched_data[:, :3])
 
         # The start of the recent data window for the next round will be the end of this one.
         self._recent_wavelength_window[0] = self._recent_wavelength_window[1]
 
-        # Run the old update histogram method to keep duplicate data
+        # Bin the new stitched data into the histogram
         self._update_histogram(complete_histogram)
 
         # Signal that data has been updated
@@ -399,73 +467,57 @@ class WavemeterLoggerLogic(GenericLogic):
             self.sig_update_histogram_next.emit(False)
 
     def _update_histogram(self, complete_histogram):
-        """ Calculate new points for the histogram.
+        """ Bin the new counts with wavelength into the histogram.
+
+        Only the rows of the stitched data that are not yet in the histogram are binned, so the
+        cost of an update does not grow with the duration of the scan. The complete histogram is
+        rebuilt in one pass if the bins or the wavelength range have changed.
 
         @param bool complete_histogram: should the complete histogram be recalculated, or just the
                                         most recent data?
-        @return:
         """
-
-        # If things like num_of_bins have changed, then recalculate the complete histogram
-        # Note: The histogram may be recalculated (bins changed, etc) from the stitched data.
-        # There is no need to recompute the interpolation for the stitched data.
-        if complete_histogram:
-            count_window = len(self._counter_logic._data_to_save)
-            self._data_index = 0
-            self.log.info('Recalcutating Laser Scanning Histogram for: '
-                          '{0:d} counts and {1:d} wavelength.'.format(
-                              count_window,
-                              len(self._wavelength_data)
-                          )
-                          )
-        else:
-            count_window = min(100, len(self._counter_logic._data_to_save))
-
-        if count_window < 2:
-            time.sleep(self._logic_update_timing * 1e-3)
-            self.sig_update_histogram_next.emit(False)
-            return
-
-        temp = np.array(self._counter_logic._data_to_save[-count_window:])
-
-        # only do something if there is wavelength data to work with
-        if len(self._wavelength_data) > 0:
-
-            for i in self._wavelength_data[self._data_index:]:
-                self._data_index += 1
-
-                if i[1] < self._xmin or i[1] > self._xmax:
-                    continue
-
-                # calculate the bin the new wavelength needs to go in
-                newbin = np.digitize([i[1]], self.histogram_axis)[0]
-                # if the bin make no sense, start from the beginning
-                if newbin > len(self.rawhisto) - 1:
-                    continue
-
-                # sum the counts in rawhisto and count the occurence of the bin in sumhisto
-                interpolation = np.interp(i[0], xp=temp[:, 0], fp=temp[:, 1])
-                self.rawhisto[newbin] += interpolation
-                self.sumhisto[newbin] += 1.0
-
-                self.envelope_histogram[newbin] = np.max([interpolation,
-                                                          self.envelope_histogram[newbin]
-                                                          ])
-
-                datapoint = [i[1], i[0], interpolation]
-                if time.time() - self.last_point_time > 1:
-                    self.sig_new_data_point.emit(self.recent_avg)
-                    self.last_point_time = time.time()
-                    self.recent_count = 0
-                else:
-                    self.recent_count += 1
-                    for j in range(3):
-                        self.recent_avg[j] -= self.recent_avg[j] / self.recent_count
-                        self.recent_avg[j] += datapoint[j] / self.recent_count
+        with self.threadlock:
+            histogram_range = (self._bins, self._xmin, self._xmax)
+            if complete_histogram or histogram_range != self._histogram_range:
+                self._histogram_range = histogram_range
+                self._histogram_index = 0
+                self.rawhisto = np.zeros(self._bins)
+                self.sumhisto = np.ones(self._bins) * 1.0e-10
+                self.envelope_histogram = np.zeros(self._bins)
+                self.log.info('Recalcutating Laser Scanning Histogram for: '
+                              '{0:d} counts and {1:d} wavelength.'.format(
+                                  len(self._counts_buffer),
+                                  len(self._wavelength_buffer)
+                              )
+                              )
+
+            new_data = self._counts_buffer.data[self._histogram_index:]
+            self._histogram_index += len(new_data)
+
+            self._recent_sum += new_data[:, [2, 0, 1]].sum(axis=0)
+            self._recent_count += len(new_data)
+
+            new_data = new_data[(new_data[:, 2] >= self._xmin) & (new_data[:, 2] <= self._xmax)]
+            if len(new_data) > 0:
+                # every wavelength goes in the bin that starts at the next lower axis value
+                bins = np.searchsorted(self.histogram_axis, new_data[:, 2], side='right') - 1
+                bins = np.clip(bins, 0, self._bins - 1)
+
+                # sum the counts in rawhisto and count the occurence of the bins in sumhisto
+                self.rawhisto += np.bincount(bins, weights=new_data[:, 1], minlength=self._bins)
+                self.sumhisto += np.bincount(bins, minlength=self._bins)
+                np.maximum.at(self.envelope_histogram, bins, new_data[:, 1])
 
             # the plot data is the summed counts divided by the occurence of the respective bins
             self.histogram = self.rawhisto / self.sumhisto
 
+        # average of (wavelength, time, counts) of the data of the last second
+        if time.time() - self.last_point_time > 1 and self._recent_count > 0:
+            self.sig_new_data_point.emit(list(self._recent_sum / self._recent_count))
+            self.last_point_time = time.time()
+            self._recent_sum = np.zeros(3)
+            self._recent_count = 0
+
     def save_data(self, timestamp=None):
         """ Save the counter trace data and writes it to a file.
 
@@ -589,8 +641,8 @@ class WavemeterLoggerLogic(GenericLogic):
         """
         # TODO: Draw plot for second APD if it is connected
 
-        wavelength_data = [entry[2] for entry in self.counts_with_wavelength]
-        count_data = np.array([entry[1] for entry in self.counts_with_wavelength])
+        wavelength_data = self.counts_with_wavelength[:, 2]
+        count_data = self.counts_with_wavelength[:, 1]
 
         # Index of max counts, to use to position "0" of frequency-shift axis
         count_max_index = count_data.argmax()
@@ -0,0 +1,665 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains a command line tool for the offline reprocessing of saved raw pulsed
+timetraces.
+
+All raw timetraces (text or npz files saved by the PulsedMeasurementLogic via the SaveLogic)
+found in a directory tree are analysed again with the methods in
+logic/pulse_extraction_methods and logic/pulsed_analysis_methods, optionally fitted with a
+method of logic/fitmethods and collected in two tab separated tables in the output directory:
+
+    pulsed_batch_results.dat: one line per file with its parameters and the fit result
+    pulsed_batch_signals.dat: one line per data point of the signals of all files
+
+The files are handed out in chunks to a pool of worker processes. Every finished file is
+appended to the progress file pulsed_batch_progress.jsonl in the output directory, so an
+interrupted run continues where it stopped when started again with the same settings. Files
+which changed on disk since they were processed are analysed again.
+
+Example:
+
+    python tools/pulsed_batch_analysis.py /data/2017 -o /data/2017_rabi --signal-end 300e-9
+        --fit sine --processes 8
+
+Use --help for a list of all settings.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import argparse
+import ast
+import importlib
+import inspect
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# make the qudi packages importable if the tool is called as a script (also in the worker
+# processes, which import this file again on Windows)
+path_of_qudi = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path_of_qudi not in sys.path:
+    sys.path.insert(0, path_of_qudi)
+
+logger = logging.getLogger(__name__)
+
+RAW_DATA_SUFFIXES = ('raw_timetrace.dat', 'raw_timetrace.npz')
+PROGRESS_FILENAME = 'pulsed_batch_progress.jsonl'
+RESULTS_FILENAME = 'pulsed_batch_results.dat'
+SIGNALS_FILENAME = 'pulsed_batch_signals.dat'
+
+# numpy >= 2 writes scalars as e.g. np.float64(1e-08) and np.True_ in the file headers
+NUMPY_SCALAR_REPR = re.compile(r'\b(?:np|numpy)\.[a-z]+[0-9]*\(([^()]*)\)')
+NUMPY_BOOL_REPR = re.compile(r'\b(?:np|numpy)\.(True|False)_\b')
+
+
+def bind_methods(cls, package, prefixes):
+    """ Bind all functions of the modules in a qudi method package to a class, the same way
+        the logic modules do it.
+
+    @param class cls: the class to bind the functions to
+    @param str package: package name relative to the qudi directory, e.g. 'logic.fitmethods'
+    @param list prefixes: name prefixes of the methods to collect, e.g. ['analyse_']
+
+    @return OrderedDict: method name without prefix: function, for every prefix
+    """
+    methods = OrderedDict((prefix, OrderedDict()) for prefix in prefixes)
+    path = os.path.join(path_of_qudi, *package.split('.'))
+    for entry in sorted(os.listdir(path)):
+        if not (os.path.isfile(os.path.join(path, entry)) and entry.endswith('.py')):
+            continue
+        mod = importlib.import_module('{0}.{1}'.format(package, entry[:-3]))
+        for method in dir(mod):
+            ref = getattr(mod, method)
+            if callable(ref) and (inspect.ismethod(ref) or inspect.isfunction(ref)):
+                setattr(cls, method, ref)
+                for prefix in prefixes:
+                    if method.startswith(prefix):
+                        methods[prefix][method[len(prefix):]] = method
+    return methods
+
+
+class PulsedProcessor:
+    """ Extraction and analysis of raw pulsed timetraces outside of qudi.
+
+    Provides the attributes the methods in logic/pulse_extraction_methods and
+    logic/pulsed_analysis_methods expect from PulseExtractionLogic and PulseAnalysisLogic.
+    """
+
+    def __init__(self, extraction_settings, analysis_settings):
+        """
+        @param dict extraction_settings: like PulseExtractionLogic.extraction_settings
+        @param dict analysis_settings: like PulseAnalysisLogic.analysis_settings
+        """
+        self.log = logger
+        self.extraction_settings = dict(extraction_settings)
+        self.analysis_settings = dict(analysis_settings)
+        self.number_of_lasers = 50
+        self.fast_counter_binwidth = 1e-9
+
+        methods = bind_methods(PulsedProcessor, 'logic.pulse_extraction_methods',
+                               ['gated_', 'ungated_'])
+        self.gated_extraction_methods = methods['gated_']
+        self.ungated_extraction_methods = methods['ungated_']
+        self.analysis_methods = bind_methods(PulsedProcessor, 'logic.pulsed_analysis_methods',
+                                             ['analyse_'])['analyse_']
+
+        method = self.extraction_settings['current_method']
+        if method not in self.gated_extraction_methods and \
+                method not in self.ungated_extraction_methods:
+            raise ValueError('Unknown extraction method "{0}".'.format(method))
+        if self.analysis_settings['current_method'] not in self.analysis_methods:
+            raise ValueError('Unknown analysis method "{0}".'
+                             ''.format(self.analysis_settings['current_method']))
+
+    def extract_laser_pulses(self, count_data, is_gated=False):
+        """ Extract the laser pulses, see PulseExtractionLogic.extract_laser_pulses.
+
+        @param numpy.ndarray count_data: raw timetrace, 1D (ungated) or 2D (gated)
+        @param bool is_gated: was the fast counter gated
+
+        @return dict: the result of the extraction method
+        """
+        self.threshold_tolerance_bin = int(
+            self.extraction_settings['threshold_tolerance'] / self.fast_counter_binwidth + 1)
+        self.min_laser_length_bin = int(
+            self.extraction_settings['min_laser_length'] / self.fast_counter_binwidth + 1)
+
+        methods = self.gated_extraction_methods if is_gated else self.ungated_extraction_methods
+        method = self.extraction_settings['current_method']
+        if method not in methods:
+            raise ValueError('The extraction method "{0}" is not available for {1} data.'
+                             ''.format(method, 'gated' if is_gated else 'ungated'))
+        return getattr(self, ('gated_' if is_gated else 'ungated_') + method)(count_data)
+
+    def analyze_data(self, laser_data):
+        """ Analyse the laser pulses, see PulseAnalysisLogic.analyze_data.
+
+        @param numpy.ndarray laser_data: 2D array of the extracted laser pulses
+
+        @return tuple(numpy.ndarray, numpy.ndarray): signal and its error
+        """
+        binwidth = self.fast_counter_binwidth
+        self.signal_start_bin = round(self.analysis_settings['signal_start_s'] / binwidth)
+        self.signal_end_bin = round(self.analysis_settings['signal_end_s'] / binwidth)
+        self.norm_start_bin = round(self.analysis_settings['norm_start_s'] / binwidth)
+        self.norm_end_bin = round(self.analysis_settings['norm_end_s'] / binwidth)
+
+        method = 'analyse_' + self.analysis_settings['current_method']
+        return getattr(self, method)(laser_data)
+
+    def process(self, raw_data, bin_size, number_of_lasers, is_gated=False,
+                is_alternating=False, laser_ignore_list=None):
+        """ Extract and analyse a raw timetrace like the PulsedMeasurementLogic does it.
+
+        @param numpy.ndarray raw_data: raw timetrace, 1D (ungated) or 2D (gated)
+        @param float bin_size: bin width of the fast counter in s
+        @param int number_of_lasers: number of laser pulses in the timetrace
+        @param bool is_gated: was the fast counter gated
+        @param bool is_alternating: are the signals of two measurements interleaved
+        @param list laser_ignore_list: indices of laser pulses to drop (negative from the end)
+
+        @return tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray):
+                    signal, error, alternating signal, alternating error (the latter two are
+                    empty for a measurement which is not alternating)
+        """
+        self.fast_counter_binwidth = bin_size
+        self.number_of_lasers = number_of_lasers
+
+        laser_data = self.extract_laser_pulses(raw_data, is_gated)['laser_counts_arr']
+        # a failed extraction returns only zeros
+        if np.sum(laser_data) < 1:
+            signal = np.zeros(laser_data.shape[0])
+            error = np.zeros(laser_data.shape[0])
+        else:
+            signal, error = self.analyze_data(laser_data)
+
+        if laser_ignore_list:
+            ignore_indices = np.unique(np.asarray(laser_ignore_list, dtype=int) % len(signal))
+            signal = np.delete(signal, ignore_indices)
+            error = np.delete(error, ignore_indices)
+        if is_alternating:
+            return signal[::2], error[::2], signal[1::2], error[1::2]
+        return signal, error, np.zeros(0), np.zeros(0)
+
+
+class BatchFitter:
+    """ The fit methods of logic/fitmethods outside of qudi, like tools/fit_logic_standalone.py
+        but without the plotting and test functions.
+    """
+
+    def __init__(self, fit_name, estimator='generic'):
+        """
+        @param str fit_name: name of the fit, e.g. 'sine' for make_sine_fit
+        @param str estimator: estimator of the fit, 'generic' for estimate_<fit_name> or the
+                              suffix of estimate_<fit_name>_<estimator>
+        """
+        self.log = logger
+        methods = bind_methods(BatchFitter, 'logic.fitmethods', ['make_', 'estimate_'])
+        if fit_name + '_fit' not in methods['make_']:
+            raise ValueError('Unknown fit "{0}".'.format(fit_name))
+        estimator_name = fit_name if estimator == 'generic' else fit_name + '_' + estimator
+        if estimator_name not in methods['estimate_']:
+            raise ValueError('Unknown estimator "{0}" for the fit "{1}".'
+                             ''.format(estimator, fit_name))
+        self._make_fit = getattr(self, 'make_' + fit_name + '_fit')
+        self._estimator = getattr(self, 'estimate_' + estimator_name)
+
+    def fit(self, x_data, y_data):
+        """ Fit data.
+
+        @param numpy.ndarray x_data: x values
+        @param numpy.ndarray y_data: y values
+
+        @return OrderedDict: parameter name: (value, standard error), the error is NaN if
+                             it could not be estimated
+        """
+        result = self._make_fit(x_axis=x_data, data=y_data, estimator=self._estimator)
+        params = OrderedDict()
+        for name, param in result.params.items():
+            stderr = param.stderr if param.stderr is not None else np.nan
+            params[name] = (float(param.value), float(stderr))
+        return params
+
+
+def find_raw_data_files(directory):
+    """ Find all raw pulsed timetraces in a directory tree.
+
+    @param str directory: root of the directory tree
+
+    @return list: sorted paths of the files relative to the directory
+    """
+    files = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in filenames:
+            if filename.endswith(RAW_DATA_SUFFIXES):
+                files.append(os.path.relpath(os.path.join(dirpath, filename), directory))
+    return sorted(files)
+
+
+def parse_header(lines):
+    """ Read the parameters from the header of a file written by the SaveLogic.
+
+    @param iterable lines: header lines without the comment character
+
+    @return OrderedDict: parameter name: value, values are converted to python literals
+                         where possible (also lists of numpy scalars written by numpy >= 2)
+    """
+    parameters = OrderedDict()
+    in_parameters = False
+    for line in lines:
+        line = line.strip()
+        if line == 'Parameters:':
+            in_parameters = True
+        elif line == 'Data:':
+            break
+        elif in_parameters and ': ' in line:
+            key, value = line.split(': ', 1)
+            literal = NUMPY_BOOL_REPR.sub(r'\1', NUMPY_SCALAR_REPR.sub(r'\1', value))
+            try:
+                parameters[key] = ast.literal_eval(literal)
+            except (ValueError, SyntaxError):
+                parameters[key] = value
+    return parameters
+
+
+def header_flag(parameters, key, default):
+    """ Read a yes/no parameter of a file header.
+
+    @param dict parameters: parameters of the file header, see parse_header
+    @param str key: name of the parameter
+    @param bool default: value if the parameter is not in the header
+
+    @return bool: the value of the parameter
+
+    Anything but True or False raises a ValueError, e.g. the string 'False' would be
+    true for bool().
+    """
+    value = parameters.get(key, default)
+    if not isinstance(value, bool):
+        raise ValueError('The parameter "{0}" in the file header is {1!r} instead of True or '
+                         'False.'.format(key, value))
+    return value
+
+
+def read_text_data(file, first_line, chunk_lines=100000):
+    """ Read the integer data of a text file in chunks of lines.
+
+    This is much faster than numpy.loadtxt for the long timetraces and needs less memory.
+
+    @param file file: open text file, positioned after first_line
+    @param str first_line: the first data line
+    @param int chunk_lines: number of lines parsed at once
+
+    @return numpy.ndarray: the data, 1D for a single column, else 2D (lines, columns)
+    """
+    columns = len(first_line.split())
+    chunks = [np.fromstring(first_line, dtype=np.int64, sep=' ')]
+    while True:
+        lines = list(itertools.islice(file, chunk_lines))
+        if not lines:
+            break
+        chunks.append(np.fromstring(''.join(lines), dtype=np.int64, sep=' '))
+    data = np.concatenate(chunks)
+    if columns > 1:
+        data = data.reshape(-1, columns)
+    return data
+
+
+def load_raw_data(path):
+    """ Load a raw pulsed timetrace saved by the PulsedMeasurementLogic.
+
+    @param str path: path of the text (.dat) or npz file
+
+    @return tuple(numpy.ndarray, OrderedDict): the raw data (1D for ungated, 2D with the
+                                               dimensions (gate, bin) for gated data) and
+                                               the parameters of the file header
+    """
+    if path.endswith('.npz'):
+        with open(path[:-4] + '_params.dat', 'r') as file:
+            parameters = parse_header(line.lstrip('#') for line in file if line.startswith('#'))
+        with np.load(path) as npz_file:
+            raw_data = npz_file['Signal (counts)']
+    else:
+        header = []
+        raw_data = np.zeros(0, dtype=np.int64)
+        with open(path, 'r') as file:
+            for line in file:
+                if line.startswith('#'):
+                    header.append(line[1:])
+                elif line.strip():
+                    raw_data = read_text_data(file, line)
+                    break
+        parameters = parse_header(header)
+
+    # the SaveLogic stores the transposed timetrace
+    if header_flag(parameters, 'Is counter gated?', False):
+        raw_data = np.atleast_2d(raw_data.transpose())
+        if raw_data.shape[1] == 1:
+            # a single bin per gate is read as one column
+            raw_data = raw_data.transpose()
+    return raw_data, parameters
+
+
+# the processor and fitter of a worker process, created once by init_worker
+_worker = {}
+
+
+def init_worker(settings):
+    """ Create the processor (and fitter) of a worker process.
+
+    @param dict settings: settings of the batch analysis, see settings_from_arguments
+    """
+    logging.basicConfig(level=logging.WARNING)
+    _worker['settings'] = settings
+    _worker['processor'] = PulsedProcessor(settings['extraction'], settings['analysis'])
+    if settings['fit'] is not None:
+        _worker['fitter'] = BatchFitter(settings['fit'], settings['estimator'])
+    else:
+        _worker['fitter'] = None
+
+
+def process_file(task):
+    """ Analyse one file in a worker process. Errors are reported in the result, they do not
+        stop the batch.
+
+    @param tuple task: (root directory, path relative to it, modification time)
+
+    @return dict: the result of the file, see PROGRESS_FILENAME
+    """
+    directory, path, mtime = task
+    settings = _worker['settings']
+    result = OrderedDict([('file', path), ('mtime', mtime), ('status', 'ok')])
+    start_time = time.time()
+    try:
+        raw_data, parameters = load_raw_data(os.path.join(directory, path))
+        is_gated = header_flag(parameters, 'Is counter gated?', raw_data.ndim == 2)
+        is_alternating = header_flag(parameters, 'Is alternating?', False)
+        bin_size = settings['bin_size'] or parameters.get('Bin size (s)')
+        number_of_lasers = settings['number_of_lasers'] or \
+            parameters.get('Number of laser pulses')
+        if not bin_size or not number_of_lasers:
+            raise ValueError('The bin size and the number of laser pulses are neither saved '
+                             'in the file nor given.')
+        result['gated'] = is_gated
+        result['alternating'] = is_alternating
+        result['bin_size'] = float(bin_size)
+        result['number_of_lasers'] = int(number_of_lasers)
+
+        signal, error, signal2, error2 = _worker['processor'].process(
+            raw_data, float(bin_size), int(number_of_lasers), is_gated, is_alternating,
+            settings['laser_ignore_list'])
+
+        try:
+            x_values = np.asarray(parameters.get('Controlled variable values', []), dtype=float)
+        except (TypeError, ValueError):
+            x_values = np.zeros(0)
+        if x_values.ndim != 1 or x_values.size != signal.size:
+            x_values = np.arange(signal.size, dtype=float)
+        result['controlled_values'] = x_values.tolist()
+        result['signal'] = signal.tolist()
+        result['error'] = error.tolist()
+        result['signal2'] = signal2.tolist()
+        result['error2'] = error2.tolist()
+
+        if _worker['fitter'] is not None:
+            fit_data = signal - signal2 if settings['fit_delta'] and is_alternating else signal
+            result['fit'] = _worker['fitter'].fit(x_values, fit_data)
+    except Exception as e:
+        result['status'] = 'error: {0}: {1}'.format(type(e).__name__, e).replace('\n', ' ')
+    result['duration_s'] = time.time() - start_time
+    return result
+
+
+def read_progress(progress_path, settings):
+    """ Read the results of a previous run from the progress file.
+
+    @param str progress_path: path of the progress file
+    @param dict settings: the settings of this run, they have to match the ones of the file
+
+    @return OrderedDict: file: result
+    """
+    results = OrderedDict()
+    if not os.path.isfile(progress_path):
+        return results
+    with open(progress_path, 'r') as file:
+        lines = file.readlines()
+    if not lines:
+        return results
+    if json.loads(lines[0]).get('settings') != settings:
+        raise ValueError('The progress file {0} was written with different settings. Use '
+                         '--restart to discard it or choose another output directory.'
+                         ''.format(progress_path))
+    for line in lines[1:]:
+        try:
+            result = json.loads(line)
+        except ValueError:
+            # the last line is incomplete if the previous run was killed while writing
+            continue
+        results[result['file']] = result
+    return results
+
+
+def write_tables(output_dir, results):
+    """ Write the consolidated results tables.
+
+    @param str output_dir: output directory
+    @param list results: results of the processed files
+    """
+    fit_params = []
+    for result in results:
+        for name in result.get('fit', {}):
+            if name not in fit_params:
+                fit_params.append(name)
+
+    columns = ['file', 'status', 'gated', 'alternating', 'bin size (s)',
+               'number of laser pulses', 'number of points']
+    for name in fit_params:
+        columns += [name, name + ' error']
+    with open(os.path.join(output_dir, RESULTS_FILENAME), 'w') as file:
+        file.write('# ' + '\t'.join(columns) + '\n')
+        for result in results:
+            row = [result['file'], result['status'], result.get('gated', ''),
+                   result.get('alternating', ''), result.get('bin_size', ''),
+                   result.get('number_of_lasers', ''), len(result.get('signal', []))]
+            fit = result.get('fit', {})
+            for name in fit_params:
+                row += fit.get(name, ('', ''))
+            file.write('\t'.join(str(entry) for entry in row) + '\n')
+
+    columns = ['file', 'controlled variable', 'signal', 'error', 'signal2', 'error2']
+    with open(os.path.join(output_dir, SIGNALS_FILENAME), 'w') as file:
+        file.write('# ' + '\t'.join(columns) + '\n')
+        for result in results:
+            if result['status'] != 'ok':
+                continue
+            points = len(result['signal'])
+            signal2 = result['signal2'] or [np.nan] * points
+            error2 = result['error2'] or [np.nan] * points
+            for row in zip(result['controlled_values'], result['signal'], result['error'],
+                           signal2, error2):
+                file.write(result['file'] + '\t' + '\t'.join(repr(value) for value in row)
+                           + '\n')
+
+
+def run_batch(directory, output_dir, settings, processes=None, chunksize=4, restart=False,
+              retry_failed=False):
+    """ Analyse all raw pulsed timetraces of a directory tree.
+
+    @param str directory: root of the directory tree with the saved data
+    @param str output_dir: directory for the progress file and the results tables
+    @param dict settings: settings of the analysis, see settings_from_arguments
+    @param int processes: number of worker processes, None for the number of CPUs
+    @param int chunksize: number of files handed to a worker at once
+    @param bool restart: discard the progress of a previous run
+    @param bool retry_failed: analyse files again which failed in a previous run
+
+    @return list: the results of all files
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    progress_path = os.path.join(output_dir, PROGRESS_FILENAME)
+    if restart and os.path.isfile(progress_path):
+        os.remove(progress_path)
+    results = read_progress(progress_path, settings)
+
+    tasks = []
+    for path in find_raw_data_files(directory):
+        mtime = os.path.getmtime(os.path.join(directory, path))
+        done = results.get(path)
+        if done is not None and done['mtime'] == mtime and \
+                (done['status'] == 'ok' or not retry_failed):
+            continue
+        tasks.append((directory, path, mtime))
+    logger.info('{0} files to analyse, {1} done before.'.format(len(tasks), len(results)))
+
+    if tasks:
+        # check the settings before the workers are started
+        init_worker(settings)
+        new_file = not os.path.isfile(progress_path) or os.path.getsize(progress_path) == 0
+        if not new_file:
+            with open(progress_path, 'rb') as progress_file:
+                progress_file.seek(-1, os.SEEK_END)
+                complete = progress_file.read(1) == b'\n'
+        with open(progress_path, 'a') as progress_file:
+            if new_file:
+                progress_file.write(json.dumps({'settings': settings}) + '\n')
+            elif not complete:
+                # end the incomplete line of a killed run
+                progress_file.write('\n')
+            if processes == 1:
+                finished = map(process_file, tasks)
+                pool = None
+            else:
+                pool = multiprocessing.Pool(processes, initializer=init_worker,
+                                            initargs=(settings,))
+                finished = pool.imap_unordered(process_file, tasks, chunksize)
+            try:
+                for number, result in enumerate(finished, 1):
+                    progress_file.write(json.dumps(result) + '\n')
+                    progress_file.flush()
+                    results[result['file']] = result
+                    if result['status'] != 'ok':
+                        logger.warning('{0}: {1}'.format(result['file'], result['status']))
+                    if number % 100 == 0 or number == len(tasks):
+                        logger.info('{0}/{1} files analysed.'.format(number, len(tasks)))
+            finally:
+                if pool is not None:
+                    pool.terminate()
+                    pool.join()
+
+    results = [results[path] for path in sorted(results)]
+    write_tables(output_dir, results)
+    return results
+
+
+def settings_from_arguments(args):
+    """ Collect the analysis settings from the command line arguments.
+
+    @param argparse.Namespace args: parsed arguments
+
+    @return dict: settings of the batch analysis
+    """
+    return {
+        'extraction': {'current_method': args.extraction_method,
+                       'conv_std_dev': args.conv_std_dev,
+                       'count_threshold': args.count_threshold,
+                       'threshold_tolerance': args.threshold_tolerance,
+                       'min_laser_length': args.min_laser_length},
+        'analysis': {'current_method': args.analysis_method,
+                     'signal_start_s': args.signal_start,
+                     'signal_end_s': args.signal_end,
+                     'norm_start_s': args.norm_start,
+                     'norm_end_s': args.norm_end},
+        'bin_size': args.bin_size,
+        'number_of_lasers': args.number_of_lasers,
+        'laser_ignore_list': args.laser_ignore,
+        'fit': args.fit,
+        'estimator': args.estimator,
+        'fit_delta': args.fit_delta}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Analyse saved raw pulsed timetraces again and collect the results.')
+    parser.add_argument('directory', help='root of the directory tree with the saved data')
+    parser.add_argument('-o', '--output', default=None,
+                        help='output directory, default: <directory>/pulsed_batch_analysis')
+    parser.add_argument('-p', '--processes', type=int, default=None,
+                        help='number of worker processes, default: number of CPUs')
+    parser.add_argument('--chunksize', type=int, default=4,
+                        help='number of files handed to a worker at once')
+    parser.add_argument('--restart', action='store_true',
+                        help='discard the progress of a previous run')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='analyse files again which failed in a previous run')
+
+    group = parser.add_argument_group('extraction')
+    group.add_argument('--extraction-method', default='conv_deriv')
+    group.add_argument('--conv-std-dev', type=float, default=10.0)
+    group.add_argument('--count-threshold', type=float, default=10)
+    group.add_argument('--threshold-tolerance', type=float, default=20e-9, help='in s')
+    group.add_argument('--min-laser-length', type=float, default=200e-9, help='in s')
+
+    group = parser.add_argument_group('analysis')
+    group.add_argument('--analysis-method', default='mean_norm')
+    group.add_argument('--signal-start', type=float, default=0.0, help='in s')
+    group.add_argument('--signal-end', type=float, default=200e-9, help='in s')
+    group.add_argument('--norm-start', type=float, default=500e-9, help='in s')
+    group.add_argument('--norm-end', type=float, default=700e-9, help='in s')
+    group.add_argument('--laser-ignore', type=int, nargs='*', default=[],
+                       help='indices of laser pulses to drop, negative from the end')
+
+    group = parser.add_argument_group('measurement parameters, default: from the files')
+    group.add_argument('--bin-size', type=float, default=None, help='in s')
+    group.add_argument('--number-of-lasers', type=int, default=None)
+
+    group = parser.add_argument_group('fit')
+    group.add_argument('--fit', default=None,
+                       help='name of a fit in logic/fitmethods, e.g. sine for make_sine_fit')
+    group.add_argument('--estimator', default='generic', help='estimator of the fit')
+    group.add_argument('--fit-delta', action='store_true',
+                       help='fit the difference of alternating signals')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    output_dir = args.output
+    if output_dir is None:
+        output_dir = os.path.join(args.directory, 'pulsed_batch_analysis')
+    try:
+        results = run_batch(args.directory, output_dir, settings_from_arguments(args),
+                            processes=args.processes, chunksize=args.chunksize,
+                            restart=args.restart, retry_failed=args.retry_failed)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    failed = sum(result['status'] != 'ok' for result in results)
+    logger.info('{0} files analysed, {1} failed. Results in {2}'.format(
+        len(results), failed, output_dir))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())